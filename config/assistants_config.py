@@ -25,7 +25,8 @@ ASSISTANT_CONFIG = {
         "temperature": 0.7,
         "top_p": 0.95,
         "presence_penalty": 0.6,
-        "frequency_penalty": 0.8
+        "frequency_penalty": 0.8,
+        "response_cache": True      # Pertanyaan berulang di chat yang sama dijawab dari cache
     },
     "KAIROS": {
         "name": "KAIROS", 
@@ -16,8 +16,9 @@ import asyncio
 # Import console jika dibutuhkan:
 from syncara.console import console
 from syncara.modules.pyrogram_integration import CompletePyrogramMethods
+from syncara.modules.outbound import OutboundMixin
 
-class Bot(Client, CompletePyrogramMethods):
+class Bot(OutboundMixin, Client, CompletePyrogramMethods):
     """Enhanced Bot class with custom handlers and complete Pyrogram methods"""
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -35,7 +36,11 @@ class Bot(Client, CompletePyrogramMethods):
         console.info(f"Bot Manager started as @{self.me.username} ({self.me.id})")
         console.info("✅ Semua method Pyrogram telah dimuat ke Bot Manager")
 
-class Ubot(Client, CompletePyrogramMethods):
+    async def stop(self, *args, **kwargs):
+        await self.outbound.close()
+        return await super().stop(*args, **kwargs)
+
+class Ubot(OutboundMixin, Client, CompletePyrogramMethods):
     """Enhanced Userbot class with complete Pyrogram methods"""
     __module__ = "pyrogram.client"
 
@@ -55,6 +60,10 @@ class Ubot(Client, CompletePyrogramMethods):
         console.info(f"Userbot started as @{self.me.username} ({self.me.id})")
         console.info("✅ Semua method Pyrogram telah dimuat ke Userbot")
 
+    async def stop(self, *args, **kwargs):
+        await self.outbound.close()
+        return await super().stop(*args, **kwargs)
+
 # Assistant Configuration sudah diimport dari config.assistants_config
 
 # Global instances
@@ -177,6 +186,22 @@ async def initialize_syncara():
     # Initialize all assistants
     await assistant_manager.initialize_all_assistants()
     
+    # Pre-fork worker pool untuk PYTHON:EXEC
+    try:
+        from syncara.modules.python_sandbox import python_sandbox
+        await python_sandbox.start()
+    except Exception as e:
+        console.error(f"❌ Error starting Python sandbox pool: {str(e)}")
+    
+    # Lanjutkan broadcast yang terputus saat restart
+    try:
+        from syncara.modules.broadcast_engine import broadcast_engine
+        clients = [bot] + [info["client"] for info in assistant_manager.get_all_assistants().values()
+                           if info.get("status") == "active"]
+        asyncio.create_task(broadcast_engine.resume_incomplete_jobs(clients))
+    except Exception as e:
+        console.error(f"❌ Error resuming broadcast jobs: {str(e)}")
+    
     console.info("🎉 SyncaraBot initialized successfully!")
     return bot, assistant_manager
 
@@ -190,6 +215,41 @@ async def stop_syncara():
     # Stop bot manager
     await bot.stop()
     
+    # Close inference HTTP pool
+    try:
+        from syncara.services.replicate import inference_engine
+        await inference_engine.close()
+    except Exception as e:
+        console.error(f"❌ Error closing inference engine: {str(e)}")
+    
+    # Stop Python sandbox workers
+    try:
+        from syncara.modules.python_sandbox import python_sandbox
+        await python_sandbox.close()
+    except Exception as e:
+        console.error(f"❌ Error stopping Python sandbox pool: {str(e)}")
+    
+    # Hentikan worker antrian AI
+    try:
+        from syncara.modules.ingestion_queue import stop_ingestion_queues
+        await stop_ingestion_queues()
+    except Exception as e:
+        console.error(f"❌ Error stopping ingestion queues: {str(e)}")
+    
+    # Flush persistent cache dan hentikan cleanup task
+    try:
+        from syncara.modules.pyrogram_helpers import pyrogram_helpers
+        await pyrogram_helpers.shutdown()
+    except Exception as e:
+        console.error(f"❌ Error shutting down pyrogram helpers: {str(e)}")
+    
+    # Tulis sisa buffer log ke database
+    try:
+        from syncara.database import log_sink
+        await log_sink.close()
+    except Exception as e:
+        console.error(f"❌ Error flushing log sink: {str(e)}")
+    
     console.info("✅ SyncaraBot stopped completely")
 
 async def start_autonomous_mode():
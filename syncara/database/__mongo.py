@@ -1,21 +1,137 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection
 from datetime import datetime, timedelta
 import asyncio
+import inspect
+import random
+import re
+import time
+from collections import deque
 from typing import Dict, Any, Optional, List
 import logging
 
 from config.config import MONGO_URI
 from syncara.console import console
+from syncara.modules.metrics import performance_monitor
 
 # Validate MongoDB URI
 if not MONGO_URI:
     console.error("❌ MONGO_URI not found in environment variables!")
     raise ValueError("MONGO_URI is required for database connection")
 
+# ==================== INSTRUMENTATION ====================
+# Setiap operasi Mongo dicatat ke performance_monitor sebagai "mongo.<collection>.<method>"
+_COLLECTION_NUMERIC_SUFFIX = re.compile(r'_-?\d+$')
+
+def _metric_collection_name(name: str) -> str:
+    """Koleksi dinamis per chat (todos_{chat_id}) digabung ke satu series"""
+    return _COLLECTION_NUMERIC_SUFFIX.sub('_*', name)
+
+class _InstrumentedCursor:
+    """Cursor find/aggregate: waktu diukur dari pembuatan sampai to_list/iterasi selesai"""
+
+    def __init__(self, cursor, metric: str):
+        self._cursor = cursor
+        self._metric = metric
+        self._started = time.perf_counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Method chaining (sort, limit, skip, ...) tetap mengembalikan wrapper
+            return self if result is self._cursor else result
+        return call
+
+    async def to_list(self, *args, **kwargs):
+        success = False
+        try:
+            result = await self._cursor.to_list(*args, **kwargs)
+            success = True
+            return result
+        finally:
+            performance_monitor.record(self._metric, time.perf_counter() - self._started, success)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        success = False
+        try:
+            async for document in self._cursor:
+                yield document
+            success = True
+        except GeneratorExit:
+            # Konsumen berhenti lebih awal (break), bukan error
+            success = True
+            raise
+        finally:
+            performance_monitor.record(self._metric, time.perf_counter() - self._started, success)
+
+class InstrumentedCollection:
+    """Proxy koleksi motor yang mengukur latency setiap operasi"""
+
+    _CURSOR_METHODS = {"find", "aggregate", "list_indexes", "find_raw_batches", "aggregate_raw_batches"}
+
+    def __init__(self, collection):
+        self._collection = collection
+        self._metric_prefix = f"mongo.{_metric_collection_name(collection.name)}"
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if isinstance(attr, AsyncIOMotorCollection):
+            return InstrumentedCollection(attr)
+        if not callable(attr):
+            return attr
+
+        metric = f"{self._metric_prefix}.{name}"
+        if name in self._CURSOR_METHODS:
+            def cursor_call(*args, **kwargs):
+                return _InstrumentedCursor(attr(*args, **kwargs), metric)
+            return cursor_call
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if not inspect.isawaitable(result):
+                return result
+            return _timed(result, metric)
+        return call
+
+    def __getitem__(self, name):
+        return InstrumentedCollection(self._collection[name])
+
+    def __repr__(self):
+        return f"InstrumentedCollection({self._collection.full_name})"
+
+class InstrumentedDatabase:
+    """Proxy database motor: koleksi yang diambil otomatis ter-instrumentasi"""
+
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        attr = getattr(self._database, name)
+        if isinstance(attr, AsyncIOMotorCollection):
+            return InstrumentedCollection(attr)
+        if name == "command":
+            def call(*args, **kwargs):
+                return _timed(attr(*args, **kwargs), "mongo.db.command")
+            return call
+        return attr
+
+    def __getitem__(self, name):
+        return InstrumentedCollection(self._database[name])
+
+async def _timed(awaitable, metric: str):
+    with performance_monitor.timer(metric):
+        return await awaitable
+
 # MongoDB connection with error handling
 try:
     mongo_client = AsyncIOMotorClient(MONGO_URI)
-    db = mongo_client.SyncaraBot
+    db = InstrumentedDatabase(mongo_client.SyncaraBot)
     console.info("✅ MongoDB client initialized successfully")
 except Exception as e:
     console.error(f"❌ Failed to initialize MongoDB client: {e}")
@@ -69,6 +185,14 @@ channel_posts = db.channel_posts
 channel_analytics = db.channel_analytics
 channel_schedule = db.channel_schedule
 channel_content_queue = db.channel_content_queue
+channel_rollups = db.channel_rollups
+
+# AI Response Cache
+ai_response_cache = db.ai_response_cache
+
+# Broadcast
+broadcast_jobs = db.broadcast_jobs
+broadcast_targets = db.broadcast_targets
 
 # System Monitoring
 system_logs = db.system_logs
@@ -124,12 +248,20 @@ async def get_database_status() -> Dict[str, Any]:
         return {"connection_healthy": False, "error": str(e)}
 
 # ==================== DATABASE UTILITIES ====================
+# TTL cache statistik untuk /dbstatus dan health check
+STATS_CACHE_CONFIG = {
+    "ttl": 30,              # Detik untuk get_database_stats
+    "integrity_ttl": 300    # Detik untuk validate_data_integrity (aggregation $lookup)
+}
+
 class DatabaseManager:
     """Database manager untuk operasi database yang umum"""
     
     def __init__(self):
         self.client = mongo_client
         self.db = db
+        self._stats_cache: Dict[str, Any] = {}
+        self._stats_locks: Dict[str, asyncio.Lock] = {}
     
     async def ensure_indexes(self):
         """Buat indexes untuk performa yang lebih baik dengan error handling"""
@@ -183,15 +315,33 @@ class DatabaseManager:
             await self._create_index_safe(channel_posts, "post_id", unique=True)
             await self._create_index_safe(channel_posts, "status")
             await self._create_index_safe(channel_posts, "created_at")
+            await self._create_index_safe(channel_posts, [("type", 1), ("status", 1), ("posted_time", -1)])
+            await self._create_index_safe(channel_posts, [("status", 1), ("posted_time", -1)])
             
             await self._create_index_safe(channel_analytics, "timestamp")
             await self._create_index_safe(channel_analytics, "metric_name")
             
+            # Rollup analytics channel (per jam dihapus otomatis lewat expires_at, harian permanen)
+            await self._create_index_safe(channel_rollups, [("channel_username", 1), ("granularity", 1), ("bucket", -1)])
+            await self._create_index_safe(channel_rollups, "expires_at", expireAfterSeconds=0)
+            
             await self._create_index_safe(channel_schedule, "scheduled_time")
             await self._create_index_safe(channel_schedule, "status")
+            await self._create_index_safe(channel_schedule, "content_type", unique=True, sparse=True)
             
             await self._create_index_safe(channel_content_queue, "priority")
             await self._create_index_safe(channel_content_queue, "status")
+            await self._create_index_safe(channel_content_queue, [("content_type", 1), ("slot", 1)], unique=True)
+            
+            # AI response cache indexes (dokumen dihapus otomatis saat expires_at lewat)
+            await self._create_index_safe(ai_response_cache, "key", unique=True)
+            await self._create_index_safe(ai_response_cache, "expires_at", expireAfterSeconds=0)
+            
+            # Broadcast indexes
+            await self._create_index_safe(broadcast_jobs, "job_id", unique=True)
+            await self._create_index_safe(broadcast_jobs, "status")
+            await self._create_index_safe(broadcast_targets, [("job_id", 1), ("target", 1)], unique=True)
+            await self._create_index_safe(broadcast_targets, [("job_id", 1), ("status", 1)])
             
             # System logs indexes
             await self._create_index_safe(system_logs, "timestamp")
@@ -336,6 +486,7 @@ class DatabaseManager:
             })
             cleanup_results["autonomous_tasks"] = autonomous_deleted.deleted_count
             
+            self.invalidate_stats()
             console.info(f"✅ Cleanup completed. Results: {cleanup_results}")
             return cleanup_results
             
@@ -343,26 +494,54 @@ class DatabaseManager:
             console.error(f"❌ Error cleaning up old data: {e}")
             return {}
     
-    async def get_database_stats(self) -> Dict[str, Any]:
-        """Dapatkan statistik database"""
+    async def _cached(self, key: str, ttl: float, loader, force: bool = False):
+        """TTL cache + single-flight untuk query statistik yang mahal"""
+        cached = self._stats_cache.get(key)
+        if not force and cached and cached[0] > time.monotonic():
+            return cached[1]
+        lock = self._stats_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._stats_cache.get(key)
+            if not force and cached and cached[0] > time.monotonic():
+                return cached[1]
+            value = await loader()
+            # Hasil kosong (error) tidak di-cache
+            if value:
+                self._stats_cache[key] = (time.monotonic() + ttl, value)
+            return value
+    
+    def invalidate_stats(self):
+        self._stats_cache.clear()
+    
+    async def get_database_stats(self, force: bool = False) -> Dict[str, Any]:
+        """Dapatkan statistik database (di-cache STATS_CACHE_CONFIG["ttl"] detik)"""
+        return await self._cached("database_stats", STATS_CACHE_CONFIG["ttl"], self._load_database_stats, force)
+    
+    async def _load_database_stats(self) -> Dict[str, Any]:
         try:
-            stats = {}
-            
-            # Collection counts
+            # Collection counts dari metadata (tanpa scan koleksi), semua query berjalan bersamaan
             collections = [
                 "users", "groups", "canvas_files", "workflow_executions",
                 "image_generations", "user_permissions", "system_logs",
-                "channel_posts", "channel_analytics", "autonomous_tasks",
+                "channel_posts", "channel_analytics", "channel_rollups", "autonomous_tasks",
                 "user_patterns", "scheduled_actions", "error_logs"
             ]
+            now = datetime.utcnow()
+            
+            counts, db_stats, recent_users, today_interactions, active_workflows = await asyncio.gather(
+                asyncio.gather(*(getattr(db, name).estimated_document_count() for name in collections)),
+                db.command("dbstats"),
+                # Filter di bawah ini memakai index (last_interaction, timestamp, status)
+                users.count_documents({"last_interaction": {"$gte": now - timedelta(days=7)}}),
+                system_logs.count_documents({
+                    "timestamp": {"$gte": now.replace(hour=0, minute=0, second=0, microsecond=0)}
+                }),
+                workflow_executions.count_documents({"status": "running"})
+            )
             
-            for collection_name in collections:
-                collection = getattr(db, collection_name)
-                count = await collection.count_documents({})
-                stats[f"{collection_name}_count"] = count
+            stats = {f"{name}_count": count for name, count in zip(collections, counts)}
             
             # Database size info
-            db_stats = await db.command("dbstats")
             stats["database_info"] = {
                 "collections": db_stats.get("collections", 0),
                 "data_size": db_stats.get("dataSize", 0),
@@ -374,16 +553,11 @@ class DatabaseManager:
             
             # Recent activity
             stats["recent_activity"] = {
-                "recent_users": await users.count_documents({
-                    "last_interaction": {"$gte": datetime.utcnow() - timedelta(days=7)}
-                }),
-                "today_interactions": await system_logs.count_documents({
-                    "timestamp": {"$gte": datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)}
-                }),
-                "active_workflows": await workflow_executions.count_documents({
-                    "status": "running"
-                })
+                "recent_users": recent_users,
+                "today_interactions": today_interactions,
+                "active_workflows": active_workflows
             }
+            stats["generated_at"] = now
             
             return stats
             
@@ -391,51 +565,87 @@ class DatabaseManager:
             console.error(f"❌ Error getting database stats: {e}")
             return {}
     
-    async def backup_collection(self, collection_name: str, backup_path: str):
-        """Backup koleksi tertentu"""
+    async def backup_collection(self, collection_name: str, backup_path: str, incremental: bool = False):
+        """Backup koleksi tertentu (streaming, gzip) ke direktori backup_path"""
         try:
             console.info(f"💾 Starting backup of collection: {collection_name}")
-            collection = getattr(db, collection_name)
-            documents = await collection.find({}).to_list(length=None)
-            
-            import json
-            with open(backup_path, 'w', encoding='utf-8') as f:
-                json.dump(documents, f, default=str, indent=2, ensure_ascii=False)
-            
-            console.info(f"✅ Collection {collection_name} backed up to {backup_path} ({len(documents)} documents)")
-            return len(documents)
+            manifest = await self.backup_collections([collection_name], backup_path, incremental=incremental)
+            info = manifest["collections"].get(collection_name, {})
+            if not info.get("completed"):
+                return 0
+            console.info(f"✅ Collection {collection_name} backed up to {backup_path} ({info['documents']} documents)")
+            return info["documents"]
             
         except Exception as e:
             console.error(f"❌ Error backing up {collection_name}: {e}")
             return 0
     
-    async def validate_data_integrity(self) -> Dict[str, Any]:
-        """Validate data integrity across collections"""
+    async def backup_collections(self, collection_names: List[str], backup_path: str = None,
+                                 incremental: bool = False) -> Dict[str, Any]:
+        """Backup beberapa koleksi bersamaan, return manifest"""
+        from syncara.database.backup import database_backup_engine
+        return await database_backup_engine.backup(collection_names, backup_path, incremental=incremental)
+    
+    async def restore_backup(self, backup_path: str, collection_names: List[str] = None) -> Dict[str, int]:
+        """Restore backup (upsert per _id) dari direktori backup"""
+        from syncara.database.backup import database_backup_engine
+        return await database_backup_engine.restore(backup_path, collection_names)
+    
+    async def validate_data_integrity(self, force: bool = False) -> Dict[str, Any]:
+        """Validate data integrity across collections (di-cache STATS_CACHE_CONFIG["integrity_ttl"] detik)"""
+        return await self._cached("data_integrity", STATS_CACHE_CONFIG["integrity_ttl"], self._load_data_integrity, force)
+    
+    @staticmethod
+    def _orphan_pipeline(local_field: str, foreign_collection: str, foreign_field: str) -> List[Dict[str, Any]]:
+        """Hitung dokumen yang tidak punya pasangan di koleksi lain (join per dokumen lewat index)"""
+        return [
+            {"$project": {"_id": 0, local_field: 1}},
+            {"$lookup": {
+                "from": foreign_collection,
+                "localField": local_field,
+                "foreignField": foreign_field,
+                "as": "_match"
+            }},
+            {"$match": {"_match": {"$size": 0}}},
+            {"$count": "orphans"}
+        ]
+    
+    async def _load_data_integrity(self) -> Dict[str, Any]:
         try:
             console.info("🔍 Validating data integrity...")
-            results = {}
             
-            # Check for orphaned records
-            # Canvas files without valid chat_ids
-            canvas_without_chats = await canvas_files.count_documents({
-                "chat_id": {"$nin": await groups.distinct("chat_id")}
-            })
-            results["orphaned_canvas_files"] = canvas_without_chats
-            
-            # Workflow executions without valid users
-            workflow_without_users = await workflow_executions.count_documents({
-                "user_id": {"$nin": await users.distinct("user_id")}
-            })
-            results["orphaned_workflows"] = workflow_without_users
-            
-            # Check for data consistency
-            total_users = await users.count_documents({})
-            users_with_patterns = await users.count_documents({"ai_learning_patterns": {"$exists": True}})
-            
-            results["data_consistency"] = {
-                "total_users": total_users,
-                "users_with_learning_patterns": users_with_patterns,
-                "learning_coverage": f"{(users_with_patterns/total_users*100):.1f}%" if total_users > 0 else "0%"
+            async def first(cursor):
+                documents = await cursor.to_list(length=1)
+                return documents[0] if documents else {}
+            
+            canvas_orphans, workflow_orphans, user_facets = await asyncio.gather(
+                # Canvas files without valid chat_ids
+                first(canvas_files.aggregate(self._orphan_pipeline("chat_id", "groups", "chat_id"))),
+                # Workflow executions without valid users
+                first(workflow_executions.aggregate(self._orphan_pipeline("user_id", "users", "user_id"))),
+                # Check for data consistency (satu pass koleksi users)
+                first(users.aggregate([
+                    {"$facet": {
+                        "total": [{"$count": "count"}],
+                        "with_patterns": [
+                            {"$match": {"ai_learning_patterns": {"$exists": True}}},
+                            {"$count": "count"}
+                        ]
+                    }}
+                ]))
+            )
+            
+            total_users = (user_facets.get("total") or [{}])[0].get("count", 0)
+            users_with_patterns = (user_facets.get("with_patterns") or [{}])[0].get("count", 0)
+            
+            results = {
+                "orphaned_canvas_files": canvas_orphans.get("orphans", 0),
+                "orphaned_workflows": workflow_orphans.get("orphans", 0),
+                "data_consistency": {
+                    "total_users": total_users,
+                    "users_with_learning_patterns": users_with_patterns,
+                    "learning_coverage": f"{(users_with_patterns/total_users*100):.1f}%" if total_users > 0 else "0%"
+                }
             }
             
             console.info(f"✅ Data integrity validation completed: {results}")
@@ -488,45 +698,154 @@ async def get_group_data(chat_id: int) -> Optional[Dict[str, Any]]:
         console.error(f"Error getting group data for {chat_id}: {e}")
         return None
 
+# ==================== BUFFERED LOG SINK ====================
+LOG_SINK_CONFIG = {
+    "max_buffer": 5000,           # Batas event di memory
+    "batch_size": 200,            # Flush segera jika buffer mencapai ini
+    "flush_interval": 2.0,        # Flush berkala (detik)
+    "sample_watermark": 0.5,      # Di atas fraksi buffer ini event prioritas rendah di-sample
+    "sample_rate": 0.1,           # Peluang event prioritas rendah disimpan saat overload
+    "priority_levels": ("error", "critical", "warning")
+}
+
+class LogSink:
+    """
+    Buffer async untuk system_logs, error_logs dan performance_metrics.
+    Event dikumpulkan di memory lalu ditulis per koleksi dengan
+    insert_many(ordered=False), sehingga pemanggil tidak menunggu round trip Mongo.
+    """
+
+    def __init__(self):
+        self._buffer = deque()
+        self._collections = {
+            "system_logs": system_logs,
+            "error_logs": error_logs,
+            "performance_metrics": performance_metrics
+        }
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._closed = False
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "failed": 0,
+            "flushes": 0
+        }
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run())
+
+    def emit(self, collection: str, document: Dict[str, Any], priority: bool = False) -> bool:
+        """Masukkan event ke buffer tanpa await. Return False jika event dibuang"""
+        if self._closed:
+            return False
+
+        size = len(self._buffer)
+        max_buffer = LOG_SINK_CONFIG["max_buffer"]
+        if not priority:
+            if size >= max_buffer:
+                self.stats["dropped"] += 1
+                return False
+            if size >= max_buffer * LOG_SINK_CONFIG["sample_watermark"] and random.random() >= LOG_SINK_CONFIG["sample_rate"]:
+                self.stats["sampled_out"] += 1
+                return False
+        elif size >= max_buffer:
+            # Event prioritas tinggi menggantikan event tertua
+            self._buffer.popleft()
+            self.stats["dropped"] += 1
+
+        self._buffer.append((collection, document))
+        self.stats["enqueued"] += 1
+        try:
+            self._ensure_flusher()
+        except RuntimeError:
+            # Tidak ada event loop aktif; event ditulis pada flush berikutnya
+            return True
+        if len(self._buffer) >= LOG_SINK_CONFIG["batch_size"]:
+            self._wakeup.set()
+        return True
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=LOG_SINK_CONFIG["flush_interval"])
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Tulis semua event di buffer, dikelompokkan per koleksi"""
+        while self._buffer:
+            batches: Dict[str, List[Dict[str, Any]]] = {}
+            for _ in range(min(len(self._buffer), LOG_SINK_CONFIG["max_buffer"])):
+                collection, document = self._buffer.popleft()
+                batches.setdefault(collection, []).append(document)
+
+            for collection, documents in batches.items():
+                try:
+                    await self._collections[collection].insert_many(documents, ordered=False)
+                    self.stats["written"] += len(documents)
+                except Exception as e:
+                    # Dokumen yang berhasil sebelum error tetap tersimpan (ordered=False)
+                    inserted = (getattr(e, "details", None) or {}).get("nInserted", 0)
+                    self.stats["written"] += inserted
+                    self.stats["failed"] += len(documents) - inserted
+                    console.error(f"Error flushing {collection}: {e}")
+            self.stats["flushes"] += 1
+
+    async def close(self):
+        """Hentikan flusher dan tulis sisa buffer (dipanggil saat shutdown)"""
+        self._closed = True
+        if self._flusher is not None:
+            # Bangunkan flusher agar batch yang sedang ditulis selesai, lalu keluar
+            self._wakeup.set()
+            try:
+                await self._flusher
+            except Exception as e:
+                console.error(f"Error stopping log sink: {e}")
+            self._flusher = None
+        await self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "buffered": len(self._buffer)}
+
+log_sink = LogSink()
+
 async def log_system_event(level: str, module: str, message: str, metadata: Dict[str, Any] = None):
-    """Log system event ke database dengan error handling"""
-    try:
-        await system_logs.insert_one({
-            "timestamp": datetime.utcnow(),
-            "level": level,
-            "module": module,
-            "message": message,
-            "metadata": metadata or {}
-        })
-    except Exception as e:
-        console.error(f"Error logging system event: {e}")
+    """Log system event ke database (di-buffer, ditulis batch oleh log_sink)"""
+    log_sink.emit("system_logs", {
+        "timestamp": datetime.utcnow(),
+        "level": level,
+        "module": module,
+        "message": message,
+        "metadata": metadata or {}
+    }, priority=level in LOG_SINK_CONFIG["priority_levels"])
 
 async def log_error(module: str, error: str, traceback: str = None, user_id: int = None, chat_id: int = None):
-    """Log error ke database dengan error handling"""
-    try:
-        await error_logs.insert_one({
-            "timestamp": datetime.utcnow(),
-            "module": module,
-            "error": error,
-            "traceback": traceback,
-            "user_id": user_id,
-            "chat_id": chat_id
-        })
-    except Exception as e:
-        console.error(f"Error logging error: {e}")
+    """Log error ke database (di-buffer, ditulis batch oleh log_sink)"""
+    log_sink.emit("error_logs", {
+        "timestamp": datetime.utcnow(),
+        "module": module,
+        "error": error,
+        "traceback": traceback,
+        "user_id": user_id,
+        "chat_id": chat_id
+    }, priority=True)
 
 async def record_performance_metric(metric_name: str, value: float, unit: str = "ms", metadata: Dict[str, Any] = None):
-    """Record performance metric dengan error handling"""
-    try:
-        await performance_metrics.insert_one({
-            "timestamp": datetime.utcnow(),
-            "metric_name": metric_name,
-            "value": value,
-            "unit": unit,
-            "metadata": metadata or {}
-        })
-    except Exception as e:
-        console.error(f"Error recording performance metric: {e}")
+    """Record performance metric (di-buffer, ditulis batch oleh log_sink)"""
+    log_sink.emit("performance_metrics", {
+        "timestamp": datetime.utcnow(),
+        "metric_name": metric_name,
+        "value": value,
+        "unit": unit,
+        "metadata": metadata or {}
+    })
 
 # ==================== HEALTH CHECK FUNCTIONS ====================
 async def run_database_health_check() -> Dict[str, Any]:
@@ -540,21 +859,23 @@ async def run_database_health_check() -> Dict[str, Any]:
             "checks": {}
         }
         
-        # Connection check
-        health_report["checks"]["connection"] = await check_database_connection()
+        # Performance check (simple indexed query timing)
+        async def timed_query():
+            started = time.perf_counter()
+            await users.find_one({}, {"_id": 1})
+            return (time.perf_counter() - started) * 1000
         
-        # Stats check
-        stats = await database_manager.get_database_stats()
-        health_report["checks"]["stats_available"] = bool(stats)
+        # Connection, stats (cached), data integrity (cached) dan query timing berjalan bersamaan
+        connection, stats, integrity, query_time = await asyncio.gather(
+            check_database_connection(),
+            database_manager.get_database_stats(),
+            database_manager.validate_data_integrity(),
+            timed_query()
+        )
         
-        # Data integrity check
-        integrity = await database_manager.validate_data_integrity()
+        health_report["checks"]["connection"] = connection
+        health_report["checks"]["stats_available"] = bool(stats)
         health_report["checks"]["data_integrity"] = bool(integrity)
-        
-        # Performance check (simple query timing)
-        start_time = datetime.utcnow()
-        await users.count_documents({})
-        query_time = (datetime.utcnow() - start_time).total_seconds() * 1000
         health_report["checks"]["query_performance"] = {
             "acceptable": query_time < 1000,  # < 1 second
             "query_time_ms": query_time
@@ -611,23 +932,26 @@ async def update_channel_post_status(post_id: str, status: str, posted_time: dat
 async def get_channel_analytics_summary() -> Dict[str, Any]:
     """Get channel analytics summary dengan error handling"""
     try:
-        # Get latest analytics
-        latest = await channel_analytics.find({}).sort("timestamp", -1).limit(1).to_list(length=1)
-        
-        # Get posts count
-        total_posts = await channel_posts.count_documents({"status": "posted"})
-        
-        # Get today's posts
-        today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_posts = await channel_posts.count_documents({
-            "status": "posted",
-            "posted_time": {"$gte": today_start}
-        })
+        # Rollup harian (waktu lokal server) menggantikan count_documents atas channel_posts
+        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        result = await channel_rollups.aggregate([
+            {"$match": {"granularity": "day"}},
+            {"$facet": {
+                "latest": [{"$sort": {"bucket": -1}}, {"$limit": 1}],
+                "posts": [{"$group": {
+                    "_id": None,
+                    "total": {"$sum": "$posts"},
+                    "today": {"$sum": {"$cond": [{"$gte": ["$bucket", today_start]}, "$posts", 0]}}
+                }}]
+            }}
+        ]).to_list(length=1)
+        facet = result[0] if result else {}
+        posts = (facet.get("posts") or [{}])[0]
         
         return {
-            "latest_analytics": latest[0] if latest else {},
-            "total_posts": total_posts,
-            "today_posts": today_posts,
+            "latest_analytics": (facet.get("latest") or [{}])[0],
+            "total_posts": posts.get("total", 0),
+            "today_posts": posts.get("today", 0),
             "last_updated": datetime.utcnow()
         }
     except Exception as e:
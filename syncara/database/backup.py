@@ -0,0 +1,335 @@
+# syncara/database/backup.py
+"""
+Backup & restore koleksi MongoDB secara streaming.
+Cursor dibaca per batch, dokumen di-encode (BSON atau Extended JSON Lines)
+dan dikompresi gzip di worker thread sehingga event loop tidak terblokir.
+Beberapa koleksi bisa di-backup bersamaan; hasilnya satu direktori dengan
+manifest. Backup incremental memakai watermark (field timestamp, atau _id
+untuk koleksi append-only) dari manifest backup sebelumnya; koleksi lain
+selalu di-backup penuh.
+
+Layout direktori backup:
+    manifest.json                 info backup, watermark & segmen per koleksi
+    users-00001.bson.gz           dokumen koleksi (BSON berurutan, gzip)
+    users-00002.bson.gz           segmen berikutnya
+"""
+
+import os
+import glob
+import gzip
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import BSON, decode_file_iter, json_util
+from pymongo import ReplaceOne
+
+from syncara.console import console
+from .__mongo import db
+
+DB_BACKUP_CONFIG = {
+    "directory": "backups",
+    "format": "bson",                 # "bson" atau "jsonl" (Extended JSON)
+    "batch_size": 1000,               # Dokumen per batch cursor / bulk_write restore
+    "segment_documents": 50000,       # Dokumen per file segmen
+    "compress_level": 6,
+    "max_parallel_collections": 3
+}
+
+# Koleksi yang dokumennya di-update di tempat: incremental memakai field timestamp.
+WATERMARK_FIELDS = {
+    "users": "last_interaction",
+    "canvas_files": "updated_at",
+    "broadcast_jobs": "updated_at"
+}
+
+# Koleksi yang hanya di-insert (tidak pernah di-update): incremental memakai _id.
+# Koleksi yang tidak ada di kedua daftar selalu di-backup penuh, karena
+# watermark _id tidak menangkap update di tempat (groups, user_patterns, dll).
+APPEND_ONLY_COLLECTIONS = {
+    "system_logs",
+    "performance_metrics",
+    "error_logs",
+    "canvas_history",
+    "user_warnings"
+}
+
+def get_watermark_field(collection_name: str) -> Optional[str]:
+    """Field watermark incremental, atau None jika koleksi harus di-backup penuh"""
+    if collection_name in WATERMARK_FIELDS:
+        return WATERMARK_FIELDS[collection_name]
+    if collection_name in APPEND_ONLY_COLLECTIONS:
+        return "_id"
+    return None
+
+MANIFEST_FILE = "manifest.json"
+_EXTENSIONS = {"bson": "bson.gz", "jsonl": "jsonl.gz"}
+
+def _write_manifest(backup_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(backup_dir, MANIFEST_FILE)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(json_util.dumps(manifest, indent=2, ensure_ascii=False))
+    os.replace(temp_path, path)
+
+def load_backup_manifest(backup_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(backup_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json_util.loads(f.read())
+
+def find_latest_backup(collection_name: str, directory: str = None) -> Optional[str]:
+    """Direktori backup terbaru yang berisi koleksi ini dalam keadaan lengkap"""
+    directory = directory or DB_BACKUP_CONFIG["directory"]
+    manifests = glob.glob(os.path.join(directory, "*", MANIFEST_FILE))
+    for manifest_path in sorted(manifests, key=os.path.getmtime, reverse=True):
+        backup_dir = os.path.dirname(manifest_path)
+        try:
+            manifest = load_backup_manifest(backup_dir)
+        except Exception:
+            continue
+        info = (manifest or {}).get("collections", {}).get(collection_name)
+        if info and info.get("completed"):
+            return backup_dir
+    return None
+
+class _SegmentWriter:
+    """Menulis dokumen ke segmen gzip; semua I/O dipanggil dari worker thread"""
+
+    def __init__(self, backup_dir: str, collection_name: str, fmt: str):
+        self.backup_dir = backup_dir
+        self.collection_name = collection_name
+        self.format = fmt
+        self.segments: List[Dict[str, Any]] = []
+        self._file = None
+        self._path = None
+        self._count = 0
+
+    def _open(self):
+        name = f"{self.collection_name}-{len(self.segments) + 1:05d}.{_EXTENSIONS[self.format]}"
+        self._path = os.path.join(self.backup_dir, name)
+        self._file = gzip.open(f"{self._path}.part", "wb", compresslevel=DB_BACKUP_CONFIG["compress_level"])
+        self._count = 0
+
+    def _close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(f"{self._path}.part", self._path)
+        self.segments.append({"file": os.path.basename(self._path), "documents": self._count})
+        self._file = None
+
+    def write(self, documents: List[Dict[str, Any]]):
+        for document in documents:
+            if self._file is None:
+                self._open()
+            if self.format == "bson":
+                self._file.write(BSON.encode(document))
+            else:
+                self._file.write(json_util.dumps(document, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._count += 1
+            if self._count >= DB_BACKUP_CONFIG["segment_documents"]:
+                self._close()
+
+    def finish(self) -> List[Dict[str, Any]]:
+        self._close()
+        return self.segments
+
+def _iter_segment(path: str) -> Iterable[Dict[str, Any]]:
+    with gzip.open(path, "rb") as f:
+        if path.endswith(_EXTENSIONS["bson"]):
+            yield from decode_file_iter(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json_util.loads(line)
+
+class DatabaseBackupEngine:
+    """Backup/restore streaming untuk satu atau banyak koleksi"""
+
+    def __init__(self, database=None):
+        self.db = database if database is not None else db
+
+    async def _watermark_bounds(self, collection, field: str, base: Optional[Dict[str, Any]]):
+        """Query range (watermark lama, watermark sekarang] untuk backup point-in-time"""
+        if field == "_id":
+            latest = await collection.find({}, {"_id": 1}).sort("_id", -1).limit(1).to_list(length=1)
+            upper = latest[0]["_id"] if latest else None
+        else:
+            upper = datetime.utcnow()
+
+        query: Dict[str, Any] = {}
+        lower = base.get("watermark_to") if base and base.get("watermark_field") == field else None
+        if lower is not None and upper is not None:
+            query[field] = {"$gt": lower, "$lte": upper}
+        elif field == "_id" and upper is not None:
+            query[field] = {"$lte": upper}
+        # Backup penuh dengan field timestamp tidak difilter: dokumen tanpa field tetap ikut
+        return query, lower, upper
+
+    async def _backup_one(self, backup_dir: str, collection_name: str, manifest: Dict[str, Any],
+                          base_manifest: Optional[Dict[str, Any]], fmt: str, lock: asyncio.Lock) -> int:
+        collection = self.db[collection_name]
+        field = get_watermark_field(collection_name)
+        base = (base_manifest or {}).get("collections", {}).get(collection_name)
+        if field is None:
+            query, lower, upper = {}, None, None
+        else:
+            query, lower, upper = await self._watermark_bounds(collection, field, base)
+
+        info = {
+            "documents": 0,
+            "segments": [],
+            "watermark_field": field,
+            "watermark_from": lower,
+            "watermark_to": upper,
+            "incremental": lower is not None,
+            "completed": False,
+            "started_at": datetime.utcnow()
+        }
+        async with lock:
+            manifest["collections"][collection_name] = info
+            await asyncio.to_thread(_write_manifest, backup_dir, manifest)
+
+        writer = _SegmentWriter(backup_dir, collection_name, fmt)
+        cursor = collection.find(query, batch_size=DB_BACKUP_CONFIG["batch_size"])
+        if field == "_id":
+            cursor = cursor.sort("_id", 1)
+
+        # Pipeline: batch berikutnya dibaca dari Mongo selagi batch sebelumnya ditulis di thread
+        pending_write = None
+        batch = []
+        try:
+            async for document in cursor:
+                batch.append(document)
+                if len(batch) >= DB_BACKUP_CONFIG["batch_size"]:
+                    if pending_write is not None:
+                        await pending_write
+                    pending_write = asyncio.ensure_future(asyncio.to_thread(writer.write, batch))
+                    info["documents"] += len(batch)
+                    batch = []
+            if pending_write is not None:
+                await pending_write
+            if batch:
+                await asyncio.to_thread(writer.write, batch)
+                info["documents"] += len(batch)
+            info["segments"] = await asyncio.to_thread(writer.finish)
+        except BaseException:
+            if pending_write is not None and not pending_write.done():
+                await asyncio.gather(pending_write, return_exceptions=True)
+            await asyncio.to_thread(writer.finish)
+            raise
+
+        async with lock:
+            # Manifest diserialisasi di thread: ubah struktur dict hanya di bawah lock
+            info["completed"] = True
+            info["finished_at"] = datetime.utcnow()
+            await asyncio.to_thread(_write_manifest, backup_dir, manifest)
+        console.info(f"✅ Collection {collection_name} backed up ({info['documents']} documents)")
+        return info["documents"]
+
+    async def backup(self, collection_names: List[str], backup_dir: str = None,
+                     incremental: bool = False, fmt: str = None) -> Dict[str, Any]:
+        """
+        Backup koleksi ke satu direktori. incremental=True hanya menyimpan
+        dokumen setelah watermark backup lengkap terakhir per koleksi;
+        koleksi tanpa watermark (lihat get_watermark_field) tetap penuh.
+        """
+        fmt = fmt or DB_BACKUP_CONFIG["format"]
+        if fmt not in _EXTENSIONS:
+            raise ValueError(f"Format backup tidak dikenal: {fmt}")
+
+        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        backup_dir = backup_dir or os.path.join(DB_BACKUP_CONFIG["directory"], f"db_{timestamp}")
+        os.makedirs(backup_dir, exist_ok=True)
+
+        manifest = {
+            "created_at": datetime.utcnow(),
+            "database": self.db.name,
+            "format": fmt,
+            "collections": {},
+            "base_backups": {}
+        }
+        base_manifests = {}
+        if incremental:
+            for name in collection_names:
+                if get_watermark_field(name) is None:
+                    continue
+                base_dir = find_latest_backup(name, os.path.dirname(backup_dir) or ".")
+                if base_dir and os.path.abspath(base_dir) != os.path.abspath(backup_dir):
+                    base_manifests[name] = load_backup_manifest(base_dir)
+                    manifest["base_backups"][name] = os.path.basename(base_dir)
+
+        lock = asyncio.Lock()
+        semaphore = asyncio.Semaphore(DB_BACKUP_CONFIG["max_parallel_collections"])
+
+        async def run(name):
+            async with semaphore:
+                try:
+                    return await self._backup_one(backup_dir, name, manifest, base_manifests.get(name), fmt, lock)
+                except Exception as e:
+                    console.error(f"❌ Error backing up {name}: {e}")
+                    async with lock:
+                        manifest["collections"].setdefault(name, {})["error"] = str(e)
+                    return 0
+
+        await asyncio.gather(*(run(name) for name in collection_names))
+        manifest["finished_at"] = datetime.utcnow()
+        await asyncio.to_thread(_write_manifest, backup_dir, manifest)
+        manifest["path"] = backup_dir
+        return manifest
+
+    async def restore(self, backup_dir: str, collection_names: List[str] = None,
+                      target_names: Dict[str, str] = None) -> Dict[str, int]:
+        """
+        Restore segmen ke koleksi (upsert per _id, sehingga backup incremental
+        bisa di-restore berurutan di atas backup penuh).
+        """
+        manifest = load_backup_manifest(backup_dir)
+        if not manifest:
+            raise FileNotFoundError(f"Manifest tidak ditemukan di {backup_dir}")
+
+        restored = {}
+        for name, info in manifest.get("collections", {}).items():
+            if collection_names and name not in collection_names:
+                continue
+            if not info.get("completed"):
+                console.warning(f"⚠️ Backup {name} tidak lengkap, dilewati")
+                continue
+            target = self.db[(target_names or {}).get(name, name)]
+            count = 0
+            for segment in info.get("segments", []):
+                iterator = iter(_iter_segment(os.path.join(backup_dir, segment["file"])))
+
+                def next_batch():
+                    batch = []
+                    for document in iterator:
+                        batch.append(document)
+                        if len(batch) >= DB_BACKUP_CONFIG["batch_size"]:
+                            break
+                    return batch
+
+                while True:
+                    batch = await asyncio.to_thread(next_batch)
+                    if not batch:
+                        break
+                    await target.bulk_write(
+                        [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in batch],
+                        ordered=False
+                    )
+                    count += len(batch)
+            restored[name] = count
+            console.info(f"✅ Restored {count} documents into {target.name}")
+        return restored
+
+def get_backup_size(backup_dir: str) -> int:
+    """Total ukuran file segmen + manifest (byte)"""
+    return sum(
+        os.path.getsize(path)
+        for path in glob.glob(os.path.join(backup_dir, "*"))
+        if os.path.isfile(path)
+    )
+
+# Global instance
+database_backup_engine = DatabaseBackupEngine()
@@ -1,23 +1,31 @@
 # syncara/modules/ai_handler.py
 from pyrogram import filters, enums
-from pyrogram.handlers import MessageHandler
+from pyrogram.handlers import MessageHandler, EditedMessageHandler
 from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
 from syncara.services import ReplicateAPI
+from syncara.services.response_cache import response_cache
 from syncara import bot, assistant_manager, console
 from config.config import OWNER_ID
 from datetime import datetime, timedelta
 import pytz
 import json
+from io import BytesIO
 from syncara.modules.assistant_memory import (
     kenalan_dan_update, 
     get_user_memory, 
     get_user_context, 
     learn_from_interaction,
     update_user_preferences,
-    get_recent_conversations
+    get_recent_conversations,
+    user_context_scope
 )
 from syncara.modules.ai_learning import ai_learning
 from syncara.modules.canvas_manager import canvas_manager
+from syncara.modules.stream_reply import stream_ai_reply, STREAMING_CONFIG
+from syncara.modules.chat_history_cache import ChatHistoryCache
+from syncara.modules.metrics import performance_monitor
+from syncara.modules.pyrogram_helpers import HierarchicalRateLimiter, RateLimiter
+from syncara.modules.ingestion_queue import get_ingestion_queue, ingestion_queues
 from config.assistants_config import get_assistant_by_username, get_assistant_config
 from syncara import autonomous_ai
 import asyncio
@@ -39,9 +47,42 @@ CHAT_HISTORY_CONFIG = {
     "enabled": True,
     "limit": 20,
     "include_media_info": True,
-    "include_timestamps": True
+    "include_timestamps": True,
+    "cache_enabled": True,
+    "cache_max_chats": 500,
+    "cache_max_messages": 50,
+    "cache_max_bytes": 16 * 1024 * 1024
 }
 
+# Ring buffer per (assistant, chat), diisi oleh message handler
+chat_history_cache = ChatHistoryCache(
+    max_chats=CHAT_HISTORY_CONFIG["cache_max_chats"],
+    max_messages=CHAT_HISTORY_CONFIG["cache_max_messages"],
+    max_bytes=CHAT_HISTORY_CONFIG["cache_max_bytes"]
+)
+
+# Rate limit request AI (melindungi backend Replicate dari spam per user)
+AI_RATE_LIMIT_CONFIG = {
+    "enabled": True,
+    "limits": {
+        "user": (6, 60),          # (max_requests, window_seconds)
+        "chat": (20, 60),
+        "assistant": (60, 60),
+        "global": (120, 60)
+    },
+    "exempt_owner": True          # Dicek saat enqueue (non-blocking), bukan di worker
+}
+
+ai_rate_limiter = HierarchicalRateLimiter(AI_RATE_LIMIT_CONFIG["limits"])
+# Pemberitahuan "terlalu banyak permintaan" maksimal sekali per menit per user
+_rate_limit_notices = RateLimiter(max_requests=1, window_seconds=60)
+
+# Kategori shortcode yang hasil teksnya (termasuk pesan error) dikirim ke chat
+TEXT_RESULT_PREFIXES = (
+    'USERBOT:', 'GROUP:', 'USER:', 'PYTHON:', 'CODE:', 'CALC:',
+    'SEARCH:', 'FILE:', 'FIND:', 'CHAT:', 'TODO:'
+)
+
 # Debug logging untuk troubleshooting
 DEBUG_MODE = False
 
@@ -307,6 +348,41 @@ async def debug_command(client, message):
         console.error(f"Error in debug command: {str(e)}")
         await message.reply_text(f"❌ Debug error: {str(e)}")
 
+@bot.on_message(filters.command("metrics") & filters.user(OWNER_ID))
+async def metrics_command(client, message):
+    """Latency p50/p95/p99 per operasi. Usage: /metrics [json|prom] [prefix]"""
+    try:
+        args = message.text.split()[1:]
+        export_format = args[0].lower() if args and args[0].lower() in ("json", "prom") else None
+        prefix = (args[1] if export_format and len(args) > 1 else args[0] if args and not export_format else None)
+        
+        if export_format:
+            if export_format == "json":
+                content = json.dumps(performance_monitor.snapshot(prefix), indent=2)
+                filename = "metrics.json"
+            else:
+                content = performance_monitor.export_prometheus()
+                filename = "metrics.prom"
+            document = BytesIO(content.encode())
+            document.name = filename
+            await message.reply_document(document=document, caption=f"📈 Snapshot metrics ({export_format})")
+        else:
+            summary = performance_monitor.format_summary(prefix)
+            if not prefix:
+                summary += "\n" + response_cache.format_summary()
+            if ingestion_queues and not prefix:
+                summary += "\n📥 **Antrian AI**\n"
+                for queue in ingestion_queues.values():
+                    stats = queue.get_stats()
+                    summary += (
+                        f"• {stats['name']}: {stats['pending']} menunggu, {stats['active_chats']} diproses, "
+                        f"wait p95 {stats['wait_p95']:.1f}s, digabung {stats['coalesced']}, dibuang {stats['shed']}\n"
+                    )
+            await message.reply_text(summary)
+    except Exception as e:
+        console.error(f"Error in metrics_command: {str(e)}")
+        await message.reply_text(f"❌ Metrics error: {str(e)}")
+
 @bot.on_message(filters.command("test"))
 async def test_command(client, message):
     """Simple test command"""
@@ -678,30 +754,40 @@ async def setup_assistant_handlers():
             # Create filter instance
             custom_filter = filters.create(create_assistant_filter(config))
             
-            # Group message handler
+            # Group message handler: hanya enqueue, LLM dipanggil oleh worker ingestion
             def create_message_handler(assistant_config):
+                queue = get_ingestion_queue(assistant_config['name'])
+                
                 async def assistant_message_handler(client, message):
                     """Handle messages for specific assistant"""
+                    # Get text from either message text or caption
+                    text = message.text or message.caption
+                    
+                    if not text:
+                        return
+                    
+                    # Remove assistant mention from text
+                    if f"@{assistant_config['username']}" in text:
+                        text = text.replace(f"@{assistant_config['username']}", "").strip()
+                    
+                    # Get photo if exists
+                    photo_file_id = message.photo.file_id if message.photo else None
+                    
+                    if not await _check_ai_quota(client, message):
+                        return
+                    status = queue.submit(client, message, text, photo_file_id, process_group_message)
+                    if status == "shed":
+                        await _notify_busy(client, message)
+                
+                async def process_group_message(client, message, text, photo_file_id):
+                    await run_in_user_context(message, handle_group_message, client, message, text, photo_file_id)
+                
+                async def handle_group_message(client, message, text, photo_file_id):
                     try:
                         # 🚀 TRIGGER: Save user data untuk group messages (tanpa greeting)
                         if message.from_user:
                             await kenalan_dan_update(client, message.from_user, send_greeting=False, interaction_context="group")
                         
-                        # Get text from either message text or caption
-                        text = message.text or message.caption
-                        
-                        if not text:
-                            return
-                        
-                        # Remove assistant mention from text
-                        if f"@{assistant_config['username']}" in text:
-                            text = text.replace(f"@{assistant_config['username']}", "").strip()
-                        
-                        # Get photo if exists
-                        photo_file_id = None
-                        if message.photo:
-                            photo_file_id = message.photo.file_id
-                        
                         # Send typing action
                         await client.send_chat_action(
                             chat_id=message.chat.id,
@@ -717,15 +803,27 @@ async def setup_assistant_handlers():
             
             # Private message handler
             def create_private_handler(assistant_config):
+                queue = get_ingestion_queue(assistant_config['name'])
+                
                 async def assistant_private_handler(client, message):
                     """Handler for private messages to specific assistant"""
+                    if not await _check_ai_quota(client, message):
+                        return
+                    status = queue.submit(client, message, message.text, None, process_private_message)
+                    if status == "shed":
+                        await _notify_busy(client, message)
+                
+                async def process_private_message(client, message, text, photo_file_id):
+                    await run_in_user_context(message, handle_private_message, client, message, text)
+                
+                async def handle_private_message(client, message, text):
                     try:
                         # Tambahkan auto-kenalan & ingatan dengan context private
                         if message.from_user:
                             await kenalan_dan_update(client, message.from_user, interaction_context="private")
                         
                         # Process AI response with specific personality
-                        await process_ai_response_with_personality(client, message, message.text, None, assistant_config['personality'])
+                        await process_ai_response_with_personality(client, message, text, None, assistant_config['personality'])
                         
                     except Exception as e:
                         console.error(f"Error in {assistant_config['name']} private handler: {str(e)}")
@@ -741,24 +839,74 @@ async def setup_assistant_handlers():
             assistant.add_handler(MessageHandler(create_message_handler(config), custom_filter & (filters.text | filters.photo)))
             assistant.add_handler(MessageHandler(create_private_handler(config), filters.text & filters.private))
             
+            # Passive observers (group -1) untuk mengisi chat history cache
+            assistant.add_handler(MessageHandler(record_chat_history), group=-1)
+            assistant.add_handler(EditedMessageHandler(record_chat_history_edit), group=-1)
+            
             console.info(f"✅ Handlers setup untuk {config['name']} (@{config['username']})")
         
     except Exception as e:
         console.error(f"Error setting up assistant handlers: {str(e)}")
 
+async def _check_ai_quota(client, message) -> bool:
+    """
+    Cek kuota AI user/chat/assistant tanpa menunggu, dipanggil sebelum enqueue.
+    Request yang kena limit ditolak di sini agar tidak pernah menahan worker
+    ingestion (worker yang tidur menunggu kuota memblokir chat lain).
+    """
+    if not AI_RATE_LIMIT_CONFIG["enabled"]:
+        return True
+    user_id = message.from_user.id if message.from_user else None
+    if AI_RATE_LIMIT_CONFIG["exempt_owner"] and user_id in OWNER_ID:
+        return True
+    
+    retry_after, level = ai_rate_limiter.check(
+        user=user_id,
+        chat=message.chat.id,
+        assistant=getattr(client, 'name', None)
+    )
+    if retry_after == 0:
+        ai_rate_limiter.stats["allowed"] += 1
+        return True
+    
+    ai_rate_limiter.stats["rejected"] += 1
+    console.warning(f"AI rate limit ({level}) untuk user {user_id} di chat {message.chat.id}")
+    if _rate_limit_notices.is_allowed(f"{user_id}:{message.chat.id}"):
+        await client.send_message(
+            chat_id=message.chat.id,
+            text=f"⏳ Terlalu banyak permintaan. Coba lagi dalam {max(retry_after, 1):.0f} detik.",
+            reply_to_message_id=message.id
+        )
+    return False
+
+async def _notify_busy(client, message):
+    """Beritahu user bahwa antrian penuh (dibatasi sekali per menit per user/chat)"""
+    user_id = message.from_user.id if message.from_user else None
+    if _rate_limit_notices.is_allowed(f"{user_id}:{message.chat.id}"):
+        await client.send_message(
+            chat_id=message.chat.id,
+            text="⏳ Sedang banyak permintaan, coba kirim lagi sebentar lagi.",
+            reply_to_message_id=message.id
+        )
+
+async def run_in_user_context(message, handler, *args):
+    """
+    Jalankan handler dalam request-scoped user context: dokumen user dimuat
+    sekali dan semua mutasi (kenalan, learning, shortcode trigger) di-flush
+    sebagai satu update di akhir request.
+    """
+    if message.from_user:
+        async with user_context_scope(message.from_user.id):
+            return await handler(*args)
+    return await handler(*args)
+
 async def process_ai_response_with_personality(client, message, prompt, photo_file_id=None, personality="AERIS"):
     """Process AI response dengan personality tertentu"""
     try:
-        # Set personality untuk response ini
+        # Set personality hanya untuk response ini (aman untuk worker paralel)
         from syncara.modules.system_prompt import system_prompt
-        original_prompt = system_prompt.current_prompt_name
-        system_prompt.set_prompt(personality)
-        
-        # Process AI response seperti biasa
-        await process_ai_response(client, message, prompt, photo_file_id)
-        
-        # Restore original personality
-        system_prompt.set_prompt(original_prompt)
+        with system_prompt.use_prompt(personality):
+            await process_ai_response(client, message, prompt, photo_file_id)
         
     except Exception as e:
         console.error(f"Error in process_ai_response_with_personality: {str(e)}")
@@ -769,6 +917,194 @@ async def process_ai_response_with_personality(client, message, prompt, photo_fi
         )
 
 # Rest of the functions remain the same...
+def _build_chat_info(chat):
+    """Normalisasi info chat untuk history entry"""
+    return {
+        'id': chat.id,
+        'title': chat.title if chat.title else "Private Chat",
+        'type': chat.type.name,
+        'username': chat.username if hasattr(chat, 'username') else None
+    }
+
+def _normalize_history_message(message, userbot_info, chat_info, tz):
+    """Ubah Message menjadi history dict (sender, reply, content). None jika dilewati"""
+    # Skip service messages
+    if message.service:
+        return None
+    
+    # Get message content
+    content = message.text or message.caption or ""
+    
+    # Handle media messages
+    if not content.strip() and CHAT_HISTORY_CONFIG["include_media_info"]:
+        if message.photo:
+            content = "[Foto]"
+        elif message.video:
+            content = "[Video]"
+        elif message.document:
+            content = f"[Dokumen: {message.document.file_name or 'Unknown'}]"
+        elif message.audio:
+            content = "[Audio]"
+        elif message.voice:
+            content = "[Voice Note]"
+        elif message.sticker:
+            content = f"[Sticker: {message.sticker.emoji or ''}]"
+        elif message.animation:
+            content = "[GIF]"
+        else:
+            content = "[Media]"
+    
+    # Skip if still empty
+    if not content.strip():
+        return None
+    
+    # Get sender info with detailed information
+    sender_info = {
+        'id': None,
+        'name': "Unknown",
+        'username': None,
+        'is_bot': False,
+        'is_assistant': False,
+        'display_name': "Unknown"
+    }
+    
+    if message.from_user:
+        sender_info = {
+            'id': message.from_user.id,
+            'name': message.from_user.first_name or "Unknown",
+            'username': message.from_user.username,
+            'is_bot': message.from_user.is_bot,
+            'is_assistant': message.from_user.id == userbot_info['id']
+        }
+        
+        # Add assistant label
+        if sender_info['is_assistant']:
+            sender_info['display_name'] = f"{userbot_info['first_name']} (Assistant)"
+        else:
+            sender_info['display_name'] = sender_info['name']
+            
+    elif message.sender_chat:
+        sender_info = {
+            'id': message.sender_chat.id,
+            'name': message.sender_chat.title or "Channel",
+            'username': message.sender_chat.username,
+            'is_bot': False,
+            'is_assistant': False,
+            'display_name': message.sender_chat.title or "Channel"
+        }
+    
+    # Get reply info if exists
+    reply_info = None
+    if message.reply_to_message:
+        reply_msg = message.reply_to_message
+        reply_sender_info = {
+            'id': None,
+            'name': "Unknown",
+            'username': None,
+            'display_name': "Unknown"
+        }
+        
+        if reply_msg.from_user:
+            reply_sender_info = {
+                'id': reply_msg.from_user.id,
+                'name': reply_msg.from_user.first_name or "Unknown",
+                'username': reply_msg.from_user.username
+            }
+            
+            # Check if reply is to assistant
+            if reply_msg.from_user.id == userbot_info['id']:
+                reply_sender_info['display_name'] = f"{userbot_info['first_name']} (Assistant)"
+            else:
+                reply_sender_info['display_name'] = reply_sender_info['name']
+                
+        elif reply_msg.sender_chat:
+            reply_sender_info = {
+                'id': reply_msg.sender_chat.id,
+                'name': reply_msg.sender_chat.title or "Channel",
+                'username': reply_msg.sender_chat.username,
+                'display_name': reply_msg.sender_chat.title or "Channel"
+            }
+        
+        reply_content = reply_msg.text or reply_msg.caption or "[Media]"
+        if len(reply_content) > 100:
+            reply_content = reply_content[:100] + "..."
+        
+        reply_info = {
+            'message_id': reply_msg.id,
+            'sender': reply_sender_info,
+            'content': reply_content
+        }
+    
+    return {
+        'message_id': message.id,
+        'sender': sender_info,
+        'chat': chat_info,
+        'content': content,
+        'timestamp': message.date.astimezone(tz),
+        'reply_to': reply_info
+    }
+
+def _get_cached_userbot_info(client):
+    """Userbot info dari cache atau client.me tanpa API call"""
+    userbot_name = getattr(client, 'name', 'unknown')
+    userbot_info = USERBOT_INFO_CACHE.get(userbot_name)
+    
+    if not userbot_info and getattr(client, 'me', None):
+        me = client.me
+        userbot_info = {
+            'id': me.id,
+            'username': me.username,
+            'first_name': me.first_name,
+            'last_name': me.last_name
+        }
+        USERBOT_INFO_CACHE[userbot_name] = userbot_info
+    
+    return userbot_info
+
+async def record_chat_history(client, message):
+    """Observer: rekam pesan baru ke chat history cache (tanpa API call)"""
+    try:
+        if not (CHAT_HISTORY_CONFIG["enabled"] and CHAT_HISTORY_CONFIG["cache_enabled"]):
+            return
+        
+        userbot_info = _get_cached_userbot_info(client)
+        if not userbot_info or not message.chat:
+            return
+        
+        tz = pytz.timezone('Asia/Jakarta')
+        entry = _normalize_history_message(message, userbot_info, _build_chat_info(message.chat), tz)
+        if entry:
+            # Message ID berurutan per chat hanya di supergroup/channel
+            sequential_ids = message.chat.type in (enums.ChatType.SUPERGROUP, enums.ChatType.CHANNEL)
+            chat_history_cache.append((getattr(client, 'name', 'unknown'), message.chat.id), entry, sequential_ids)
+    except Exception as e:
+        debug_log(f"Error recording chat history: {str(e)}")
+
+async def record_chat_history_edit(client, message):
+    """Observer: sinkronkan pesan yang di-edit ke chat history cache"""
+    try:
+        if not (CHAT_HISTORY_CONFIG["enabled"] and CHAT_HISTORY_CONFIG["cache_enabled"]):
+            return
+        
+        content = message.text or message.caption
+        if content and message.chat:
+            chat_history_cache.update_content((getattr(client, 'name', 'unknown'), message.chat.id), message.id, content)
+    except Exception as e:
+        debug_log(f"Error updating chat history: {str(e)}")
+
+async def remember_sent_message(client, sent_message):
+    """Rekam balasan assistant sendiri (outgoing tidak selalu diterima sebagai update)"""
+    if not sent_message:
+        return
+    # Userbot biasanya sudah merekam placeholder dari update outgoing: timpa kontennya
+    content = sent_message.text or sent_message.caption
+    if content and sent_message.chat and chat_history_cache.update_content(
+        (getattr(client, 'name', 'unknown'), sent_message.chat.id), sent_message.id, content
+    ):
+        return
+    await record_chat_history(client, sent_message)
+
+@performance_monitor.instrument("ai_handler.get_chat_history")
 async def get_chat_history(client, chat_id, limit=None):
     """Get chat history with detailed information including message ID, user ID, and reply info"""
     try:
@@ -784,7 +1120,7 @@ async def get_chat_history(client, chat_id, limit=None):
         
         # Get userbot info from cache
         userbot_name = getattr(client, 'name', 'unknown')
-        userbot_info = USERBOT_INFO_CACHE.get(userbot_name)
+        userbot_info = _get_cached_userbot_info(client)
         
         if not userbot_info:
             # Fallback: get info but with rate limiting
@@ -801,143 +1137,37 @@ async def get_chat_history(client, chat_id, limit=None):
                 console.error(f"Error getting userbot info: {str(e)}")
                 return []
         
+        # Warm cache: tidak perlu round trip ke API
+        cache_key = (userbot_name, chat_id)
+        if CHAT_HISTORY_CONFIG["cache_enabled"]:
+            cached_messages = chat_history_cache.get(cache_key, limit)
+            if cached_messages is not None:
+                return cached_messages
+        
         # Get chat info
-        try:
-            chat = await client.get_chat(chat_id)
-            chat_info = {
-                'id': chat.id,
-                'title': chat.title if chat.title else "Private Chat",
-                'type': chat.type.name,
-                'username': chat.username if hasattr(chat, 'username') else None
-            }
-        except Exception as e:
-            console.error(f"Error getting chat info: {str(e)}")
-            chat_info = {
-                'id': chat_id,
-                'title': "Unknown Chat",
-                'type': "unknown",
-                'username': None
-            }
+        chat_info = chat_history_cache.get_chat_info(cache_key)
+        if not chat_info:
+            try:
+                chat = await client.get_chat(chat_id)
+                chat_info = _build_chat_info(chat)
+            except Exception as e:
+                console.error(f"Error getting chat info: {str(e)}")
+                chat_info = {
+                    'id': chat_id,
+                    'title': "Unknown Chat",
+                    'type': "unknown",
+                    'username': None
+                }
         
         # Get timezone for timestamp formatting
         tz = pytz.timezone('Asia/Jakarta')
         
+        # Cold start atau gap: backfill dari API
         async for message in client.get_chat_history(chat_id, limit=limit):
             try:
-                # Skip service messages
-                if message.service:
-                    continue
-                
-                # Get message content
-                content = message.text or message.caption or ""
-                
-                # Handle media messages
-                if not content.strip() and CHAT_HISTORY_CONFIG["include_media_info"]:
-                    if message.photo:
-                        content = "[Foto]"
-                    elif message.video:
-                        content = "[Video]"
-                    elif message.document:
-                        content = f"[Dokumen: {message.document.file_name or 'Unknown'}]"
-                    elif message.audio:
-                        content = "[Audio]"
-                    elif message.voice:
-                        content = "[Voice Note]"
-                    elif message.sticker:
-                        content = f"[Sticker: {message.sticker.emoji or ''}]"
-                    elif message.animation:
-                        content = "[GIF]"
-                    else:
-                        content = "[Media]"
-                
-                # Skip if still empty
-                if not content.strip():
-                    continue
-                
-                # Get sender info with detailed information
-                sender_info = {
-                    'id': None,
-                    'name': "Unknown",
-                    'username': None,
-                    'is_bot': False,
-                    'is_assistant': False
-                }
-                
-                if message.from_user:
-                    sender_info = {
-                        'id': message.from_user.id,
-                        'name': message.from_user.first_name or "Unknown",
-                        'username': message.from_user.username,
-                        'is_bot': message.from_user.is_bot,
-                        'is_assistant': message.from_user.id == userbot_info['id']
-                    }
-                    
-                    # Add assistant label
-                    if sender_info['is_assistant']:
-                        sender_info['display_name'] = f"{userbot_info['first_name']} (Assistant)"
-                    else:
-                        sender_info['display_name'] = sender_info['name']
-                        
-                elif message.sender_chat:
-                    sender_info = {
-                        'id': message.sender_chat.id,
-                        'name': message.sender_chat.title or "Channel",
-                        'username': message.sender_chat.username,
-                        'is_bot': False,
-                        'is_assistant': False,
-                        'display_name': message.sender_chat.title or "Channel"
-                    }
-                
-                # Get reply info if exists
-                reply_info = None
-                if message.reply_to_message:
-                    reply_msg = message.reply_to_message
-                    reply_sender_info = {
-                        'id': None,
-                        'name': "Unknown",
-                        'username': None
-                    }
-                    
-                    if reply_msg.from_user:
-                        reply_sender_info = {
-                            'id': reply_msg.from_user.id,
-                            'name': reply_msg.from_user.first_name or "Unknown",
-                            'username': reply_msg.from_user.username
-                        }
-                        
-                        # Check if reply is to assistant
-                        if reply_msg.from_user.id == userbot_info['id']:
-                            reply_sender_info['display_name'] = f"{userbot_info['first_name']} (Assistant)"
-                        else:
-                            reply_sender_info['display_name'] = reply_sender_info['name']
-                            
-                    elif reply_msg.sender_chat:
-                        reply_sender_info = {
-                            'id': reply_msg.sender_chat.id,
-                            'name': reply_msg.sender_chat.title or "Channel",
-                            'username': reply_msg.sender_chat.username,
-                            'display_name': reply_msg.sender_chat.title or "Channel"
-                        }
-                    
-                    reply_content = reply_msg.text or reply_msg.caption or "[Media]"
-                    if len(reply_content) > 100:
-                        reply_content = reply_content[:100] + "..."
-                    
-                    reply_info = {
-                        'message_id': reply_msg.id,
-                        'sender': reply_sender_info,
-                        'content': reply_content
-                    }
-                
-                # Add to messages list with all detailed info
-                messages.append({
-                    'message_id': message.id,
-                    'sender': sender_info,
-                    'chat': chat_info,
-                    'content': content,
-                    'timestamp': message.date.astimezone(tz),
-                    'reply_to': reply_info
-                })
+                entry = _normalize_history_message(message, userbot_info, chat_info, tz)
+                if entry:
+                    messages.append(entry)
                 
             except Exception as e:
                 console.error(f"Error processing message in history: {str(e)}")
@@ -946,6 +1176,9 @@ async def get_chat_history(client, chat_id, limit=None):
         # Reverse to get chronological order (oldest first)
         messages.reverse()
         
+        if CHAT_HISTORY_CONFIG["cache_enabled"]:
+            chat_history_cache.backfill(cache_key, messages, chat_info)
+        
         return messages
         
     except Exception as e:
@@ -1104,7 +1337,8 @@ async def process_ai_response(client, message, prompt, photo_file_id=None):
         context = {
             'bot_name': 'AERIS',
             'bot_username': 'Aeris_sync',
-            'user_id': message.from_user.id if message.from_user else 0
+            'user_id': message.from_user.id if message.from_user else 0,
+            'chat_type': 'private' if message.chat.type == enums.ChatType.PRIVATE else 'group'
         }
         
         # Ambil ingatan user dari database dengan context yang lebih lengkap
@@ -1117,6 +1351,7 @@ async def process_ai_response(client, message, prompt, photo_file_id=None):
             context['user_context'] = user_context
 
         system_prompt_text = system_prompt.get_chat_prompt(context)
+        base_system_prompt = system_prompt_text
         
         # Personalisasi prompt berdasarkan learning patterns
         if message.from_user:
@@ -1170,35 +1405,78 @@ async def process_ai_response(client, message, prompt, photo_file_id=None):
         # Generate AI response using Replicate
         console.info(f"Generating AI response for: {prompt[:50]}...")
         
-        ai_response = await replicate_api.generate_response(
-            prompt=full_prompt,
-            system_prompt=system_prompt_text,
-            temperature=temperature,
-            max_tokens=2048,
-            image_file_id=photo_file_id,
-            client=client,
-            presence_penalty=presence_penalty,
-            frequency_penalty=frequency_penalty
+        # Response cache opt-in per assistant ("response_cache": True). Key hanya
+        # pesan user + field persona yang stabil; full_prompt (history) dan system
+        # prompt (berisi currentTime) berubah tiap request sehingga tidak dipakai.
+        # Prompt yang dipersonalisasi (history, user context, learning pattern,
+        # owner section) di-scope ke chat + user agar balasan tidak bocor.
+        use_cache = assistant_config.get('response_cache', False)
+        cache_scope = f"{assistant_id}:{context['chat_type']}"
+        personalized = (
+            formatted_history or user_context or context['user_id'] in OWNER_ID
+            or system_prompt_text != base_system_prompt
         )
+        if personalized:
+            cache_scope += f":{message.chat.id}:{context['user_id']}"
+        
+        processed_response = None
+        
+        # Streaming mode: placeholder di-edit progresif saat token masuk
+        if STREAMING_CONFIG["enabled"]:
+            token_stream = replicate_api.generate_response_stream(
+                prompt=full_prompt,
+                system_prompt=system_prompt_text,
+                temperature=temperature,
+                max_tokens=2048,
+                image_file_id=photo_file_id,
+                client=client,
+                presence_penalty=presence_penalty,
+                frequency_penalty=frequency_penalty,
+                raise_errors=True,
+                cache=use_cache,
+                cache_prompt=prompt,
+                cache_scope=cache_scope
+            )
+            processed_response = await stream_ai_reply(
+                client, message, token_stream, process_shortcodes_in_response,
+                on_sent=remember_sent_message
+            )
         
-        # Process shortcodes in AI response
-        try:
-            from syncara.shortcode import registry
-            console.info(f"Shortcode registry loaded with {len(registry.shortcodes)} handlers")
-            processed_response = await process_shortcodes_in_response(ai_response, client, message)
-        except ImportError as e:
-            console.error(f"Import error for shortcode registry: {e}")
-            processed_response = ai_response
-        except Exception as e:
-            console.error(f"Error processing shortcodes: {e}")
-            processed_response = ai_response
-        
-        # Send the AI response
-        await client.send_message(
-            chat_id=message.chat.id,
-            text=f"{processed_response}",
-            reply_to_message_id=message.id
-        )
+        # Non-streaming mode atau fallback jika stream gagal sebelum token pertama
+        if processed_response is None:
+            ai_response = await replicate_api.generate_response(
+                prompt=full_prompt,
+                system_prompt=system_prompt_text,
+                temperature=temperature,
+                max_tokens=2048,
+                image_file_id=photo_file_id,
+                client=client,
+                presence_penalty=presence_penalty,
+                frequency_penalty=frequency_penalty,
+                cache=use_cache,
+                cache_prompt=prompt,
+                cache_scope=cache_scope
+            )
+            
+            # Process shortcodes in AI response
+            try:
+                from syncara.shortcode import registry
+                console.info(f"Shortcode registry loaded with {len(registry.shortcodes)} handlers")
+                processed_response = await process_shortcodes_in_response(ai_response, client, message)
+            except ImportError as e:
+                console.error(f"Import error for shortcode registry: {e}")
+                processed_response = ai_response
+            except Exception as e:
+                console.error(f"Error processing shortcodes: {e}")
+                processed_response = ai_response
+            
+            # Send the AI response
+            sent_message = await client.send_message(
+                chat_id=message.chat.id,
+                text=f"{processed_response}",
+                reply_to_message_id=message.id
+            )
+            await remember_sent_message(client, sent_message)
         
         # Learn from this interaction for future improvements
         if message.from_user:
@@ -1223,17 +1501,14 @@ async def process_shortcodes_in_response(response_text, client, message):
     """Process shortcodes in AI response and execute them"""
     try:
         import re
-        from syncara.shortcode import registry
-        
-        # Pattern to match shortcodes like [CATEGORY:ACTION] or [CATEGORY:ACTION:params]
-        shortcode_pattern = r'\[([A-Z]+:[A-Z_]+)(?::([^\]]*))?\]'
+        from syncara.shortcode import registry, parse_shortcodes, SHORTCODE_PATTERN
         
-        # Find all shortcodes first for validation
-        all_matches = list(re.finditer(shortcode_pattern, response_text))
-        shortcode_names = [match.group(1).strip() for match in all_matches]
+        # Find all shortcodes first for validation (pattern sudah precompiled)
+        parsed = parse_shortcodes(response_text)
+        shortcode_names = [name for _, name, _ in parsed]
         
         # If no shortcodes found, return original response
-        if not all_matches:
+        if not parsed:
             return response_text
         
         # Validate shortcode execution order
@@ -1251,90 +1526,95 @@ async def process_shortcodes_in_response(response_text, client, message):
         pending_images = []
         pending_responses = []
         
-        async def execute_shortcode_silent(match):
-            """Execute shortcode without sending files immediately"""
+        def record_result(match, shortcode_name, params_str, result):
+            """Catat hasil shortcode tanpa mengirim file/response langsung"""
             full_shortcode = match.group(0)  # Full match like [USER:PROMOTE:7691971162] or [CHANNEL:START]
-            shortcode_name = match.group(1).strip()  # USER:PROMOTE or CHANNEL:START
-            params_str = match.group(2)  # 7691971162 or None
-            
-            # Handle None params (for shortcodes without parameters)
-            if params_str is None:
-                params_str = ""
-            else:
-                params_str = params_str.strip()
             
-            console.info(f"Processing shortcode: {shortcode_name} with params: '{params_str}'")
-            
-            # Execute shortcode with params as string
-            try:
-                result = await registry.execute_shortcode(shortcode_name, client, message, params_str)
-                
-                execution_result = {
+            if isinstance(result, BaseException):
+                if isinstance(result, asyncio.TimeoutError):
+                    console.error(f"Shortcode {shortcode_name} timeout")
+                else:
+                    console.error(f"Error executing shortcode {shortcode_name}: {str(result)}")
+                failed_executions.append(shortcode_name)
+                execution_results.append({
                     'shortcode': shortcode_name,
                     'params': params_str,
-                    'success': result,
+                    'success': False,
+                    'error': str(result) or type(result).__name__,
                     'full_match': full_shortcode
-                }
-                
-                execution_results.append(execution_result)
-                
-                if result:
-                    console.info(f"Shortcode {shortcode_name} executed successfully")
-                    successful_executions.append(shortcode_name)
-                    
-                    # Track results based on shortcode type
-                    if shortcode_name == 'CANVAS:CREATE':
-                        filename = params_str.split(':')[0] if ':' in params_str else params_str
-                        created_files.append(filename)
-                        console.info(f"File {filename} added to pending send list")
-                    elif shortcode_name == 'IMAGE:GEN':
-                        if isinstance(result, str):
-                            pending_images.append(result)
-                            console.info(f"Image {result} added to pending send list")
-                    elif shortcode_name.startswith(('USERBOT:', 'GROUP:', 'USER:')):
-                        if isinstance(result, str):
-                            pending_responses.append(result)
-                            console.info(f"Response {result} added to pending send list")
-                    elif shortcode_name.startswith(('PYTHON:', 'CODE:', 'CALC:')):
-                        if isinstance(result, str):
-                            pending_responses.append(result)
-                            console.info(f"Python result {result} added to pending send list")
-                    elif shortcode_name.startswith(('SEARCH:', 'FILE:', 'FIND:', 'CHAT:')):
-                        if isinstance(result, str):
-                            pending_responses.append(result)
-                            console.info(f"Search result {result} added to pending send list")
-                    elif shortcode_name.startswith(('TODO:')):
-                        if isinstance(result, str):
-                            pending_responses.append(result)
-                            console.info(f"TODO result {result} added to pending send list")
-                    
-                    return ""  # Remove shortcode from text without replacement
-                else:
-                    console.error(f"Shortcode {shortcode_name} failed")
-                    failed_executions.append(shortcode_name)
-                    return ""  # Remove shortcode from text without replacement
-                    
-            except Exception as e:
-                console.error(f"Error executing shortcode {shortcode_name}: {str(e)}")
+                })
+                return
+            
+            if isinstance(result, str) and result.startswith("❌"):
+                # Kegagalan yang dilaporkan lewat pesan "❌ ..." (unknown shortcode, error handler);
+                # dihitung gagal, sama seperti metrics shortcode di registry
+                console.error(f"Shortcode {shortcode_name} failed: {result}")
                 failed_executions.append(shortcode_name)
                 execution_results.append({
                     'shortcode': shortcode_name,
                     'params': params_str,
                     'success': False,
-                    'error': str(e),
+                    'error': result,
                     'full_match': full_shortcode
                 })
-                return ""  # Remove shortcode from text without replacement
-        
-        # Process shortcodes one by one since re.sub doesn't support async
-        processed_response = response_text
-        matches = list(re.finditer(shortcode_pattern, response_text))
-        
-        # Process in reverse order to avoid index issues
-        for match in reversed(matches):
-            replacement = await execute_shortcode_silent(match)
-            start, end = match.span()
-            processed_response = processed_response[:start] + replacement + processed_response[end:]
+                if shortcode_name.startswith(TEXT_RESULT_PREFIXES):
+                    pending_responses.append(result)
+                return
+            
+            execution_results.append({
+                'shortcode': shortcode_name,
+                'params': params_str,
+                'success': result,
+                'full_match': full_shortcode
+            })
+            
+            if not result:
+                console.error(f"Shortcode {shortcode_name} failed")
+                failed_executions.append(shortcode_name)
+                return
+            
+            console.info(f"Shortcode {shortcode_name} executed successfully")
+            successful_executions.append(shortcode_name)
+            
+            # Track results based on shortcode type
+            if shortcode_name == 'CANVAS:CREATE':
+                filename = params_str.split(':')[0] if ':' in params_str else params_str
+                created_files.append(filename)
+                console.info(f"File {filename} added to pending send list")
+            elif shortcode_name == 'IMAGE:GEN':
+                if isinstance(result, str):
+                    pending_images.append(result)
+                    console.info(f"Image {result} added to pending send list")
+            elif shortcode_name.startswith(('USERBOT:', 'GROUP:', 'USER:')):
+                if isinstance(result, str):
+                    pending_responses.append(result)
+                    console.info(f"Response {result} added to pending send list")
+            elif shortcode_name.startswith(('PYTHON:', 'CODE:', 'CALC:')):
+                if isinstance(result, str):
+                    pending_responses.append(result)
+                    console.info(f"Python result {result} added to pending send list")
+            elif shortcode_name.startswith(('SEARCH:', 'FILE:', 'FIND:', 'CHAT:')):
+                if isinstance(result, str):
+                    pending_responses.append(result)
+                    console.info(f"Search result {result} added to pending send list")
+            elif shortcode_name.startswith(('TODO:')):
+                if isinstance(result, str):
+                    pending_responses.append(result)
+                    console.info(f"TODO result {result} added to pending send list")
+        
+        # Eksekusi paralel: shortcode independen berjalan bersamaan, pasangan
+        # yang bergantung (misalnya CANVAS:CREATE -> CANVAS:EXPORT) tetap berurutan
+        calls = [(name, params_str) for _, name, params_str in parsed]
+        for name, params_str in calls:
+            console.info(f"Processing shortcode: {name} with params: '{params_str}'")
+        results = await registry.execute_shortcodes(calls, client, message)
+        
+        # Hasil dicatat sesuai urutan di teks agar urutan pengiriman stabil
+        for (match, name, params_str), result in zip(parsed, results):
+            record_result(match, name, params_str, result)
+        
+        # Semua shortcode dihapus dari teks tanpa pengganti
+        processed_response = SHORTCODE_PATTERN.sub('', response_text)
         
         # Clean up extra whitespace and newlines
         processed_response = re.sub(r'\n\s*\n\s*\n', '\n\n', processed_response)
@@ -1514,6 +1794,7 @@ __all__ = [
     'initialize_ai_handler',
     'get_chat_history',
     'format_chat_history',
+    'chat_history_cache',
     'cache_userbot_info',
     'USERBOT_INFO_CACHE',
     'USERBOT_PROMPT_MAPPING',
@@ -2220,8 +2501,11 @@ async def database_status_command(client, message):
         from syncara.database import run_database_health_check, get_database_status, database_manager
         
         # Get comprehensive status
-        health_report = await run_database_health_check()
-        db_status = await get_database_status()
+        health_report, db_status = await asyncio.gather(
+            run_database_health_check(),
+            get_database_status()
+        )
+        # Sudah di-cache oleh health check di atas
         stats = await database_manager.get_database_stats()
         
         # Format response
@@ -2327,6 +2611,9 @@ async def database_cleanup_command(client, message):
         console.error(f"Error in database cleanup command: {e}")
         await message.reply(f"❌ Error running cleanup: {str(e)}")
 
+# Task backup yang sedang berjalan (referensi dipegang agar tidak di-GC)
+_backup_tasks = set()
+
 @bot.on_message(filters.text & filters.command("dbbackup"))
 async def database_backup_command(client, message):
     """Create database backup"""
@@ -2341,38 +2628,68 @@ async def database_backup_command(client, message):
         # Extract collection name from command
         command_parts = message.text.split()
         if len(command_parts) < 2:
-            await message.reply("❌ Usage: `/dbbackup <collection_name>`\nExample: `/dbbackup users`")
+            await message.reply(
+                "❌ Usage: `/dbbackup <collection[,collection...]|all> [incremental] [jsonl]`\n"
+                "Example: `/dbbackup users` atau `/dbbackup users,groups incremental`"
+            )
             return
         
-        collection_name = command_parts[1]
+        from syncara.database import database_manager, db
+        from syncara.database.backup import DB_BACKUP_CONFIG, get_backup_size
+        import os
         
-        await message.reply(f"💾 Creating backup of {collection_name} collection...")
+        options = {part.lower() for part in command_parts[2:]}
+        incremental = "incremental" in options or "inc" in options
+        backup_format = "jsonl" if "jsonl" in options else DB_BACKUP_CONFIG["format"]
         
-        from syncara.database import database_manager
-        import os
+        if command_parts[1].lower() == "all":
+            collection_names = sorted(await db.list_collection_names())
+        else:
+            collection_names = [name for name in command_parts[1].split(",") if name]
         
-        # Create backup filename
+        status_message = await message.reply(
+            f"💾 Creating {'incremental ' if incremental else ''}backup of {', '.join(collection_names)}..."
+        )
+        
+        # Create backup directory name
         timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"backup_{collection_name}_{timestamp}.json"
-        backup_path = os.path.join("backups", backup_filename)
-        
-        # Ensure backup directory exists
-        os.makedirs("backups", exist_ok=True)
-        
-        # Create backup
-        document_count = await database_manager.backup_collection(collection_name, backup_path)
-        
-        if document_count > 0:
-            file_size = os.path.getsize(backup_path) / 1024 / 1024  # MB
-            backup_text = f"✅ **Backup Created Successfully**\n\n"
-            backup_text += f"📁 **File**: {backup_filename}\n"
-            backup_text += f"📊 **Documents**: {document_count:,}\n"
-            backup_text += f"📏 **Size**: {file_size:.2f} MB\n"
-            backup_text += f"📍 **Location**: ./backups/"
-        else:
-            backup_text = f"❌ Failed to create backup for {collection_name}"
+        label = "all" if command_parts[1].lower() == "all" else "_".join(collection_names)[:60]
+        backup_dir = os.path.join(DB_BACKUP_CONFIG["directory"], f"backup_{label}_{timestamp}")
+        
+        async def run_backup():
+            try:
+                from syncara.database.backup import database_backup_engine
+                manifest = await database_backup_engine.backup(
+                    collection_names, backup_dir, incremental=incremental, fmt=backup_format
+                )
+                
+                collections = manifest["collections"]
+                completed = [name for name, info in collections.items() if info.get("completed")]
+                if completed:
+                    file_size = get_backup_size(backup_dir) / 1024 / 1024  # MB
+                    backup_text = f"✅ **Backup Created Successfully**\n\n"
+                    backup_text += f"📁 **Folder**: {os.path.basename(backup_dir)}\n"
+                    for name in collection_names:
+                        info = collections.get(name, {})
+                        if info.get("completed"):
+                            mode = "incremental" if info.get("incremental") else "full"
+                            backup_text += f"📊 `{name}`: {info['documents']:,} documents ({mode})\n"
+                        else:
+                            backup_text += f"❌ `{name}`: {info.get('error', 'gagal')}\n"
+                    backup_text += f"📏 **Size**: {file_size:.2f} MB\n"
+                    backup_text += f"📍 **Location**: ./{DB_BACKUP_CONFIG['directory']}/"
+                else:
+                    backup_text = f"❌ Failed to create backup for {', '.join(collection_names)}"
+                
+                await status_message.edit_text(backup_text)
+            except Exception as e:
+                console.error(f"Error in database backup task: {e}")
+                await status_message.edit_text(f"❌ Error creating backup: {str(e)}")
         
-        await message.reply(backup_text)
+        # Backup berjalan di background agar handler (dan balasan lain) tidak tertahan
+        task = asyncio.create_task(run_backup())
+        _backup_tasks.add(task)
+        task.add_done_callback(_backup_tasks.discard)
         
     except Exception as e:
         console.error(f"Error in database backup command: {e}")
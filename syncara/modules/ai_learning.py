@@ -2,19 +2,51 @@
 from syncara.database import users
 from syncara.console import console
 from datetime import datetime, timedelta
+import copy
 import json
 import re
-from collections import Counter
+import time
+from collections import Counter, OrderedDict
+
+# Cache pola belajar per user (counter incremental + blok prompt yang sudah dirender)
+PATTERN_CACHE_CONFIG = {
+    "ttl": 1800,            # Detik sebelum stats di-reload dari database
+    "max_users": 5000,      # Batas user yang disimpan di memory (LRU)
+    "recent_window": 20,    # Pesan terakhir untuk analisis learning effectiveness
+    "stats_version": 1      # Naikkan jika struktur counter berubah agar di-rebuild
+}
+
+TOPIC_KEYWORDS = {
+    "technology": ["coding", "program", "software", "app", "website", "tech", "computer", "ai", "python", "javascript"],
+    "music": ["lagu", "musik", "song", "music", "playlist", "artist", "band", "album"],
+    "education": ["belajar", "study", "course", "tutorial", "education", "school", "university", "college"],
+    "entertainment": ["film", "movie", "game", "fun", "entertainment", "hobby", "anime", "series"],
+    "business": ["bisnis", "business", "money", "work", "job", "career", "startup", "finance"],
+    "health": ["sehat", "health", "olahraga", "exercise", "diet", "medical", "fitness"],
+    "travel": ["travel", "trip", "vacation", "jalan", "wisata", "liburan", "hotel"],
+    "food": ["makanan", "food", "resep", "recipe", "makan", "masak", "restaurant"],
+    "sports": ["sport", "football", "basketball", "badminton", "tennis", "gym"],
+    "science": ["science", "physics", "chemistry", "biology", "research", "experiment"]
+}
+
+MOOD_SCORE_KEYS = {1: "positive", -1: "negative", 0: "neutral"}
 
 class AILearning:
     def __init__(self):
         self.learning_patterns = {}
         self.response_quality = {}
+        # user_id -> {"stats": dict, "loaded_at": float}
+        self._stats_cache = OrderedDict()
+        # user_id -> {"version": int, "block": str, "expires_at": float}
+        self._prompt_cache = {}
     
     async def analyze_user_patterns(self, user_id):
-        """Analisis pola penggunaan user untuk personalisasi"""
+        """Analisis pola penggunaan user untuk personalisasi (full recompute)"""
         try:
-            user_data = await users.find_one({"user_id": user_id})
+            user_data = await users.find_one(
+                {"user_id": user_id},
+                {"conversation_history": 1}
+            )
             if not user_data or "conversation_history" not in user_data:
                 return None
             
@@ -22,40 +54,16 @@ class AILearning:
             if not conversations:
                 return None
             
-            # Analisis pola pertanyaan
-            question_patterns = self._analyze_question_patterns(conversations)
-            
-            # Analisis topik yang sering dibahas
-            topic_patterns = self._analyze_topic_patterns(conversations)
-            
-            # Analisis waktu interaksi
-            time_patterns = self._analyze_time_patterns(conversations)
+            # Bangun ulang counter dari seluruh riwayat
+            stats = self._build_stats(conversations)
+            patterns = self._patterns_from_stats(stats)
             
-            # Analisis panjang respons yang disukai
-            response_preferences = self._analyze_response_preferences(conversations)
-            
-            # Analisis sentiment dan mood
-            mood_patterns = self._analyze_mood_patterns(conversations)
-            
-            # Analisis learning effectiveness
-            learning_effectiveness = self._analyze_learning_effectiveness(conversations)
-            
-            patterns = {
-                "question_types": question_patterns,
-                "topics": topic_patterns,
-                "time_patterns": time_patterns,
-                "response_preferences": response_preferences,
-                "mood_patterns": mood_patterns,
-                "learning_effectiveness": learning_effectiveness,
-                "last_updated": datetime.utcnow(),
-                "analysis_version": "2.0"
-            }
-            
-            # Simpan analisis ke database
+            # Simpan analisis dan counter ke database
             await users.update_one(
                 {"user_id": user_id},
-                {"$set": {"ai_learning_patterns": patterns}}
+                {"$set": {"ai_learning_patterns": patterns, "ai_learning_stats": stats}}
             )
+            self._store_stats(user_id, stats)
             
             console.info(f"🧠 Updated learning patterns for user {user_id}")
             return patterns
@@ -64,58 +72,115 @@ class AILearning:
             console.error(f"Error analyzing user patterns: {e}")
             return None
     
-    def _analyze_question_patterns(self, conversations):
-        """Analisis tipe pertanyaan yang sering diajukan"""
-        question_types = []
+    # ==================== PER-ENTRY CLASSIFIERS ====================
+    
+    def _classify_question_type(self, message):
+        """Tipe pertanyaan dari satu pesan (lowercase)"""
+        if any(word in message for word in ["apa", "what"]):
+            return "information"
+        elif any(word in message for word in ["bagaimana", "how", "cara", "gimana"]):
+            return "how_to"
+        elif any(word in message for word in ["kenapa", "why", "mengapa"]):
+            return "explanation"
+        elif any(word in message for word in ["kapan", "when"]):
+            return "time"
+        elif any(word in message for word in ["dimana", "where"]):
+            return "location"
+        elif any(word in message for word in ["siapa", "who"]):
+            return "person"
+        elif any(word in message for word in ["bisakah", "can", "bisa", "could"]):
+            return "capability"
+        elif "?" in message:
+            return "general_question"
+        return "statement"
+    
+    def _match_topics(self, message):
+        """Topik yang disebut dalam satu pesan (lowercase)"""
+        return [
+            topic for topic, keywords in TOPIC_KEYWORDS.items()
+            if any(keyword in message for keyword in keywords)
+        ]
+    
+    def _entry_time(self, conv):
+        """Timestamp entry sebagai datetime (data lama bisa berupa string ISO)"""
+        timestamp = conv.get("timestamp")
+        if isinstance(timestamp, datetime):
+            return timestamp
+        if isinstance(timestamp, str):
+            try:
+                return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            except ValueError:
+                return None
+        return None
+    
+    def _response_features(self, response):
+        """(length bucket, banyak emoji, formalitas) dari satu respons"""
+        length = len(response)
+        if length < 100:
+            length_bucket = "short"
+        elif length < 500:
+            length_bucket = "medium"
+        else:
+            length_bucket = "long"
         
-        for conv in conversations:
-            message = conv.get("message", "").lower()
-            
-            if any(word in message for word in ["apa", "what"]):
-                question_types.append("information")
-            elif any(word in message for word in ["bagaimana", "how", "cara", "gimana"]):
-                question_types.append("how_to")
-            elif any(word in message for word in ["kenapa", "why", "mengapa"]):
-                question_types.append("explanation")
-            elif any(word in message for word in ["kapan", "when"]):
-                question_types.append("time")
-            elif any(word in message for word in ["dimana", "where"]):
-                question_types.append("location")
-            elif any(word in message for word in ["siapa", "who"]):
-                question_types.append("person")
-            elif any(word in message for word in ["bisakah", "can", "bisa", "could"]):
-                question_types.append("capability")
-            elif "?" in message:
-                question_types.append("general_question")
-            else:
-                question_types.append("statement")
+        # Analisis penggunaan emoji
+        emoji_count = len(re.findall(r'[^\w\s]', response))
         
-        return Counter(question_types).most_common()
+        # Analisis formalitas
+        formal_words = ["anda", "bapak", "ibu", "dengan hormat", "terima kasih"]
+        informal_words = ["kamu", "lo", "gue", "aku", "wkwk", "hehe"]
+        
+        response_lower = response.lower()
+        formal_count = sum(1 for word in formal_words if word in response_lower)
+        informal_count = sum(1 for word in informal_words if word in response_lower)
+        formality = "formal" if formal_count > informal_count else "informal"
+        
+        return length_bucket, emoji_count > 2, formality
+    
+    def _mood_features(self, message):
+        """(mood score -1..1, interaction type) dari satu pesan (lowercase)"""
+        positive_words = ["bagus", "senang", "suka", "baik", "mantap", "keren", "amazing", "good", "great", "love"]
+        negative_words = ["buruk", "sedih", "tidak", "bad", "hate", "angry", "marah", "bosan", "boring"]
+        question_words = ["?", "apa", "bagaimana", "kenapa", "what", "how", "why"]
+        
+        positive_count = sum(1 for word in positive_words if word in message)
+        negative_count = sum(1 for word in negative_words if word in message)
+        question_count = sum(1 for word in question_words if word in message)
+        
+        # Mood score (-1 to 1)
+        if positive_count > negative_count:
+            mood_score = 1
+        elif negative_count > positive_count:
+            mood_score = -1
+        else:
+            mood_score = 0
+        
+        # Interaction type
+        if question_count > 0:
+            interaction_type = "questioning"
+        elif positive_count > 0:
+            interaction_type = "positive"
+        elif negative_count > 0:
+            interaction_type = "negative"
+        else:
+            interaction_type = "neutral"
+        
+        return mood_score, interaction_type
+    
+    # ==================== BATCH ANALYZERS ====================
+    
+    def _analyze_question_patterns(self, conversations):
+        """Analisis tipe pertanyaan yang sering diajukan"""
+        return Counter(
+            self._classify_question_type(conv.get("message", "").lower())
+            for conv in conversations
+        ).most_common()
     
     def _analyze_topic_patterns(self, conversations):
         """Analisis topik yang sering dibahas"""
         topics = []
-        
-        topic_keywords = {
-            "technology": ["coding", "program", "software", "app", "website", "tech", "computer", "ai", "python", "javascript"],
-            "music": ["lagu", "musik", "song", "music", "playlist", "artist", "band", "album"],
-            "education": ["belajar", "study", "course", "tutorial", "education", "school", "university", "college"],
-            "entertainment": ["film", "movie", "game", "fun", "entertainment", "hobby", "anime", "series"],
-            "business": ["bisnis", "business", "money", "work", "job", "career", "startup", "finance"],
-            "health": ["sehat", "health", "olahraga", "exercise", "diet", "medical", "fitness"],
-            "travel": ["travel", "trip", "vacation", "jalan", "wisata", "liburan", "hotel"],
-            "food": ["makanan", "food", "resep", "recipe", "makan", "masak", "restaurant"],
-            "sports": ["sport", "football", "basketball", "badminton", "tennis", "gym"],
-            "science": ["science", "physics", "chemistry", "biology", "research", "experiment"]
-        }
-        
         for conv in conversations:
-            message = conv.get("message", "").lower()
-            
-            for topic, keywords in topic_keywords.items():
-                if any(keyword in message for keyword in keywords):
-                    topics.append(topic)
-        
+            topics.extend(self._match_topics(conv.get("message", "").lower()))
         return Counter(topics).most_common()
     
     def _analyze_time_patterns(self, conversations):
@@ -124,14 +189,10 @@ class AILearning:
         days = []
         
         for conv in conversations:
-            timestamp = conv.get("timestamp")
-            if timestamp:
-                try:
-                    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    hours.append(dt.hour)
-                    days.append(dt.strftime('%A'))
-                except:
-                    continue
+            dt = self._entry_time(conv)
+            if dt:
+                hours.append(dt.hour)
+                days.append(dt.strftime('%A'))
         
         return {
             "peak_hours": Counter(hours).most_common(3),
@@ -142,37 +203,10 @@ class AILearning:
     
     def _analyze_response_preferences(self, conversations):
         """Analisis preferensi respons user"""
-        response_lengths = []
-        emoji_usage = []
-        formality_levels = []
-        
-        for conv in conversations:
-            response = conv.get("response", "")
-            
-            # Analisis panjang respons
-            length = len(response)
-            if length < 100:
-                response_lengths.append("short")
-            elif length < 500:
-                response_lengths.append("medium")
-            else:
-                response_lengths.append("long")
-            
-            # Analisis penggunaan emoji
-            emoji_count = len(re.findall(r'[^\w\s]', response))
-            emoji_usage.append(emoji_count > 2)
-            
-            # Analisis formalitas
-            formal_words = ["anda", "bapak", "ibu", "dengan hormat", "terima kasih"]
-            informal_words = ["kamu", "lo", "gue", "aku", "wkwk", "hehe"]
-            
-            formal_count = sum(1 for word in formal_words if word in response.lower())
-            informal_count = sum(1 for word in informal_words if word in response.lower())
-            
-            if formal_count > informal_count:
-                formality_levels.append("formal")
-            else:
-                formality_levels.append("informal")
+        features = [self._response_features(conv.get("response", "")) for conv in conversations]
+        response_lengths = [f[0] for f in features]
+        emoji_usage = [f[1] for f in features]
+        formality_levels = [f[2] for f in features]
         
         return {
             "preferred_length": Counter(response_lengths).most_common(1)[0][0] if response_lengths else "medium",
@@ -183,37 +217,9 @@ class AILearning:
     
     def _analyze_mood_patterns(self, conversations):
         """Analisis pola mood dan sentiment"""
-        positive_words = ["bagus", "senang", "suka", "baik", "mantap", "keren", "amazing", "good", "great", "love"]
-        negative_words = ["buruk", "sedih", "tidak", "bad", "hate", "angry", "marah", "bosan", "boring"]
-        question_words = ["?", "apa", "bagaimana", "kenapa", "what", "how", "why"]
-        
-        mood_scores = []
-        interaction_types = []
-        
-        for conv in conversations:
-            message = conv.get("message", "").lower()
-            
-            positive_count = sum(1 for word in positive_words if word in message)
-            negative_count = sum(1 for word in negative_words if word in message)
-            question_count = sum(1 for word in question_words if word in message)
-            
-            # Mood score (-1 to 1)
-            if positive_count > negative_count:
-                mood_scores.append(1)
-            elif negative_count > positive_count:
-                mood_scores.append(-1)
-            else:
-                mood_scores.append(0)
-            
-            # Interaction type
-            if question_count > 0:
-                interaction_types.append("questioning")
-            elif positive_count > 0:
-                interaction_types.append("positive")
-            elif negative_count > 0:
-                interaction_types.append("negative")
-            else:
-                interaction_types.append("neutral")
+        features = [self._mood_features(conv.get("message", "").lower()) for conv in conversations]
+        mood_scores = [f[0] for f in features]
+        interaction_types = [f[1] for f in features]
         
         return {
             "avg_mood": sum(mood_scores) / max(len(mood_scores), 1),
@@ -241,8 +247,8 @@ class AILearning:
                     break
         
         # Analisis response quality improvement
-        recent_responses = [len(conv.get("response", "")) for conv in recent_convs]
-        older_responses = [len(conv.get("response", "")) for conv in older_convs] if older_convs else recent_responses
+        recent_responses = [conv.get("response_length", len(conv.get("response", ""))) for conv in recent_convs]
+        older_responses = [conv.get("response_length", len(conv.get("response", ""))) for conv in older_convs] if older_convs else recent_responses
         
         avg_recent_length = sum(recent_responses) / max(len(recent_responses), 1)
         avg_older_length = sum(older_responses) / max(len(older_responses), 1)
@@ -281,56 +287,240 @@ class AILearning:
         
         return intersection / union if union > 0 else 0
     
+    # ==================== INCREMENTAL COUNTERS ====================
+    
+    def _entry_counters(self, conv):
+        """Increment counter (dotted key) untuk satu conversation entry"""
+        message = conv.get("message", "").lower()
+        response = conv.get("response", "")
+        
+        inc = {
+            "total": 1,
+            "response_length_sum": len(response),
+            f"question_types.{self._classify_question_type(message)}": 1
+        }
+        
+        for topic in self._match_topics(message):
+            inc[f"topics.{topic}"] = 1
+        
+        dt = self._entry_time(conv)
+        if dt:
+            inc[f"hours.{dt.hour}"] = 1
+            inc[f"days.{dt.strftime('%A')}"] = 1
+        
+        length_bucket, many_emoji, formality = self._response_features(response)
+        inc[f"response_lengths.{length_bucket}"] = 1
+        inc[f"emoji.{'yes' if many_emoji else 'no'}"] = 1
+        inc[f"formality.{formality}"] = 1
+        
+        mood_score, interaction_type = self._mood_features(message)
+        inc["mood_sum"] = mood_score
+        inc[f"mood_scores.{MOOD_SCORE_KEYS[mood_score]}"] = 1
+        inc[f"interaction_types.{interaction_type}"] = 1
+        
+        return inc
+    
+    def _recent_entry(self, conv):
+        """Ringkasan entry untuk window learning effectiveness"""
+        return {
+            "message": conv.get("message", "")[:300],
+            "response_length": len(conv.get("response", ""))
+        }
+    
+    def _apply_counters(self, stats, inc):
+        """Terapkan increment dotted key ke stats dict di memory"""
+        for key, value in inc.items():
+            target = stats
+            parts = key.split(".")
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = target.get(parts[-1], 0) + value
+    
+    def _build_stats(self, conversations):
+        """Bangun counter dari riwayat lengkap (bootstrap / migrasi data lama)"""
+        stats = {"version": PATTERN_CACHE_CONFIG["stats_version"], "revision": 0}
+        for conv in conversations:
+            self._apply_counters(stats, self._entry_counters(conv))
+        window = PATTERN_CACHE_CONFIG["recent_window"]
+        stats["recent"] = [self._recent_entry(conv) for conv in conversations[-window:]]
+        return stats
+    
+    def _patterns_from_stats(self, stats):
+        """Render patterns (format sama dengan analisis penuh) dari counter"""
+        total = stats.get("total", 0)
+        
+        def most_common(field, n=None):
+            return Counter(stats.get(field, {})).most_common(n)
+        
+        emoji = stats.get("emoji", {})
+        days = stats.get("days", {})
+        mood_scores = stats.get("mood_scores", {})
+        
+        return {
+            "question_types": most_common("question_types"),
+            "topics": most_common("topics"),
+            "time_patterns": {
+                "peak_hours": [(int(hour), count) for hour, count in most_common("hours", 3)],
+                "peak_days": most_common("days", 3),
+                "total_interactions": total,
+                "avg_daily_interactions": total / max(len(days), 1)
+            },
+            "response_preferences": {
+                "preferred_length": most_common("response_lengths", 1)[0][0] if stats.get("response_lengths") else "medium",
+                "likes_emoji": emoji.get("yes", 0) > total / 2 if total else True,
+                "preferred_formality": most_common("formality", 1)[0][0] if stats.get("formality") else "informal",
+                "avg_response_length": stats.get("response_length_sum", 0) / max(total, 1)
+            },
+            "mood_patterns": {
+                "avg_mood": stats.get("mood_sum", 0) / max(total, 1),
+                "interaction_types": most_common("interaction_types"),
+                "mood_stability": 1 - (len([k for k, v in mood_scores.items() if v]) / max(total, 1))
+            },
+            "learning_effectiveness": self._analyze_learning_effectiveness(stats.get("recent", [])),
+            "last_updated": datetime.utcnow(),
+            "analysis_version": "2.1"
+        }
+    
+    def _store_stats(self, user_id, stats):
+        """Simpan stats ke cache memory dengan LRU eviction"""
+        self._stats_cache[user_id] = {"stats": stats, "loaded_at": time.time()}
+        self._stats_cache.move_to_end(user_id)
+        while len(self._stats_cache) > PATTERN_CACHE_CONFIG["max_users"]:
+            evicted_id, _ = self._stats_cache.popitem(last=False)
+            self._prompt_cache.pop(evicted_id, None)
+    
+    def build_entry_update(self, user_id, entry):
+        """
+        Operasi update Mongo untuk counter pola dari satu entry baru.
+        Dipanggil oleh add_conversation_entry agar digabung dalam satu update_one.
+        Stats di memory (jika ada) ikut diperbarui sehingga prompt berikutnya
+        tidak perlu membaca database.
+        """
+        inc = self._entry_counters(entry)
+        recent_entry = self._recent_entry(entry)
+        window = PATTERN_CACHE_CONFIG["recent_window"]
+        
+        update = {
+            "$inc": {f"ai_learning_stats.{key}": value for key, value in inc.items()},
+            "$push": {"ai_learning_stats.recent": {"$each": [recent_entry], "$slice": -window}}
+        }
+        update["$inc"]["ai_learning_stats.revision"] = 1
+        
+        cached = self._stats_cache.get(user_id)
+        if cached:
+            stats = cached["stats"]
+            self._apply_counters(stats, inc)
+            stats["recent"] = (stats.get("recent", []) + [recent_entry])[-window:]
+            stats["revision"] = stats.get("revision", 0) + 1
+            # Patterns tetap dipersist untuk konsumen lain (autonomous AI, insights)
+            update["$set"] = {"ai_learning_patterns": self._patterns_from_stats(stats)}
+        
+        return update
+    
+    async def _get_stats(self, user_id):
+        """Stats dari memory, atau satu kali load dari database (dengan projection)"""
+        cached = self._stats_cache.get(user_id)
+        if cached and time.time() - cached["loaded_at"] < PATTERN_CACHE_CONFIG["ttl"]:
+            self._stats_cache.move_to_end(user_id)
+            return cached["stats"]
+        
+        # Pakai dokumen dari request-scoped user context jika ada
+        from syncara.modules.assistant_memory import current_user_context
+        session = current_user_context(user_id)
+        if session is not None:
+            user_data = session.doc
+        else:
+            user_data = await users.find_one(
+                {"user_id": user_id},
+                {"ai_learning_stats": 1, "conversation_history": 1}
+            )
+        if not user_data:
+            return None
+        
+        # Salinan agar counter memory tidak ikut berubah oleh mutasi dokumen session
+        stats = copy.deepcopy(user_data.get("ai_learning_stats"))
+        if not stats or stats.get("version") != PATTERN_CACHE_CONFIG["stats_version"]:
+            # Data lama tanpa counter: rebuild sekali dari conversation_history
+            conversations = user_data.get("conversation_history") or []
+            if not conversations:
+                return None
+            stats = self._build_stats(conversations)
+            await users.update_one(
+                {"user_id": user_id},
+                {"$set": {"ai_learning_stats": stats, "ai_learning_patterns": self._patterns_from_stats(stats)}}
+            )
+            console.info(f"🧠 Rebuilt learning counters for user {user_id}")
+        
+        self._store_stats(user_id, stats)
+        return stats
+    
+    def _render_personalization(self, patterns):
+        """Render blok personalisasi dari patterns"""
+        block = "\n\n📊 **User Personalization:**\n"
+        
+        # Tambahkan preferensi berdasarkan analisis
+        if patterns.get("response_preferences"):
+            prefs = patterns["response_preferences"]
+            block += f"• Response style: {prefs['preferred_length']} length, {prefs['preferred_formality']} tone"
+            if prefs['likes_emoji']:
+                block += " with emojis"
+            block += "\n"
+        
+        # Tambahkan topik yang disukai
+        if patterns.get("topics"):
+            top_topics = [topic for topic, count in patterns["topics"][:3]]
+            if top_topics:
+                block += f"• Interested topics: {', '.join(top_topics)}\n"
+        
+        # Tambahkan tipe pertanyaan yang sering
+        if patterns.get("question_types"):
+            top_questions = [qtype for qtype, count in patterns["question_types"][:2]]
+            if top_questions:
+                block += f"• Common question types: {', '.join(top_questions)}\n"
+        
+        # Tambahkan mood context
+        if patterns.get("mood_patterns"):
+            mood = patterns["mood_patterns"]
+            avg_mood = mood.get("avg_mood", 0)
+            if avg_mood > 0.3:
+                block += "• User generally has positive mood\n"
+            elif avg_mood < -0.3:
+                block += "• User may need more encouragement\n"
+        
+        # Tambahkan learning effectiveness
+        if patterns.get("learning_effectiveness"):
+            effectiveness = patterns["learning_effectiveness"]
+            score = effectiveness.get("effectiveness_score", 0.5)
+            if score > 0.8:
+                block += "• High learning effectiveness - can provide advanced content\n"
+            elif score < 0.4:
+                block += "• Focus on clarity and avoid repetition\n"
+        
+        block += "\nAdapt your response accordingly! 🎯"
+        return block
+    
     async def get_personalized_prompt(self, user_id, base_prompt):
         """Buat prompt yang dipersonalisasi berdasarkan analisis user"""
         try:
-            patterns = await self.analyze_user_patterns(user_id)
-            if not patterns:
+            stats = await self._get_stats(user_id)
+            if not stats or not stats.get("total"):
                 return base_prompt
             
-            personalized_prompt = base_prompt + "\n\n📊 **User Personalization:**\n"
-            
-            # Tambahkan preferensi berdasarkan analisis
-            if patterns.get("response_preferences"):
-                prefs = patterns["response_preferences"]
-                personalized_prompt += f"• Response style: {prefs['preferred_length']} length, {prefs['preferred_formality']} tone"
-                if prefs['likes_emoji']:
-                    personalized_prompt += " with emojis"
-                personalized_prompt += "\n"
-            
-            # Tambahkan topik yang disukai
-            if patterns.get("topics"):
-                top_topics = [topic for topic, count in patterns["topics"][:3]]
-                if top_topics:
-                    personalized_prompt += f"• Interested topics: {', '.join(top_topics)}\n"
-            
-            # Tambahkan tipe pertanyaan yang sering
-            if patterns.get("question_types"):
-                top_questions = [qtype for qtype, count in patterns["question_types"][:2]]
-                if top_questions:
-                    personalized_prompt += f"• Common question types: {', '.join(top_questions)}\n"
-            
-            # Tambahkan mood context
-            if patterns.get("mood_patterns"):
-                mood = patterns["mood_patterns"]
-                avg_mood = mood.get("avg_mood", 0)
-                if avg_mood > 0.3:
-                    personalized_prompt += "• User generally has positive mood\n"
-                elif avg_mood < -0.3:
-                    personalized_prompt += "• User may need more encouragement\n"
-            
-            # Tambahkan learning effectiveness
-            if patterns.get("learning_effectiveness"):
-                effectiveness = patterns["learning_effectiveness"]
-                score = effectiveness.get("effectiveness_score", 0.5)
-                if score > 0.8:
-                    personalized_prompt += "• High learning effectiveness - can provide advanced content\n"
-                elif score < 0.4:
-                    personalized_prompt += "• Focus on clarity and avoid repetition\n"
-            
-            personalized_prompt += "\nAdapt your response accordingly! 🎯"
+            # Blok dirender ulang hanya jika revision berubah atau TTL habis
+            now = time.time()
+            revision = stats.get("revision", 0)
+            cached = self._prompt_cache.get(user_id)
+            if cached and cached["revision"] == revision and cached["expires_at"] > now:
+                return base_prompt + cached["block"]
+            
+            block = self._render_personalization(self._patterns_from_stats(stats))
+            self._prompt_cache[user_id] = {
+                "revision": revision,
+                "block": block,
+                "expires_at": now + PATTERN_CACHE_CONFIG["ttl"]
+            }
             
-            return personalized_prompt
+            return base_prompt + block
             
         except Exception as e:
             console.error(f"Error creating personalized prompt: {e}")
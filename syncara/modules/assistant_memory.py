@@ -1,8 +1,200 @@
-from syncara.database import users
+from syncara.database import users, log_error
 from syncara.console import console
 from datetime import datetime
+import copy
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import json
 
+# Field user yang dibutuhkan dalam satu request AI
+USER_CONTEXT_PROJECTION = {
+    "_id": 0,
+    "user_id": 1,
+    "username": 1,
+    "first_name": 1,
+    "last_name": 1,
+    "first_seen": 1,
+    "last_interaction": 1,
+    "interaction_count": 1,
+    "interaction_contexts": 1,
+    "preferences": 1,
+    "conversation_history": 1,
+    "notes": 1,
+    "personality_notes": 1,
+    "learning_progress": 1,
+    "ai_learning_stats": 1,
+    "learning_data.user_feedback": {"$slice": -50}
+}
+
+# Session user aktif untuk request yang sedang diproses (ikut ke task turunan)
+_current_user_context: ContextVar = ContextVar("current_user_context", default=None)
+
+def _flatten_fields(doc, prefix=""):
+    """Dokumen bersarang -> {"a.b": value}; dict kosong dan non-dict menjadi leaf"""
+    fields = {}
+    for key, value in doc.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            fields.update(_flatten_fields(value, f"{path}."))
+        else:
+            fields[path] = value
+    return fields
+
+def _paths_conflict(a, b):
+    return a == b or a.startswith(f"{b}.") or b.startswith(f"{a}.")
+
+def build_new_user_update(new_doc, update):
+    """
+    Upsert user baru tanpa menimpa dokumen yang mungkin sudah dibuat request
+    lain: field awal lewat $setOnInsert, mutasi ($set/$inc/$push) tetap berlaku.
+    """
+    mutated = [path for operator in update.values() for path in operator]
+    on_insert = {
+        path: value for path, value in _flatten_fields(new_doc).items()
+        if path not in ("_id", "user_id") and not any(_paths_conflict(path, other) for other in mutated)
+    }
+    return {**update, "$setOnInsert": on_insert} if on_insert else dict(update)
+
+class UserContextSession:
+    """
+    Unit of work per request untuk dokumen users.
+    Dokumen dimuat sekali (dengan projection), dibagikan ke semua konsumen,
+    dan semua mutasi digabung menjadi satu write saat flush().
+    """
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.doc = None
+        self.is_new = False
+        self.touched = False  # kenalan_dan_update sudah jalan untuk request ini
+        self._insert_doc = None
+        self._set = {}
+        self._inc = {}
+        self._push = {}
+    
+    async def load(self):
+        self.doc = await users.find_one({"user_id": self.user_id}, USER_CONTEXT_PROJECTION)
+        return self.doc
+    
+    def insert(self, new_doc):
+        """Tandai user baru, dokumen awal ditulis lewat $setOnInsert saat flush"""
+        self._insert_doc = copy.deepcopy(new_doc)
+        self.doc = new_doc
+        self.is_new = True
+    
+    @staticmethod
+    def _resolve(doc, path, create=True):
+        parts = path.split(".")
+        target = doc
+        for part in parts[:-1]:
+            if create:
+                target = target.setdefault(part, {})
+            else:
+                target = target.get(part, {})
+        return target, parts[-1]
+    
+    def set(self, fields):
+        for path, value in fields.items():
+            self._set[path] = value
+            if self.doc is not None:
+                target, key = self._resolve(self.doc, path)
+                target[key] = value
+    
+    def inc(self, fields):
+        for path, value in fields.items():
+            self._inc[path] = self._inc.get(path, 0) + value
+            if self.doc is not None:
+                target, key = self._resolve(self.doc, path)
+                target[key] = target.get(key, 0) + value
+    
+    def push(self, path, items, slice_=None):
+        op = self._push.setdefault(path, {"$each": []})
+        op["$each"].extend(items)
+        if slice_ is not None:
+            op["$slice"] = slice_
+        if self.doc is not None:
+            target, key = self._resolve(self.doc, path)
+            values = list(target.get(key) or []) + list(items)
+            target[key] = values[slice_:] if slice_ is not None else values
+    
+    def merge_update(self, update):
+        """Gabungkan dokumen update Mongo ($set/$inc/$push) ke unit of work"""
+        self.set(update.get("$set", {}))
+        self.inc(update.get("$inc", {}))
+        for path, value in update.get("$push", {}).items():
+            if isinstance(value, dict) and "$each" in value:
+                self.push(path, value["$each"], value.get("$slice"))
+            else:
+                self.push(path, [value])
+    
+    def build_update(self):
+        update = {}
+        if self._set:
+            update["$set"] = self._set
+        if self._inc:
+            update["$inc"] = self._inc
+        if self._push:
+            update["$push"] = self._push
+        return update
+    
+    async def flush(self):
+        """Tulis semua mutasi dalam satu operasi; kegagalan dicatat dan di-raise"""
+        update = self.build_update()
+        try:
+            if self.is_new:
+                await users.update_one(
+                    {"user_id": self.user_id},
+                    build_new_user_update(self._insert_doc, update),
+                    upsert=True
+                )
+            elif update:
+                await users.update_one({"user_id": self.user_id}, update)
+        except Exception as e:
+            pending = sum(len(fields) for fields in update.values())
+            console.error(f"Error flushing user context for {self.user_id} ({pending} mutasi hilang): {e}")
+            await log_error("assistant_memory", f"User context flush failed ({pending} mutations): {e}",
+                            user_id=self.user_id)
+            raise
+        finally:
+            self._set, self._inc, self._push = {}, {}, {}
+            self.is_new = False
+            self._insert_doc = None
+
+def current_user_context(user_id):
+    """Session aktif untuk user_id ini, atau None jika di luar request scope"""
+    session = _current_user_context.get()
+    if session is not None and session.user_id == user_id:
+        return session
+    return None
+
+@asynccontextmanager
+async def user_context_scope(user_id):
+    """
+    Buka unit of work untuk satu request. Semua fungsi memory di dalam scope
+    (termasuk shortcode trigger) memakai dokumen yang sama dan flush sekali.
+    Jika dokumen gagal dimuat, scope berjalan tanpa session (yield None) dan
+    fungsi memory menulis langsung ke database.
+    """
+    existing = current_user_context(user_id)
+    if existing is not None:
+        yield existing
+        return
+    
+    session = UserContextSession(user_id)
+    try:
+        await session.load()
+    except Exception as e:
+        console.error(f"Error loading user context for {user_id}, memakai write langsung: {e}")
+        yield None
+        return
+    
+    token = _current_user_context.set(session)
+    try:
+        yield session
+    finally:
+        _current_user_context.reset(token)
+        await session.flush()
+
 async def kenalan_dan_update(client, user, send_greeting=True, interaction_context="unknown"):
     """Kenalan dengan user dan simpan/update ke database
     
@@ -13,7 +205,16 @@ async def kenalan_dan_update(client, user, send_greeting=True, interaction_conte
         interaction_context: String, context interaction ("private", "group", "unknown")
     """
     try:
-        user_data = await users.find_one({"user_id": user.id})
+        session = current_user_context(user.id)
+        if session is not None:
+            if session.touched:
+                # Sudah dicatat untuk request ini
+                return
+            session.touched = True
+            user_data = session.doc
+        else:
+            user_data = await users.find_one({"user_id": user.id})
+        
         if not user_data:
             # User baru, simpan ke database dengan struktur yang lebih lengkap
             new_user_data = {
@@ -23,10 +224,7 @@ async def kenalan_dan_update(client, user, send_greeting=True, interaction_conte
                 "last_name": user.last_name,
                 "last_interaction": datetime.utcnow(),
                 "first_seen": datetime.utcnow(),
-                "interaction_count": 1,
                 "interaction_contexts": {
-                    "private_count": 1 if interaction_context == "private" else 0,
-                    "group_count": 1 if interaction_context == "group" else 0,
                     "has_private_chat": interaction_context == "private",
                     "last_context": interaction_context,
                     "preferred_context": interaction_context if interaction_context != "unknown" else "group"
@@ -58,7 +256,21 @@ async def kenalan_dan_update(client, user, send_greeting=True, interaction_conte
                 }
             }
             
-            await users.insert_one(new_user_data)
+            # Counter lewat $inc: request pertama yang bersamaan tidak saling menimpa
+            counters = {
+                "interaction_count": 1,
+                "interaction_contexts.private_count": 1 if interaction_context == "private" else 0,
+                "interaction_contexts.group_count": 1 if interaction_context == "group" else 0
+            }
+            if session is not None:
+                session.insert(new_user_data)
+                session.inc(counters)
+            else:
+                await users.update_one(
+                    {"user_id": user.id},
+                    build_new_user_update(new_user_data, {"$inc": counters}),
+                    upsert=True
+                )
             
             if send_greeting:
                 welcome_message = f"Halo {user.first_name or user.username}! Aku AERIS, asisten AI kamu. Senang kenalan denganmu! 😊\n\n" \
@@ -72,36 +284,38 @@ async def kenalan_dan_update(client, user, send_greeting=True, interaction_conte
             # User lama, update waktu interaksi dan increment counter
             interaction_count = user_data.get('interaction_count', 0) + 1
             
-            # Update interaction contexts
+            # Counter di-increment di database ($inc), bukan ditulis dari snapshot:
+            # request paralel user yang sama (private + grup) tidak kehilangan hitungan
             contexts = user_data.get('interaction_contexts', {})
-            if interaction_context == "private":
-                contexts['private_count'] = contexts.get('private_count', 0) + 1
-                contexts['has_private_chat'] = True
-            elif interaction_context == "group":
-                contexts['group_count'] = contexts.get('group_count', 0) + 1
-            
-            contexts['last_context'] = interaction_context
-            
-            # Determine preferred context based on usage
             private_count = contexts.get('private_count', 0)
             group_count = contexts.get('group_count', 0)
-            if private_count > group_count:
-                contexts['preferred_context'] = "private"
-            elif group_count > private_count:
-                contexts['preferred_context'] = "group"
-            else:
-                contexts['preferred_context'] = contexts.get('preferred_context', 'group')
-            
+            counters = {"interaction_count": 1}
             update_data = {
                 "last_interaction": datetime.utcnow(),
                 "username": user.username,
                 "first_name": user.first_name,
                 "last_name": user.last_name,
-                "interaction_count": interaction_count,
-                "interaction_contexts": contexts
+                "interaction_contexts.last_context": interaction_context
             }
+            if interaction_context == "private":
+                counters["interaction_contexts.private_count"] = 1
+                update_data["interaction_contexts.has_private_chat"] = True
+                private_count += 1
+            elif interaction_context == "group":
+                counters["interaction_contexts.group_count"] = 1
+                group_count += 1
+            
+            # Determine preferred context based on usage
+            if private_count > group_count:
+                update_data["interaction_contexts.preferred_context"] = "private"
+            elif group_count > private_count:
+                update_data["interaction_contexts.preferred_context"] = "group"
             
-            await users.update_one({"user_id": user.id}, {"$set": update_data})
+            if session is not None:
+                session.set(update_data)
+                session.inc(counters)
+            else:
+                await users.update_one({"user_id": user.id}, {"$set": update_data, "$inc": counters})
             
             if send_greeting:
                 # Personalized greeting based on interaction history
@@ -145,6 +359,8 @@ async def update_user_preferences(user_id, preferences):
 async def add_conversation_entry(user_id, message, response, context=None):
     """Tambah entry ke riwayat percakapan dengan enhanced context"""
     try:
+        session = current_user_context(user_id)
+
         entry = {
             "timestamp": datetime.utcnow(),
             "message": message,
@@ -156,21 +372,26 @@ async def add_conversation_entry(user_id, message, response, context=None):
             "mood_indicator": _detect_mood(message)
         }
         
+        # Counter pola belajar diperbarui incremental dalam update yang sama
+        from syncara.modules.ai_learning import ai_learning
+        update = ai_learning.build_entry_update(user_id, entry)
+        
         # Push entry baru dan batasi ke 50 entry terakhir dalam satu operasi
-        await users.update_one(
-            {"user_id": user_id},
-            {
-                "$push": {
-                    "conversation_history": {
-                        "$each": [entry],
-                        "$slice": -50
-                    }
-                }
-            }
-        )
+        update["$push"]["conversation_history"] = {
+            "$each": [entry],
+            "$slice": -50
+        }
         
         # Update interaction patterns
-        await _update_interaction_patterns(user_id, entry)
+        update["$push"]["learning_data.interaction_patterns"] = {
+            "$each": [_build_interaction_pattern(entry)],
+            "$slice": -100  # Keep last 100 patterns
+        }
+        
+        if session is not None:
+            session.merge_update(update)
+        else:
+            await users.update_one({"user_id": user_id}, update)
         
         console.info(f"💬 Added conversation entry for user {user_id}")
         return True
@@ -213,32 +434,16 @@ def _detect_mood(message):
     else:
         return "neutral"
 
-async def _update_interaction_patterns(user_id, entry):
-    """Update interaction patterns for user"""
-    try:
-        pattern = {
-            "timestamp": entry["timestamp"],
-            "type": entry["interaction_type"],
-            "mood": entry["mood_indicator"],
-            "message_length": entry["message_length"],
-            "hour": entry["timestamp"].hour,
-            "day_of_week": entry["timestamp"].strftime("%A")
-        }
-        
-        await users.update_one(
-            {"user_id": user_id},
-            {
-                "$push": {
-                    "learning_data.interaction_patterns": {
-                        "$each": [pattern],
-                        "$slice": -100  # Keep last 100 patterns
-                    }
-                }
-            }
-        )
-        
-    except Exception as e:
-        console.error(f"Error updating interaction patterns: {e}")
+def _build_interaction_pattern(entry):
+    """Interaction pattern dari conversation entry"""
+    return {
+        "timestamp": entry["timestamp"],
+        "type": entry["interaction_type"],
+        "mood": entry["mood_indicator"],
+        "message_length": entry["message_length"],
+        "hour": entry["timestamp"].hour,
+        "day_of_week": entry["timestamp"].strftime("%A")
+    }
 
 async def get_recent_conversations(user_id, limit=10):
     """Ambil percakapan terbaru untuk konteks"""
@@ -263,8 +468,10 @@ async def learn_from_interaction(user_id, message, response, feedback=None):
         
         await add_conversation_entry(user_id, message, response, context)
         
+        session = current_user_context(user_id)
+        
         # Update learning data
-        learning_update = {}
+        learning_push = {}
         
         # Jika ada feedback, simpan
         if feedback:
@@ -275,18 +482,24 @@ async def learn_from_interaction(user_id, message, response, feedback=None):
                 "feedback": feedback,
                 "feedback_type": _classify_feedback(feedback)
             }
-            learning_update["$push"] = {"learning_data.user_feedback": feedback_entry}
+            learning_push["learning_data.user_feedback"] = feedback_entry
         
         # Analisis tipe pertanyaan untuk frequently asked
         question_types = analyze_question_type(message)
         if question_types:
+            if session is not None and session.doc is not None:
+                feedback_data = session.doc.get("learning_data", {}).get("user_feedback", [])
+                success_rate = _success_rate_from_feedback(feedback_data, question_types)
+            else:
+                success_rate = await _calculate_success_rate(user_id, question_types)
+            
             question_entry = {
                 "timestamp": datetime.utcnow(),
                 "question_type": question_types,
                 "message": message,
-                "success_rate": _calculate_success_rate(user_id, question_types)
+                "success_rate": success_rate
             }
-            learning_update["$push"] = {"learning_data.frequently_asked": question_entry}
+            learning_push["learning_data.frequently_asked"] = question_entry
         
         # Track successful responses
         if _is_successful_response(message, response, feedback):
@@ -296,12 +509,13 @@ async def learn_from_interaction(user_id, message, response, feedback=None):
                 "response": response,
                 "success_factors": _identify_success_factors(response)
             }
-            if "$push" not in learning_update:
-                learning_update["$push"] = {}
-            learning_update["$push"]["learning_data.successful_responses"] = success_entry
+            learning_push["learning_data.successful_responses"] = success_entry
         
-        if learning_update:
-            await users.update_one({"user_id": user_id}, learning_update)
+        if learning_push:
+            if session is not None:
+                session.merge_update({"$push": learning_push})
+            else:
+                await users.update_one({"user_id": user_id}, {"$push": learning_push})
         
         console.info(f"🎓 Learned from interaction with user {user_id}")
         return True
@@ -377,19 +591,23 @@ async def _calculate_success_rate(user_id, question_types):
         
         feedback_data = user_data.get("learning_data", {}).get("user_feedback", [])
         
-        relevant_feedback = [f for f in feedback_data if any(qt in f.get("message", "").lower() for qt in question_types)]
-        
-        if not relevant_feedback:
-            return 0.5
-        
-        positive_feedback = sum(1 for f in relevant_feedback if f.get("feedback_type") == "positive")
-        
-        return positive_feedback / len(relevant_feedback)
+        return _success_rate_from_feedback(feedback_data, question_types)
         
     except Exception as e:
         console.error(f"Error calculating success rate: {e}")
         return 0.5
 
+def _success_rate_from_feedback(feedback_data, question_types):
+    """Success rate dari daftar feedback yang sudah dimuat"""
+    relevant_feedback = [f for f in feedback_data if any(qt in f.get("message", "").lower() for qt in question_types)]
+    
+    if not relevant_feedback:
+        return 0.5
+    
+    positive_feedback = sum(1 for f in relevant_feedback if f.get("feedback_type") == "positive")
+    
+    return positive_feedback / len(relevant_feedback)
+
 def _is_successful_response(message, response, feedback):
     """Determine if a response was successful"""
     # Has feedback and it's positive
@@ -449,7 +667,11 @@ def analyze_question_type(message):
 async def get_user_context(user_id):
     """Dapatkan konteks lengkap user untuk AI response yang lebih baik"""
     try:
-        user_data = await users.find_one({"user_id": user_id})
+        session = current_user_context(user_id)
+        if session is not None:
+            user_data = session.doc
+        else:
+            user_data = await users.find_one({"user_id": user_id}, USER_CONTEXT_PROJECTION)
         if not user_data:
             return None
         
@@ -5,6 +5,7 @@ from syncara.shortcode import registry
 from syncara.services import ReplicateAPI
 from syncara.database import db, users, user_patterns, autonomous_tasks, scheduled_actions
 from syncara.console import console
+from syncara.modules.outbound import set_outbound_priority, PRIORITY_BACKGROUND
 
 class AutonomousAI:
     def __init__(self):
@@ -18,6 +19,8 @@ class AutonomousAI:
     async def start_autonomous_mode(self):
         console.info("🤖 Starting Autonomous AI Mode...")
         self.is_running = True
+        # Pesan proaktif mengalah pada balasan interaktif di outbound dispatcher
+        set_outbound_priority(PRIORITY_BACKGROUND)
         # Start multiple background tasks
         tasks = [
             asyncio.create_task(self.monitor_user_activity()),
@@ -0,0 +1,385 @@
+# syncara/modules/broadcast_engine.py
+"""
+Broadcast job engine untuk kirim_bulk_pesan / forward_bulk_pesan.
+Target dikerjakan paralel oleh beberapa worker per client (pacing oleh
+outbound dispatcher masing-masing client), dibagi ke beberapa assistant,
+dan progress di-checkpoint ke Mongo agar job yang terputus bisa dilanjutkan
+tanpa mengirim ulang ke target yang sudah selesai.
+"""
+
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+from syncara.console import console
+from syncara.modules.outbound import OutboundMixin, outbound_priority, PRIORITY_BACKGROUND
+
+BROADCAST_CONFIG = {
+    "workers_per_client": 5,        # Request bersamaan per client (rate tetap diatur dispatcher)
+    "checkpoint_interval": 2.0,     # Detik antar flush progress ke Mongo
+    "checkpoint_batch": 100,        # Flush lebih cepat jika sudah sebanyak ini
+    "progress_log_interval": 30,    # Detik antar log throughput
+    "max_failures_kept": 200,       # Detail error per target yang disimpan di memori
+    "finished_status_kept": 50      # Ringkasan status job selesai yang disimpan di memori
+}
+
+class BroadcastJob:
+    """State runtime satu job broadcast"""
+
+    def __init__(self, job_id: str, kind: str, payload: Dict[str, Any], targets: List[Union[int, str]]):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.targets = targets
+        self.failures: Dict[str, str] = {}
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.per_client: Dict[str, int] = {}
+        self.client_labels: List[str] = []
+        self.persisted = False
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.status = "running"
+
+    def get_status(self) -> Dict[str, Any]:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        processed = self.sent + self.failed
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "total": len(self.targets),
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "pending": len(self.targets) - processed - self.skipped,
+            "elapsed": elapsed,
+            "throughput": processed / elapsed if elapsed > 0 else 0.0,
+            "per_client": dict(self.per_client),
+            "failures": dict(list(self.failures.items())[:20])
+        }
+
+def _client_label(client) -> str:
+    me = getattr(client, "me", None)
+    if me is not None:
+        return f"@{me.username}" if getattr(me, "username", None) else str(me.id)
+    return getattr(client, "name", "client")
+
+def _persistable(payload: Dict[str, Any]) -> bool:
+    """Payload hanya bisa di-resume jika isinya tipe dasar (bisa disimpan ke BSON)"""
+    def check(value):
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return True
+        if isinstance(value, (list, tuple)):
+            return all(check(item) for item in value)
+        if isinstance(value, dict):
+            return all(isinstance(key, str) and check(item) for key, item in value.items())
+        return False
+    return check(payload)
+
+class BroadcastEngine:
+    """Menjalankan dan me-resume job broadcast"""
+
+    def __init__(self):
+        # Hanya job yang sedang berjalan; job selesai tersimpan di Mongo + ringkasan status
+        self.jobs: Dict[str, BroadcastJob] = {}
+        self.finished: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    # ==================== PERSISTENCE ====================
+
+    async def _load_checkpoint(self, job: BroadcastJob, resumable: bool) -> Dict[str, str]:
+        """Buat dokumen job atau muat progress sebelumnya. Return {target: status} yang sudah selesai"""
+        try:
+            from syncara.database import broadcast_jobs, broadcast_targets
+
+            existing = await broadcast_jobs.find_one({"job_id": job.job_id}, {"_id": 1})
+            if existing:
+                done = {}
+                cursor = broadcast_targets.find(
+                    {"job_id": job.job_id, "status": {"$in": ["sent", "failed"]}},
+                    {"target": 1, "status": 1}
+                )
+                async for doc in cursor:
+                    done[str(doc["target"])] = doc["status"]
+                await broadcast_jobs.update_one(
+                    {"job_id": job.job_id},
+                    {"$set": {"status": "running", "resumed_at": datetime.utcnow()}}
+                )
+                job.persisted = True
+                console.info(f"[BROADCAST] Resume job {job.job_id}: {len(done)} target sudah selesai")
+                return done
+
+            await broadcast_jobs.insert_one({
+                "job_id": job.job_id,
+                "kind": job.kind,
+                "payload": job.payload if resumable else None,
+                "resumable": resumable,
+                "clients": job.client_labels,
+                "total": len(job.targets),
+                "sent": 0,
+                "failed": 0,
+                "status": "running",
+                "created_at": datetime.utcnow()
+            })
+            if job.targets:
+                await broadcast_targets.insert_many(
+                    [{"job_id": job.job_id, "target": target, "status": "pending"} for target in job.targets],
+                    ordered=False
+                )
+            job.persisted = True
+        except Exception as e:
+            console.error(f"[BROADCAST] Checkpoint tidak tersedia, job berjalan tanpa resume: {e}")
+        return {}
+
+    async def _flush(self, job: BroadcastJob, updates: List[Dict[str, Any]]):
+        if not updates or not job.persisted:
+            return
+        try:
+            from pymongo import UpdateOne
+            from syncara.database import broadcast_jobs, broadcast_targets
+
+            await broadcast_targets.bulk_write([
+                UpdateOne(
+                    {"job_id": job.job_id, "target": update["target"]},
+                    {"$set": {**update, "updated_at": datetime.utcnow()}}
+                )
+                for update in updates
+            ], ordered=False)
+            await broadcast_jobs.update_one(
+                {"job_id": job.job_id},
+                {"$set": {"sent": job.sent, "failed": job.failed, "updated_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            console.error(f"[BROADCAST] Gagal menyimpan checkpoint {job.job_id}: {e}")
+
+    async def _finish(self, job: BroadcastJob):
+        if not job.persisted:
+            return
+        try:
+            from syncara.database import broadcast_jobs
+            await broadcast_jobs.update_one(
+                {"job_id": job.job_id},
+                {"$set": {
+                    "status": job.status,
+                    "sent": job.sent,
+                    "failed": job.failed,
+                    "finished_at": datetime.utcnow()
+                }}
+            )
+        except Exception as e:
+            console.error(f"[BROADCAST] Gagal menyimpan status akhir {job.job_id}: {e}")
+
+    # ==================== EXECUTION ====================
+
+    async def _deliver(self, client, job: BroadcastJob, target):
+        payload = job.payload
+        if job.kind == "forward":
+            return await client.forward_messages(
+                chat_id=target,
+                from_chat_id=payload["from_chat_id"],
+                message_ids=payload["message_ids"],
+                **payload.get("kwargs", {})
+            )
+        return await client.send_message(chat_id=target, text=payload["text"], **payload.get("kwargs", {}))
+
+    async def run(self, kind: str, targets: List[Union[int, str]], payload: Dict[str, Any],
+                  clients: List[Any], job_id: str = None, delay: float = 1.0,
+                  on_result: Callable[[Any, Any], None] = None) -> BroadcastJob:
+        """
+        Jalankan job broadcast sampai selesai. kind: "send" (payload text, kwargs)
+        atau "forward" (payload from_chat_id, message_ids, kwargs).
+        Target gagal di satu client dicoba lewat client lain sebelum dianggap gagal.
+        Client tanpa outbound dispatcher dikerjakan satu worker dengan jeda `delay`.
+        Hasil pengiriman tidak disimpan di job: on_result(target, result)
+        dipanggil untuk setiap target yang berhasil.
+        """
+        # Dedupe dengan urutan tetap
+        unique_targets = list(dict.fromkeys(targets))
+        job = BroadcastJob(job_id or f"broadcast_{uuid.uuid4().hex[:12]}", kind, payload, unique_targets)
+        self.jobs[job.job_id] = job
+
+        # Satu entry per client (label unik)
+        clients = list({_client_label(client): client for client in clients if client is not None}.values())
+        if not clients:
+            job.status = "failed"
+            job.finished_at = time.monotonic()
+            self._retire(job)
+            return job
+
+        labels = [_client_label(client) for client in clients]
+        job.client_labels = labels
+        done = await self._load_checkpoint(job, _persistable(payload))
+
+        # Satu antrian per client; target dibagi round-robin, retry pindah ke client lain
+        queues = {label: asyncio.Queue() for label in labels}
+        remaining = 0
+        for target in unique_targets:
+            if str(target) in done:
+                job.skipped += 1
+            else:
+                queues[labels[remaining % len(labels)]].put_nowait((target, frozenset()))
+                remaining += 1
+
+        updates: List[Dict[str, Any]] = []
+        flush_now = asyncio.Event()
+        finished = asyncio.Event()
+        all_done = asyncio.Event()
+        if remaining == 0:
+            all_done.set()
+
+        def record(target, status, client_label=None, error=None):
+            update = {"target": target, "status": status}
+            if client_label:
+                update["client"] = client_label
+            if error:
+                update["error"] = error[:500]
+            updates.append(update)
+            if len(updates) >= BROADCAST_CONFIG["checkpoint_batch"]:
+                flush_now.set()
+
+        def complete_one():
+            nonlocal remaining
+            remaining -= 1
+            if remaining <= 0:
+                all_done.set()
+
+        async def worker(client, label, paced):
+            queue = queues[label]
+            while True:
+                target, tried = await queue.get()
+                try:
+                    if not paced and delay > 0 and job.per_client.get(label):
+                        await asyncio.sleep(delay)
+                    result = await self._deliver(client, job, target)
+                    if on_result is not None:
+                        on_result(target, result)
+                    job.sent += 1
+                    job.per_client[label] = job.per_client.get(label, 0) + 1
+                    record(target, "sent", client_label=label)
+                    complete_one()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    tried = tried | {label}
+                    untried = [other for other in labels if other not in tried]
+                    if untried:
+                        # Client lain mungkin punya akses ke peer ini
+                        retry_label = min(untried, key=lambda other: queues[other].qsize())
+                        queues[retry_label].put_nowait((target, tried))
+                    else:
+                        job.failed += 1
+                        if len(job.failures) < BROADCAST_CONFIG["max_failures_kept"]:
+                            job.failures[str(target)] = str(e)
+                        record(target, "failed", client_label=label, error=str(e))
+                        complete_one()
+
+        async def checkpointer():
+            last_log = time.monotonic()
+            while not finished.is_set():
+                try:
+                    await asyncio.wait_for(flush_now.wait(), timeout=BROADCAST_CONFIG["checkpoint_interval"])
+                except asyncio.TimeoutError:
+                    pass
+                flush_now.clear()
+                batch, updates[:] = updates[:], []
+                await self._flush(job, batch)
+
+                if time.monotonic() - last_log >= BROADCAST_CONFIG["progress_log_interval"]:
+                    last_log = time.monotonic()
+                    status = job.get_status()
+                    console.info(
+                        f"[BROADCAST] {job.job_id}: {status['sent']} terkirim, {status['failed']} gagal, "
+                        f"{status['pending']} sisa ({status['throughput']:.1f} target/detik)"
+                    )
+
+        with outbound_priority(PRIORITY_BACKGROUND):
+            workers = []
+            for client, label in zip(clients, labels):
+                paced = isinstance(client, OutboundMixin)
+                count = BROADCAST_CONFIG["workers_per_client"] if paced else 1
+                workers.extend(asyncio.create_task(worker(client, label, paced)) for _ in range(count))
+        checkpoint_task = asyncio.create_task(checkpointer())
+
+        try:
+            await all_done.wait()
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "interrupted"
+            raise
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            finished.set()
+            flush_now.set()
+            await checkpoint_task
+            await self._flush(job, updates)
+            job.finished_at = time.monotonic()
+            if job.status != "interrupted":
+                await self._finish(job)
+
+            status = self._retire(job)
+            console.info(
+                f"[BROADCAST] {job.job_id} {job.status}: {status['sent']}/{status['total']} terkirim, "
+                f"{status['failed']} gagal, {status['skipped']} dilewati, {status['elapsed']:.1f}s"
+            )
+
+        return job
+
+    def _retire(self, job: BroadcastJob) -> Dict[str, Any]:
+        """Lepas job selesai dari memori, simpan ringkasan statusnya saja"""
+        status = job.get_status()
+        if self.jobs.get(job.job_id) is job:
+            del self.jobs[job.job_id]
+        self.finished.pop(job.job_id, None)
+        self.finished[job.job_id] = status
+        while len(self.finished) > BROADCAST_CONFIG["finished_status_kept"]:
+            self.finished.popitem(last=False)
+        return status
+
+    async def resume_incomplete_jobs(self, clients: List[Any]):
+        """Lanjutkan job berstatus running yang tertinggal saat restart"""
+        try:
+            from syncara.database import broadcast_jobs, broadcast_targets
+
+            available = {_client_label(client): client for client in clients if client is not None}
+            async for doc in broadcast_jobs.find({"status": "running", "resumable": True}):
+                if doc["job_id"] in self.jobs:
+                    continue
+                # Utamakan client yang sama dengan saat job dibuat
+                job_clients = [available[label] for label in doc.get("clients", []) if label in available]
+                if not job_clients:
+                    job_clients = list(available.values())
+                targets = [
+                    target_doc["target"]
+                    async for target_doc in broadcast_targets.find({"job_id": doc["job_id"]}, {"target": 1})
+                ]
+                console.info(f"[BROADCAST] Melanjutkan job {doc['job_id']} ({len(targets)} target)")
+                asyncio.create_task(self.run(doc["kind"], targets, doc["payload"], job_clients, job_id=doc["job_id"]))
+        except Exception as e:
+            console.error(f"[BROADCAST] Gagal resume job: {e}")
+
+    def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.get_status()
+        return self.finished.get(job_id)
+
+def get_broadcast_clients(client, use_assistants: bool = True) -> List[Any]:
+    """Client utama ditambah semua assistant aktif (untuk membagi beban broadcast)"""
+    clients = [client]
+    if use_assistants:
+        try:
+            from syncara import assistant_manager
+            for info in assistant_manager.get_all_assistants().values():
+                if info.get("status") == "active" and info.get("client") is not client:
+                    clients.append(info["client"])
+        except Exception as e:
+            console.warning(f"[BROADCAST] Assistant lain tidak tersedia: {e}")
+    return clients
+
+# Global instance
+broadcast_engine = BroadcastEngine()
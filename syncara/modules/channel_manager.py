@@ -11,10 +11,26 @@ from dataclasses import dataclass
 import json
 
 from pyrogram import enums
+from pymongo import UpdateOne
 from syncara.console import console
 from syncara.services import ReplicateAPI
+from syncara.modules.outbound import set_outbound_priority, PRIORITY_BACKGROUND
 import re
 
+CHANNEL_SCHEDULER_CONFIG = {
+    "pregenerate_minutes": 30,        # Konten dibuat sejauh ini sebelum slot
+    "generation_retry_minutes": 10,   # Jeda retry jika pre-generation gagal
+    "catch_up_hours": 3,              # Slot yang terlewat (downtime) masih diposting dalam batas ini
+    "max_sleep": 300,                 # Batas tidur loop scheduler (detik)
+    "horizon_days": 62                # Batas pencarian slot berikutnya
+}
+
+CHANNEL_ANALYTICS_CONFIG = {
+    "update_interval": 3600,          # Interval update member_count (detik)
+    "hourly_retention_days": 14,      # Rollup per jam dihapus otomatis (TTL) setelah ini
+    "recent_posts": 10                # Posting terakhir yang ditampilkan di statistik
+}
+
 @dataclass
 class ContentPost:
     """Data class untuk content post"""
@@ -83,7 +99,8 @@ class ChannelContentGenerator:
             content = await self.replicate_api.generate_response(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=500
+                max_tokens=500,
+                cache=False
             )
             
             hashtags = ["#DailyTips", "#SyncaraAI", "#AITips", "#Productivity", "#AI"]
@@ -141,7 +158,8 @@ class ChannelContentGenerator:
             content = await self.replicate_api.generate_response(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=600
+                max_tokens=600,
+                cache=False
             )
             
             hashtags = ["#WeeklyUpdate", "#SyncaraNews", "#AIProgress", "#Community"]
@@ -192,7 +210,8 @@ class ChannelContentGenerator:
             content = await self.replicate_api.generate_response(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=500
+                max_tokens=500,
+                cache=False
             )
             
             hashtags = ["#UserStory", "#Testimonial", "#SyncaraSuccess", "#AIImpact"]
@@ -242,7 +261,8 @@ class ChannelContentGenerator:
             content = await self.replicate_api.generate_response(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=700
+                max_tokens=700,
+                cache=False
             )
             
             hashtags = ["#AITrends", "#TechInsights", "#FutureAI", "#Innovation"]
@@ -292,7 +312,8 @@ class ChannelContentGenerator:
             answer = await self.replicate_api.generate_response(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=600
+                max_tokens=600,
+                cache=False
             )
             
             content = f"❓ **Q&A Session**\n\n**Q:** {question}\n\n**A:** {answer}"
@@ -341,7 +362,8 @@ class ChannelContentGenerator:
             content = await self.replicate_api.generate_response(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=400
+                max_tokens=400,
+                cache=False
             )
             
             hashtags = ["#FunFacts", "#AIFacts", "#DidYouKnow", "#TechTrivia"]
@@ -462,16 +484,23 @@ class ChannelManager:
         self.is_running = False
         self._db_initialized = False
         
-        # Content schedule
+        # Content schedule (waktu lokal server)
         self.content_schedule = {
-            "daily_tips": {"hour": 8, "minute": 0},      # 08:00 setiap hari
-            "fun_facts": {"hour": 14, "minute": 0},      # 14:00 setiap hari  
-            "qna": {"hour": 20, "minute": 0},            # 20:00 setiap hari
-            "user_stories": {"hour": 10, "minute": 30},  # 10:30 setiap 2 hari
-            "weekly_updates": {"weekday": 1, "hour": 9}, # Senin 09:00
-            "ai_trends": {"day": 1, "hour": 11},         # Tanggal 1 setiap bulan
-            "polls": {"hour": 16, "minute": 0}           # 16:00 setiap 3 hari
+            "daily_tips": {"hour": 8, "minute": 0},                     # 08:00 setiap hari
+            "fun_facts": {"hour": 14, "minute": 0},                     # 14:00 setiap hari  
+            "qna": {"hour": 20, "minute": 0},                           # 20:00 setiap hari
+            "user_stories": {"hour": 10, "minute": 30, "day_mod": 2},   # 10:30 setiap 2 hari (tanggal genap)
+            "weekly_updates": {"weekday": 0, "hour": 9, "minute": 0},   # Senin 09:00
+            "ai_trends": {"day": 1, "hour": 11, "minute": 0},           # Tanggal 1 setiap bulan
+            "polls": {"hour": 16, "minute": 0, "day_mod": 3}            # 16:00 setiap 3 hari
         }
+        
+        # State scheduler: slot berikutnya per jenis konten dan konten yang sudah disiapkan
+        self._next_slots: Dict[str, datetime] = {}
+        self._prepared: Dict[str, tuple] = {}            # content_type -> (slot, ContentPost)
+        self._generating: Dict[str, asyncio.Task] = {}
+        self._generation_retry: Dict[str, datetime] = {}
+        self._stop_event: Optional[asyncio.Event] = None
 
     async def _ensure_db_connection(self):
         """Ensure database connection"""
@@ -484,6 +513,8 @@ class ChannelManager:
                 self.channel_posts = db.channel_posts
                 self.channel_analytics = db.channel_analytics
                 self.channel_schedule = db.channel_schedule
+                self.channel_content_queue = db.channel_content_queue
+                self.channel_rollups = db.channel_rollups
                 self._db_initialized = True
             except ImportError:
                 console.error("Database not available for channel management")
@@ -492,18 +523,22 @@ class ChannelManager:
         """Start auto-posting scheduler"""
         console.info("🚀 Starting Syncara Insights auto-posting...")
         self.is_running = True
+        # Posting terjadwal masuk lane background di outbound dispatcher
+        set_outbound_priority(PRIORITY_BACKGROUND)
         
         try:
             # Start background tasks with proper error handling
             tasks = []
             
+            # Rollup analytics diisi dari riwayat posting sebelum event baru dicatat
+            await self._backfill_rollups()
+            
             # Create tasks with exception handling
-            daily_task = asyncio.create_task(self._daily_content_scheduler(client))
-            weekly_task = asyncio.create_task(self._weekly_content_scheduler(client))
-            monthly_task = asyncio.create_task(self._monthly_content_scheduler(client))
+            self._stop_event = asyncio.Event()
+            content_task = asyncio.create_task(self._content_scheduler(client))
             analytics_task = asyncio.create_task(self._analytics_tracker(client))
             
-            tasks.extend([daily_task, weekly_task, monthly_task, analytics_task])
+            tasks.extend([content_task, analytics_task])
             
             console.info(f"✅ Started {len(tasks)} scheduler tasks")
             
@@ -523,119 +558,271 @@ class ChannelManager:
         """Stop auto-posting"""
         console.info("⏹️ Stopping Syncara Insights auto-posting...")
         self.is_running = False
+        if self._stop_event is not None:
+            self._stop_event.set()
+        for task in list(self._generating.values()):
+            task.cancel()
 
-    async def _daily_content_scheduler(self, client):
-        """Daily content posting scheduler"""
-        while self.is_running:
-            try:
-                current_time = datetime.now()
-                
-                # Daily Tips - 08:00
-                if (current_time.hour == 8 and current_time.minute == 0 and 
-                    not await self._is_content_posted_today("daily_tips")):
-                    
-                    post = await self.content_generator.generate_daily_tips()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                # Fun Facts - 14:00
-                if (current_time.hour == 14 and current_time.minute == 0 and
-                    not await self._is_content_posted_today("fun_facts")):
-                    
-                    post = await self.content_generator.generate_fun_facts()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                # Q&A - 20:00
-                if (current_time.hour == 20 and current_time.minute == 0 and
-                    not await self._is_content_posted_today("qna")):
-                    
-                    post = await self.content_generator.generate_qna_content()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                # User Stories - setiap 2 hari sekali 10:30
-                if (current_time.hour == 10 and current_time.minute == 30 and
-                    current_time.day % 2 == 0 and
-                    not await self._is_content_posted_today("user_stories")):
-                    
-                    post = await self.content_generator.generate_user_stories()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                # Polls - setiap 3 hari sekali 16:00
-                if (current_time.hour == 16 and current_time.minute == 0 and
-                    current_time.day % 3 == 0 and
-                    not await self._is_content_posted_today("polls")):
-                    
-                    post = await self.content_generator.generate_interactive_poll()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                await asyncio.sleep(60)  # Check every minute
-                
-            except Exception as e:
-                console.error(f"Error in daily scheduler: {str(e)}")
-                await self.log_error("channel_manager", f"Daily scheduler error: {str(e)}")
-                await asyncio.sleep(300)  # Wait 5 minutes on error
+    # ==================== CALENDAR SCHEDULER ====================
 
-    async def _weekly_content_scheduler(self, client):
-        """Weekly content scheduler"""
-        while self.is_running:
+    def _get_generators(self) -> Dict[str, Any]:
+        return {
+            "daily_tips": self.content_generator.generate_daily_tips,
+            "weekly_updates": self.content_generator.generate_weekly_updates,
+            "user_stories": self.content_generator.generate_user_stories,
+            "ai_trends": self.content_generator.generate_ai_trends,
+            "qna": self.content_generator.generate_qna_content,
+            "fun_facts": self.content_generator.generate_fun_facts,
+            "polls": self.content_generator.generate_interactive_poll
+        }
+
+    def _slot_on(self, content_type: str, day: datetime) -> Optional[datetime]:
+        """Slot jenis konten pada tanggal `day`, atau None jika tidak ada slot hari itu"""
+        rule = self.content_schedule[content_type]
+        if "weekday" in rule and day.weekday() != rule["weekday"]:
+            return None
+        if "day" in rule and day.day != rule["day"]:
+            return None
+        if "day_mod" in rule and day.day % rule["day_mod"] != 0:
+            return None
+        return day.replace(hour=rule["hour"], minute=rule.get("minute", 0), second=0, microsecond=0)
+
+    def _next_slot(self, content_type: str, after: datetime) -> Optional[datetime]:
+        """Slot pertama setelah `after`"""
+        for offset in range(CHANNEL_SCHEDULER_CONFIG["horizon_days"]):
+            slot = self._slot_on(content_type, after + timedelta(days=offset))
+            if slot is not None and slot > after:
+                return slot
+        return None
+
+    def _previous_slot(self, content_type: str, before: datetime) -> Optional[datetime]:
+        """Slot terakhir pada atau sebelum `before`"""
+        for offset in range(CHANNEL_SCHEDULER_CONFIG["horizon_days"]):
+            slot = self._slot_on(content_type, before - timedelta(days=offset))
+            if slot is not None and slot <= before:
+                return slot
+        return None
+
+    async def _load_schedule_state(self):
+        """
+        Tentukan slot berikutnya per jenis konten dari satu query state
+        (channel_schedule, index content_type). Slot yang terlewat saat
+        downtime dan masih dalam batas catch-up dijadwalkan segera.
+        """
+        await self._ensure_db_connection()
+        content_types = list(self.content_schedule)
+        now = datetime.now()
+
+        last_slots: Dict[str, datetime] = {}
+        try:
+            states = await self.channel_schedule.find(
+                {"content_type": {"$in": content_types}}
+            ).to_list(length=None)
+            last_slots = {state["content_type"]: state.get("last_slot") for state in states}
+
+            # Belum ada state (pertama kali): pakai posting terakhir dari channel_posts, satu aggregation
+            missing = [content_type for content_type in content_types if content_type not in last_slots]
+            if missing:
+                local_offset = timedelta(minutes=round((now - datetime.utcnow()).total_seconds() / 60))
+                latest_posts = await self.channel_posts.aggregate([
+                    {"$match": {"type": {"$in": missing}, "status": "posted"}},
+                    {"$group": {"_id": "$type", "posted_time": {"$max": "$posted_time"}}}
+                ]).to_list(length=None)
+                for item in latest_posts:
+                    if item.get("posted_time"):
+                        last_slots[item["_id"]] = item["posted_time"] + local_offset
+        except Exception as e:
+            console.error(f"Error loading channel schedule state: {str(e)}")
+
+        catch_up = timedelta(hours=CHANNEL_SCHEDULER_CONFIG["catch_up_hours"])
+        for content_type in content_types:
+            previous = self._previous_slot(content_type, now)
+            last = last_slots.get(content_type)
+            if previous and now - previous <= catch_up and (last is None or last < previous):
+                console.info(f"⏪ Catch-up {content_type}: slot {previous:%Y-%m-%d %H:%M} terlewat")
+                self._next_slots[content_type] = previous
+            else:
+                self._next_slots[content_type] = self._next_slot(content_type, now)
+
+    async def _save_schedule_state(self, content_type: str, slot: datetime, status: str):
+        try:
+            await self.channel_schedule.update_one(
+                {"content_type": content_type},
+                {"$set": {
+                    "content_type": content_type,
+                    "last_slot": slot,
+                    "last_status": status,
+                    "next_slot": self._next_slots.get(content_type),
+                    "updated_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            console.error(f"Error saving channel schedule state: {str(e)}")
+
+    async def _pregenerate(self, content_type: str, slot: datetime):
+        """Buat konten sebelum slot dan simpan ke channel_content_queue"""
+        retry_at = datetime.now() + timedelta(minutes=CHANNEL_SCHEDULER_CONFIG["generation_retry_minutes"])
+        try:
+            post = await self._get_generators()[content_type]()
+            if not post:
+                self._generation_retry[content_type] = retry_at
+                return
+
+            post.scheduled_time = slot
+            self._prepared[content_type] = (slot, post)
+            self._generation_retry.pop(content_type, None)
+            await self.channel_content_queue.update_one(
+                {"content_type": content_type, "slot": slot},
+                {"$set": {
+                    "content_type": content_type,
+                    "slot": slot,
+                    "post_id": post.id,
+                    "title": post.title,
+                    "content": post.content,
+                    "hashtags": post.hashtags or [],
+                    "status": "ready",
+                    "priority": 0,
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+            await self.channel_posts.update_one({"post_id": post.id}, {"$set": {"scheduled_time": slot}})
+            console.info(f"📝 Pre-generated {content_type} untuk slot {slot:%Y-%m-%d %H:%M}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._generation_retry[content_type] = retry_at
+            console.error(f"Error pre-generating {content_type}: {str(e)}")
+        finally:
+            self._generating.pop(content_type, None)
+
+    async def _take_prepared_post(self, content_type: str, slot: datetime) -> Optional[ContentPost]:
+        """Ambil konten siap posting: memory -> channel_content_queue -> tunggu/generate sekarang"""
+        prepared = self._prepared.get(content_type)
+        if prepared and prepared[0] == slot:
+            del self._prepared[content_type]
+            return prepared[1]
+
+        # Konten dari sebelum restart
+        try:
+            queued = await self.channel_content_queue.find_one(
+                {"content_type": content_type, "slot": slot, "status": "ready"}
+            )
+            if queued:
+                return ContentPost(
+                    id=queued["post_id"],
+                    type=content_type,
+                    title=queued.get("title", ""),
+                    content=queued["content"],
+                    scheduled_time=slot,
+                    hashtags=queued.get("hashtags", [])
+                )
+        except Exception as e:
+            console.error(f"Error reading channel content queue: {str(e)}")
+
+        # Pre-generation masih berjalan atau belum sempat dilakukan
+        task = self._generating.get(content_type)
+        if task is None:
+            task = self._generating[content_type] = asyncio.create_task(self._pregenerate(content_type, slot))
+        await asyncio.shield(task)
+        prepared = self._prepared.pop(content_type, None)
+        return prepared[1] if prepared and prepared[0] == slot else None
+
+    async def _publish_slot(self, client, content_type: str, slot: datetime):
+        post = await self._take_prepared_post(content_type, slot)
+        posted = bool(post) and await self._post_to_channel(client, post)
+        status = "posted" if posted else "failed"
+        await self._record_post_event(content_type, posted)
+
+        if post:
             try:
-                current_time = datetime.now()
-                
-                # Weekly Updates - Senin 09:00
-                if (current_time.weekday() == 0 and current_time.hour == 9 and 
-                    current_time.minute == 0 and
-                    not await self._is_content_posted_this_week("weekly_updates")):
-                    
-                    post = await self.content_generator.generate_weekly_updates()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                await asyncio.sleep(3600)  # Check every hour
-                
+                await self.channel_content_queue.update_one(
+                    {"content_type": content_type, "slot": slot},
+                    {"$set": {"status": status, "processed_at": datetime.utcnow()}}
+                )
             except Exception as e:
-                console.error(f"Error in weekly scheduler: {str(e)}")
-                await self.log_error("channel_manager", f"Weekly scheduler error: {str(e)}")
-                await asyncio.sleep(3600)
+                console.error(f"Error updating channel content queue: {str(e)}")
+
+        # Slot berikutnya dihitung dari sekarang: slot yang sudah lewat tidak diposting beruntun
+        self._next_slots[content_type] = self._next_slot(content_type, max(slot, datetime.now()))
+        await self._save_schedule_state(content_type, slot, status)
+
+    async def _content_scheduler(self, client):
+        """
+        Scheduler berbasis kalender: tidur sampai event berikutnya
+        (pre-generation atau slot), tanpa polling per menit.
+        """
+        await self._load_schedule_state()
+        lead = timedelta(minutes=CHANNEL_SCHEDULER_CONFIG["pregenerate_minutes"])
 
-    async def _monthly_content_scheduler(self, client):
-        """Monthly content scheduler"""
         while self.is_running:
             try:
-                current_time = datetime.now()
-                
-                # AI Trends - Tanggal 1 setiap bulan 11:00
-                if (current_time.day == 1 and current_time.hour == 11 and 
-                    current_time.minute == 0 and
-                    not await self._is_content_posted_this_month("ai_trends")):
-                    
-                    post = await self.content_generator.generate_ai_trends()
-                    if post:
-                        await self._post_to_channel(client, post)
-                
-                await asyncio.sleep(3600)  # Check every hour
-                
+                now = datetime.now()
+                events = []
+
+                for content_type, slot in self._next_slots.items():
+                    if slot is None:
+                        continue
+                    events.append(slot)
+                    prepared = self._prepared.get(content_type)
+                    if (prepared and prepared[0] == slot) or content_type in self._generating:
+                        continue
+                    start_at = max(slot - lead, self._generation_retry.get(content_type, now))
+                    if start_at <= now and slot > now:
+                        self._generating[content_type] = asyncio.create_task(
+                            self._pregenerate(content_type, slot)
+                        )
+                    elif start_at > now:
+                        events.append(start_at)
+
+                due = sorted(
+                    (slot, content_type) for content_type, slot in self._next_slots.items()
+                    if slot is not None and slot <= now
+                )
+                for slot, content_type in due:
+                    await self._publish_slot(client, content_type, slot)
+                if due:
+                    continue
+
+                next_event = min(events, default=now + timedelta(seconds=CHANNEL_SCHEDULER_CONFIG["max_sleep"]))
+                timeout = min(max((next_event - now).total_seconds(), 1), CHANNEL_SCHEDULER_CONFIG["max_sleep"])
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
             except Exception as e:
-                console.error(f"Error in monthly scheduler: {str(e)}")
-                await self.log_error("channel_manager", f"Monthly scheduler error: {str(e)}")
-                await asyncio.sleep(3600)
+                console.error(f"Error in content scheduler: {str(e)}")
+                await self.log_error("channel_manager", f"Content scheduler error: {str(e)}")
+                await asyncio.sleep(60)
+
+    def get_schedule(self) -> Dict[str, Any]:
+        """Slot berikutnya dan status pre-generation per jenis konten"""
+        return {
+            content_type: {
+                "next_slot": slot,
+                "prepared": bool(self._prepared.get(content_type) and self._prepared[content_type][0] == slot),
+                "generating": content_type in self._generating
+            }
+            for content_type, slot in sorted(
+                self._next_slots.items(), key=lambda item: item[1] or datetime.max
+            )
+        }
 
     async def _analytics_tracker(self, client):
         """Track channel analytics"""
         while self.is_running:
             try:
                 await self._update_channel_analytics(client)
-                await asyncio.sleep(3600)  # Update analytics every hour
+                await asyncio.sleep(CHANNEL_ANALYTICS_CONFIG["update_interval"])
                 
             except Exception as e:
                 console.error(f"Error in analytics tracker: {str(e)}")
-                await asyncio.sleep(3600)
+                await asyncio.sleep(CHANNEL_ANALYTICS_CONFIG["update_interval"])
 
-    async def _post_to_channel(self, client, post: ContentPost):
-        """Post content to channel"""
+    async def _post_to_channel(self, client, post: ContentPost) -> bool:
+        """Post content to channel, return True jika berhasil"""
         try:
             # Post to channel - using Pyrogram enums for parse mode
             message = await client.send_message(
@@ -660,6 +847,7 @@ class ChannelManager:
             
             console.info(f"✅ Posted to channel: {post.type} - {post.title}")
             await self.log_system_event("info", "channel_manager", f"Posted content: {post.type}")
+            return True
             
         except Exception as e:
             console.error(f"Error posting to channel with Markdown: {str(e)}")
@@ -688,6 +876,7 @@ class ChannelManager:
                 
                 console.info(f"✅ Posted to channel (no parse mode): {post.type} - {post.title}")
                 await self.log_system_event("info", "channel_manager", f"Posted content (no parse): {post.type}")
+                return True
                 
             except Exception as e2:
                 console.error(f"Error posting without parse mode: {str(e2)}")
@@ -718,6 +907,7 @@ class ChannelManager:
                     
                     console.info(f"✅ Posted to channel (plain text): {post.type} - {post.title}")
                     await self.log_system_event("info", "channel_manager", f"Posted content (plain): {post.type}")
+                    return True
                     
                 except Exception as e3:
                     console.error(f"Failed to post even with plain text: {str(e3)}")
@@ -725,6 +915,7 @@ class ChannelManager:
                         await self.log_system_event("error", "channel_manager", f"Failed to post: {str(e3)}")
                     except:
                         pass
+                    return False
 
     async def _is_content_posted_today(self, content_type: str) -> bool:
         """Check if content type was posted today"""
@@ -793,8 +984,92 @@ class ChannelManager:
             console.error(f"Error checking monthly posts: {str(e)}")
             return False
 
+    # ==================== ANALYTICS ROLLUPS ====================
+
+    def _rollup_update(self, granularity: str, moment: datetime, update: Dict[str, Any]) -> UpdateOne:
+        """Upsert satu dokumen rollup (per jam / per hari, waktu lokal server)"""
+        if granularity == "hour":
+            bucket = moment.replace(minute=0, second=0, microsecond=0)
+        else:
+            bucket = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        on_insert = {"channel_username": self.channel_username, "granularity": granularity, "bucket": bucket}
+        if granularity == "hour":
+            # Rollup per jam dihapus otomatis oleh TTL index; rollup harian disimpan permanen
+            on_insert["expires_at"] = bucket + timedelta(days=CHANNEL_ANALYTICS_CONFIG["hourly_retention_days"])
+
+        return UpdateOne(
+            {"_id": f"{self.channel_username}:{granularity}:{bucket:%Y%m%d%H}"},
+            {**update, "$setOnInsert": on_insert},
+            upsert=True
+        )
+
+    async def _record_post_event(self, content_type: str, posted: bool, moment: datetime = None):
+        """Naikkan counter rollup jam & hari untuk satu posting (berhasil atau gagal)"""
+        try:
+            await self._ensure_db_connection()
+            moment = moment or datetime.now()
+            increments = {"posts": 1, f"by_type.{content_type}": 1} if posted else {"failed": 1}
+            await self.channel_rollups.bulk_write(
+                [self._rollup_update(granularity, moment, {"$inc": increments}) for granularity in ("hour", "day")],
+                ordered=False
+            )
+        except Exception as e:
+            console.error(f"Error recording channel post event: {str(e)}")
+
+    async def _backfill_rollups(self):
+        """
+        Isi rollup sekali dari channel_posts yang sudah ada (sebelum rollup
+        dipakai). Ditandai dokumen meta agar tidak diulang; total ditulis
+        dengan $set (bukan $inc) sehingga backfill yang terputus sebelum
+        marker tertulis aman diulang tanpa menggandakan counter.
+        """
+        try:
+            await self._ensure_db_connection()
+            marker_id = f"{self.channel_username}:meta:backfill"
+            if await self.channel_rollups.find_one({"_id": marker_id}, {"_id": 1}):
+                return
+
+            now = datetime.now()
+            local_offset = timedelta(minutes=round((now - datetime.utcnow()).total_seconds() / 60))
+            hourly_since = now - timedelta(days=CHANNEL_ANALYTICS_CONFIG["hourly_retention_days"])
+            counters: Dict[tuple, Dict[str, int]] = {}
+
+            cursor = self.channel_posts.find(
+                {"status": "posted", "posted_time": {"$ne": None}},
+                {"type": 1, "posted_time": 1}
+            )
+            async for post in cursor:
+                moment = post["posted_time"] + local_offset
+                buckets = {"day": moment.replace(hour=0, minute=0, second=0, microsecond=0)}
+                if moment >= hourly_since:
+                    buckets["hour"] = moment.replace(minute=0, second=0, microsecond=0)
+                for key in buckets.items():
+                    totals = counters.setdefault(key, {"posts": 0})
+                    totals["posts"] += 1
+                    type_field = f"by_type.{post.get('type', 'unknown')}"
+                    totals[type_field] = totals.get(type_field, 0) + 1
+
+            operations = [
+                self._rollup_update(granularity, moment, {"$set": totals})
+                for (granularity, moment), totals in counters.items()
+            ]
+            for start in range(0, len(operations), 500):
+                await self.channel_rollups.bulk_write(operations[start:start + 500], ordered=False)
+
+            await self.channel_rollups.insert_one({
+                "_id": marker_id,
+                "channel_username": self.channel_username,
+                "granularity": "meta",
+                "backfilled_at": datetime.utcnow()
+            })
+            if operations:
+                console.info(f"📊 Channel rollups backfilled ({len(operations)} bucket)")
+        except Exception as e:
+            console.error(f"Error backfilling channel rollups: {str(e)}")
+
     async def _update_channel_analytics(self, client):
-        """Update channel analytics"""
+        """Simpan member_count terbaru ke rollup jam & hari"""
         try:
             await self._ensure_db_connection()
             
@@ -803,104 +1078,97 @@ class ChannelManager:
                 channel_info = await client.get_chat(self.channel_username)
                 member_count = getattr(channel_info, 'members_count', 0)
             except:
-                member_count = 0
-            
-            # Save analytics
-            analytics_doc = {
-                "timestamp": datetime.utcnow(),
-                "channel_username": self.channel_username,
-                "member_count": member_count,
-                "posts_today": await self._get_posts_count_today(),
-                "posts_this_week": await self._get_posts_count_this_week(),
-                "posts_this_month": await self._get_posts_count_this_month()
-            }
+                return
             
-            await self.channel_analytics.insert_one(analytics_doc)
+            now = datetime.now()
+            update = {"$set": {"member_count": member_count, "member_count_at": datetime.utcnow()}}
+            await self.channel_rollups.bulk_write(
+                [self._rollup_update(granularity, now, update) for granularity in ("hour", "day")],
+                ordered=False
+            )
             
         except Exception as e:
             console.error(f"Error updating analytics: {str(e)}")
 
-    async def _get_posts_count_today(self) -> int:
-        """Get posts count today"""
-        try:
-            today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            today_end = today_start + timedelta(days=1)
-            
-            count = await self.channel_posts.count_documents({
-                "status": "posted",
-                "posted_time": {"$gte": today_start, "$lt": today_end}
-            })
-            return count
-        except:
-            return 0
+    async def _get_post_window_counts(self) -> Dict[str, Any]:
+        """Hitungan hari ini / minggu / bulan / 24 jam / total dari rollup dalam satu $facet"""
+        now = datetime.now()
+        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start = today_start - timedelta(days=today_start.weekday())
+        month_start = today_start.replace(day=1)
+        hourly_since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=23)
 
-    async def _get_posts_count_this_week(self) -> int:
-        """Get posts count this week"""
-        try:
-            today = datetime.now()
-            week_start = today - timedelta(days=today.weekday())
-            week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
-            week_end = week_start + timedelta(days=7)
-            
-            count = await self.channel_posts.count_documents({
-                "status": "posted",
-                "posted_time": {"$gte": week_start, "$lt": week_end}
-            })
-            return count
-        except:
-            return 0
+        def posts_since(start: datetime) -> Dict[str, Any]:
+            return {"$sum": {"$cond": [{"$gte": ["$bucket", start]}, "$posts", 0]}}
 
-    async def _get_posts_count_this_month(self) -> int:
-        """Get posts count this month"""
-        try:
-            today = datetime.now()
-            month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            if today.month == 12:
-                month_end = month_start.replace(year=today.year+1, month=1)
-            else:
-                month_end = month_start.replace(month=today.month+1)
-            
-            count = await self.channel_posts.count_documents({
-                "status": "posted",
-                "posted_time": {"$gte": month_start, "$lt": month_end}
-            })
-            return count
-        except:
-            return 0
+        result = await self.channel_rollups.aggregate([
+            {"$match": {"channel_username": self.channel_username, "granularity": {"$in": ["hour", "day"]}}},
+            {"$facet": {
+                "windows": [
+                    {"$match": {"granularity": "day"}},
+                    {"$group": {
+                        "_id": None,
+                        "total": {"$sum": "$posts"},
+                        "failed": {"$sum": "$failed"},
+                        "today": posts_since(today_start),
+                        "week": posts_since(week_start),
+                        "month": posts_since(month_start)
+                    }}
+                ],
+                "last_24h": [
+                    {"$match": {"granularity": "hour", "bucket": {"$gte": hourly_since}}},
+                    {"$group": {"_id": None, "posts": {"$sum": "$posts"}}}
+                ],
+                "by_type": [
+                    {"$match": {"granularity": "day", "by_type": {"$exists": True}}},
+                    {"$project": {"types": {"$objectToArray": "$by_type"}}},
+                    {"$unwind": "$types"},
+                    {"$group": {"_id": "$types.k", "count": {"$sum": "$types.v"}}},
+                    {"$sort": {"count": -1}}
+                ],
+                "members": [
+                    {"$match": {"granularity": "day", "member_count": {"$exists": True}}},
+                    {"$sort": {"bucket": -1}},
+                    {"$limit": 1},
+                    {"$project": {"member_count": 1, "member_count_at": 1}}
+                ]
+            }}
+        ]).to_list(length=1)
+
+        facet = result[0] if result else {}
+        windows = (facet.get("windows") or [{}])[0]
+        members = (facet.get("members") or [{}])[0]
+        return {
+            "member_count": members.get("member_count", 0),
+            "member_count_at": members.get("member_count_at"),
+            "total_posts": windows.get("total", 0),
+            "failed_posts": windows.get("failed", 0),
+            "posts_today": windows.get("today", 0),
+            "posts_this_week": windows.get("week", 0),
+            "posts_this_month": windows.get("month", 0),
+            "posts_last_24h": (facet.get("last_24h") or [{}])[0].get("posts", 0),
+            "content_distribution": {item["_id"]: item["count"] for item in facet.get("by_type", [])}
+        }
 
     async def get_channel_stats(self) -> Dict[str, Any]:
-        """Get comprehensive channel statistics"""
+        """Get comprehensive channel statistics (dari rollup, bukan scan channel_posts)"""
         try:
             await self._ensure_db_connection()
             
-            # Get latest analytics
-            latest_analytics = await self.channel_analytics.find({}).sort("timestamp", -1).limit(1).to_list(length=1)
-            
-            # Get content type distribution
-            content_types = await self.channel_posts.aggregate([
-                {"$match": {"status": "posted"}},
-                {"$group": {"_id": "$type", "count": {"$sum": 1}}}
-            ]).to_list(length=None)
-            
-            # Get recent posts
-            recent_posts = await self.channel_posts.find({
-                "status": "posted"
-            }).sort("posted_time", -1).limit(10).to_list(length=None)
+            counts, recent_posts = await asyncio.gather(
+                self._get_post_window_counts(),
+                self.channel_posts.find({
+                    "status": "posted"
+                }).sort("posted_time", -1).limit(CHANNEL_ANALYTICS_CONFIG["recent_posts"]).to_list(length=None)
+            )
             
-            stats = {
+            return {
                 "channel_username": self.channel_username,
-                "member_count": latest_analytics[0].get("member_count", 0) if latest_analytics else 0,
-                "total_posts": await self.channel_posts.count_documents({"status": "posted"}),
-                "posts_today": await self._get_posts_count_today(),
-                "posts_this_week": await self._get_posts_count_this_week(),
-                "posts_this_month": await self._get_posts_count_this_month(),
-                "content_distribution": {item["_id"]: item["count"] for item in content_types},
+                **counts,
                 "recent_posts": recent_posts,
                 "last_updated": datetime.utcnow()
             }
             
-            return stats
-            
         except Exception as e:
             console.error(f"Error getting channel stats: {str(e)}")
             return {}
@@ -908,15 +1176,7 @@ class ChannelManager:
     async def manual_post(self, client, content_type: str) -> bool:
         """Manually trigger a post"""
         try:
-            generators = {
-                "daily_tips": self.content_generator.generate_daily_tips,
-                "weekly_updates": self.content_generator.generate_weekly_updates,
-                "user_stories": self.content_generator.generate_user_stories,
-                "ai_trends": self.content_generator.generate_ai_trends,
-                "qna": self.content_generator.generate_qna_content,
-                "fun_facts": self.content_generator.generate_fun_facts,
-                "polls": self.content_generator.generate_interactive_poll
-            }
+            generators = self._get_generators()
             
             if content_type not in generators:
                 console.error(f"Unknown content type: {content_type}")
@@ -924,8 +1184,9 @@ class ChannelManager:
             
             post = await generators[content_type]()
             if post:
-                await self._post_to_channel(client, post)
-                return True
+                posted = await self._post_to_channel(client, post)
+                await self._record_post_event(content_type, posted)
+                return posted
             return False
             
         except Exception as e:
@@ -0,0 +1,326 @@
+# syncara/modules/chat_backup.py
+"""
+Backup chat streaming untuk backup_lengkap_chat.
+Pesan ditulis sebagai segmen JSON Lines terkompresi (gzip) selama iterasi,
+media di-download paralel (dibatasi) ke file content-addressed (sha256),
+dan cursor message id disimpan per segmen sehingga backup bisa dilanjutkan.
+
+Layout direktori backup:
+    manifest.json            info chat, daftar segmen, cursor, status
+    messages-00001.jsonl.gz  pesan (urutan terbaru -> terlama)
+    media/index.jsonl        file_unique_id -> sha256 & path media
+    media/ab/abcdef...ext    file media (nama = sha256 isi file)
+"""
+
+import os
+import gzip
+import json
+import asyncio
+import hashlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+from syncara.console import console
+
+CHAT_BACKUP_CONFIG = {
+    "segment_messages": 1000,     # Pesan per segmen (juga interval checkpoint cursor)
+    "media_concurrency": 4,       # Download media bersamaan
+    "compress_level": 6,          # Level gzip segmen
+    "hash_chunk_size": 1024 * 1024
+}
+
+MANIFEST_FILE = "manifest.json"
+MEDIA_DIR = "media"
+MEDIA_INDEX_FILE = "index.jsonl"
+
+def serialize_message(message) -> Dict[str, Any]:
+    """Konversi Message Pyrogram ke dict yang bisa disimpan sebagai JSON"""
+    media = getattr(message, "media", None)
+    media_type = getattr(media, "value", media) if media else None
+    media_object = getattr(message, media_type, None) if isinstance(media_type, str) else None
+
+    return {
+        "id": message.id,
+        "from_user": {
+            "id": message.from_user.id if message.from_user else None,
+            "first_name": message.from_user.first_name if message.from_user else None,
+            "username": message.from_user.username if message.from_user else None
+        },
+        "date": message.date,
+        "text": message.text,
+        "caption": message.caption,
+        "media_type": media_type,
+        "file_unique_id": getattr(media_object, "file_unique_id", None),
+        "file_name": getattr(media_object, "file_name", None),
+        "reply_to_message_id": message.reply_to_message_id,
+        "forward_from": {
+            "id": message.forward_from.id if message.forward_from else None,
+            "first_name": message.forward_from.first_name if message.forward_from else None
+        } if message.forward_from else None
+    }
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(temp_path, path)
+
+def _write_segment(path: str, lines: List[str]):
+    """Tulis satu segmen gzip secara atomik (segmen setengah jadi tidak pernah terlihat)"""
+    temp_path = f"{path}.tmp"
+    with gzip.open(temp_path, "wt", encoding="utf-8", compresslevel=CHAT_BACKUP_CONFIG["compress_level"]) as f:
+        f.writelines(lines)
+    os.replace(temp_path, path)
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHAT_BACKUP_CONFIG["hash_chunk_size"]), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _store_media(media_root: str, temp_path: str, file_name: Optional[str]) -> str:
+    """Pindahkan file hasil download ke path content-addressed, return path relatif"""
+    sha256 = _hash_file(temp_path)
+    extension = os.path.splitext(file_name or temp_path)[1].lower()
+    relative_path = os.path.join(sha256[:2], f"{sha256}{extension}")
+    final_path = os.path.join(media_root, relative_path)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    if os.path.exists(final_path):
+        # Isi yang sama sudah tersimpan (dedupe)
+        os.remove(temp_path)
+    else:
+        os.replace(temp_path, final_path)
+    return relative_path
+
+def load_manifest(backup_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(backup_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def find_resumable_backup(prefix: str, include_media: bool) -> Optional[str]:
+    """
+    Direktori backup terbaru dengan awalan prefix yang bisa dilanjutkan:
+    belum lengkap dan mode include_media sama. None jika tidak ada.
+    """
+    parent = os.path.dirname(prefix) or "."
+    base = os.path.basename(prefix)
+    if not os.path.isdir(parent):
+        return None
+    for name in sorted(os.listdir(parent), reverse=True):
+        if name != base and not name.startswith(f"{base}_"):
+            continue
+        backup_dir = os.path.join(parent, name) if os.path.dirname(prefix) else name
+        try:
+            manifest = load_manifest(backup_dir)
+        except (OSError, ValueError):
+            continue
+        if manifest and not manifest.get("completed") and manifest.get("include_media") == include_media:
+            return backup_dir
+    return None
+
+def load_media_index(backup_dir: str) -> Dict[str, str]:
+    """Return {file_unique_id: path media relatif terhadap direktori media}"""
+    index = {}
+    path = os.path.join(backup_dir, MEDIA_DIR, MEDIA_INDEX_FILE)
+    if not os.path.exists(path):
+        return index
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                index[entry["file_unique_id"]] = entry["path"]
+            except (ValueError, KeyError):
+                # Baris terakhir bisa terpotong jika proses mati saat menulis
+                continue
+    return index
+
+def get_backup_size(backup_path: str) -> int:
+    """Total ukuran file backup (file tunggal atau direktori)"""
+    if os.path.isfile(backup_path):
+        return os.path.getsize(backup_path)
+    total = 0
+    for root, _, files in os.walk(backup_path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+class ChatBackupWriter:
+    """Menulis satu backup chat secara streaming dengan checkpoint per segmen"""
+
+    def __init__(self, client, chat_id: Union[int, str], backup_dir: str, include_media: bool = False):
+        self.client = client
+        self.chat_id = chat_id
+        self.backup_dir = backup_dir
+        self.include_media = include_media
+        self.media_root = os.path.join(backup_dir, MEDIA_DIR)
+        self.manifest: Dict[str, Any] = {}
+        self.media_index: Dict[str, str] = {}
+        self._media_pending: Dict[str, asyncio.Task] = {}
+        self._media_slots = asyncio.Semaphore(CHAT_BACKUP_CONFIG["media_concurrency"])
+        self._media_index_file = None
+
+    async def _prepare(self):
+        os.makedirs(self.backup_dir, exist_ok=True)
+        manifest = load_manifest(self.backup_dir)
+
+        if manifest:
+            self.manifest = manifest
+            console.info(
+                f"💾 Melanjutkan backup {self.backup_dir} dari message id {manifest.get('cursor')} "
+                f"({manifest.get('total_messages', 0)} pesan tersimpan)"
+            )
+        else:
+            chat_info = await self.client.get_info_chat(self.chat_id)
+            self.manifest = {
+                "format": "jsonl.gz",
+                "version": 1,
+                "chat_info": {
+                    "id": chat_info.id,
+                    "type": getattr(chat_info.type, "value", chat_info.type),
+                    "title": chat_info.title,
+                    "username": chat_info.username,
+                    "description": chat_info.description
+                },
+                "backup_date": datetime.now().isoformat(),
+                "include_media": self.include_media,
+                "segments": [],
+                "total_messages": 0,
+                "total_media": 0,
+                "cursor": None,
+                "completed": False
+            }
+            await asyncio.to_thread(_write_json_atomic, os.path.join(self.backup_dir, MANIFEST_FILE), self.manifest)
+
+        # Backup yang sudah lengkap tidak menulis apa pun: index media tidak perlu dibuka
+        if self.include_media and not self.manifest.get("completed"):
+            os.makedirs(self.media_root, exist_ok=True)
+            self.media_index = await asyncio.to_thread(load_media_index, self.backup_dir)
+            self._media_index_file = open(os.path.join(self.media_root, MEDIA_INDEX_FILE), "a", encoding="utf-8")
+
+    # ==================== MEDIA ====================
+
+    async def _download_media(self, message, file_unique_id: str, file_name: Optional[str]):
+        try:
+            temp_dir = os.path.join(self.media_root, "tmp")
+            os.makedirs(temp_dir, exist_ok=True)
+            temp_path = await self.client.download_media(message, file_name=os.path.join(temp_dir, file_unique_id))
+            if not temp_path:
+                return
+            relative_path = await asyncio.to_thread(_store_media, self.media_root, temp_path, file_name)
+            self.media_index[file_unique_id] = relative_path
+            self._media_index_file.write(json.dumps({"file_unique_id": file_unique_id, "path": relative_path}) + "\n")
+            self.manifest["total_media"] = self.manifest.get("total_media", 0) + 1
+        except Exception as e:
+            console.error(f"Error download media pesan {message.id}: {e}")
+        finally:
+            self._media_slots.release()
+            self._media_pending.pop(file_unique_id, None)
+
+    async def _queue_media(self, message, record: Dict[str, Any]):
+        file_unique_id = record.get("file_unique_id")
+        if not file_unique_id or file_unique_id in self.media_index or file_unique_id in self._media_pending:
+            return
+        # Backpressure: iterasi pesan menunggu jika slot download penuh
+        await self._media_slots.acquire()
+        self._media_pending[file_unique_id] = asyncio.create_task(
+            self._download_media(message, file_unique_id, record.get("file_name"))
+        )
+
+    # ==================== SEGMENTS ====================
+
+    async def _commit_segment(self, lines: List[str], cursor: int):
+        """Tulis segmen lalu majukan cursor (media segmen ini harus selesai dulu)"""
+        if self._media_pending:
+            await asyncio.gather(*list(self._media_pending.values()), return_exceptions=True)
+        if self._media_index_file:
+            self._media_index_file.flush()
+
+        segment_name = f"messages-{len(self.manifest['segments']) + 1:05d}.jsonl.gz"
+        await asyncio.to_thread(_write_segment, os.path.join(self.backup_dir, segment_name), lines)
+
+        self.manifest["segments"].append(segment_name)
+        self.manifest["total_messages"] += len(lines)
+        self.manifest["cursor"] = cursor
+        self.manifest["updated_at"] = datetime.now().isoformat()
+        await asyncio.to_thread(_write_json_atomic, os.path.join(self.backup_dir, MANIFEST_FILE), self.manifest)
+
+    async def run(self, limit: int = 0) -> str:
+        await self._prepare()
+        if self.manifest.get("completed"):
+            console.info(f"✅ Backup {self.backup_dir} sudah lengkap")
+            return self.backup_dir
+
+        segment_size = CHAT_BACKUP_CONFIG["segment_messages"]
+        remaining = max(limit - self.manifest["total_messages"], 0) if limit else 0
+        lines: List[str] = []
+        cursor = self.manifest.get("cursor") or 0
+
+        try:
+            if limit and remaining == 0:
+                self.manifest["completed"] = True
+            else:
+                # get_chat_history berjalan dari pesan terbaru ke terlama; offset_id = cursor resume
+                async for message in self.client.get_chat_history(self.chat_id, limit=remaining, offset_id=cursor):
+                    record = serialize_message(message)
+                    lines.append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    if self.include_media:
+                        await self._queue_media(message, record)
+                    cursor = message.id
+
+                    if len(lines) >= segment_size:
+                        await self._commit_segment(lines, cursor)
+                        lines = []
+                        console.info(f"💾 Backup {self.chat_id}: {self.manifest['total_messages']} pesan")
+
+                if lines:
+                    await self._commit_segment(lines, cursor)
+                    lines = []
+                self.manifest["completed"] = True
+
+            self.manifest["finished_at"] = datetime.now().isoformat()
+            await asyncio.to_thread(_write_json_atomic, os.path.join(self.backup_dir, MANIFEST_FILE), self.manifest)
+            return self.backup_dir
+        finally:
+            for task in list(self._media_pending.values()):
+                task.cancel()
+            if self._media_index_file:
+                self._media_index_file.close()
+                self._media_index_file = None
+
+# ==================== READING ====================
+
+def iter_segment(path: str) -> Iterator[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+async def iter_backup_messages(backup_path: str, chronological: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Baca pesan dari backup secara lazy. Segmen dibaca satu per satu di thread,
+    jadi memori yang dipakai hanya sebesar satu segmen.
+    File .json format lama tetap didukung.
+    """
+    if os.path.isfile(backup_path):
+        with open(backup_path, "r", encoding="utf-8") as f:
+            legacy = await asyncio.to_thread(json.load, f)
+        messages = legacy.get("messages", [])
+        for message in (reversed(messages) if chronological else messages):
+            yield message
+        return
+
+    manifest = load_manifest(backup_path)
+    if not manifest:
+        raise FileNotFoundError(f"Manifest backup tidak ditemukan: {backup_path}")
+
+    # Segmen tersimpan dari terbaru ke terlama
+    segments = manifest.get("segments", [])
+    for segment_name in (reversed(segments) if chronological else segments):
+        records = await asyncio.to_thread(lambda: list(iter_segment(os.path.join(backup_path, segment_name))))
+        for record in (reversed(records) if chronological else records):
+            yield record
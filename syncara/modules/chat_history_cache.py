@@ -0,0 +1,175 @@
+# syncara/modules/chat_history_cache.py
+"""
+In-process cache untuk riwayat chat yang dipakai sebagai konteks AI.
+Setiap chat punya ring buffer berisi history dict yang sudah dinormalisasi
+(sender, reply, content). Buffer diisi oleh message handler, sehingga API
+hanya dipanggil untuk backfill saat cold start atau ketika terdeteksi gap.
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, List, Optional
+from syncara.console import console
+
+class _ChatBuffer:
+    """Ring buffer untuk satu chat"""
+
+    __slots__ = ("messages", "chat_info", "warm", "last_id", "size_bytes")
+
+    def __init__(self, max_messages: int):
+        self.messages = deque(maxlen=max_messages)
+        self.chat_info = None
+        self.warm = False
+        self.last_id = 0
+        self.size_bytes = 0
+
+def _estimate_size(entry: Dict[str, Any]) -> int:
+    """Perkiraan ukuran entry tanpa serialisasi penuh"""
+    size = 200 + len(entry.get('content') or "")
+    reply = entry.get('reply_to')
+    if reply:
+        size += 100 + len(reply.get('content') or "")
+    return size
+
+class ChatHistoryCache:
+    """
+    LRU cache lintas chat dengan batas jumlah chat, jumlah pesan per chat
+    dan total ukuran (bytes perkiraan).
+    """
+
+    def __init__(self, max_chats: int = 500, max_messages: int = 50,
+                 max_bytes: int = 16 * 1024 * 1024, gap_tolerance: int = 20):
+        self.max_chats = max_chats
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.gap_tolerance = gap_tolerance
+        self.total_bytes = 0
+        self._chats: "OrderedDict[Hashable, _ChatBuffer]" = OrderedDict()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "backfills": 0,
+            "appends": 0,
+            "gaps": 0,
+            "evictions": 0
+        }
+
+    def get(self, key: Hashable, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Ambil history (kronologis). None jika chat cold/stale dan perlu backfill"""
+        buffer = self._chats.get(key)
+        if buffer is None or not buffer.warm or limit > self.max_messages:
+            self.stats["misses"] += 1
+            return None
+
+        self._chats.move_to_end(key)
+        self.stats["hits"] += 1
+        if limit >= len(buffer.messages):
+            return list(buffer.messages)
+        return list(buffer.messages)[-limit:]
+
+    def get_chat_info(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        buffer = self._chats.get(key)
+        return buffer.chat_info if buffer else None
+
+    def backfill(self, key: Hashable, messages: List[Dict[str, Any]], chat_info: Dict[str, Any] = None) -> None:
+        """Ganti isi buffer dengan history dari API (urutan kronologis)"""
+        buffer = self._chats.get(key)
+        if buffer is None:
+            buffer = _ChatBuffer(self.max_messages)
+            self._chats[key] = buffer
+        else:
+            self.total_bytes -= buffer.size_bytes
+            buffer.messages.clear()
+            buffer.size_bytes = 0
+
+        for entry in messages[-self.max_messages:]:
+            self._push(buffer, entry)
+
+        buffer.chat_info = chat_info or buffer.chat_info
+        buffer.last_id = max((m.get('message_id') or 0 for m in messages), default=buffer.last_id)
+        buffer.warm = True
+        self._chats.move_to_end(key)
+        self.stats["backfills"] += 1
+        self._enforce_limits()
+
+    def append(self, key: Hashable, entry: Dict[str, Any], sequential_ids: bool = False) -> bool:
+        """
+        Tambahkan pesan baru dari handler. Hanya chat yang sudah warm yang
+        direkam; sequential_ids=True untuk supergroup/channel sehingga lompatan
+        message_id yang besar dianggap gap dan memicu backfill berikutnya.
+        """
+        buffer = self._chats.get(key)
+        if buffer is None or not buffer.warm:
+            return False
+
+        message_id = entry.get('message_id') or 0
+        if message_id and message_id <= buffer.last_id:
+            # Duplikat atau pesan lama, abaikan
+            return False
+
+        if sequential_ids and buffer.last_id and message_id - buffer.last_id > self.gap_tolerance:
+            self.stats["gaps"] += 1
+            console.info(f"[HISTORY] Gap terdeteksi di chat {key}, backfill berikutnya dari API")
+            self.invalidate(key)
+            return False
+
+        self._push(buffer, entry)
+        if entry.get('chat'):
+            buffer.chat_info = entry['chat']
+        buffer.last_id = max(buffer.last_id, message_id)
+        self._chats.move_to_end(key)
+        self.stats["appends"] += 1
+        self._enforce_limits()
+        return True
+
+    def update_content(self, key: Hashable, message_id: int, content: str) -> bool:
+        """Update konten pesan yang di-edit (misalnya balasan streaming)"""
+        buffer = self._chats.get(key)
+        if buffer is None:
+            return False
+
+        for entry in reversed(buffer.messages):
+            if entry.get('message_id') == message_id:
+                old_size = _estimate_size(entry)
+                entry['content'] = content
+                delta = _estimate_size(entry) - old_size
+                buffer.size_bytes += delta
+                self.total_bytes += delta
+                return True
+        return False
+
+    def invalidate(self, key: Hashable) -> None:
+        buffer = self._chats.pop(key, None)
+        if buffer is not None:
+            self.total_bytes -= buffer.size_bytes
+
+    def clear(self) -> None:
+        self._chats.clear()
+        self.total_bytes = 0
+
+    def _push(self, buffer: _ChatBuffer, entry: Dict[str, Any]) -> None:
+        if len(buffer.messages) == buffer.messages.maxlen:
+            evicted = buffer.messages[0]
+            evicted_size = _estimate_size(evicted)
+            buffer.size_bytes -= evicted_size
+            self.total_bytes -= evicted_size
+
+        buffer.messages.append(entry)
+        size = _estimate_size(entry)
+        buffer.size_bytes += size
+        self.total_bytes += size
+
+    def _enforce_limits(self) -> None:
+        """Evict chat paling lama tidak dipakai sampai di bawah batas"""
+        while self._chats and (len(self._chats) > self.max_chats or self.total_bytes > self.max_bytes):
+            _, buffer = self._chats.popitem(last=False)
+            self.total_bytes -= buffer.size_bytes
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "chats": len(self._chats),
+            "total_bytes": self.total_bytes,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0
+        }
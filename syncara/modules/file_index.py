@@ -0,0 +1,334 @@
+# syncara/modules/file_index.py
+"""
+Index path file workspace di memori untuk SEARCH:FILE.
+Index dibangun sekali (atau dimuat dari snapshot), lalu di-refresh
+incremental oleh background thread dengan membandingkan mtime/size,
+sehingga query tidak pernah melakukan os.walk di event loop.
+"""
+
+import os
+import re
+import json
+import time
+import fnmatch
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from syncara.console import console
+
+FILE_INDEX_CONFIG = {
+    "refresh_interval": 30,                       # Detik antar scan mtime
+    "snapshot_path": "cache/file_index.json",    # None untuk menonaktifkan snapshot
+    "content_index": False,                       # Inverted trigram index untuk isi file
+    "max_content_bytes": 1024 * 1024,             # File lebih besar tidak di-index isinya
+    "ready_timeout": 30                           # Detik menunggu build pertama
+}
+
+class _Entry:
+    """Satu file di index"""
+
+    __slots__ = ("path", "path_lower", "name_lower", "size", "mtime")
+
+    def __init__(self, path: str, size: int, mtime: float):
+        self.path = path
+        self.path_lower = path.lower()
+        self.name_lower = os.path.basename(self.path_lower)
+        self.size = size
+        self.mtime = mtime
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class WorkspaceFileIndex:
+    """
+    Index path (relatif terhadap root) dengan query glob, substring dan regex.
+    Opsional: inverted trigram index untuk pencarian isi file.
+    """
+
+    def __init__(self, root, excluded_dirs: Iterable[str], searchable_extensions: Iterable[str],
+                 refresh_interval: float = None, snapshot_path: Optional[str] = None,
+                 content_index: bool = None):
+        self.root = str(root)
+        self.excluded_dirs = set(excluded_dirs)
+        self.searchable_extensions = set(searchable_extensions)
+        self.refresh_interval = refresh_interval or FILE_INDEX_CONFIG["refresh_interval"]
+        self.snapshot_path = snapshot_path if snapshot_path is not None else FILE_INDEX_CONFIG["snapshot_path"]
+        self.content_index = FILE_INDEX_CONFIG["content_index"] if content_index is None else content_index
+
+        # Snapshot bisa berada di dalam workspace: jangan ikut di-index, kalau tidak
+        # setiap refresh melihat mtime snapshot berubah lalu menulisnya ulang
+        self._ignored_files: Set[str] = set()
+        if self.snapshot_path:
+            snapshot = os.path.relpath(os.path.abspath(self.snapshot_path), os.path.abspath(self.root))
+            self._ignored_files = {snapshot, f"{snapshot}.tmp"}
+
+        # Snapshot entries diganti utuh saat refresh (reader tidak perlu lock)
+        self._entries: Dict[str, _Entry] = {}
+        self._ordered: Tuple[_Entry, ...] = ()
+
+        # Trigram index: trigram -> set path, path -> trigram milik file
+        self._postings: Dict[str, Set[str]] = {}
+        self._file_trigrams: Dict[str, frozenset] = {}
+        self._content_lock = threading.Lock()
+
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {
+            "builds": 0,
+            "last_scan_seconds": 0.0,
+            "last_scan_at": None,
+            "changed_files": 0,
+            "queries": 0
+        }
+
+    # ==================== BUILD & REFRESH ====================
+
+    def start(self):
+        """Mulai background refresh (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        if not self._entries and self._load_snapshot():
+            self._ready.set()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="workspace-file-index", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                console.error(f"[FILE_INDEX] Error refresh index: {e}")
+            finally:
+                self._ready.set()
+            self._stop.wait(self.refresh_interval)
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        """Scan workspace dengan os.scandir, return {path relatif: (size, mtime)}"""
+        found = {}
+        root_length = len(self.root.rstrip(os.sep)) + 1
+        stack = [self.root]
+
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as iterator:
+                    for item in iterator:
+                        try:
+                            if item.is_dir(follow_symlinks=False):
+                                if item.name not in self.excluded_dirs:
+                                    stack.append(item.path)
+                            elif item.is_file():
+                                path = item.path[root_length:]
+                                if path in self._ignored_files:
+                                    continue
+                                stat = item.stat()
+                                found[path] = (stat.st_size, stat.st_mtime)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+        return found
+
+    def refresh(self):
+        """Scan ulang dan terapkan hanya perubahan (file baru, berubah, terhapus)"""
+        started = time.monotonic()
+        scanned = self._scan()
+        current = self._entries
+
+        entries = {}
+        changed = []
+        for path, (size, mtime) in scanned.items():
+            entry = current.get(path)
+            if entry is None or entry.mtime != mtime or entry.size != size:
+                entry = _Entry(path, size, mtime)
+                changed.append(path)
+            entries[path] = entry
+        removed = [path for path in current if path not in entries]
+
+        if changed or removed or not self._ordered:
+            self._entries = entries
+            self._ordered = tuple(entries[path] for path in sorted(entries))
+
+        if self.content_index:
+            self._update_content_index(changed, removed)
+
+        self.stats["builds"] += 1
+        self.stats["changed_files"] = len(changed) + len(removed)
+        self.stats["last_scan_seconds"] = time.monotonic() - started
+        self.stats["last_scan_at"] = time.time()
+
+        if changed or removed:
+            self._save_snapshot()
+
+    def _update_content_index(self, changed: List[str], removed: List[str]):
+        for path in changed:
+            if os.path.splitext(path)[1].lower() not in self.searchable_extensions:
+                continue
+            entry = self._entries.get(path)
+            if not entry or entry.size > FILE_INDEX_CONFIG["max_content_bytes"]:
+                self._drop_content(path)
+                continue
+            try:
+                with open(os.path.join(self.root, path), 'r', encoding='utf-8', errors='ignore') as f:
+                    grams = frozenset(_trigrams(f.read().lower()))
+            except OSError:
+                continue
+
+            with self._content_lock:
+                self._drop_content(path)
+                self._file_trigrams[path] = grams
+                for gram in grams:
+                    self._postings.setdefault(gram, set()).add(path)
+
+        with self._content_lock:
+            for path in removed:
+                self._drop_content(path)
+
+    def _drop_content(self, path: str):
+        grams = self._file_trigrams.pop(path, None)
+        if not grams:
+            return
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings:
+                postings.discard(path)
+                if not postings:
+                    del self._postings[gram]
+
+    # ==================== SNAPSHOT ====================
+
+    def _load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, 'r') as f:
+                data = json.load(f)
+            if data.get('root') != self.root:
+                return False
+            self._entries = {path: _Entry(path, size, mtime) for path, (size, mtime) in data['files'].items()}
+            self._ordered = tuple(self._entries[path] for path in sorted(self._entries))
+            console.info(f"[FILE_INDEX] Snapshot dimuat: {len(self._entries)} file")
+            return True
+        except Exception as e:
+            console.warning(f"[FILE_INDEX] Snapshot tidak valid: {e}")
+            return False
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+            temp_path = f"{self.snapshot_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump({
+                    'root': self.root,
+                    'files': {entry.path: [entry.size, entry.mtime] for entry in self._ordered}
+                }, f)
+            os.replace(temp_path, self.snapshot_path)
+        except Exception as e:
+            console.warning(f"[FILE_INDEX] Gagal menyimpan snapshot: {e}")
+
+    # ==================== QUERY ====================
+
+    async def wait_ready(self) -> bool:
+        """Mulai index jika belum, tunggu build pertama tanpa memblokir event loop"""
+        self.start()
+        if self._ready.is_set():
+            return True
+        return await asyncio.to_thread(self._ready.wait, FILE_INDEX_CONFIG["ready_timeout"])
+
+    @staticmethod
+    def parse_query(query: str) -> Tuple[str, Any]:
+        """
+        Tentukan mode query:
+        - 're:pattern' atau '/pattern/' -> regex
+        - 'content:text'                -> isi file (trigram index)
+        - mengandung * ? [              -> glob (path lengkap atau nama file)
+        - selain itu                    -> substring
+        """
+        query = query.strip()
+        if query.startswith('re:'):
+            return 'regex', re.compile(query[3:], re.IGNORECASE)
+        if len(query) > 2 and query.startswith('/') and query.endswith('/'):
+            return 'regex', re.compile(query[1:-1], re.IGNORECASE)
+        if query.startswith('content:'):
+            return 'content', query[8:].strip().lower()
+        if any(char in query for char in '*?['):
+            return 'glob', re.compile(fnmatch.translate(query.lower()))
+        return 'substring', query.lower()
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Cari file di index (sinkron, murni in-memory untuk mode path)"""
+        self.stats["queries"] += 1
+        mode, matcher = self.parse_query(query)
+        entries = self._ordered
+
+        if mode == 'substring':
+            matched = [entry for entry in entries if matcher in entry.path_lower]
+        elif mode == 'glob':
+            matched = [
+                entry for entry in entries
+                if matcher.match(entry.path_lower) or matcher.match(entry.name_lower)
+            ]
+        elif mode == 'regex':
+            matched = [entry for entry in entries if matcher.search(entry.path)]
+        else:
+            matched = self._search_content(matcher)
+
+        return [{'path': entry.path, 'size_bytes': entry.size} for entry in matched]
+
+    def _search_content(self, text: str) -> List[_Entry]:
+        if not text:
+            return []
+
+        if self.content_index and len(text) >= 3:
+            # Kandidat = irisan posting list semua trigram query
+            with self._content_lock:
+                candidates = None
+                for gram in sorted(_trigrams(text), key=lambda g: len(self._postings.get(g, ()))):
+                    postings = self._postings.get(gram)
+                    if not postings:
+                        return []
+                    candidates = set(postings) if candidates is None else candidates & postings
+                    if not candidates:
+                        return []
+            entries = [self._entries[path] for path in sorted(candidates or ()) if path in self._entries]
+        else:
+            entries = [
+                entry for entry in self._ordered
+                if os.path.splitext(entry.path)[1].lower() in self.searchable_extensions
+                and entry.size <= FILE_INDEX_CONFIG["max_content_bytes"]
+            ]
+
+        # Verifikasi kandidat (trigram bisa false positive)
+        matched = []
+        for entry in entries:
+            try:
+                with open(os.path.join(self.root, entry.path), 'r', encoding='utf-8', errors='ignore') as f:
+                    if text in f.read().lower():
+                        matched.append(entry)
+            except OSError:
+                continue
+        return matched
+
+    async def search_async(self, query: str) -> List[Dict[str, Any]]:
+        """Query dari event loop; dijalankan di thread agar tidak memblokir"""
+        await self.wait_ready()
+        return await asyncio.to_thread(self.search, query)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "files": len(self._ordered),
+            "trigrams": len(self._postings),
+            "content_files": len(self._file_trigrams),
+            "ready": self._ready.is_set()
+        }
@@ -0,0 +1,194 @@
+# syncara/modules/ingestion_queue.py
+"""
+Antrian ingestion untuk pesan yang memicu AI.
+Handler Pyrogram hanya memasukkan pesan ke antrian; N worker per assistant
+yang memanggil LLM. Pesan dalam satu chat diproses berurutan, chat
+bergiliran (round-robin) agar adil, antrian dibatasi (load shedding),
+dan beberapa mention dari user yang sama yang belum diproses digabung
+menjadi satu completion.
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from syncara.console import console
+from syncara.modules.metrics import performance_monitor
+
+INGESTION_CONFIG = {
+    "workers_per_assistant": 4,     # Completion paralel per assistant
+    "max_pending": 200,             # Total item menunggu per assistant
+    "max_pending_per_chat": 10,     # Item menunggu per chat
+    "coalesce": True,               # Gabungkan mention beruntun dari user yang sama
+    "coalesce_max_messages": 5,     # Batas pesan yang digabung ke satu item
+    "max_wait": 300                 # Item lebih lama dari ini dibuang saat diambil worker
+}
+
+class IngestionItem:
+    """Satu unit kerja: pesan terakhir + teks yang (mungkin) sudah digabung"""
+
+    __slots__ = ("client", "message", "texts", "photo_file_id", "handler", "enqueued_at", "user_id")
+
+    def __init__(self, client, message, text: str, photo_file_id: Optional[str], handler: Callable):
+        self.client = client
+        self.message = message
+        self.texts = [text]
+        self.photo_file_id = photo_file_id
+        self.handler = handler
+        self.enqueued_at = time.monotonic()
+        self.user_id = message.from_user.id if message.from_user else None
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.texts)
+
+class IngestionQueue:
+    """Antrian per assistant dengan urutan per chat dan worker pool"""
+
+    def __init__(self, name: str, workers: int = None, max_pending: int = None,
+                 max_pending_per_chat: int = None):
+        self.name = name
+        self.worker_count = workers or INGESTION_CONFIG["workers_per_assistant"]
+        self.max_pending = max_pending or INGESTION_CONFIG["max_pending"]
+        self.max_pending_per_chat = max_pending_per_chat or INGESTION_CONFIG["max_pending_per_chat"]
+
+        self._chats: Dict[Any, Deque[IngestionItem]] = {}
+        self._active_chats = set()
+        # Chat yang punya item dan tidak sedang diproses worker
+        self._ready: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._pending = 0
+        self.stats = {
+            "queued": 0,
+            "coalesced": 0,
+            "shed": 0,
+            "expired": 0,
+            "processed": 0,
+            "errors": 0
+        }
+
+    # ==================== PRODUCER ====================
+
+    def submit(self, client, message, text: str, photo_file_id: Optional[str],
+               handler: Callable[[Any, Any, str, Optional[str]], Awaitable[Any]]) -> str:
+        """
+        Masukkan pesan ke antrian tanpa menunggu. Return "queued",
+        "coalesced" atau "shed" (antrian penuh, pesan dibuang).
+        """
+        self.start()
+        chat_id = message.chat.id
+        items = self._chats.get(chat_id)
+
+        if items and INGESTION_CONFIG["coalesce"] and message.from_user:
+            # Gabungkan dengan item user yang sama yang belum diambil worker
+            for item in reversed(items):
+                if item.user_id == message.from_user.id and item.handler is handler:
+                    if len(item.texts) >= INGESTION_CONFIG["coalesce_max_messages"]:
+                        break
+                    item.texts.append(text)
+                    item.message = message
+                    item.photo_file_id = photo_file_id or item.photo_file_id
+                    self.stats["coalesced"] += 1
+                    return "coalesced"
+
+        if self._pending >= self.max_pending or (items and len(items) >= self.max_pending_per_chat):
+            self.stats["shed"] += 1
+            console.warning(
+                f"[INGESTION:{self.name}] Antrian penuh, pesan {message.id} di chat {chat_id} dibuang "
+                f"({self._pending} menunggu)"
+            )
+            return "shed"
+
+        if items is None:
+            items = self._chats[chat_id] = deque()
+        items.append(IngestionItem(client, message, text, photo_file_id, handler))
+        self._pending += 1
+        self.stats["queued"] += 1
+
+        if chat_id not in self._active_chats and len(items) == 1:
+            self._ready.put_nowait(chat_id)
+        return "queued"
+
+    # ==================== WORKERS ====================
+
+    def start(self):
+        if self._ready is not None:
+            return
+        self._ready = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(index))
+            for index in range(self.worker_count)
+        ]
+        console.info(f"[INGESTION:{self.name}] {self.worker_count} worker siap")
+
+    async def _worker(self, index: int):
+        while True:
+            chat_id = await self._ready.get()
+            items = self._chats.get(chat_id)
+            if not items:
+                continue
+
+            item = items.popleft()
+            self._pending -= 1
+            self._active_chats.add(chat_id)
+            try:
+                wait = time.monotonic() - item.enqueued_at
+                performance_monitor.record(f"ingestion.{self.name}.wait", wait, True)
+                if wait > INGESTION_CONFIG["max_wait"]:
+                    self.stats["expired"] += 1
+                    console.warning(f"[INGESTION:{self.name}] Pesan {item.message.id} kedaluwarsa ({wait:.0f}s)")
+                    continue
+
+                with performance_monitor.timer(f"ingestion.{self.name}.process") as outcome:
+                    try:
+                        await item.handler(item.client, item.message, item.text, item.photo_file_id)
+                        self.stats["processed"] += 1
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        outcome["success"] = False
+                        self.stats["errors"] += 1
+                        console.error(f"[INGESTION:{self.name}] Worker {index} error: {e}")
+            finally:
+                self._active_chats.discard(chat_id)
+                if items and self._ready is not None:
+                    # Chat kembali ke ekor antrian: urutan per chat terjaga, chat lain dapat giliran
+                    self._ready.put_nowait(chat_id)
+                elif self._chats.get(chat_id) is items:
+                    del self._chats[chat_id]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._ready = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        oldest = min(
+            (items[0].enqueued_at for items in self._chats.values() if items),
+            default=None
+        )
+        wait = performance_monitor.get_stats(f"ingestion.{self.name}.wait")
+        return {
+            **self.stats,
+            "name": self.name,
+            "workers": len(self._workers),
+            "pending": self._pending,
+            "active_chats": len(self._active_chats),
+            "waiting_chats": sum(1 for items in self._chats.values() if items),
+            "oldest_wait": time.monotonic() - oldest if oldest is not None else 0.0,
+            "wait_p95": wait.get("window", {}).get("p95", 0.0) if wait else 0.0
+        }
+
+# Satu antrian per assistant
+ingestion_queues: Dict[str, IngestionQueue] = {}
+
+def get_ingestion_queue(name: str) -> IngestionQueue:
+    queue = ingestion_queues.get(name)
+    if queue is None:
+        queue = ingestion_queues[name] = IngestionQueue(name)
+    return queue
+
+async def stop_ingestion_queues():
+    await asyncio.gather(*(queue.stop() for queue in ingestion_queues.values()), return_exceptions=True)
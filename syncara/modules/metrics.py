@@ -0,0 +1,299 @@
+# syncara/modules/metrics.py
+"""
+Instrumentasi latency dengan memori tetap.
+Setiap series (nama operasi) menyimpan histogram bucket logaritmik
+(p50/p95/p99) untuk total sejak start dan untuk rolling window berbasis
+slot waktu, plus counter call/error. Snapshot bisa diekspor sebagai JSON
+atau format teks Prometheus.
+"""
+
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+METRICS_CONFIG = {
+    "min_latency": 0.0001,      # Batas bawah bucket pertama (detik)
+    "max_latency": 300.0,       # Di atas ini masuk bucket terakhir
+    "bucket_growth": 1.2,       # Rasio antar batas bucket (~10% error percentile)
+    "window_seconds": 300,      # Panjang rolling window
+    "window_slots": 10,         # Resolusi rolling window
+    "max_series": 1000,         # Series baru di atas batas ini digabung ke "_other"
+    "recent_errors": 10         # Error terakhir yang disimpan per series
+}
+
+def _build_bounds() -> List[float]:
+    bounds = []
+    bound = METRICS_CONFIG["min_latency"]
+    while bound < METRICS_CONFIG["max_latency"]:
+        bounds.append(bound)
+        bound *= METRICS_CONFIG["bucket_growth"]
+    bounds.append(METRICS_CONFIG["max_latency"])
+    return bounds
+
+BUCKET_BOUNDS = _build_bounds()
+_LOG_MIN = math.log(METRICS_CONFIG["min_latency"])
+_LOG_GROWTH = math.log(METRICS_CONFIG["bucket_growth"])
+
+def _bucket_index(duration: float) -> int:
+    """Index bucket O(1) lewat logaritma"""
+    if duration <= BUCKET_BOUNDS[0]:
+        return 0
+    index = math.ceil((math.log(duration) - _LOG_MIN) / _LOG_GROWTH)
+    return min(index, len(BUCKET_BOUNDS))
+
+class _Histogram:
+    """Counter bucket + count/error/sum. Bucket terakhir = overflow"""
+
+    __slots__ = ("buckets", "count", "errors", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, index: int, duration: float, success: bool):
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        if not success:
+            self.errors += 1
+
+    def merge(self, other: "_Histogram"):
+        for index, value in enumerate(other.buckets):
+            if value:
+                self.buckets[index] += value
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, value in enumerate(self.buckets):
+            if value and seen + value >= rank:
+                if index >= len(BUCKET_BOUNDS):
+                    return self.max
+                # Interpolasi linear di dalam bucket, tidak melebihi nilai maksimum tercatat
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper = BUCKET_BOUNDS[index]
+                return min(lower + (upper - lower) * (rank - seen) / value, self.max)
+            seen += value
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0.0,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99)
+        }
+
+class _Series:
+    """Satu operasi: histogram total + ring slot untuk rolling window"""
+
+    __slots__ = ("total", "slots", "slot_ids", "slot_seconds", "min", "recent_errors")
+
+    def __init__(self):
+        self.total = _Histogram()
+        self.slots = [_Histogram() for _ in range(METRICS_CONFIG["window_slots"])]
+        self.slot_ids = [-1] * METRICS_CONFIG["window_slots"]
+        self.slot_seconds = METRICS_CONFIG["window_seconds"] / METRICS_CONFIG["window_slots"]
+        self.min = None
+        self.recent_errors = deque(maxlen=METRICS_CONFIG["recent_errors"])
+
+    def record(self, duration: float, success: bool, now: float, metadata: Dict[str, Any]):
+        index = _bucket_index(duration)
+        self.total.add(index, duration, success)
+        if self.min is None or duration < self.min:
+            self.min = duration
+
+        slot_id = int(now // self.slot_seconds)
+        position = slot_id % len(self.slots)
+        if self.slot_ids[position] != slot_id:
+            self.slots[position].reset()
+            self.slot_ids[position] = slot_id
+        self.slots[position].add(index, duration, success)
+
+        if not success:
+            self.recent_errors.append({"timestamp": time.time(), "duration": duration, **metadata})
+
+    def window(self, now: float) -> _Histogram:
+        current = int(now // self.slot_seconds)
+        merged = _Histogram()
+        for slot_id, histogram in zip(self.slot_ids, self.slots):
+            if current - slot_id < len(self.slots):
+                merged.merge(histogram)
+        return merged
+
+class PerformanceMonitor:
+    """
+    Monitor untuk performance method calls.
+    record() O(1) dengan memori tetap per series.
+    """
+
+    def __init__(self, max_series: int = None):
+        self.max_series = max_series or METRICS_CONFIG["max_series"]
+        self.series: Dict[str, _Series] = {}
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+
+    def record(self, method_name: str, duration: float, success: bool, **kwargs) -> None:
+        """Record method call performance"""
+        now = time.monotonic()
+        with self.lock:
+            series = self.series.get(method_name)
+            if series is None:
+                if len(self.series) >= self.max_series:
+                    method_name = "_other"
+                    series = self.series.get(method_name)
+                if series is None:
+                    series = self.series[method_name] = _Series()
+            series.record(duration, success, now, kwargs)
+
+    @contextmanager
+    def timer(self, method_name: str, **kwargs):
+        """
+        Ukur blok kode. Exception dihitung sebagai error; blok juga bisa
+        menandai gagal sendiri lewat `outcome["success"] = False`.
+        """
+        outcome = {"success": True}
+        started = time.perf_counter()
+        try:
+            yield outcome
+        except BaseException as e:
+            outcome["success"] = False
+            kwargs.setdefault("error", str(e)[:200])
+            raise
+        finally:
+            self.record(method_name, time.perf_counter() - started, outcome["success"], **kwargs)
+
+    def instrument(self, method_name: str = None):
+        """Decorator untuk coroutine function"""
+        def decorator(func: Callable):
+            name = method_name or func.__qualname__
+
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    # ==================== SNAPSHOT & EXPORT ====================
+
+    def _series_stats(self, series: _Series, now: float) -> Dict[str, Any]:
+        total = series.total.summary()
+        return {
+            "total_calls": total["count"],
+            "success_rate": 1 - total["error_rate"] if total["count"] else 0,
+            "avg_duration": total["avg"],
+            "min_duration": series.min or 0,
+            "max_duration": total["max"],
+            "total": total,
+            "window": series.window(now).summary(),
+            "recent_errors": list(series.recent_errors)
+        }
+
+    def get_stats(self, method_name: Optional[str] = None) -> Dict[str, Any]:
+        """Get performance statistics (satu method, atau semua method per nama)"""
+        now = time.monotonic()
+        with self.lock:
+            if method_name:
+                series = self.series.get(method_name)
+                return self._series_stats(series, now) if series else {}
+            return {name: self._series_stats(series, now) for name, series in self.series.items()}
+
+    def snapshot(self, prefix: str = None) -> Dict[str, Any]:
+        """Snapshot JSON (tanpa recent_errors), opsional difilter prefix nama"""
+        now = time.monotonic()
+        with self.lock:
+            return {
+                "uptime_seconds": time.time() - self.started_at,
+                "window_seconds": METRICS_CONFIG["window_seconds"],
+                "series": {
+                    name: {"total": series.total.summary(), "window": series.window(now).summary()}
+                    for name, series in sorted(self.series.items())
+                    if not prefix or name.startswith(prefix)
+                }
+            }
+
+    def export_prometheus(self, metric: str = "syncara_operation_duration_seconds") -> str:
+        """Histogram kumulatif dalam format teks Prometheus"""
+        # Bucket Prometheus dibuat lebih kasar agar output tetap ringkas
+        export_bounds = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+        lines = [
+            f"# HELP {metric} Latency operasi per series",
+            f"# TYPE {metric} histogram"
+        ]
+        errors = [
+            "# HELP syncara_operation_errors_total Jumlah operasi gagal",
+            "# TYPE syncara_operation_errors_total counter"
+        ]
+        with self.lock:
+            for name, series in sorted(self.series.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                histogram = series.total
+                cumulative = 0
+                position = 0
+                for bound in export_bounds:
+                    while position < len(BUCKET_BOUNDS) and BUCKET_BOUNDS[position] <= bound:
+                        cumulative += histogram.buckets[position]
+                        position += 1
+                    lines.append(f'{metric}_bucket{{operation="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{operation="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{operation="{label}"}} {histogram.total:.6f}')
+                lines.append(f'{metric}_count{{operation="{label}"}} {histogram.count}')
+                errors.append(f'syncara_operation_errors_total{{operation="{label}"}} {histogram.errors}')
+        return "\n".join(lines + errors) + "\n"
+
+    def format_summary(self, prefix: str = None, limit: int = 25) -> str:
+        """Ringkasan teks (rolling window) untuk command Telegram"""
+        snapshot = self.snapshot(prefix)
+        rows = sorted(
+            snapshot["series"].items(),
+            key=lambda item: item[1]["window"]["count"] * item[1]["window"]["avg"],
+            reverse=True
+        )
+        window_minutes = snapshot["window_seconds"] // 60
+        text = f"📈 **Performance ({window_minutes} menit terakhir)**\n\n"
+        shown = 0
+        for name, data in rows:
+            window = data["window"]
+            if not window["count"]:
+                continue
+            text += (
+                f"• `{name}`: {window['count']}x, "
+                f"p50 {window['p50'] * 1000:.0f}ms, p95 {window['p95'] * 1000:.0f}ms, "
+                f"p99 {window['p99'] * 1000:.0f}ms, error {window['error_rate'] * 100:.1f}%\n"
+            )
+            shown += 1
+            if shown >= limit:
+                break
+        if not shown:
+            text += "Belum ada data di window ini."
+        return text
+
+# Global instance
+performance_monitor = PerformanceMonitor()
@@ -0,0 +1,389 @@
+# syncara/modules/outbound.py
+"""
+Outbound send scheduler per client (Bot/Ubot).
+Semua pengiriman (send_message, send_photo, send_document, forward, copy)
+melewati satu dispatcher per client dengan token bucket global dan per-chat,
+priority lane (balasan interaktif > terjadwal > autonomous/broadcast), serta
+penyerapan FloodWait dengan requeue otomatis.
+"""
+
+import time
+import heapq
+import asyncio
+import contextlib
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+from pyrogram.errors import FloodWait
+from syncara.console import console
+
+# Priority lane (angka kecil = lebih dulu)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKGROUND: "background"
+}
+
+OUTBOUND_CONFIG = {
+    # Batas Telegram: bot ~30 msg/detik global, 1 msg/detik per chat, 20 msg/menit per grup
+    "bot_global_rate": 30.0,
+    "bot_global_burst": 30,
+    "user_global_rate": 5.0,        # Userbot lebih konservatif
+    "user_global_burst": 10,
+    "private_rate": 1.0,
+    "private_burst": 3,
+    "group_rate": 20 / 60,
+    "group_burst": 3,
+    "max_inflight": 8,              # Request bersamaan per client
+    "max_flood_wait": 300,          # FloodWait lebih lama dari ini diteruskan ke caller
+    "max_flood_retries": 3,
+    "max_idle_lanes": 5000          # Lane chat idle dibuang di atas jumlah ini
+}
+
+# Priority untuk pengiriman di context saat ini (diwarisi task turunan)
+_current_priority: ContextVar[int] = ContextVar("outbound_priority", default=PRIORITY_INTERACTIVE)
+
+@contextlib.contextmanager
+def outbound_priority(priority: int):
+    """Set priority lane untuk semua pengiriman di dalam blok ini"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+# True di dalam job dispatcher: pengiriman bertingkat (mis. copy_message yang
+# memanggil send_message) langsung dijalankan agar tidak menunggu lane-nya sendiri
+_inside_job: ContextVar[bool] = ContextVar("outbound_inside_job", default=False)
+
+def set_outbound_priority(priority: int):
+    """Set priority untuk sisa task saat ini (dan task yang dibuat setelahnya)"""
+    _current_priority.set(priority)
+
+class TokenBucket:
+    """Token bucket sederhana berbasis waktu monotonic"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float = None) -> float:
+        """Detik sampai satu token tersedia"""
+        now = now or time.monotonic()
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float = None):
+        self._refill(now or time.monotonic())
+        self.tokens -= 1
+
+class _SendJob:
+    __slots__ = ("func", "args", "kwargs", "priority", "future", "enqueued_at", "flood_retries")
+
+    def __init__(self, func, args, kwargs, priority, future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.flood_retries = 0
+
+class _ChatLane:
+    """Antrian FIFO per chat; hanya satu request in-flight per chat"""
+
+    __slots__ = ("jobs", "bucket", "busy", "blocked_until", "scheduled")
+
+    def __init__(self, bucket: TokenBucket):
+        self.jobs = deque()
+        self.bucket = bucket
+        self.busy = False
+        self.blocked_until = 0.0
+        self.scheduled = False
+
+    @property
+    def priority(self) -> int:
+        return min(job.priority for job in self.jobs)
+
+class OutboundDispatcher:
+    """
+    Dispatcher pengiriman untuk satu client. Urutan pesan per chat dijaga,
+    chat berbeda dikirim paralel sampai max_inflight, dan chat dengan
+    priority lebih tinggi didahulukan saat token global terbatas.
+    """
+
+    def __init__(self, client, is_bot: bool = True):
+        self.client = client
+        prefix = "bot" if is_bot else "user"
+        self.global_bucket = TokenBucket(OUTBOUND_CONFIG[f"{prefix}_global_rate"], OUTBOUND_CONFIG[f"{prefix}_global_burst"])
+
+        self._lanes: Dict[Any, _ChatLane] = {}
+        self._ready = []      # (priority, seq, chat_key)
+        self._delayed = []    # (ready_at, seq, chat_key)
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._inflight: Optional[asyncio.Semaphore] = None
+        self._loop_task = None
+
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "flood_waits": 0,
+            "flood_wait_seconds": 0,
+            "requeued": 0,
+            "queue_wait_total": 0.0,
+            "by_priority": {name: 0 for name in PRIORITY_NAMES.values()}
+        }
+
+    # ==================== PUBLIC API ====================
+
+    async def submit(self, chat_id, func: Callable[..., Awaitable], *args, priority: int = None, **kwargs):
+        """Antrikan func(*args, **kwargs) untuk chat_id dan tunggu hasilnya"""
+        if _inside_job.get():
+            # Job luar sudah memegang lane & token; antri lagi akan deadlock
+            return await func(*args, **kwargs)
+
+        self._ensure_started()
+
+        if priority is None:
+            priority = _current_priority.get()
+
+        key = self._chat_key(chat_id)
+        lane = self._lanes.get(key)
+        if lane is None:
+            if len(self._lanes) >= OUTBOUND_CONFIG["max_idle_lanes"]:
+                self._prune_lanes()
+            lane = _ChatLane(self._chat_bucket(key))
+            self._lanes[key] = lane
+
+        future = asyncio.get_running_loop().create_future()
+        lane.jobs.append(_SendJob(func, args, kwargs, priority, future))
+        self._schedule(key, lane)
+        return await future
+
+    def get_stats(self) -> Dict[str, Any]:
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for lane in self._lanes.values():
+            for job in lane.jobs:
+                queued[PRIORITY_NAMES.get(job.priority, "normal")] += 1
+
+        completed = self.stats["sent"] + self.stats["failed"]
+        return {
+            **self.stats,
+            "queued": queued,
+            "chats": len(self._lanes),
+            "avg_queue_wait": self.stats["queue_wait_total"] / completed if completed else 0.0
+        }
+
+    async def close(self):
+        """Hentikan dispatcher; job yang masih antri dibatalkan"""
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+        for lane in self._lanes.values():
+            while lane.jobs:
+                job = lane.jobs.popleft()
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("Outbound dispatcher stopped"))
+        self._lanes.clear()
+        self._ready.clear()
+        self._delayed.clear()
+
+    # ==================== INTERNAL ====================
+
+    def _ensure_started(self):
+        if self._loop_task is None or self._loop_task.done():
+            self._wakeup = asyncio.Event()
+            self._inflight = asyncio.Semaphore(OUTBOUND_CONFIG["max_inflight"])
+            self._loop_task = asyncio.create_task(self._dispatch_loop())
+
+    @staticmethod
+    def _chat_key(chat_id):
+        if isinstance(chat_id, str):
+            stripped = chat_id.lstrip('-')
+            if stripped.isdigit():
+                return int(chat_id)
+            return chat_id.lower().lstrip('@')
+        return chat_id
+
+    @staticmethod
+    def _chat_bucket(key) -> TokenBucket:
+        # ID positif = private chat; ID negatif / username = grup atau channel
+        if isinstance(key, int) and key > 0:
+            return TokenBucket(OUTBOUND_CONFIG["private_rate"], OUTBOUND_CONFIG["private_burst"])
+        return TokenBucket(OUTBOUND_CONFIG["group_rate"], OUTBOUND_CONFIG["group_burst"])
+
+    def _schedule(self, key, lane: _ChatLane):
+        """Masukkan chat ke heap ready/delayed jika ada job dan tidak sedang in-flight"""
+        if lane.scheduled or lane.busy or not lane.jobs:
+            return
+
+        self._seq += 1
+        now = time.monotonic()
+        if lane.blocked_until > now:
+            heapq.heappush(self._delayed, (lane.blocked_until, self._seq, key))
+        else:
+            heapq.heappush(self._ready, (lane.priority, self._seq, key))
+        lane.scheduled = True
+        self._wakeup.set()
+
+    async def _dispatch_loop(self):
+        while True:
+            try:
+                now = time.monotonic()
+
+                # Pindahkan chat yang sudah tidak tertahan ke heap ready
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, _, key = heapq.heappop(self._delayed)
+                    lane = self._lanes.get(key)
+                    if lane and lane.jobs:
+                        self._seq += 1
+                        heapq.heappush(self._ready, (lane.priority, self._seq, key))
+                    elif lane:
+                        lane.scheduled = False
+
+                if not self._ready:
+                    timeout = self._delayed[0][0] - now if self._delayed else None
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # Token global berlaku untuk semua lane
+                global_wait = self.global_bucket.wait_time(now)
+                if global_wait > 0:
+                    await asyncio.sleep(global_wait)
+                    continue
+
+                _, _, key = heapq.heappop(self._ready)
+                lane = self._lanes.get(key)
+                if lane is None or not lane.jobs:
+                    if lane:
+                        lane.scheduled = False
+                    continue
+
+                chat_wait = max(lane.bucket.wait_time(now), lane.blocked_until - now)
+                if chat_wait > 0:
+                    self._seq += 1
+                    heapq.heappush(self._delayed, (now + chat_wait, self._seq, key))
+                    continue
+
+                await self._inflight.acquire()
+                lane.scheduled = False
+                lane.busy = True
+                lane.bucket.consume(now)
+                self.global_bucket.consume(now)
+                job = lane.jobs.popleft()
+                asyncio.create_task(self._run_job(key, lane, job))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                console.error(f"[OUTBOUND] Error di dispatch loop: {e}")
+                await asyncio.sleep(1)
+
+    async def _run_job(self, key, lane: _ChatLane, job: _SendJob):
+        try:
+            if job.future.cancelled():
+                return
+
+            # Task ini punya context sendiri, flag tidak bocor ke job lain
+            _inside_job.set(True)
+            result = await job.func(*job.args, **job.kwargs)
+
+            self.stats["sent"] += 1
+            self.stats["by_priority"][PRIORITY_NAMES.get(job.priority, "normal")] += 1
+            self.stats["queue_wait_total"] += time.monotonic() - job.enqueued_at
+            if not job.future.done():
+                job.future.set_result(result)
+
+        except FloodWait as e:
+            wait = e.value if isinstance(e.value, (int, float)) else 1
+            self.stats["flood_waits"] += 1
+            self.stats["flood_wait_seconds"] += wait
+            lane.blocked_until = time.monotonic() + wait
+
+            job.flood_retries += 1
+            if wait > OUTBOUND_CONFIG["max_flood_wait"] or job.flood_retries > OUTBOUND_CONFIG["max_flood_retries"]:
+                self.stats["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                # Requeue di depan agar urutan pesan chat tetap terjaga
+                console.warning(f"[OUTBOUND] FloodWait {wait}s untuk chat {key}, requeue")
+                self.stats["requeued"] += 1
+                lane.jobs.appendleft(job)
+
+        except Exception as e:
+            self.stats["failed"] += 1
+            self.stats["queue_wait_total"] += time.monotonic() - job.enqueued_at
+            if not job.future.done():
+                job.future.set_exception(e)
+
+        finally:
+            lane.busy = False
+            self._inflight.release()
+            self._schedule(key, lane)
+
+    def _prune_lanes(self):
+        """Buang lane idle yang bucket-nya sudah penuh kembali (tidak mengubah pacing)"""
+        now = time.monotonic()
+        for key, lane in list(self._lanes.items()):
+            if lane.jobs or lane.busy or lane.scheduled or lane.blocked_until > now:
+                continue
+            lane.bucket.wait_time(now)
+            if lane.bucket.tokens >= lane.bucket.capacity:
+                del self._lanes[key]
+
+class OutboundMixin:
+    """
+    Mixin untuk Bot/Ubot: method kirim Pyrogram diarahkan lewat dispatcher.
+    Harus berada sebelum pyrogram.Client di MRO.
+    """
+
+    @property
+    def outbound(self) -> OutboundDispatcher:
+        dispatcher = self.__dict__.get("_outbound_dispatcher")
+        if dispatcher is None:
+            dispatcher = OutboundDispatcher(self, is_bot=bool(getattr(self, "bot_token", None)))
+            self.__dict__["_outbound_dispatcher"] = dispatcher
+        return dispatcher
+
+    async def send_message(self, chat_id, *args, **kwargs):
+        return await self.outbound.submit(chat_id, super().send_message, chat_id, *args, **kwargs)
+
+    async def send_photo(self, chat_id, *args, **kwargs):
+        return await self.outbound.submit(chat_id, super().send_photo, chat_id, *args, **kwargs)
+
+    async def send_document(self, chat_id, *args, **kwargs):
+        return await self.outbound.submit(chat_id, super().send_document, chat_id, *args, **kwargs)
+
+    async def send_video(self, chat_id, *args, **kwargs):
+        return await self.outbound.submit(chat_id, super().send_video, chat_id, *args, **kwargs)
+
+    async def forward_messages(self, chat_id, *args, **kwargs):
+        return await self.outbound.submit(chat_id, super().forward_messages, chat_id, *args, **kwargs)
+
+    async def copy_message(self, chat_id, *args, **kwargs):
+        return await self.outbound.submit(chat_id, super().copy_message, chat_id, *args, **kwargs)
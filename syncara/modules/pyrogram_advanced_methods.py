@@ -8,6 +8,7 @@ from pyrogram import types, enums
 from pyrogram.errors import RPCError
 from typing import Union, List, Optional, Dict, Any, AsyncGenerator
 from syncara.console import console
+from syncara.modules.broadcast_engine import broadcast_engine, get_broadcast_clients
 import asyncio
 from datetime import datetime, timedelta
 
@@ -597,34 +598,37 @@ class AdvancedMethods:
                               targets: List[Union[int, str]],
                               text: str,
                               delay: float = 1.0,
+                              use_assistants: bool = None,
+                              job_id: str = None,
                               **kwargs) -> List[types.Message]:
         """
-        Mengirim pesan ke multiple chat dengan delay.
+        Mengirim pesan ke multiple chat secara paralel lewat broadcast engine.
         
         Args:
             targets: List ID chat target
             text: Teks pesan
-            delay: Delay antar pengiriman dalam detik
+            delay: Delay antar pengiriman dalam detik (hanya untuk client tanpa outbound dispatcher)
+            use_assistants: Bagi target ke assistant aktif lain (default: ya untuk userbot)
+            job_id: ID job untuk checkpoint/resume (job_id sama = target yang selesai dilewati)
             **kwargs: Parameter tambahan untuk send_message
             
         Returns:
-            List[Message]: List pesan yang berhasil dikirim
+            List[Message]: List pesan yang berhasil dikirim (urut sesuai targets)
         """
         try:
-            results = []
-            for target in targets:
-                try:
-                    message = await self.kirim_pesan(
-                        chat_id=target,
-                        text=text,
-                        **kwargs
-                    )
-                    results.append(message)
-                    if delay > 0:
-                        await asyncio.sleep(delay)
-                except Exception as e:
-                    console.error(f"Error mengirim ke {target}: {e}")
-                    continue
+            if use_assistants is None:
+                use_assistants = not getattr(self, "bot_token", None)
+            delivered = {}
+            job = await broadcast_engine.run(
+                "send",
+                targets,
+                {"text": text, "kwargs": kwargs},
+                get_broadcast_clients(self, use_assistants),
+                job_id=job_id,
+                delay=delay,
+                on_result=lambda target, result: delivered.__setitem__(str(target), result)
+            )
+            results = [delivered[str(target)] for target in job.targets if str(target) in delivered]
             
             console.info(f"Berhasil mengirim ke {len(results)}/{len(targets)} target")
             return results
@@ -637,36 +641,38 @@ class AdvancedMethods:
                                 from_chat_id: Union[int, str],
                                 message_ids: Union[int, List[int]],
                                 delay: float = 1.0,
+                                use_assistants: bool = None,
+                                job_id: str = None,
                                 **kwargs) -> List[List[types.Message]]:
         """
-        Forward pesan ke multiple chat dengan delay.
+        Forward pesan ke multiple chat secara paralel lewat broadcast engine.
         
         Args:
             targets: List ID chat target
             from_chat_id: ID chat sumber
             message_ids: ID pesan yang akan di-forward
-            delay: Delay antar pengiriman dalam detik
+            delay: Delay antar pengiriman dalam detik (hanya untuk client tanpa outbound dispatcher)
+            use_assistants: Bagi target ke assistant aktif lain (default: ya untuk userbot)
+            job_id: ID job untuk checkpoint/resume (job_id sama = target yang selesai dilewati)
             **kwargs: Parameter tambahan untuk forward_messages
             
         Returns:
-            List[List[Message]]: List hasil forward untuk setiap target
+            List[List[Message]]: List hasil forward untuk setiap target yang berhasil
         """
         try:
-            results = []
-            for target in targets:
-                try:
-                    forwarded = await self.forward_pesan(
-                        chat_id=target,
-                        from_chat_id=from_chat_id,
-                        message_ids=message_ids,
-                        **kwargs
-                    )
-                    results.append(forwarded)
-                    if delay > 0:
-                        await asyncio.sleep(delay)
-                except Exception as e:
-                    console.error(f"Error forward ke {target}: {e}")
-                    continue
+            if use_assistants is None:
+                use_assistants = not getattr(self, "bot_token", None)
+            delivered = {}
+            job = await broadcast_engine.run(
+                "forward",
+                targets,
+                {"from_chat_id": from_chat_id, "message_ids": message_ids, "kwargs": kwargs},
+                get_broadcast_clients(self, use_assistants),
+                job_id=job_id,
+                delay=delay,
+                on_result=lambda target, result: delivered.__setitem__(str(target), result)
+            )
+            results = [delivered[str(target)] for target in job.targets if str(target) in delivered]
             
             console.info(f"Berhasil forward ke {len(results)}/{len(targets)} target")
             return results
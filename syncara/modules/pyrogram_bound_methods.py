@@ -131,7 +131,7 @@ class PyrogramBoundMethods:
         
         async def backup_chat(chat_self, limit: int = 1000):
             """Backup chat ini"""
-            return await self.backup_lengkap_chat(chat_self.id, limit)
+            return await self.backup_lengkap_chat(chat_self.id, limit=limit)
         
         # Bind methods ke Chat type
         types.Chat.arsip = arsip_chat
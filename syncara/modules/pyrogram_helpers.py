@@ -7,268 +7,641 @@ import asyncio
 import time
 import json
 import os
+import sys
+import heapq
+import itertools
 import hashlib
 import pickle
+import sqlite3
 from typing import Dict, Any, Optional, List, Union, Callable
 from datetime import datetime, timedelta
 from syncara.console import console
+from syncara.modules.metrics import PerformanceMonitor, performance_monitor
 from pyrogram import types, enums
-import aiofiles
 from functools import wraps
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from enum import Enum
 import threading
 
+CACHE_CONFIG = {
+    "default_ttl": 3600,                # Detik
+    "max_entries": 10000,               # Total entry (dibagi rata ke shard)
+    "max_bytes": 64 * 1024 * 1024,      # Perkiraan ukuran total value
+    "shards": 16
+}
+
+_MISSING = object()
+
+def _estimate_size(value: Any, depth: int = 0) -> int:
+    """Perkiraan ukuran value, dihitung sekali saat set (bukan saat get_stats)"""
+    size = sys.getsizeof(value, 64)
+    if depth >= 2:
+        return size
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k, depth + 1) + _estimate_size(v, depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item, depth + 1) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += sum(_estimate_size(v, depth + 1) for v in vars(value).values())
+    return size
+
+def _key_part(value: Any) -> str:
+    """Representasi argumen yang stabil antar proses (tanpa alamat memori object)"""
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, Enum):
+        return f"{value.__class__.__name__}.{value.name}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_key_part(item) for item in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{_key_part(k)}:{_key_part(v)}" for k, v in sorted(value.items(), key=lambda kv: repr(kv[0]))) + "}"
+    # Client Pyrogram: identitas = nama session
+    if hasattr(value, "api_id") and hasattr(value, "name"):
+        return f"client:{value.name}"
+    if hasattr(value, "id"):
+        return f"{value.__class__.__name__}:{value.id}"
+    return f"{value.__class__.__name__}:{id(value)}"
+
+def make_cache_key(namespace: str, *args, **kwargs) -> str:
+    """Key cache stabil: namespace + hash argumen yang sudah dinormalisasi"""
+    raw = "|".join([_key_part(arg) for arg in args] + [f"{k}={_key_part(v)}" for k, v in sorted(kwargs.items())])
+    return f"{namespace}:{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"
+
+class _CacheShard:
+    """Satu shard: LRU (OrderedDict) + heap expiry, dilindungi lock sendiri"""
+
+    __slots__ = ("entries", "expiry_heap", "lock", "bytes", "max_entries", "max_bytes", "stats")
+
+    def __init__(self, max_entries: int, max_bytes: int, stats: Dict[str, int]):
+        # key -> (value, expires_at, size, created_at)
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.expiry_heap: List[tuple] = []
+        self.lock = threading.Lock()
+        self.bytes = 0
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = stats
+
+    def _remove(self, key: str) -> None:
+        _, _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+    def expire(self, now: float) -> int:
+        """Buang entry yang expired dari kepala heap (amortized O(log n))"""
+        removed = 0
+        heap = self.expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self.entries.get(key)
+            # Entry heap basi jika key sudah di-set ulang dengan expiry lain
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                removed += 1
+        if len(heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [(entry[1], key) for key, entry in self.entries.items()]
+            heapq.heapify(self.expiry_heap)
+        self.stats["expirations"] += removed
+        return removed
+
+    def get(self, key: str, now: float) -> Any:
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[1] <= now:
+            self._remove(key)
+            self.stats["expirations"] += 1
+            return _MISSING
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, value: Any, expires_at: float, size: int, now: float) -> None:
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = (value, expires_at, size, now)
+        self.bytes += size
+        heapq.heappush(self.expiry_heap, (expires_at, key))
+
+        self.expire(now)
+        # Eviction LRU sampai batas entry dan bytes terpenuhi
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
 class CacheManager:
     """
-    Manager untuk caching data dengan TTL (Time To Live).
+    Cache LRU/TTL in-memory dengan batas jumlah entry dan bytes.
+    Key dibagi ke beberapa shard (lock per shard, operasi O(1)/O(log n)),
+    expiry lewat heap, dan get_or_load mencegah stampede (single-flight).
     """
     
-    def __init__(self, default_ttl: int = 3600):
-        self.cache: Dict[str, Dict[str, Any]] = {}
-        self.default_ttl = default_ttl
-        self.lock = threading.Lock()
+    def __init__(self, default_ttl: int = None, max_entries: int = None,
+                 max_bytes: int = None, shards: int = None):
+        self.default_ttl = default_ttl or CACHE_CONFIG["default_ttl"]
+        self.max_entries = max_entries or CACHE_CONFIG["max_entries"]
+        self.max_bytes = max_bytes or CACHE_CONFIG["max_bytes"]
+        shard_count = shards or CACHE_CONFIG["shards"]
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "loads": 0,
+            "coalesced": 0
+        }
+        self._shards = [
+            _CacheShard(
+                max(1, self.max_entries // shard_count),
+                max(1, self.max_bytes // shard_count),
+                self.stats
+            )
+            for _ in range(shard_count)
+        ]
+        # key -> Future hasil loader yang sedang berjalan
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    def _shard(self, key: str) -> _CacheShard:
+        return self._shards[hash(key) % len(self._shards)]
     
-    def _is_expired(self, cache_entry: Dict[str, Any]) -> bool:
-        """Check if cache entry is expired"""
-        return time.time() > cache_entry.get('expires_at', 0)
+    def _lookup(self, key: str) -> Any:
+        shard = self._shard(key)
+        with shard.lock:
+            value = shard.get(key, time.monotonic())
+        if value is _MISSING:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+        return value
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """Set cache entry"""
-        with self.lock:
-            expires_at = time.time() + (ttl or self.default_ttl)
-            self.cache[key] = {
-                'value': value,
-                'expires_at': expires_at,
-                'created_at': time.time()
-            }
+        size = _estimate_size(value)
+        now = time.monotonic()
+        shard = self._shard(key)
+        with shard.lock:
+            shard.set(key, value, now + (ttl or self.default_ttl), size, now)
+        self.stats["sets"] += 1
     
     def get(self, key: str) -> Optional[Any]:
         """Get cache entry"""
-        with self.lock:
-            if key not in self.cache:
-                return None
-            
-            entry = self.cache[key]
-            if self._is_expired(entry):
-                del self.cache[key]
-                return None
-            
-            return entry['value']
+        value = self._lookup(key)
+        return None if value is _MISSING else value
+    
+    async def get_or_load(self, key: str, loader: Callable, ttl: Optional[int] = None) -> Any:
+        """
+        Ambil dari cache, atau jalankan loader() sekali walaupun banyak
+        coroutine miss bersamaan (yang lain menunggu hasil yang sama).
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            return value
+        
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self.stats["loads"] += 1
+            value = await loader()
+            self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Hindari warning "exception never retrieved" jika tidak ada yang menunggu
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
     
     def delete(self, key: str) -> bool:
         """Delete cache entry"""
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
+        shard = self._shard(key)
+        with shard.lock:
+            if key in shard.entries:
+                shard._remove(key)
                 return True
             return False
     
     def clear(self) -> None:
         """Clear all cache"""
-        with self.lock:
-            self.cache.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.expiry_heap.clear()
+                shard.bytes = 0
     
     def cleanup_expired(self) -> int:
         """Cleanup expired entries"""
-        with self.lock:
-            expired_keys = []
-            for key, entry in self.cache.items():
-                if self._is_expired(entry):
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self.cache[key]
-            
-            return len(expired_keys)
+        now = time.monotonic()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                removed += shard.expire(now)
+        return removed
+    
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self._shards)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        with self.lock:
-            total_entries = len(self.cache)
-            total_size = sum(len(str(entry['value'])) for entry in self.cache.values())
-            
-            return {
-                'total_entries': total_entries,
-                'total_size_bytes': total_size,
-                'oldest_entry': min(
-                    (entry['created_at'] for entry in self.cache.values()),
-                    default=None
-                ),
-                'newest_entry': max(
-                    (entry['created_at'] for entry in self.cache.values()),
-                    default=None
-                )
-            }
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            'total_entries': len(self),
+            'total_size_bytes': sum(shard.bytes for shard in self._shards),
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hit_rate': self.stats["hits"] / lookups if lookups else 0.0,
+            'inflight': len(self._inflight)
+        }
+
+class RateLimitExceeded(Exception):
+    """Request ditolak limiter; retry_after = detik sampai request berikutnya diizinkan"""
+    
+    def __init__(self, message: str, retry_after: float = 0.0, level: Optional[str] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.level = level
 
 class RateLimiter:
     """
-    Rate limiter untuk mencegah spam requests.
+    Rate limiter GCRA (Generic Cell Rate Algorithm) per key.
+    State per key hanya satu angka (theoretical arrival time), jadi setiap
+    cek O(1). Key yang sudah penuh kembali (idle) dibuang dari depan
+    OrderedDict secara amortized, sehingga memori tidak tumbuh terus.
     """
     
     def __init__(self, max_requests: int = 30, window_seconds: int = 60):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, List[float]] = defaultdict(list)
+        # Jarak ideal antar request; burst maksimum = max_requests
+        self.emission_interval = window_seconds / max_requests
+        # key -> theoretical arrival time, urut berdasarkan update terakhir
+        self.requests: "OrderedDict[str, float]" = OrderedDict()
+        self._updated: Dict[str, float] = {}
         self.lock = threading.Lock()
     
-    def is_allowed(self, key: str) -> bool:
-        """Check if request is allowed"""
+    def __len__(self) -> int:
+        return len(self.requests)
+    
+    def _expire_idle(self, now: float) -> None:
+        """Buang key yang tidak di-update selama satu window (TAT pasti sudah lewat)"""
+        requests = self.requests
+        while requests:
+            key = next(iter(requests))
+            if self._updated[key] + self.window_seconds > now:
+                break
+            del requests[key]
+            del self._updated[key]
+    
+    def _peek(self, key: str, now: float, cost: int = 1) -> tuple:
+        """Return (allowed, new_tat, retry_after) tanpa mengubah state"""
+        tat = max(self.requests.get(key, now), now)
+        new_tat = tat + self.emission_interval * cost
+        allow_at = new_tat - self.window_seconds
+        # Toleransi pembulatan float: window/max_requests tidak selalu pas (mis. 10/3)
+        if allow_at - now > 1e-9:
+            return False, tat, allow_at - now
+        return True, new_tat, 0.0
+    
+    def _commit(self, key: str, new_tat: float, now: float) -> None:
+        self.requests[key] = new_tat
+        self.requests.move_to_end(key)
+        self._updated[key] = now
+    
+    def check(self, key: str, cost: int = 1) -> float:
+        """Konsumsi kuota jika diizinkan. Return 0 jika diizinkan, atau detik tunggu"""
         with self.lock:
             now = time.time()
-            window_start = now - self.window_seconds
-            
-            # Clean old requests
-            self.requests[key] = [
-                req_time for req_time in self.requests[key]
-                if req_time > window_start
-            ]
-            
-            # Check if under limit
-            if len(self.requests[key]) < self.max_requests:
-                self.requests[key].append(now)
-                return True
-            
-            return False
+            self._expire_idle(now)
+            allowed, new_tat, retry_after = self._peek(key, now, cost)
+            if allowed:
+                self._commit(key, new_tat, now)
+            return retry_after
+    
+    def is_allowed(self, key: str) -> bool:
+        """Check if request is allowed"""
+        return self.check(key) == 0
+    
+    async def acquire(self, key: str, cost: int = 1, timeout: Optional[float] = None) -> None:
+        """Tunggu sampai kuota tersedia (bukan menolak). Raise RateLimitExceeded jika melewati timeout"""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            retry_after = self.check(key, cost)
+            if retry_after == 0:
+                return
+            if deadline is not None and time.time() + retry_after > deadline:
+                raise RateLimitExceeded(f"Rate limit exceeded for {key}", retry_after)
+            await asyncio.sleep(retry_after)
     
     def get_reset_time(self, key: str) -> float:
         """Get time when rate limit resets"""
         with self.lock:
-            if key not in self.requests or not self.requests[key]:
-                return 0
-            
-            oldest_request = min(self.requests[key])
-            return oldest_request + self.window_seconds
+            return self.requests.get(key, 0)
     
     def reset(self, key: str) -> None:
         """Reset rate limit for key"""
         with self.lock:
             if key in self.requests:
                 del self.requests[key]
+                del self._updated[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            self._expire_idle(time.time())
+            return {
+                'active_keys': len(self.requests),
+                'max_requests': self.max_requests,
+                'window_seconds': self.window_seconds
+            }
 
-class PerformanceMonitor:
+class HierarchicalRateLimiter:
     """
-    Monitor untuk performance method calls.
+    Beberapa level limit (mis. user, chat, assistant, global) yang dicek
+    bersamaan: request hanya diizinkan jika semua level mengizinkan, dan
+    kuota hanya dikonsumsi di semua level sekaligus.
+    
+    limits: {level: (max_requests, window_seconds)}; level "global" tidak butuh key.
     """
     
-    def __init__(self, max_records: int = 1000):
-        self.max_records = max_records
-        self.records: List[Dict[str, Any]] = []
+    def __init__(self, limits: Dict[str, tuple]):
+        self.limiters = {
+            level: RateLimiter(max_requests, window_seconds)
+            for level, (max_requests, window_seconds) in limits.items()
+        }
         self.lock = threading.Lock()
+        self.stats = {"allowed": 0, "delayed": 0, "rejected": 0}
     
-    def record(self, method_name: str, duration: float, success: bool, **kwargs) -> None:
-        """Record method call performance"""
-        with self.lock:
-            record = {
-                'method': method_name,
-                'duration': duration,
-                'success': success,
-                'timestamp': time.time(),
-                'metadata': kwargs
-            }
-            
-            self.records.append(record)
-            
-            # Keep only max_records
-            if len(self.records) > self.max_records:
-                self.records = self.records[-self.max_records:]
+    def _keys(self, keys: Dict[str, Any]) -> List[tuple]:
+        resolved = []
+        for level, limiter in self.limiters.items():
+            if level == "global":
+                resolved.append((level, limiter, "global"))
+            elif keys.get(level) is not None:
+                resolved.append((level, limiter, str(keys[level])))
+        return resolved
     
-    def get_stats(self, method_name: Optional[str] = None) -> Dict[str, Any]:
-        """Get performance statistics"""
+    def check(self, cost: int = 1, **keys) -> tuple:
+        """Return (retry_after, level yang membatasi). retry_after 0 = diizinkan"""
         with self.lock:
-            records = self.records
-            if method_name:
-                records = [r for r in records if r['method'] == method_name]
-            
-            if not records:
-                return {}
-            
-            durations = [r['duration'] for r in records]
-            successes = [r for r in records if r['success']]
+            now = time.time()
+            pending = []
+            worst = (0.0, None)
+            for level, limiter, key in self._keys(keys):
+                with limiter.lock:
+                    limiter._expire_idle(now)
+                    allowed, new_tat, retry_after = limiter._peek(key, now, cost)
+                if not allowed and retry_after > worst[0]:
+                    worst = (retry_after, level)
+                pending.append((limiter, key, new_tat))
             
-            return {
-                'total_calls': len(records),
-                'success_rate': len(successes) / len(records) if records else 0,
-                'avg_duration': sum(durations) / len(durations) if durations else 0,
-                'min_duration': min(durations) if durations else 0,
-                'max_duration': max(durations) if durations else 0,
-                'recent_calls': records[-10:] if records else []
-            }
+            if worst[0] > 0:
+                return worst
+            for limiter, key, new_tat in pending:
+                with limiter.lock:
+                    limiter._commit(key, new_tat, now)
+            return 0.0, None
+    
+    async def acquire(self, cost: int = 1, timeout: Optional[float] = None, **keys) -> float:
+        """
+        Tunggu sampai semua level mengizinkan. Return total detik menunggu.
+        Raise RateLimitExceeded jika harus menunggu lebih dari timeout.
+        """
+        started = time.time()
+        deadline = None if timeout is None else started + timeout
+        while True:
+            retry_after, level = self.check(cost, **keys)
+            if retry_after == 0:
+                waited = time.time() - started
+                self.stats["delayed" if waited > 0 else "allowed"] += 1
+                return waited
+            if deadline is not None and time.time() + retry_after > deadline:
+                self.stats["rejected"] += 1
+                raise RateLimitExceeded(f"Rate limit {level} exceeded", retry_after, level)
+            await asyncio.sleep(retry_after)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "levels": {level: limiter.get_stats() for level, limiter in self.limiters.items()}
+        }
+
+FILE_CACHE_CONFIG = {
+    "db_name": "pyrogram_cache.db",     # Satu file SQLite (WAL) di cache_dir
+    "default_ttl": 3600,
+    "flush_interval": 0.5,              # Detik menunggu sebelum batch write
+    "flush_batch": 256                  # Flush segera jika pending sebanyak ini
+}
 
 class FileCache:
     """
-    File-based cache untuk persistent storage.
+    Persistent cache di satu database SQLite mode WAL.
+    Semua akses database berjalan di satu thread khusus (tidak memblokir event
+    loop), write di-batch, dan entry expired dihapus oleh compact() berkala.
     """
     
-    def __init__(self, cache_dir: str = "cache"):
+    def __init__(self, cache_dir: str = "cache", db_name: str = None):
         self.cache_dir = cache_dir
-        os.makedirs(cache_dir, exist_ok=True)
+        self.db_path = os.path.join(cache_dir, db_name or FILE_CACHE_CONFIG["db_name"])
+        # Satu worker = koneksi SQLite hanya dipakai satu thread, urutan operasi terjaga
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-cache")
+        self._conn: Optional[sqlite3.Connection] = None
+        # key -> (pickled value, expires_at) yang belum ditulis
+        self._pending: Dict[str, tuple] = {}
+        self._flush_handle = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closed = False
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "batches": 0,
+            "compacted": 0
+        }
+    
+    # ==================== DATABASE THREAD ====================
+    
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self._closed:
+                raise RuntimeError("FileCache sudah ditutup")
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires_at REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires_at)")
+            self._conn = conn
+        return self._conn
+    
+    def _get_sync(self, key: str) -> Any:
+        row = self._db().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        # Unpickle langsung dari buffer row, di thread database
+        return pickle.loads(row[0]) if row else None
+    
+    def _write_batch_sync(self, items: List[tuple]) -> None:
+        conn = self._db()
+        now = time.time()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, created_at) VALUES (?, ?, ?, ?)",
+                [(key, blob, expires_at, now) for key, (blob, expires_at) in items]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    def _delete_sync(self, key: str) -> bool:
+        return self._db().execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount > 0
+    
+    def _compact_sync(self) -> int:
+        conn = self._db()
+        removed = conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+    
+    def _clear_sync(self) -> int:
+        count = self._db().execute("DELETE FROM cache").rowcount
+        # Bersihkan file pickle per-key dari format cache lama
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.cache'):
+                os.remove(os.path.join(self.cache_dir, filename))
+                count += 1
+        return count
+    
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
+    async def _run(self, func: Callable, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
     
-    def _get_file_path(self, key: str) -> str:
-        """Get file path for cache key"""
-        key_hash = hashlib.md5(key.encode()).hexdigest()
-        return os.path.join(self.cache_dir, f"{key_hash}.cache")
+    # ==================== BATCHED WRITES ====================
+    
+    def _schedule_flush(self) -> None:
+        if self._flush_task and not self._flush_task.done():
+            return
+        loop = asyncio.get_running_loop()
+        if len(self._pending) >= FILE_CACHE_CONFIG["flush_batch"]:
+            if self._flush_handle:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            self._flush_task = loop.create_task(self.flush())
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(
+                FILE_CACHE_CONFIG["flush_interval"],
+                lambda: setattr(self, "_flush_task", loop.create_task(self.flush()))
+            )
+    
+    async def flush(self) -> None:
+        """Tulis semua pending write dalam satu transaksi"""
+        self._flush_handle = None
+        while self._pending:
+            batch = list(self._pending.items())
+            self._pending = {}
+            try:
+                await self._run(self._write_batch_sync, batch)
+                self.stats["writes"] += len(batch)
+                self.stats["batches"] += 1
+            except Exception as e:
+                console.error(f"Error saving cache to file: {e}")
+    
+    # ==================== PUBLIC API ====================
     
     async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set cache entry to file"""
-        file_path = self._get_file_path(key)
-        
-        cache_data = {
-            'value': value,
-            'expires_at': time.time() + (ttl or 3600),
-            'created_at': time.time()
-        }
-        
+        """Set cache entry (ditulis ke database secara batch)"""
+        if self._closed:
+            return
         try:
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(pickle.dumps(cache_data))
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
         except Exception as e:
             console.error(f"Error saving cache to file: {e}")
+            return
+        self._pending[key] = (blob, time.time() + (ttl or FILE_CACHE_CONFIG["default_ttl"]))
+        self._schedule_flush()
     
     async def get(self, key: str) -> Optional[Any]:
-        """Get cache entry from file"""
-        file_path = self._get_file_path(key)
-        
-        if not os.path.exists(file_path):
-            return None
-        
+        """Get cache entry"""
         try:
-            async with aiofiles.open(file_path, 'rb') as f:
-                cache_data = pickle.loads(await f.read())
-            
-            if time.time() > cache_data.get('expires_at', 0):
-                os.remove(file_path)
-                return None
-            
-            return cache_data['value']
+            pending = self._pending.get(key)
+            if pending is not None:
+                value = pickle.loads(pending[0]) if pending[1] > time.time() else None
+            else:
+                value = await self._run(self._get_sync, key)
         except Exception as e:
             console.error(f"Error loading cache from file: {e}")
-            return None
+            value = None
+        
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
     
     async def delete(self, key: str) -> bool:
-        """Delete cache entry file"""
-        file_path = self._get_file_path(key)
-        
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                return True
-            except Exception as e:
-                console.error(f"Error deleting cache file: {e}")
-        
-        return False
+        """Delete cache entry"""
+        was_pending = self._pending.pop(key, None) is not None
+        try:
+            # Executor FIFO: batch yang sudah berjalan selesai sebelum delete ini
+            return await self._run(self._delete_sync, key) or was_pending
+        except Exception as e:
+            console.error(f"Error deleting cache entry: {e}")
+            return was_pending
+    
+    async def compact(self) -> int:
+        """Hapus entry expired dan truncate WAL"""
+        try:
+            removed = await self._run(self._compact_sync)
+            self.stats["compacted"] += removed
+            return removed
+        except Exception as e:
+            console.error(f"Error compacting file cache: {e}")
+            return 0
     
     async def clear(self) -> int:
-        """Clear all cache files"""
-        count = 0
+        """Clear all cache entries"""
+        self._pending.clear()
         try:
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.cache'):
-                    os.remove(os.path.join(self.cache_dir, filename))
-                    count += 1
+            return await self._run(self._clear_sync)
         except Exception as e:
             console.error(f"Error clearing cache: {e}")
-        
-        return count
+            return 0
+    
+    async def close(self) -> None:
+        """Flush pending write lalu tutup database dan thread-nya"""
+        if self._closed:
+            return
+        if self._flush_handle:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # Flush yang sedang berjalan harus selesai sebelum koneksi ditutup
+        if self._flush_task and not self._flush_task.done():
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        # Setelah ini set() diabaikan dan koneksi tidak dibuka ulang
+        self._closed = True
+        await self._run(self._close_sync)
+        self._executor.shutdown()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending": len(self._pending),
+            "db_path": self.db_path,
+            "db_size_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+        }
 
 class MessageQueue:
     """
@@ -279,23 +652,32 @@ class MessageQueue:
         self.queue = asyncio.PriorityQueue(maxsize=max_size)
         self.running = False
         self.workers = []
+        # Tie-breaker: item dengan priority sama tidak dibandingkan sebagai dict (FIFO)
+        self._sequence = itertools.count()
+    
+    def _enqueue_delayed(self, priority: int, queue_item: Dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait((priority, next(self._sequence), queue_item))
+        except asyncio.QueueFull:
+            console.warning(f"Message queue penuh, pesan tertunda dibuang (priority {priority})")
     
     async def put(self, message: Dict[str, Any], priority: int = 5, delay: float = 0) -> None:
-        """Add message to queue"""
-        if delay > 0:
-            await asyncio.sleep(delay)
-        
+        """Add message to queue (delay dijadwalkan di event loop, producer tidak ikut menunggu)"""
         queue_item = {
             'priority': priority,
             'message': message,
             'timestamp': time.time()
         }
         
-        await self.queue.put((priority, queue_item))
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._enqueue_delayed, priority, queue_item)
+            return
+        
+        await self.queue.put((priority, next(self._sequence), queue_item))
     
     async def get(self) -> Dict[str, Any]:
         """Get message from queue"""
-        _, queue_item = await self.queue.get()
+        _, _, queue_item = await self.queue.get()
         return queue_item['message']
     
     async def worker(self, worker_id: int, handler: Callable):
@@ -336,7 +718,7 @@ class PyrogramHelpers:
     def __init__(self):
         self.cache = CacheManager()
         self.rate_limiter = RateLimiter()
-        self.performance_monitor = PerformanceMonitor()
+        self.performance_monitor = performance_monitor
         self.file_cache = FileCache()
         self.message_queue = MessageQueue()
         self._cleanup_task_started = False
@@ -362,6 +744,7 @@ class PyrogramHelpers:
             try:
                 await asyncio.sleep(300)  # 5 menit
                 expired_count = self.cache.cleanup_expired()
+                expired_count += await self.file_cache.compact()
                 if expired_count > 0:
                     console.info(f"Cleaned up {expired_count} expired cache entries")
             except Exception as e:
@@ -380,41 +763,52 @@ class PyrogramHelpers:
                 # Start cleanup task if needed
                 self._start_cleanup_task()
                 
-                # Create cache key
-                cache_key = f"{func.__name__}:{hashlib.md5(str(args + tuple(kwargs.items())).encode()).hexdigest()}"
+                # Key stabil: client dinormalisasi ke nama session, bukan repr object
+                cache_key = make_cache_key(func.__qualname__, *args, **kwargs)
                 
-                # Try to get from cache
-                cache_manager = self.file_cache if use_file_cache else self.cache
-                cached_result = await cache_manager.get(cache_key) if use_file_cache else cache_manager.get(cache_key)
+                async def load():
+                    start_time = time.time()
+                    try:
+                        result = await func(*args, **kwargs)
+                        self.performance_monitor.record(func.__name__, time.time() - start_time, True)
+                        return result
+                    except Exception as e:
+                        self.performance_monitor.record(func.__name__, time.time() - start_time, False, error=str(e))
+                        raise
                 
+                if not use_file_cache:
+                    return await self.cache.get_or_load(cache_key, load, ttl)
+                
+                cached_result = await self.file_cache.get(cache_key)
                 if cached_result is not None:
                     return cached_result
                 
-                # Call actual function
-                start_time = time.time()
-                try:
-                    result = await func(*args, **kwargs)
-                    
-                    # Cache result
-                    if use_file_cache:
-                        await cache_manager.set(cache_key, result, ttl)
-                    else:
-                        cache_manager.set(cache_key, result, ttl)
-                    
-                    # Record performance
-                    duration = time.time() - start_time
-                    self.performance_monitor.record(func.__name__, duration, True)
-                    
-                    return result
-                except Exception as e:
-                    # Record performance
-                    duration = time.time() - start_time
-                    self.performance_monitor.record(func.__name__, duration, False, error=str(e))
-                    raise
+                result = await load()
+                await self.file_cache.set(cache_key, result, ttl)
+                return result
             
             return wrapper
         return decorator
     
+    async def get_chat_cached(self, client, chat_id: Union[int, str], ttl: int = 300) -> types.Chat:
+        """get_chat dengan cache per client; request bersamaan untuk chat yang sama digabung"""
+        self._start_cleanup_task()
+        return await self.cache.get_or_load(
+            make_cache_key("get_chat", client, chat_id),
+            lambda: client.get_chat(chat_id),
+            ttl
+        )
+    
+    async def get_chat_member_cached(self, client, chat_id: Union[int, str],
+                                     user_id: Union[int, str], ttl: int = 30) -> types.ChatMember:
+        """get_chat_member dengan cache TTL pendek (status member bisa berubah)"""
+        self._start_cleanup_task()
+        return await self.cache.get_or_load(
+            make_cache_key("get_chat_member", client, chat_id, user_id),
+            lambda: client.get_chat_member(chat_id, user_id),
+            ttl
+        )
+    
     def rate_limit(self, max_requests: int = 30, window_seconds: int = 60):
         """
         Decorator untuk rate limiting.
@@ -423,12 +817,11 @@ class PyrogramHelpers:
             @wraps(func)
             async def wrapper(*args, **kwargs):
                 # Create rate limit key
-                rate_key = f"{func.__name__}:{args[0] if args else 'default'}"
+                rate_key = f"{func.__name__}:{_key_part(args[0]) if args else 'default'}"
                 
-                if not self.rate_limiter.is_allowed(rate_key):
-                    reset_time = self.rate_limiter.get_reset_time(rate_key)
-                    wait_time = reset_time - time.time()
-                    raise Exception(f"Rate limit exceeded. Try again in {wait_time:.2f} seconds")
+                wait_time = self.rate_limiter.check(rate_key)
+                if wait_time > 0:
+                    raise RateLimitExceeded(f"Rate limit exceeded. Try again in {wait_time:.2f} seconds", wait_time)
                 
                 return await func(*args, **kwargs)
             
@@ -626,10 +1019,9 @@ class PyrogramHelpers:
         """Get cache statistics"""
         return {
             'memory_cache': self.cache.get_stats(),
+            'file_cache': self.file_cache.get_stats(),
             'performance_stats': self.performance_monitor.get_stats(),
-            'rate_limiter_stats': {
-                'active_keys': len(self.rate_limiter.requests)
-            }
+            'rate_limiter_stats': self.rate_limiter.get_stats()
         }
     
     async def cleanup_cache(self) -> Dict[str, int]:
@@ -638,7 +1030,8 @@ class PyrogramHelpers:
         self._start_cleanup_task()
         
         memory_cleaned = self.cache.cleanup_expired()
-        file_cleaned = await self.file_cache.clear()
+        # Hanya entry expired; file cache harus tetap ada setelah restart
+        file_cleaned = await self.file_cache.compact()
         
         return {
             'memory_cache_cleaned': memory_cleaned,
@@ -663,6 +1056,11 @@ class PyrogramHelpers:
             # Ignore errors during shutdown cleanup
             pass
         
+        try:
+            await self.file_cache.close()
+        except Exception as e:
+            console.error(f"Error closing file cache: {e}")
+        
         from syncara.console import console
         console.info("PyrogramHelpers shutdown completed")
 
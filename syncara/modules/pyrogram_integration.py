@@ -14,6 +14,7 @@ from .pyrogram_bound_methods import PyrogramBoundMethods
 from .pyrogram_helpers import PyrogramHelpers, pyrogram_helpers
 from .pyrogram_scheduler import PyrogramScheduler, pyrogram_scheduler
 from .pyrogram_compatibility import print_compatibility_info, AVAILABLE_TYPES
+from .chat_backup import serialize_message
 from syncara.console import console
 from pyrogram import types
 from typing import Union, Optional, List, Dict, Any, Callable
@@ -136,23 +137,7 @@ class CompletePyrogramMethods(PyrogramMethods, ChatMethods, InlineMethods, Callb
         try:
             messages = []
             async for message in self.get_chat_history(chat_id, limit=limit):
-                message_data = {
-                    "id": message.id,
-                    "from_user": {
-                        "id": message.from_user.id if message.from_user else None,
-                        "first_name": message.from_user.first_name if message.from_user else None,
-                        "username": message.from_user.username if message.from_user else None
-                    },
-                    "date": message.date,
-                    "text": message.text,
-                    "caption": message.caption,
-                    "media_type": message.media.value if message.media else None,
-                    "reply_to_message_id": message.reply_to_message_id,
-                    "forward_from": {
-                        "id": message.forward_from.id if message.forward_from else None,
-                        "first_name": message.forward_from.first_name if message.forward_from else None
-                    } if message.forward_from else None
-                }
+                message_data = serialize_message(message)
                 messages.append(message_data)
             
             console.info(f"Berhasil backup {len(messages)} pesan dari chat {chat_id}")
@@ -3,6 +3,7 @@ Scheduler untuk automated tasks dan fitur advanced.
 """
 
 import asyncio
+import heapq
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Callable, Union
@@ -11,6 +12,13 @@ from dataclasses import dataclass
 import json
 import os
 from croniter import croniter
+from syncara.modules.outbound import set_outbound_priority, PRIORITY_NORMAL
+
+SCHEDULER_CONFIG = {
+    "max_workers": 10,          # Task yang boleh berjalan bersamaan
+    "persist_debounce": 2.0,    # Detik menunggu sebelum menulis perubahan ke file
+    "idle_sleep": 3600          # Batas tidur saat heap kosong (dibangunkan oleh add_task)
+}
 
 @dataclass
 class ScheduledTask:
@@ -39,11 +47,24 @@ class PyrogramScheduler:
     Scheduler untuk menjalankan task secara otomatis.
     """
     
-    def __init__(self, persistent_file: str = "scheduled_tasks.json"):
+    def __init__(self, persistent_file: str = "scheduled_tasks.json", max_workers: int = None):
         self.tasks: Dict[str, ScheduledTask] = {}
         self.running = False
         self.persistent_file = persistent_file
         self.loop_task = None
+        self.max_workers = max_workers or SCHEDULER_CONFIG["max_workers"]
+        
+        # Min-heap (next_run timestamp, seq, task_id); entry usang diabaikan saat di-pop
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._workers: Optional[asyncio.Semaphore] = None
+        self._running_tasks: Dict[str, asyncio.Task] = {}
+        
+        # State persistent per task; hanya task yang berubah yang diserialisasi ulang
+        self._persisted: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._flush_task = None
         
         # Load persistent tasks
         self.load_persistent_tasks()
@@ -99,7 +120,8 @@ class PyrogramScheduler:
         )
         
         self.tasks[task_id] = task
-        self.save_persistent_tasks()
+        self._push(task)
+        self._mark_dirty(task_id)
         
         console.info(f"✅ Task '{name}' ({task_id}) added to scheduler")
         return True
@@ -111,7 +133,7 @@ class PyrogramScheduler:
         if task_id in self.tasks:
             task_name = self.tasks[task_id].name
             del self.tasks[task_id]
-            self.save_persistent_tasks()
+            self._mark_dirty(task_id)
             console.info(f"🗑️ Task '{task_name}' ({task_id}) removed from scheduler")
             return True
         return False
@@ -122,7 +144,8 @@ class PyrogramScheduler:
         """
         if task_id in self.tasks:
             self.tasks[task_id].enabled = True
-            self.save_persistent_tasks()
+            self._push(self.tasks[task_id])
+            self._mark_dirty(task_id)
             console.info(f"✅ Task '{self.tasks[task_id].name}' enabled")
             return True
         return False
@@ -133,7 +156,7 @@ class PyrogramScheduler:
         """
         if task_id in self.tasks:
             self.tasks[task_id].enabled = False
-            self.save_persistent_tasks()
+            self._mark_dirty(task_id)
             console.info(f"⏸️ Task '{self.tasks[task_id].name}' disabled")
             return True
         return False
@@ -167,6 +190,18 @@ class PyrogramScheduler:
         """
         return [self.get_task_status(task_id) for task_id in self.tasks.keys()]
     
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Statistik scheduler.
+        """
+        return {
+            'tasks': len(self.tasks),
+            'queued': len(self._heap),
+            'running': len(self._running_tasks),
+            'max_workers': self.max_workers,
+            'pending_writes': len(self._dirty)
+        }
+    
     async def start(self):
         """
         Memulai scheduler.
@@ -175,6 +210,14 @@ class PyrogramScheduler:
             return
         
         self.running = True
+        self._wakeup = asyncio.Event()
+        self._workers = asyncio.Semaphore(self.max_workers)
+        
+        # Bangun ulang heap dari semua task
+        self._heap = []
+        for task in self.tasks.values():
+            self._push(task)
+        
         self.loop_task = asyncio.create_task(self._scheduler_loop())
         console.info("🚀 Pyrogram Scheduler started")
     
@@ -194,31 +237,93 @@ class PyrogramScheduler:
             except asyncio.CancelledError:
                 pass
         
+        for running in list(self._running_tasks.values()):
+            running.cancel()
+        if self._running_tasks:
+            await asyncio.gather(*self._running_tasks.values(), return_exceptions=True)
+        
+        # Tulis perubahan yang masih tertunda
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self.save_persistent_tasks()
+        
         console.info("🛑 Pyrogram Scheduler stopped")
     
+    def _push(self, task: ScheduledTask):
+        """
+        Masukkan task ke heap jika siap dijadwalkan.
+        """
+        if not task.enabled or not task.next_run or task.func is None:
+            return
+        
+        self._seq += 1
+        heapq.heappush(self._heap, (task.next_run.timestamp(), self._seq, task.id))
+        if self._wakeup:
+            self._wakeup.set()
+    
+    def _is_current(self, due: float, task_id: str) -> bool:
+        """
+        Entry heap masih valid jika task ada, aktif, dan next_run belum berubah.
+        """
+        task = self.tasks.get(task_id)
+        return bool(
+            task and task.enabled and task.func is not None and task.next_run
+            and task.next_run.timestamp() == due
+        )
+    
     async def _scheduler_loop(self):
         """
-        Main loop scheduler.
+        Main loop scheduler: tidur sampai task terdekat jatuh tempo.
         """
+        # Pengiriman dari task terjadwal berada di lane normal (diwarisi _dispatch)
+        set_outbound_priority(PRIORITY_NORMAL)
+        
         while self.running:
             try:
-                current_time = datetime.now()
+                # Buang entry yang sudah tidak berlaku
+                while self._heap and not self._is_current(self._heap[0][0], self._heap[0][2]):
+                    heapq.heappop(self._heap)
+                
+                if not self._heap:
+                    delay = SCHEDULER_CONFIG["idle_sleep"]
+                else:
+                    delay = self._heap[0][0] - time.time()
                 
-                for task_id, task in list(self.tasks.items()):
-                    if not task.enabled:
-                        continue
-                    
-                    # Check if task should run
-                    if task.next_run and current_time >= task.next_run:
-                        await self._execute_task(task)
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
                 
-                # Sleep for 1 second
-                await asyncio.sleep(1)
+                _, _, task_id = heapq.heappop(self._heap)
+                if task_id in self._running_tasks:
+                    # Run sebelumnya belum selesai, jadwal ulang dihitung setelah selesai
+                    continue
+                
+                self._running_tasks[task_id] = asyncio.create_task(self._dispatch(self.tasks[task_id]))
                 
             except Exception as e:
                 console.error(f"Error in scheduler loop: {e}")
                 await asyncio.sleep(5)
     
+    async def _dispatch(self, task: ScheduledTask):
+        """
+        Jalankan task di bawah batas worker lalu jadwalkan run berikutnya.
+        """
+        try:
+            async with self._workers:
+                await self._execute_task(task)
+        finally:
+            self._running_tasks.pop(task.id, None)
+            # Jadwalkan task yang terdaftar sekarang: jika task_id diganti saat run
+            # ini berjalan, entry heap task pengganti sudah terbuang di loop
+            current = self.tasks.get(task.id)
+            if current is not None:
+                self._push(current)
+    
     async def _execute_task(self, task: ScheduledTask):
         """
         Menjalankan task.
@@ -230,7 +335,7 @@ class PyrogramScheduler:
             if task.max_runs and task.current_runs >= task.max_runs:
                 console.info(f"⏹️ Task {task.name} reached max runs ({task.max_runs})")
                 task.enabled = False
-                self.save_persistent_tasks()
+                self._mark_dirty(task.id)
                 return
             
             # Execute task with timeout
@@ -260,7 +365,7 @@ class PyrogramScheduler:
             await self._handle_task_failure(task)
         
         finally:
-            self.save_persistent_tasks()
+            self._mark_dirty(task.id)
     
     async def _handle_task_failure(self, task: ScheduledTask):
         """
@@ -294,32 +399,72 @@ class PyrogramScheduler:
         elif task.interval_seconds:
             task.next_run = datetime.now() + timedelta(seconds=task.interval_seconds)
     
+    def _serialize_task(self, task: ScheduledTask) -> Dict[str, Any]:
+        """
+        Data task yang bisa diserialisasi.
+        """
+        return {
+            'name': task.name,
+            'args': task.args,
+            'kwargs': task.kwargs,
+            'cron_expression': task.cron_expression,
+            'interval_seconds': task.interval_seconds,
+            'enabled': task.enabled,
+            'max_runs': task.max_runs,
+            'current_runs': task.current_runs,
+            'max_retries': task.max_retries,
+            'timeout_seconds': task.timeout_seconds,
+            'metadata': task.metadata,
+            'next_run': task.next_run.isoformat() if task.next_run else None,
+            'last_run': task.last_run.isoformat() if task.last_run else None
+        }
+    
+    def _mark_dirty(self, task_id: str):
+        """
+        Tandai task berubah; penulisan file di-batch dan di-debounce.
+        """
+        self._dirty.add(task_id)
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Di luar event loop, tulis langsung
+            self.save_persistent_tasks()
+            return
+        
+        if not self._flush_task or self._flush_task.done():
+            self._flush_task = loop.create_task(self._flush_later())
+    
+    async def _flush_later(self):
+        """
+        Tunggu jendela debounce lalu tulis semua perubahan sekaligus.
+        """
+        try:
+            await asyncio.sleep(SCHEDULER_CONFIG["persist_debounce"])
+            self.save_persistent_tasks()
+        except asyncio.CancelledError:
+            pass
+    
     def save_persistent_tasks(self):
         """
-        Menyimpan task ke file persistent.
+        Menyimpan task yang berubah ke file persistent (atomic replace).
         """
         try:
-            persistent_data = {}
-            for task_id, task in self.tasks.items():
-                # Only save serializable data
-                persistent_data[task_id] = {
-                    'name': task.name,
-                    'args': task.args,
-                    'kwargs': task.kwargs,
-                    'cron_expression': task.cron_expression,
-                    'interval_seconds': task.interval_seconds,
-                    'enabled': task.enabled,
-                    'max_runs': task.max_runs,
-                    'current_runs': task.current_runs,
-                    'max_retries': task.max_retries,
-                    'timeout_seconds': task.timeout_seconds,
-                    'metadata': task.metadata,
-                    'next_run': task.next_run.isoformat() if task.next_run else None,
-                    'last_run': task.last_run.isoformat() if task.last_run else None
-                }
+            dirty, self._dirty = self._dirty, set()
+            for task_id in dirty:
+                task = self.tasks.get(task_id)
+                if task:
+                    self._persisted[task_id] = self._serialize_task(task)
+                else:
+                    self._persisted.pop(task_id, None)
+            
+            if not dirty and os.path.exists(self.persistent_file):
+                return
             
-            with open(self.persistent_file, 'w') as f:
-                json.dump(persistent_data, f, indent=2)
+            temp_file = f"{self.persistent_file}.tmp"
+            with open(temp_file, 'w') as f:
+                json.dump(self._persisted, f, indent=2)
+            os.replace(temp_file, self.persistent_file)
                 
         except Exception as e:
             console.error(f"Error saving persistent tasks: {e}")
@@ -358,6 +503,7 @@ class PyrogramScheduler:
                 # Note: func will be None until re-registered
                 # This is intentional - functions can't be serialized
                 self.tasks[task_id] = task
+                self._persisted[task_id] = data
             
             console.info(f"📂 Loaded {len(persistent_data)} persistent tasks")
             
@@ -407,7 +553,12 @@ class PyrogramScheduler:
             task_id = f"backup_chat_{chat_id}"
         
         async def backup_chat():
-            await client.backup_lengkap_chat(chat_id=chat_id, limit=1000)
+            # Direktori per run: backup harian tidak melanjutkan backup yang sudah lengkap
+            await client.backup_lengkap_chat(
+                chat_id=chat_id,
+                limit=1000,
+                output_file=f"backup_chat_{chat_id}_{datetime.now().strftime('%Y%m%d_%H%M')}"
+            )
         
         return self.add_task(
             task_id=task_id,
@@ -8,9 +8,10 @@ from pyrogram.errors import RPCError
 from pyrogram.handlers import MessageHandler, CallbackQueryHandler, InlineQueryHandler
 from typing import Union, List, Optional, Dict, Any, Callable, BinaryIO
 from syncara.console import console
+from syncara.modules.chat_backup import ChatBackupWriter, find_resumable_backup, iter_backup_messages, load_media_index, MEDIA_DIR
+from syncara.modules.outbound import OutboundMixin
 import asyncio
 import time
-import json
 import os
 from datetime import datetime, timedelta
 
@@ -485,67 +486,40 @@ class UtilitiesMethods:
     async def backup_lengkap_chat(self, 
                                  chat_id: Union[int, str],
                                  include_media: bool = False,
-                                 output_file: Optional[str] = None) -> str:
+                                 output_file: Optional[str] = None,
+                                 limit: int = 0) -> str:
         """
-        Backup lengkap chat termasuk media (opsional).
+        Backup lengkap chat termasuk media (opsional), ditulis streaming
+        sebagai segmen JSON Lines gzip dan bisa dilanjutkan jika terputus.
         
         Args:
             chat_id: ID chat yang akan di-backup
             include_media: Apakah media ikut di-backup
-            output_file: File output untuk backup
+            output_file: Direktori output backup (direktori yang sama = lanjutkan backup)
+            limit: Jumlah pesan maksimum (0 = semua)
             
         Returns:
-            str: Path file backup
+            str: Path direktori backup
         """
         try:
             console.info(f"💾 Memulai backup lengkap chat {chat_id}...")
             
             if not output_file:
-                timestamp = int(time.time())
-                output_file = f"backup_chat_{chat_id}_{timestamp}.json"
-            
-            # Get chat info
-            chat_info = await self.get_info_chat(chat_id)
-            
-            # Get messages
-            messages = await self.backup_chat(chat_id, limit=0)  # All messages
-            
-            backup_data = {
-                "chat_info": {
-                    "id": chat_info.id,
-                    "type": chat_info.type,
-                    "title": chat_info.title,
-                    "username": chat_info.username,
-                    "description": chat_info.description
-                },
-                "backup_date": datetime.now().isoformat(),
-                "total_messages": len(messages),
-                "include_media": include_media,
-                "messages": messages
-            }
-            
-            # Download media if requested
-            if include_media:
-                console.info("📥 Downloading media files...")
-                media_dir = f"backup_media_{chat_id}_{int(time.time())}"
-                os.makedirs(media_dir, exist_ok=True)
-                
-                for i, msg in enumerate(messages):
-                    if msg.get('media_type'):
-                        try:
-                            # This would need actual message object, simplified for now
-                            console.info(f"📥 Downloading media {i+1}/{len(messages)}")
-                        except Exception as e:
-                            console.error(f"Error downloading media {i}: {e}")
-                
-                backup_data["media_directory"] = media_dir
-            
-            # Save backup
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            console.info(f"✅ Backup selesai: {output_file}")
-            return output_file
+                # Lanjutkan backup hari ini yang belum lengkap (mode media sama);
+                # selain itu selalu buat direktori baru, bukan mengembalikan backup lama
+                prefix = f"backup_chat_{chat_id}_{datetime.now().strftime('%Y%m%d')}"
+                output_file = find_resumable_backup(prefix, include_media)
+                if not output_file:
+                    output_file = prefix if not os.path.exists(prefix) else f"{prefix}_{datetime.now().strftime('%H%M%S')}"
+            
+            writer = ChatBackupWriter(self, chat_id, output_file, include_media=include_media)
+            backup_dir = await writer.run(limit=limit)
+            
+            console.info(
+                f"✅ Backup selesai: {backup_dir} ({writer.manifest['total_messages']} pesan, "
+                f"{writer.manifest.get('total_media', 0)} media)"
+            )
+            return backup_dir
         except Exception as e:
             console.error(f"Error backup lengkap chat: {e}")
             raise
@@ -555,10 +529,10 @@ class UtilitiesMethods:
                                       target_chat_id: Union[int, str],
                                       include_media: bool = False) -> bool:
         """
-        Restore chat dari file backup.
+        Restore chat dari backup (direktori streaming atau file .json lama).
         
         Args:
-            backup_file: File backup yang akan di-restore
+            backup_file: Path backup yang akan di-restore
             target_chat_id: ID chat tujuan restore
             include_media: Apakah media ikut di-restore
             
@@ -571,29 +545,40 @@ class UtilitiesMethods:
             if not os.path.exists(backup_file):
                 raise FileNotFoundError(f"File backup tidak ditemukan: {backup_file}")
             
-            with open(backup_file, 'r', encoding='utf-8') as f:
-                backup_data = json.load(f)
-            
-            messages = backup_data.get('messages', [])
-            console.info(f"📨 Akan restore {len(messages)} pesan")
+            media_index = load_media_index(backup_file) if include_media and os.path.isdir(backup_file) else {}
+            media_root = os.path.join(backup_file, MEDIA_DIR)
             
             restored_count = 0
-            for msg in messages:
+            total_count = 0
+            async for msg in iter_backup_messages(backup_file):
+                total_count += 1
                 try:
-                    # Restore text messages
-                    if msg.get('text'):
+                    media_path = media_index.get(msg.get('file_unique_id'))
+                    if media_path:
+                        caption = msg.get('caption') or msg.get('text')
+                        await self.send_document(
+                            chat_id=target_chat_id,
+                            document=os.path.join(media_root, media_path),
+                            caption=f"[RESTORED] {caption}" if caption else "[RESTORED]"
+                        )
+                    elif msg.get('text'):
+                        # Restore text messages
                         await self.kirim_pesan(
                             chat_id=target_chat_id,
                             text=f"[RESTORED] {msg['text']}"
                         )
-                        restored_count += 1
-                        await asyncio.sleep(1)  # Rate limiting
+                    else:
+                        continue
+                    restored_count += 1
+                    # Rate limiting ditangani outbound dispatcher jika tersedia
+                    if not isinstance(self, OutboundMixin):
+                        await asyncio.sleep(1)
                 
                 except Exception as e:
                     console.error(f"Error restore pesan: {e}")
                     continue
             
-            console.info(f"✅ Restore selesai: {restored_count}/{len(messages)} pesan")
+            console.info(f"✅ Restore selesai: {restored_count}/{total_count} pesan")
             return True
         except Exception as e:
             console.error(f"Error restore chat: {e}")
@@ -0,0 +1,274 @@
+# syncara/modules/python_sandbox.py
+"""
+Pool worker process untuk menjalankan snippet Python dari PYTHON:EXEC.
+Setiap worker adalah interpreter terpisah (mode isolated) dengan rlimit
+CPU/memori, dipakai ulang antar eksekusi, dan di-kill jika melewati batas
+waktu, sehingga kode pengguna tidak pernah memblokir event loop bot.
+"""
+
+import os
+import sys
+import json
+import asyncio
+from typing import Any, Dict, Optional
+from syncara.console import console
+
+SANDBOX_CONFIG = {
+    "workers": min(4, os.cpu_count() or 1),  # Worker yang di-pre-fork
+    "cpu_seconds": 5,                         # RLIMIT_CPU per eksekusi
+    "memory_mb": 256,                         # RLIMIT_AS per worker
+    "wall_timeout": 10,                       # Detik sebelum worker di-kill
+    "max_output": 4000,                       # Karakter output maksimum
+    "max_calls_per_worker": 200               # Recycle worker setelah N eksekusi
+}
+
+# Source worker dijalankan via `python -I -S -c`, tidak mengimpor package bot
+WORKER_SOURCE = r'''
+import sys, io, json, math, contextlib
+cpu_seconds, memory_bytes, max_output = (int(arg) for arg in sys.argv[1:4])
+
+try:
+    import resource
+    resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    try:
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    except (ValueError, OSError):
+        pass
+    _, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+except ImportError:
+    resource = None
+
+SAFE_BUILTINS = {
+    'print': print, 'len': len, 'str': str, 'int': int, 'float': float,
+    'bool': bool, 'list': list, 'dict': dict, 'tuple': tuple, 'set': set,
+    'range': range, 'enumerate': enumerate, 'zip': zip, 'map': map,
+    'filter': filter, 'sum': sum, 'min': min, 'max': max, 'abs': abs,
+    'round': round, 'pow': pow, 'divmod': divmod,
+}
+
+requests, replies = sys.stdin.buffer, sys.stdout.buffer
+sys.stdin = io.StringIO()
+
+def truncate(text):
+    if text is not None and len(text) > max_output:
+        return text[:max_output] + "\n... (output truncated)"
+    return text
+
+for line in requests:
+    code = json.loads(line)["code"]
+
+    if resource is not None:
+        # Batas CPU relatif terhadap pemakaian sejauh ini (worker dipakai ulang)
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds + 1
+        if cpu_hard != resource.RLIM_INFINITY:
+            soft = min(soft, cpu_hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, cpu_hard))
+
+    captured = io.StringIO()
+    result = {'success': True, 'output': None, 'return_value': None, 'error': None}
+    try:
+        namespace = {'__builtins__': dict(SAFE_BUILTINS), 'math': math}
+        with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+            # Expression dulu (kalkulasi), jika bukan expression jalankan sebagai statement
+            try:
+                compiled, is_expression = compile(code, '<sandbox>', 'eval'), True
+            except SyntaxError:
+                compiled, is_expression = compile(code, '<sandbox>', 'exec'), False
+            return_value = eval(compiled, namespace)
+            if is_expression and return_value is not None:
+                print(return_value)
+                result['return_value'] = truncate(str(return_value))
+    except MemoryError:
+        result.update(success=False, error='Memory limit exceeded')
+    except BaseException as e:
+        result.update(success=False, error=f"{type(e).__name__}: {e}")
+
+    output = captured.getvalue().strip()
+    result['output'] = truncate(output) if output else None
+    del captured
+    replies.write(json.dumps(result).encode() + b"\n")
+    replies.flush()
+'''
+
+class _SandboxWorker:
+    """Satu worker process yang dipakai ulang"""
+
+    __slots__ = ("process", "calls")
+
+    def __init__(self, process):
+        self.process = process
+        self.calls = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+class PythonSandboxPool:
+    """
+    Pool worker process dengan antrian idle. Eksekusi berjalan paralel
+    sebanyak jumlah worker; sisanya menunggu worker kosong.
+    """
+
+    def __init__(self, size: int = None):
+        self.size = size or SANDBOX_CONFIG["workers"]
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers = set()
+        self._spawning = 0
+        self._start_lock = None
+        self.stats = {
+            "executions": 0,
+            "timeouts": 0,
+            "killed": 0,
+            "respawns": 0
+        }
+
+    async def _spawn(self) -> Optional[_SandboxWorker]:
+        self._spawning += 1
+        try:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-I", "-S", "-c", WORKER_SOURCE,
+                str(SANDBOX_CONFIG["cpu_seconds"]),
+                str(SANDBOX_CONFIG["memory_mb"] * 1024 * 1024),
+                str(SANDBOX_CONFIG["max_output"]),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                start_new_session=True,
+                limit=1024 * 1024
+            )
+            worker = _SandboxWorker(process)
+            self._workers.add(worker)
+            return worker
+        except Exception as e:
+            console.error(f"[SANDBOX] Gagal membuat worker: {e}")
+            return None
+        finally:
+            self._spawning -= 1
+
+    async def start(self):
+        """Pre-fork semua worker"""
+        if self._idle is not None:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+
+        async with self._start_lock:
+            if self._idle is not None:
+                return
+            idle = asyncio.Queue()
+            workers = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+            for worker in workers:
+                if worker:
+                    idle.put_nowait(worker)
+            self._idle = idle
+            console.info(f"[SANDBOX] {idle.qsize()} Python worker siap")
+
+    async def _kill(self, worker: _SandboxWorker):
+        self._workers.discard(worker)
+        if worker.alive:
+            try:
+                worker.process.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await worker.process.wait()
+        except Exception:
+            pass
+
+    async def _replace(self, worker: _SandboxWorker):
+        """Ganti worker yang mati/di-recycle dengan worker baru"""
+        await self._kill(worker)
+        if self._idle is None:
+            return
+        replacement = await self._spawn()
+        if replacement and self._idle is None:
+            await self._kill(replacement)
+        elif replacement:
+            self.stats["respawns"] += 1
+            self._idle.put_nowait(replacement)
+
+    async def _acquire(self) -> _SandboxWorker:
+        # Pool menyusut jika spawn pernah gagal, isi lagi sesuai kebutuhan
+        if self._idle.empty() and len(self._workers) + self._spawning < self.size:
+            worker = await self._spawn()
+            if worker:
+                return worker
+        return await self._idle.get()
+
+    async def execute(self, code: str, timeout: float = None) -> Dict[str, Any]:
+        """
+        Jalankan code di worker. Return dict dengan success, output,
+        return_value dan error (format sama dengan eksekusi in-process lama).
+        """
+        await self.start()
+        timeout = timeout or SANDBOX_CONFIG["wall_timeout"]
+        worker = await self._acquire()
+        recycle = False
+
+        try:
+            worker.process.stdin.write(json.dumps({"code": code}).encode() + b"\n")
+            await worker.process.stdin.drain()
+            line = await asyncio.wait_for(worker.process.stdout.readline(), timeout=timeout)
+
+            if not line:
+                # Worker mati di tengah eksekusi (SIGXCPU / OOM)
+                recycle = True
+                returncode = await worker.process.wait()
+                self.stats["killed"] += 1
+                return {
+                    'success': False,
+                    'output': None,
+                    'return_value': None,
+                    'error': f"Execution killed: CPU/memory limit exceeded (exit code {returncode})"
+                }
+
+            worker.calls += 1
+            recycle = worker.calls >= SANDBOX_CONFIG["max_calls_per_worker"]
+            return json.loads(line)
+
+        except asyncio.TimeoutError:
+            recycle = True
+            self.stats["timeouts"] += 1
+            return {
+                'success': False,
+                'output': None,
+                'return_value': None,
+                'error': f"Execution timed out after {timeout}s"
+            }
+        except Exception as e:
+            recycle = True
+            console.error(f"[SANDBOX] Error komunikasi dengan worker: {e}")
+            return {
+                'success': False,
+                'output': None,
+                'return_value': None,
+                'error': str(e)
+            }
+        finally:
+            self.stats["executions"] += 1
+            if self._idle is None:
+                # Pool sudah ditutup selama eksekusi
+                asyncio.create_task(self._kill(worker))
+            elif recycle or not worker.alive:
+                asyncio.create_task(self._replace(worker))
+            else:
+                self._idle.put_nowait(worker)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "size": self.size,
+            "workers": len(self._workers),
+            "idle": self._idle.qsize() if self._idle else 0
+        }
+
+    async def close(self):
+        """Hentikan semua worker"""
+        workers = list(self._workers)
+        await asyncio.gather(*(self._kill(worker) for worker in workers), return_exceptions=True)
+        self._idle = None
+
+# Global instance
+python_sandbox = PythonSandboxPool()
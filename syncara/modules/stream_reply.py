@@ -0,0 +1,273 @@
+# syncara/modules/stream_reply.py
+"""
+Streaming reply ke Telegram: placeholder message yang di-edit progresif
+saat token dari model masuk, dengan deteksi shortcode incremental.
+"""
+
+import re
+import time
+import asyncio
+from typing import List, Optional, Tuple
+from pyrogram import enums
+from pyrogram.errors import FloodWait, MessageNotModified
+from syncara.console import console
+from syncara.shortcode import SHORTCODE_PATTERN
+
+# Prefix yang masih mungkin menjadi shortcode (belum ada ']' penutup)
+PARTIAL_SHORTCODE_PATTERN = re.compile(r'\[[A-Z]*(?::[A-Z_]*(?::[^\]]*)?)?')
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+STREAMING_CONFIG = {
+    "enabled": True,
+    "placeholder": "💭 ...",
+    "cursor": " ▌",
+    "edit_interval_private": 1.0,   # Detik minimum antar edit di private chat
+    "edit_interval_group": 3.0,     # Grup lebih ketat (~20 edit/menit)
+    "min_new_chars": 20,            # Jangan edit jika perubahan terlalu kecil
+    "max_pending_shortcode": 8000,  # Batas teks yang ditahan untuk shortcode belum tertutup
+    "final_flood_wait_limit": 30    # FloodWait maksimum yang ditunggu untuk edit final
+}
+
+class StreamingShortcodeFilter:
+    """
+    Memisahkan teks yang aman ditampilkan dari shortcode saat stream berjalan.
+    Shortcode terdeteksi ketika ']' penutupnya tiba; prefix yang belum lengkap
+    ditahan agar pengguna tidak melihat shortcode mentah.
+    """
+
+    def __init__(self, max_pending: int = None):
+        self.raw_text = ""
+        self.display_text = ""
+        self.shortcodes: List[Tuple[str, str]] = []
+        self._pending = ""
+        self._max_pending = max_pending or STREAMING_CONFIG["max_pending_shortcode"]
+
+    def feed(self, chunk: str) -> str:
+        """Tambahkan potongan token, kembalikan display text terbaru"""
+        self.raw_text += chunk
+        self._pending += chunk
+
+        while self._pending:
+            index = self._pending.find('[')
+            if index == -1:
+                self.display_text += self._pending
+                self._pending = ""
+                break
+
+            self.display_text += self._pending[:index]
+            self._pending = self._pending[index:]
+
+            match = SHORTCODE_PATTERN.match(self._pending)
+            if match:
+                self.shortcodes.append((match.group(1), (match.group(2) or "").strip()))
+                console.info(f"[STREAM] Shortcode terdeteksi: {match.group(1)}")
+                self._pending = self._pending[match.end():]
+                continue
+
+            if PARTIAL_SHORTCODE_PATTERN.fullmatch(self._pending) and len(self._pending) < self._max_pending:
+                # Tunggu chunk berikutnya
+                break
+
+            # Bukan shortcode, tampilkan '[' apa adanya
+            self.display_text += '['
+            self._pending = self._pending[1:]
+
+        return self.display_text
+
+    def flush(self) -> str:
+        """Akhir stream: sisa pending yang tidak menjadi shortcode ditampilkan"""
+        self.display_text += self._pending
+        self._pending = ""
+        return self.display_text
+
+class StreamingReplyEditor:
+    """
+    Mengirim placeholder lalu meng-edit pesan secara coalesced, menghormati
+    batas edit Telegram dan menyerap FloodWait tanpa menghentikan stream.
+    """
+
+    def __init__(self, client, message, edit_interval: float = None):
+        self.client = client
+        self.chat_id = message.chat.id
+        self.reply_to_message_id = message.id
+        if edit_interval is None:
+            is_private = message.chat.type == enums.ChatType.PRIVATE
+            edit_interval = STREAMING_CONFIG["edit_interval_private" if is_private else "edit_interval_group"]
+        self.edit_interval = edit_interval
+        self.message = None
+        self.first_token_at = None
+        self.edit_count = 0
+        self._started_at = time.monotonic()
+        self._last_edit_at = 0.0
+        self._last_text = ""
+        self._blocked_until = 0.0
+
+    async def start(self):
+        """Kirim placeholder message"""
+        self.message = await self.client.send_message(
+            chat_id=self.chat_id,
+            text=STREAMING_CONFIG["placeholder"],
+            reply_to_message_id=self.reply_to_message_id
+        )
+        return self.message
+
+    async def _edit(self, text: str, parse_mode=None) -> bool:
+        try:
+            edited = await self.client.edit_message_text(
+                chat_id=self.chat_id,
+                message_id=self.message.id,
+                text=text,
+                parse_mode=parse_mode
+            )
+            if edited:
+                self.message = edited
+            self.edit_count += 1
+            return True
+        except MessageNotModified:
+            return True
+        except FloodWait as e:
+            self._blocked_until = time.monotonic() + e.value
+            console.warning(f"[STREAM] FloodWait {e.value}s saat edit, menunda update")
+            return False
+
+    async def update(self, text: str):
+        """Edit pesan dengan teks parsial jika interval sudah lewat"""
+        if not self.message or not text.strip():
+            return
+
+        now = time.monotonic()
+        if self.first_token_at is None:
+            self.first_token_at = now - self._started_at
+
+        if now < self._blocked_until or now - self._last_edit_at < self.edit_interval:
+            return
+        # Edit pertama langsung, selanjutnya tunggu perubahan yang berarti
+        if self._last_text and len(text) - len(self._last_text) < STREAMING_CONFIG["min_new_chars"]:
+            return
+
+        visible = text[:TELEGRAM_MESSAGE_LIMIT - len(STREAMING_CONFIG["cursor"])]
+        # Parse mode dimatikan selama stream agar markdown setengah jadi tidak error
+        if await self._edit(visible + STREAMING_CONFIG["cursor"], parse_mode=enums.ParseMode.DISABLED):
+            self._last_text = text
+        self._last_edit_at = time.monotonic()
+
+    async def _final_edit(self, text: str) -> bool:
+        """Edit final; tunggu FloodWait (dalam batas) dan coba sekali lagi"""
+        for _ in range(2):
+            wait = self._blocked_until - time.monotonic()
+            if wait > STREAMING_CONFIG["final_flood_wait_limit"]:
+                return False
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                if await self._edit(text):
+                    return True
+            except Exception as e:
+                # Markdown final bisa gagal di-parse, kirim sebagai teks biasa
+                console.warning(f"[STREAM] Edit final gagal ({e}), retry tanpa parse mode")
+                try:
+                    if await self._edit(text, parse_mode=enums.ParseMode.DISABLED):
+                        return True
+                except Exception as e2:
+                    console.warning(f"[STREAM] Edit final tanpa parse mode gagal: {e2}")
+                    return False
+        return False
+
+    async def finalize(self, text: str) -> List:
+        """
+        Edit final dengan parse mode default, pecah jika melebihi batas Telegram.
+        Jika edit final tidak bisa dilakukan, teks dikirim sebagai pesan baru
+        agar pengguna tidak tertinggal dengan teks parsial. Return semua pesan
+        yang berisi balasan final.
+        """
+        if not self.message:
+            return []
+
+        text = text.strip() or "No valid response generated"
+        parts = [text[i:i + TELEGRAM_MESSAGE_LIMIT] for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)]
+
+        if not await self._final_edit(parts[0]):
+            console.warning("[STREAM] Edit final tidak terkirim, mengirim balasan sebagai pesan baru")
+            placeholder = self.message
+            self.message = await self.client.send_message(
+                chat_id=self.chat_id,
+                text=parts[0],
+                reply_to_message_id=self.reply_to_message_id
+            )
+            try:
+                await self.client.delete_messages(self.chat_id, placeholder.id)
+            except Exception as e:
+                console.warning(f"[STREAM] Gagal menghapus pesan parsial: {e}")
+
+        sent_messages = [self.message]
+        for part in parts[1:]:
+            sent_messages.append(await self.client.send_message(
+                chat_id=self.chat_id,
+                text=part,
+                reply_to_message_id=self.reply_to_message_id
+            ))
+        return sent_messages
+
+    async def discard(self):
+        """Hapus placeholder jika stream gagal sebelum token pertama"""
+        if self.message:
+            try:
+                await self.client.delete_messages(self.chat_id, self.message.id)
+            except Exception as e:
+                console.warning(f"[STREAM] Gagal menghapus placeholder: {e}")
+            self.message = None
+
+    def get_stats(self) -> dict:
+        return {
+            "time_to_first_token": self.first_token_at,
+            "edits": self.edit_count,
+            "total_time": time.monotonic() - self._started_at
+        }
+
+async def stream_ai_reply(client, message, token_stream, process_shortcodes, on_sent=None) -> Optional[str]:
+    """
+    Konsumsi token_stream dan tampilkan progresif di Telegram.
+    Return teks final yang sudah diproses shortcode, atau None jika stream
+    gagal sebelum token pertama (caller dapat fallback ke mode non-streaming).
+    on_sent(client, sent_message) dipanggil untuk setiap pesan balasan final.
+    """
+    editor = StreamingReplyEditor(client, message)
+    shortcode_filter = StreamingShortcodeFilter()
+
+    await editor.start()
+
+    try:
+        async for chunk in token_stream:
+            display_text = shortcode_filter.feed(chunk)
+            await editor.update(display_text)
+    except Exception as e:
+        if not shortcode_filter.raw_text:
+            console.error(f"[STREAM] Stream gagal sebelum token pertama: {e}")
+            await editor.discard()
+            return None
+        console.error(f"[STREAM] Stream terputus, memakai output parsial: {e}")
+
+    if not shortcode_filter.raw_text.strip():
+        await editor.discard()
+        return None
+
+    shortcode_filter.flush()
+
+    # Eksekusi shortcode memakai pipeline yang sama dengan mode non-streaming
+    if shortcode_filter.shortcodes:
+        processed_response = await process_shortcodes(shortcode_filter.raw_text, client, message)
+    else:
+        processed_response = shortcode_filter.display_text
+
+    sent_messages = await editor.finalize(processed_response)
+    if on_sent:
+        for sent_message in sent_messages:
+            await on_sent(client, sent_message)
+
+    stats = editor.get_stats()
+    console.info(
+        f"[STREAM] Selesai: first token {stats['time_to_first_token'] or 0:.2f}s, "
+        f"{stats['edits']} edit, total {stats['total_time']:.2f}s"
+    )
+    return processed_response
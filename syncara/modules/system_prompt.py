@@ -6,6 +6,65 @@ import json
 import xml.etree.ElementTree as ET
 import glob
 import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from string import Formatter
+
+PROMPT_CACHE_CONFIG = {
+    "file_check_interval": 5,       # Detik antar pengecekan mtime file persona
+    "filter_by_chat_type": True,    # Hanya sertakan kategori shortcode yang relevan
+    "excluded_categories": {
+        # Manajemen member/grup tidak berguna di private chat
+        "private": ("GROUP", "USER")
+    }
+}
+
+JAKARTA_TZ = pytz.timezone('Asia/Jakarta')
+
+# Persona untuk task yang sedang berjalan (lihat SystemPrompt.use_prompt)
+_active_persona = ContextVar("system_prompt_persona", default=None)
+
+SHORTCODE_GUIDELINES = """
+
+📋 SHORTCODE EXECUTION GUIDELINES:
+- ALWAYS create files before trying to export/show/edit them
+- Use CANVAS:CREATE before CANVAS:EXPORT
+- Use CANVAS:LIST to check available files first
+- Check admin privileges before using USER/GROUP commands
+- Test shortcodes in correct order to avoid failures
+- Use TODO:CREATE before TODO:COMPLETE/DELETE/UPDATE
+- Use TODO:LIST to check existing todos first
+
+
+🎨 CANVAS SHORTCODE EXAMPLES:
+CORRECT ORDER:
+1. [CANVAS:CREATE:myfile.txt:txt:File content with\\nNewlines]
+2. [CANVAS:EXPORT:myfile.txt]
+
+WRONG ORDER (will fail):
+1. [CANVAS:EXPORT:myfile.txt] ❌ File doesn't exist yet
+2. [CANVAS:CREATE:myfile.txt:txt:Content] ✅ File created
+
+NEWLINE HANDLING:
+- Use \\n for line breaks in content
+- Example: 'Line 1\\nLine 2\\nLine 3' becomes proper newlines
+- Don't use literal newlines in shortcode parameters
+
+📝 TODO MANAGEMENT EXAMPLES:
+BASIC TODO OPERATIONS:
+1. [TODO:CREATE:Belajar Python programming]
+2. [TODO:LIST:] - View all todos
+3. [TODO:COMPLETE:1] - Mark first todo as done
+4. [TODO:UPDATE:2:Setup Docker environment]
+5. [TODO:DELETE:3] - Delete todo by ID
+6. [TODO:STATS:] - Show todo statistics
+
+TODO FILTERING:
+- [TODO:LIST:pending] - Show only pending todos
+- [TODO:LIST:completed] - Show only completed todos
+- [TODO:CLEAR:] - Clear all completed todos
+"""
 
 class SystemPrompt:
     _instance = None
@@ -19,6 +78,11 @@ class SystemPrompt:
     
     def _initialize(self):
         """Initialize the system prompt templates"""
+        self._prompt_files = {}      # prompt_key -> (path, mtime)
+        self._prompt_versions = {}   # prompt_key -> counter reload
+        self._compiled = {}          # (persona, excluded categories) -> (version, parts)
+        self._files_checked_at = time.monotonic()
+        
         # Load all system prompts from system_promt folder
         self._load_system_prompts()
         
@@ -32,30 +96,7 @@ class SystemPrompt:
             prompt_files = glob.glob("system_promt/*.xml")
             
             for file_path in prompt_files:
-                try:
-                    # Get prompt name from filename (without extension)
-                    prompt_name = os.path.basename(file_path).split('.')[0].upper()
-                    
-                    # Read file content
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        content = file.read()
-                        
-                    # Extract prompt content
-                    if ':"""' in content:
-                        # Format: NAME:"""content"""
-                        prompt_key, prompt_content = content.split(':"""', 1)
-                        prompt_content = prompt_content.rsplit('"""', 1)[0]
-                    else:
-                        # Just use the whole content
-                        prompt_key = prompt_name
-                        prompt_content = content
-                    
-                    # Store in prompts dictionary
-                    self._prompts[prompt_key] = prompt_content
-                    print(f"Loaded system prompt: {prompt_key}")
-                    
-                except Exception as e:
-                    print(f"Error loading prompt from {file_path}: {str(e)}")
+                self._load_prompt_file(file_path)
             
             print(f"Loaded {len(self._prompts)} system prompts")
             
@@ -83,6 +124,36 @@ Gunakan format shortcode sesuai permintaan user. Handler baru akan aktif setelah
 """
             self._prompts["DEFAULT"] = SYSTEM_PROMPT
     
+    def _load_prompt_file(self, file_path):
+        """Load satu file persona dan tandai template terkompilasinya usang"""
+        try:
+            # Get prompt name from filename (without extension)
+            prompt_name = os.path.basename(file_path).split('.')[0].upper()
+            mtime = os.path.getmtime(file_path)
+            
+            # Read file content
+            with open(file_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+                
+            # Extract prompt content
+            if ':"""' in content:
+                # Format: NAME:"""content"""
+                prompt_key, prompt_content = content.split(':"""', 1)
+                prompt_content = prompt_content.rsplit('"""', 1)[0]
+            else:
+                # Just use the whole content
+                prompt_key = prompt_name
+                prompt_content = content
+            
+            # Store in prompts dictionary
+            self._prompts[prompt_key] = prompt_content
+            self._prompt_files[prompt_key] = (file_path, mtime)
+            self._prompt_versions[prompt_key] = self._prompt_versions.get(prompt_key, 0) + 1
+            print(f"Loaded system prompt: {prompt_key}")
+            
+        except Exception as e:
+            print(f"Error loading prompt from {file_path}: {str(e)}")
+    
     def set_prompt(self, prompt_name):
         """Set the current prompt by name"""
         prompt_name = prompt_name.upper()
@@ -118,97 +189,131 @@ Gunakan format shortcode sesuai permintaan user. Handler baru akan aktif setelah
 - Prioritas respons maksimal! """
         return ""
 
+    def _get_shortcode_capabilities(self, exclude_categories=()) -> str:
+        """Bagian shortcode statis: docs registry + guideline"""
+        # Get shortcode capabilities from registry
+        try:
+            from syncara.shortcode import registry
+            shortcode_capabilities = registry.get_shortcode_docs(exclude_categories)
+        except ImportError as e:
+            print(f"Import error for shortcode registry: {e}")
+            try:
+                # Fallback to direct import
+                from syncara.shortcode import SHORTCODE_DESCRIPTIONS
+                shortcode_capabilities = "Available Shortcodes:\n"
+                for shortcode, desc in SHORTCODE_DESCRIPTIONS.items():
+                    shortcode_capabilities += f"- [{shortcode}] - {desc}\n"
+            except ImportError as e2:
+                print(f"Fallback import error: {e2}")
+                shortcode_capabilities = "Shortcode system not available"
+        except Exception as e:
+            print(f"Error getting shortcode capabilities: {e}")
+            shortcode_capabilities = "Shortcode system not available"
+        
+        return shortcode_capabilities + SHORTCODE_GUIDELINES
+
+    @staticmethod
+    def _registry_version():
+        try:
+            from syncara.shortcode import registry
+            return registry.version
+        except Exception:
+            return None
+
+    def _check_prompt_files(self):
+        """Reload file persona yang berubah (dicek paling sering sekali per interval)"""
+        now = time.monotonic()
+        if now - self._files_checked_at < PROMPT_CACHE_CONFIG["file_check_interval"]:
+            return
+        self._files_checked_at = now
+        for prompt_key, (file_path, mtime) in list(self._prompt_files.items()):
+            try:
+                if os.path.getmtime(file_path) != mtime:
+                    self._load_prompt_file(file_path)
+            except OSError:
+                continue
+
+    def _compile(self, prompt_name: str, exclude_categories: frozenset):
+        """
+        Pecah template persona menjadi potongan literal + nama field dinamis.
+        Field statis (ownerList, shortcode_capabilities) langsung disisipkan.
+        """
+        template = self._prompts.get(prompt_name, self._prompts.get("DEFAULT", ""))
+        static_values = {
+            "ownerList": ', '.join([str(id) for id in OWNER_ID]),
+            "shortcode_capabilities": self._get_shortcode_capabilities(exclude_categories)
+        }
+        
+        parts = []
+        literal = []
+        for text, field_name, format_spec, conversion in Formatter().parse(template):
+            literal.append(text)
+            if field_name is None:
+                continue
+            if field_name in static_values:
+                literal.append(format(static_values[field_name], format_spec or ""))
+            else:
+                parts.append("".join(literal))
+                parts.append((field_name, format_spec or ""))
+                literal = []
+        parts.append("".join(literal))
+        return parts
+
     def get_chat_prompt(self, context: dict) -> str:
         """Get the formatted system prompt with current context"""
         try:
-            # Get current time in Asia/Jakarta timezone
-            tz = pytz.timezone('Asia/Jakarta')
-            current_time = datetime.now(tz).strftime("%Y-%m-%d %H:%M:%S %Z")
+            self._check_prompt_files()
             
-            # Get shortcode capabilities from registry
-            try:
-                from syncara.shortcode import registry
-                shortcode_capabilities = registry.get_shortcode_docs()
-                print(f"Shortcode capabilities loaded: {len(registry.descriptions)} descriptions")
-            except ImportError as e:
-                print(f"Import error for shortcode registry: {e}")
-                try:
-                    # Fallback to direct import
-                    from syncara.shortcode import SHORTCODE_DESCRIPTIONS
-                    shortcode_capabilities = "Available Shortcodes:\n"
-                    for shortcode, desc in SHORTCODE_DESCRIPTIONS.items():
-                        shortcode_capabilities += f"- [{shortcode}] - {desc}\n"
-                except ImportError as e2:
-                    print(f"Fallback import error: {e2}")
-                    shortcode_capabilities = "Shortcode system not available"
-            except Exception as e:
-                print(f"Error getting shortcode capabilities: {e}")
-                shortcode_capabilities = "Shortcode system not available"
+            prompt_name = _active_persona.get() or self.current_prompt_name
+            exclude_categories = frozenset()
+            if PROMPT_CACHE_CONFIG["filter_by_chat_type"]:
+                exclude_categories = frozenset(
+                    PROMPT_CACHE_CONFIG["excluded_categories"].get(context.get('chat_type'), ())
+                )
             
-            # Add shortcode execution order guidelines
-            shortcode_capabilities += "\n\n📋 SHORTCODE EXECUTION GUIDELINES:\n"
-            shortcode_capabilities += "- ALWAYS create files before trying to export/show/edit them\n"
-            shortcode_capabilities += "- Use CANVAS:CREATE before CANVAS:EXPORT\n"
-            shortcode_capabilities += "- Use CANVAS:LIST to check available files first\n"
-            shortcode_capabilities += "- Check admin privileges before using USER/GROUP commands\n"
-            shortcode_capabilities += "- Test shortcodes in correct order to avoid failures\n"
-            shortcode_capabilities += "- Use TODO:CREATE before TODO:COMPLETE/DELETE/UPDATE\n"
-            shortcode_capabilities += "- Use TODO:LIST to check existing todos first\n"
+            # Template terkompilasi di-cache per persona + filter kategori,
+            # invalid otomatis saat registry atau file persona berubah
+            cache_key = (prompt_name, exclude_categories)
+            version = (self._registry_version(), self._prompt_versions.get(prompt_name, 0))
+            cached = self._compiled.get(cache_key)
+            if cached is None or cached[0] != version:
+                cached = (version, self._compile(prompt_name, exclude_categories))
+                self._compiled[cache_key] = cached
+            parts = cached[1]
             
-            # Add canvas shortcode examples
-            shortcode_capabilities += "\n\n🎨 CANVAS SHORTCODE EXAMPLES:\n"
-            shortcode_capabilities += "CORRECT ORDER:\n"
-            shortcode_capabilities += "1. [CANVAS:CREATE:myfile.txt:txt:File content with\\nNewlines]\n"
-            shortcode_capabilities += "2. [CANVAS:EXPORT:myfile.txt]\n\n"
-            shortcode_capabilities += "WRONG ORDER (will fail):\n"
-            shortcode_capabilities += "1. [CANVAS:EXPORT:myfile.txt] ❌ File doesn't exist yet\n"
-            shortcode_capabilities += "2. [CANVAS:CREATE:myfile.txt:txt:Content] ✅ File created\n\n"
-            shortcode_capabilities += "NEWLINE HANDLING:\n"
-            shortcode_capabilities += "- Use \\n for line breaks in content\n"
-            shortcode_capabilities += "- Example: 'Line 1\\nLine 2\\nLine 3' becomes proper newlines\n"
-            shortcode_capabilities += "- Don't use literal newlines in shortcode parameters\n\n"
-            shortcode_capabilities += "📝 TODO MANAGEMENT EXAMPLES:\n"
-            shortcode_capabilities += "BASIC TODO OPERATIONS:\n"
-            shortcode_capabilities += "1. [TODO:CREATE:Belajar Python programming]\n"
-            shortcode_capabilities += "2. [TODO:LIST:] - View all todos\n"
-            shortcode_capabilities += "3. [TODO:COMPLETE:1] - Mark first todo as done\n"
-            shortcode_capabilities += "4. [TODO:UPDATE:2:Setup Docker environment]\n"
-            shortcode_capabilities += "5. [TODO:DELETE:3] - Delete todo by ID\n"
-            shortcode_capabilities += "6. [TODO:STATS:] - Show todo statistics\n\n"
-            shortcode_capabilities += "TODO FILTERING:\n"
-            shortcode_capabilities += "- [TODO:LIST:pending] - Show only pending todos\n"
-            shortcode_capabilities += "- [TODO:LIST:completed] - Show only completed todos\n"
-            shortcode_capabilities += "- [TODO:CLEAR:] - Clear all completed todos\n"
+            # Get current time in Asia/Jakarta timezone
+            current_time = datetime.now(JAKARTA_TZ).strftime("%Y-%m-%d %H:%M:%S %Z")
             
             # Default values
-            bot_name = context.get('bot_name', 'Syncara')
-            bot_username = context.get('bot_username', 'SyncaraBot')
             user_id = context.get('user_id', 0)
+            values = {
+                "botName": context.get('bot_name', 'Syncara'),
+                "botUsername": context.get('bot_username', 'SyncaraBot'),
+                "isOwnerSection": self.get_owner_section(user_id),
+                "currentTime": current_time
+            }
             
-            # Get owner list from config
-            owner_list = ', '.join([str(id) for id in OWNER_ID])
-            
-            # Get owner section based on user_id
-            is_owner_section = self.get_owner_section(user_id)
-            
-            # Get the current prompt template
-            prompt_template = self._prompts.get(
-                self.current_prompt_name, 
-                self._prompts.get("DEFAULT", "")
-            )
-            
-            # Format the prompt with all variables
-            return prompt_template.format(
-                botName=bot_name,
-                botUsername=bot_username,
-                ownerList=owner_list,
-                isOwnerSection=is_owner_section,
-                currentTime=current_time,
-                shortcode_capabilities=shortcode_capabilities
+            # Isi hanya field dinamis
+            return "".join(
+                part if isinstance(part, str) else format(values[part[0]], part[1])
+                for part in parts
             )
         except Exception as e:
             print(f"Error in get_chat_prompt: {str(e)}")
             return ""
 
+    @contextmanager
+    def use_prompt(self, prompt_name: str):
+        """
+        Pakai persona tertentu untuk task saat ini saja (tidak mengubah
+        current_prompt_name global yang dipakai task lain secara bersamaan).
+        """
+        prompt_name = (prompt_name or "").upper()
+        token = _active_persona.set(prompt_name if prompt_name in self._prompts else None)
+        try:
+            yield
+        finally:
+            _active_persona.reset(token)
+
 # Create singleton instance
 system_prompt = SystemPrompt()
\ No newline at end of file
@@ -2,10 +2,13 @@
 from pyrogram import filters, Client
 from pyrogram.types import CallbackQuery
 from syncara import bot, assistant_manager, console
+from syncara.modules.pyrogram_helpers import pyrogram_helpers
+from syncara.modules.metrics import performance_monitor
 from config.config import OWNER_ID
 from datetime import datetime
 import pytz
 
+@performance_monitor.instrument("userbot_manager.get_chat_history")
 async def get_chat_history(client, chat_id, limit=None):
     """Get chat history with detailed information including message ID, user ID, and reply info"""
     try:
@@ -43,7 +46,7 @@ async def get_chat_history(client, chat_id, limit=None):
         
         # Get chat info
         try:
-            chat = await client.get_chat(chat_id)
+            chat = await pyrogram_helpers.get_chat_cached(client, chat_id)
             chat_info = {
                 'id': chat.id,
                 'title': chat.title if chat.title else "Private Chat",
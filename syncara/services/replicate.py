@@ -6,16 +6,251 @@ import requests
 from io import BytesIO
 import httpx
 import os
+import time
 from syncara.console import console
+from syncara.modules.metrics import performance_monitor
+from syncara.services.response_cache import RESPONSE_CACHE_CONFIG, response_cache
 
 def get_replicate_client():
     return replicate
 
 replicate_client = get_replicate_client()
 
+# Konfigurasi async inference engine
+INFERENCE_CONFIG = {
+    "api_base": "https://api.replicate.com/v1",
+    "default_model": "openai/gpt-4o",
+    "max_concurrency_per_model": 8,   # Prediksi paralel per model
+    "max_connections": 50,            # Ukuran pool HTTP
+    "max_keepalive_connections": 20,
+    "connect_timeout": 10.0,
+    "request_timeout": 120.0,         # Batas waktu total per panggilan
+    "sync_wait_seconds": 60,          # Header Prefer: wait (maks 60 dari Replicate)
+    "poll_interval": 0.5,
+    "max_poll_interval": 3.0
+}
+
+class InferenceError(Exception):
+    """Error dari Replicate prediction (failed, canceled, atau timeout)"""
+
+class AsyncReplicateEngine:
+    """
+    Async inference backend untuk Replicate.
+
+    Memakai satu httpx.AsyncClient yang di-pool untuk semua ReplicateAPI
+    instance, semaphore per model untuk membatasi concurrency, dan timeout
+    per panggilan sehingga event loop tidak pernah terblokir.
+    """
+
+    def __init__(self, api_token=None, config=None):
+        self.api_token = api_token
+        self.config = dict(INFERENCE_CONFIG, **(config or {}))
+        self._client = None
+        self._semaphores = {}
+        self.stats = {
+            "requests": 0,
+            "in_flight": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "timeouts": 0
+        }
+
+    def _get_client(self):
+        """Lazy init HTTP client agar dibuat di dalam event loop yang aktif"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.config["api_base"],
+                headers={
+                    "Authorization": f"Bearer {self.api_token or API_KEY}",
+                    "Content-Type": "application/json"
+                },
+                timeout=httpx.Timeout(
+                    self.config["request_timeout"],
+                    connect=self.config["connect_timeout"]
+                ),
+                limits=httpx.Limits(
+                    max_connections=self.config["max_connections"],
+                    max_keepalive_connections=self.config["max_keepalive_connections"]
+                )
+            )
+        return self._client
+
+    def _get_semaphore(self, model):
+        """Semaphore per model untuk bounded concurrency"""
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.config["max_concurrency_per_model"])
+        return self._semaphores[model]
+
+    async def create_prediction(self, model, input_params, stream=False, wait=True):
+        """Buat prediction baru untuk model resmi (owner/name)"""
+        client = self._get_client()
+        headers = {}
+        if wait:
+            headers["Prefer"] = f"wait={self.config['sync_wait_seconds']}"
+
+        payload = {"input": input_params}
+        if stream:
+            payload["stream"] = True
+
+        response = await client.post(f"/models/{model}/predictions", json=payload, headers=headers)
+        if response.status_code >= 400:
+            raise InferenceError(f"Replicate HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def wait_for_prediction(self, prediction):
+        """Poll prediction sampai selesai dengan backoff"""
+        client = self._get_client()
+        interval = self.config["poll_interval"]
+
+        while prediction.get("status") not in ("succeeded", "failed", "canceled"):
+            await asyncio.sleep(interval)
+            interval = min(interval * 1.5, self.config["max_poll_interval"])
+
+            response = await client.get(prediction["urls"]["get"])
+            if response.status_code >= 400:
+                raise InferenceError(f"Replicate HTTP {response.status_code}: {response.text[:200]}")
+            prediction = response.json()
+
+        if prediction["status"] != "succeeded":
+            raise InferenceError(prediction.get("error") or f"Prediction {prediction['status']}")
+
+        return prediction
+
+    async def cancel_prediction(self, prediction):
+        """Cancel prediction yang melewati batas waktu"""
+        try:
+            cancel_url = (prediction or {}).get("urls", {}).get("cancel")
+            if cancel_url:
+                await self._get_client().post(cancel_url)
+        except Exception as e:
+            console.warning(f"[INFERENCE] Gagal cancel prediction: {e}")
+
+    @staticmethod
+    def _join_output(output):
+        """Output language model berupa list token, gabungkan jadi string"""
+        if output is None:
+            return ""
+        if isinstance(output, list):
+            return "".join(str(item) for item in output)
+        return str(output)
+
+    async def run(self, model, input_params, timeout=None):
+        """Jalankan model dan kembalikan output lengkap sebagai string"""
+        timeout = timeout or self.config["request_timeout"]
+        prediction = None
+
+        async def _run():
+            nonlocal prediction
+            prediction = await self.create_prediction(model, input_params)
+            prediction = await self.wait_for_prediction(prediction)
+            return self._join_output(prediction.get("output"))
+
+        async with self._get_semaphore(model):
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            try:
+                result = await asyncio.wait_for(_run(), timeout=timeout)
+                self.stats["succeeded"] += 1
+                return result
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                await self.cancel_prediction(prediction)
+                raise InferenceError(f"Inference timeout setelah {timeout:.0f}s")
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+
+    async def stream(self, model, input_params, timeout=None):
+        """
+        Stream token output via Server-Sent Events.
+        Yield setiap potongan teks segera setelah diterima dari Replicate.
+        """
+        timeout = timeout or self.config["request_timeout"]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        prediction = None
+
+        async with self._get_semaphore(model):
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            try:
+                prediction = await asyncio.wait_for(
+                    self.create_prediction(model, input_params, stream=True, wait=False),
+                    timeout=timeout
+                )
+                stream_url = prediction.get("urls", {}).get("stream")
+                if not stream_url:
+                    raise InferenceError("Model tidak mendukung streaming")
+
+                headers = {"Accept": "text/event-stream", "Cache-Control": "no-store"}
+                async with self._get_client().stream("GET", stream_url, headers=headers) as response:
+                    if response.status_code >= 400:
+                        raise InferenceError(f"Replicate HTTP {response.status_code}")
+
+                    event, data_lines = None, []
+                    async for line in response.aiter_lines():
+                        if loop.time() > deadline:
+                            raise asyncio.TimeoutError()
+
+                        if line.startswith(":"):
+                            continue
+                        if line.startswith("event:"):
+                            event = line[6:].strip()
+                            continue
+                        if line.startswith("data:"):
+                            data = line[5:]
+                            data_lines.append(data[1:] if data.startswith(" ") else data)
+                            continue
+                        if line:
+                            continue
+
+                        # Baris kosong = akhir satu event
+                        data = "\n".join(data_lines)
+                        current_event, event, data_lines = event, None, []
+                        if current_event == "output":
+                            yield data
+                        elif current_event == "error":
+                            raise InferenceError(data or "Streaming error")
+                        elif current_event == "done":
+                            break
+
+                self.stats["succeeded"] += 1
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                await self.cancel_prediction(prediction)
+                raise InferenceError(f"Inference timeout setelah {timeout:.0f}s")
+            except Exception:
+                self.stats["failed"] += 1
+                raise
+            finally:
+                self.stats["in_flight"] -= 1
+
+    def get_stats(self):
+        """Statistik engine untuk monitoring"""
+        return {
+            **self.stats,
+            "models": {
+                model: self.config["max_concurrency_per_model"] - sem._value
+                for model, sem in self._semaphores.items()
+            }
+        }
+
+    async def close(self):
+        """Tutup HTTP pool saat shutdown"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+# Shared engine untuk semua ReplicateAPI instance
+inference_engine = AsyncReplicateEngine()
+
 class ReplicateAPI:
-    def __init__(self):
+    def __init__(self, model=None, engine=None):
         replicate.api_token = API_KEY
+        self.model = model or INFERENCE_CONFIG["default_model"]
+        self.engine = engine or inference_engine
 
     async def download_image_as_base64(self, file_id, client):
         try:
@@ -31,55 +266,80 @@ class ReplicateAPI:
             print(f"Error downloading image: {str(e)}")
             return None
 
-    async def generate_response(self, prompt, system_prompt=None, temperature=1, top_p=1, max_tokens=4096, image_file_id=None, client=None, presence_penalty=0, frequency_penalty=0):
-        try:
-            # Prepare input parameters
-            input_params = {
-                "prompt": prompt,
-                "temperature": temperature,
-                "top_p": top_p,
-                "max_completion_tokens": max_tokens,
-                "presence_penalty": presence_penalty,
-                "frequency_penalty": frequency_penalty
-            }
-            
-            # If image is provided, download and add to input
-            if image_file_id and client:
-                image_data = await self.download_image_as_base64(image_file_id, client)
-                if image_data:
-                    input_params["image_input"] = [image_data]
-            
-            # Add system prompt if provided
-            if system_prompt:
-                input_params["system_prompt"] = system_prompt
+    def _cache_keys(self, cache, cache_prompt, cache_scope, image_file_id, params):
+        """Key response cache, atau None jika panggilan ini tidak boleh di-cache.
 
-            # Run the model using the official client
-            output = replicate.run(
-                "openai/gpt-4o",  # Changed to vision model
-                input=input_params
-            )
+        Cache bersifat opt-in: caller harus memberi cache=True beserta
+        cache_prompt (pesan user saja, tanpa history) dan cache_scope
+        (field prompt yang stabil, mis. nama persona) sebagai pengganti
+        full prompt / system prompt yang berubah tiap request. Jika prompt
+        berisi konteks user/chat, cache_scope wajib menyertakan user & chat.
+        """
+        if not cache or not RESPONSE_CACHE_CONFIG["enabled"] or image_file_id:
+            return None
+        if not cache_prompt or len(cache_prompt) > RESPONSE_CACHE_CONFIG["max_prompt_chars"]:
+            return None
+        return response_cache.make_keys(cache_prompt, cache_scope, self.model, params)
 
-            # Since output is an iterator, we need to join the chunks
-            result = ""
-            for item in output:
-                result += str(item)
+    async def generate_response(self, prompt, system_prompt=None, temperature=1, top_p=1, max_tokens=4096, image_file_id=None, client=None, presence_penalty=0, frequency_penalty=0, timeout=None, cache=False, cache_prompt=None, cache_scope=None):
+        params = {
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_completion_tokens": max_tokens,
+            "presence_penalty": presence_penalty,
+            "frequency_penalty": frequency_penalty
+        }
 
-            return result if result.strip() else "No valid response generated"
+        async def _generate():
+            try:
+                # Prepare input parameters
+                input_params = {"prompt": prompt, **params}
+                
+                # If image is provided, download and add to input
+                if image_file_id and client:
+                    image_data = await self.download_image_as_base64(image_file_id, client)
+                    if image_data:
+                        input_params["image_input"] = [image_data]
+                
+                # Add system prompt if provided
+                if system_prompt:
+                    input_params["system_prompt"] = system_prompt
 
-        except Exception as e:
-            return f"Error: {str(e)}"
+                # Run the model through the async engine (non-blocking)
+                with performance_monitor.timer("replicate.generate_response", model=self.model):
+                    result = await self.engine.run(self.model, input_params, timeout=timeout)
+
+                return result if result.strip() else "No valid response generated"
+
+            except Exception as e:
+                return f"Error: {str(e)}"
+
+        keys = self._cache_keys(cache, cache_prompt, cache_scope, image_file_id, params)
+        if keys is None:
+            return await _generate()
+        return await response_cache.get_or_generate(*keys, _generate)
+
+    async def generate_response_stream(self, prompt, system_prompt=None, temperature=1, top_p=1, max_tokens=4096, image_file_id=None, client=None, presence_penalty=0, frequency_penalty=0, timeout=None, raise_errors=False, cache=False, cache_prompt=None, cache_scope=None):
+        params = {
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_completion_tokens": max_tokens,
+            "presence_penalty": presence_penalty,
+            "frequency_penalty": frequency_penalty
+        }
+
+        # Cache hit dikirim sebagai satu chunk; miss dikumpulkan lalu disimpan setelah stream selesai
+        keys = self._cache_keys(cache, cache_prompt, cache_scope, image_file_id, params)
+        if keys is not None:
+            cached = await response_cache.lookup(*keys)
+            if cached is not None:
+                yield cached
+                return
+            response_cache.stats["misses"] += 1
 
-    async def generate_response_stream(self, prompt, system_prompt=None, temperature=1, top_p=1, max_tokens=4096, image_file_id=None, client=None, presence_penalty=0, frequency_penalty=0):
         try:
             # Prepare input parameters
-            input_params = {
-                "prompt": prompt,
-                "temperature": temperature,
-                "top_p": top_p,
-                "max_completion_tokens": max_tokens,
-                "presence_penalty": presence_penalty,
-                "frequency_penalty": frequency_penalty
-            }
+            input_params = {"prompt": prompt, **params}
             
             # If image is provided, download and add to input
             if image_file_id and client:
@@ -91,14 +351,19 @@ class ReplicateAPI:
             if system_prompt:
                 input_params["system_prompt"] = system_prompt
 
-            # Stream the output
-            for event in replicate.stream(
-                "openai/gpt-4-vision-preview",  # Changed to vision model
-                input=input_params
-            ):
-                yield str(event)
+            # Stream the output through the async engine (non-blocking)
+            chunks = []
+            started = time.perf_counter()
+            async for chunk in self.engine.stream(self.model, input_params, timeout=timeout):
+                chunks.append(chunk)
+                yield chunk
+
+            if keys is not None:
+                await response_cache.store(*keys, "".join(chunks), time.perf_counter() - started)
 
         except Exception as e:
+            if raise_errors:
+                raise
             yield f"Error: {str(e)}"
 
 async def generate_image(
@@ -0,0 +1,315 @@
+# syncara/services/response_cache.py
+"""
+Cache respons LLM di depan ReplicateAPI (opt-in per panggilan).
+Key = pesan user yang dinormalisasi + hash scope (field prompt yang stabil,
+mis. persona) + model + parameter sampling. Entry disimpan di memory
+(LRU + TTL), opsional dipersist ke MongoDB, dan bisa dicocokkan secara
+approximate memakai similarity token Jaccard (metrik yang sama dengan
+AILearning._similarity_score) di dalam bucket scope + parameter yang sama.
+Respons yang berisi shortcode aksi tidak pernah disimpan maupun di-replay.
+"""
+
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from syncara.console import console
+
+RESPONSE_CACHE_CONFIG = {
+    "enabled": True,
+    "ttl": 6 * 3600,                 # Umur entry (detik)
+    "max_entries": 2000,             # Batas entry di memory (LRU)
+    "approximate": True,             # Cocokkan prompt yang mirip (Jaccard token)
+    "approximate_threshold": 0.9,    # Similarity minimum untuk approximate hit
+    "approximate_min_tokens": 4,     # Prompt yang lebih pendek hanya exact match
+    "approximate_max_candidates": 200,
+    "persist": True,                 # Simpan juga ke MongoDB (ai_response_cache)
+    "max_prompt_chars": 20000        # Prompt lebih panjang tidak di-cache
+}
+# Opt-in per assistant: set "response_cache": True di ASSISTANT_CONFIG
+
+_WHITESPACE = re.compile(r"\s+")
+_UNCACHEABLE_PREFIXES = ("Error:", "No valid response generated")
+# Sama dengan syncara.shortcode.SHORTCODE_PATTERN; respons berisi aksi tidak boleh di-replay
+_SHORTCODE = re.compile(r'\[[A-Z]+:[A-Z_]+(?::[^\]]*)?\]')
+
+def normalize_prompt(text: str) -> str:
+    return _WHITESPACE.sub(" ", (text or "").strip().lower())
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+def _tokens(normalized: str) -> frozenset:
+    # Tokenisasi sama dengan AILearning._similarity_score
+    return frozenset(normalized.split())
+
+def is_cacheable_response(text: str) -> bool:
+    if not (text and text.strip()) or text.startswith(_UNCACHEABLE_PREFIXES):
+        return False
+    return _SHORTCODE.search(text) is None
+
+class _CacheEntry:
+    __slots__ = ("key", "bucket", "tokens", "response", "expires_at", "latency", "hits")
+
+    def __init__(self, key, bucket, tokens, response, expires_at, latency):
+        self.key = key
+        self.bucket = bucket
+        self.tokens = tokens
+        self.response = response
+        self.expires_at = expires_at
+        self.latency = latency
+        self.hits = 0
+
+class ResponseCache:
+    """LRU + TTL response cache dengan index token per bucket untuk approximate match"""
+
+    def __init__(self, max_entries: int = None, ttl: int = None):
+        self.max_entries = max_entries or RESPONSE_CACHE_CONFIG["max_entries"]
+        self.ttl = ttl or RESPONSE_CACHE_CONFIG["ttl"]
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # bucket -> token -> set(key)
+        self._index: Dict[str, Dict[str, set]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._collection = None
+        self.stats = {
+            "hits": 0,
+            "approximate_hits": 0,
+            "persistent_hits": 0,
+            "shared_inflight": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "saved_seconds": 0.0
+        }
+
+    # ==================== KEYS ====================
+
+    @staticmethod
+    def make_keys(prompt: str, scope: Optional[str], model: str,
+                  params: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Return (key, bucket, normalized_prompt)"""
+        normalized = normalize_prompt(prompt)
+        bucket = _digest(json.dumps(
+            [normalize_prompt(scope), model, sorted(params.items())],
+            default=str
+        ))
+        return _digest(f"{bucket}:{normalized}"), bucket, normalized
+
+    # ==================== MEMORY ====================
+
+    def _index_add(self, entry: _CacheEntry):
+        tokens = self._index.setdefault(entry.bucket, {})
+        for token in entry.tokens:
+            tokens.setdefault(token, set()).add(entry.key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        tokens = self._index.get(entry.bucket)
+        if tokens is None:
+            return
+        for token in entry.tokens:
+            keys = tokens.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del tokens[token]
+        if not tokens:
+            del self._index[entry.bucket]
+
+    def _get_exact(self, key: str, now: float) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _get_approximate(self, bucket: str, tokens: frozenset, now: float) -> Optional[_CacheEntry]:
+        if len(tokens) < RESPONSE_CACHE_CONFIG["approximate_min_tokens"]:
+            return None
+        index = self._index.get(bucket)
+        if not index:
+            return None
+
+        # Hitung token yang sama per kandidat lewat inverted index, token jarang dulu
+        shared: Dict[str, int] = {}
+        for token in sorted(tokens, key=lambda t: len(index.get(t, ()))):
+            for key in index.get(token, ()):
+                shared[key] = shared.get(key, 0) + 1
+            if len(shared) >= RESPONSE_CACHE_CONFIG["approximate_max_candidates"]:
+                break
+
+        best, best_score = None, RESPONSE_CACHE_CONFIG["approximate_threshold"]
+        for key, common in shared.items():
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= now:
+                continue
+            score = common / (len(tokens) + len(entry.tokens) - common)
+            if score >= best_score:
+                best, best_score = entry, score
+        if best is not None:
+            self._entries.move_to_end(best.key)
+        return best
+
+    def _put(self, key: str, bucket: str, normalized: str, response: str, latency: float,
+             expires_at: float = None) -> _CacheEntry:
+        self._remove(key)
+        entry = _CacheEntry(
+            key, bucket, _tokens(normalized), response,
+            expires_at or time.time() + self.ttl, latency
+        )
+        self._entries[key] = entry
+        self._index_add(entry)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+        return entry
+
+    def _hit(self, entry: _CacheEntry, kind: str) -> str:
+        entry.hits += 1
+        self.stats[kind] += 1
+        self.stats["saved_seconds"] += entry.latency
+        return entry.response
+
+    # ==================== PERSISTENCE ====================
+
+    async def _get_collection(self):
+        if not RESPONSE_CACHE_CONFIG["persist"]:
+            return None
+        if self._collection is None:
+            try:
+                from syncara.database import ai_response_cache
+                self._collection = ai_response_cache
+            except Exception as e:
+                console.warning(f"[RESPONSE_CACHE] Persistensi tidak tersedia: {e}")
+                RESPONSE_CACHE_CONFIG["persist"] = False
+                return None
+        return self._collection
+
+    async def _load_persistent(self, key: str) -> Optional[Dict[str, Any]]:
+        collection = await self._get_collection()
+        if collection is None:
+            return None
+        try:
+            return await collection.find_one({"key": key, "expires_at": {"$gt": datetime.utcnow()}})
+        except Exception as e:
+            console.warning(f"[RESPONSE_CACHE] Gagal membaca cache persisten: {e}")
+            return None
+
+    async def _store_persistent(self, entry: _CacheEntry, normalized: str):
+        collection = await self._get_collection()
+        if collection is None:
+            return
+        try:
+            await collection.update_one(
+                {"key": entry.key},
+                {"$set": {
+                    "key": entry.key,
+                    "bucket": entry.bucket,
+                    "prompt": normalized,
+                    "response": entry.response,
+                    "latency": entry.latency,
+                    "created_at": datetime.utcnow(),
+                    "expires_at": datetime.utcnow() + timedelta(seconds=max(entry.expires_at - time.time(), 0))
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            console.warning(f"[RESPONSE_CACHE] Gagal menyimpan cache persisten: {e}")
+
+    # ==================== PUBLIC API ====================
+
+    async def lookup(self, key: str, bucket: str, normalized: str) -> Optional[str]:
+        """Cari respons: exact memory -> approximate memory -> MongoDB"""
+        now = time.time()
+        entry = self._get_exact(key, now)
+        if entry is not None:
+            return self._hit(entry, "hits")
+
+        if RESPONSE_CACHE_CONFIG["approximate"]:
+            entry = self._get_approximate(bucket, _tokens(normalized), now)
+            if entry is not None:
+                return self._hit(entry, "approximate_hits")
+
+        document = await self._load_persistent(key)
+        if document and is_cacheable_response(document.get("response")):
+            expires_at = time.time() + max((document["expires_at"] - datetime.utcnow()).total_seconds(), 0)
+            entry = self._put(key, bucket, normalized, document["response"],
+                              document.get("latency", 0.0), expires_at)
+            return self._hit(entry, "persistent_hits")
+        return None
+
+    async def store(self, key: str, bucket: str, normalized: str, response: str, latency: float):
+        if not is_cacheable_response(response):
+            return
+        entry = self._put(key, bucket, normalized, response, latency)
+        self.stats["stores"] += 1
+        await self._store_persistent(entry, normalized)
+
+    async def get_or_generate(self, key: str, bucket: str, normalized: str,
+                              generate: Callable[[], Awaitable[str]]) -> str:
+        """Lookup, lalu generate sekali untuk prompt identik yang datang bersamaan"""
+        cached = await self.lookup(key, bucket, normalized)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["shared_inflight"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            started = time.perf_counter()
+            response = await generate()
+            await self.store(key, bucket, normalized, response, time.perf_counter() - started)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Hindari warning "exception was never retrieved" jika tidak ada yang menunggu
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._index.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["hits"] + self.stats["approximate_hits"] + self.stats["persistent_hits"]
+        total = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "buckets": len(self._index),
+            "hit_rate": hits / total if total else 0.0
+        }
+
+    def format_summary(self) -> str:
+        stats = self.get_stats()
+        return (
+            f"🗃️ **Response Cache**: {stats['entries']} entry, hit rate {stats['hit_rate'] * 100:.1f}% "
+            f"({stats['hits']} exact, {stats['approximate_hits']} mirip, {stats['persistent_hits']} db, "
+            f"{stats['misses']} miss), hemat {stats['saved_seconds']:.0f}s\n"
+        )
+
+# Global instance
+response_cache = ResponseCache()
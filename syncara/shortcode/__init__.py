@@ -1,15 +1,91 @@
 # syncara/shortcode/__init__.py
 import os
+import re
+import asyncio
+import heapq
 import importlib
 import inspect
-from typing import Dict, Callable
+from collections import OrderedDict
+from typing import Dict, Callable, List, Tuple
 from config.config import OWNER_ID
+from syncara.modules.metrics import performance_monitor
+
+# Pattern shortcode [CATEGORY:ACTION] atau [CATEGORY:ACTION:params], dikompilasi sekali
+SHORTCODE_PATTERN = re.compile(r'\[([A-Z]+:[A-Z_]+)(?::([^\]]*))?\]')
+
+# Nama alternatif yang sering dipakai model -> handler kanonik
+SHORTCODE_ALIASES = {
+    'IMAGE:GENERATE': 'IMAGE:GEN',
+    'CANVAS:READ': 'CANVAS:SHOW',
+    'CANVAS:UPDATE': 'CANVAS:EDIT',
+    'PYTHON:EVAL': 'PYTHON:EXEC',
+}
+
+# Jumlah message terakhir yang diingat untuk dedup trigger user save
+USER_SAVE_TRIGGER_MEMORY = 1000
+
+# Konfigurasi eksekusi paralel shortcode dalam satu AI response
+SHORTCODE_EXECUTION_CONFIG = {
+    "max_concurrency": 4,      # Shortcode yang berjalan bersamaan
+    "default_timeout": 60,     # Detik per shortcode
+    "timeouts": {              # Override per kategori / shortcode (None = tanpa timeout)
+        "IMAGE": 180,
+        "PYTHON": 30,
+        "MULTISTEP": 300,
+        "PYROGRAM": 120,
+        # Job panjang dengan checkpoint/manifest: dibatalkan di tengah jalan
+        # membuat broadcast_jobs tetap "running" dan manifest backup tidak lengkap
+        "PYROGRAM:BULK_KIRIM": None,
+        "PYROGRAM:BULK_FORWARD": None,
+        "PYROGRAM:BROADCAST_ALL_GROUPS": None,
+        "PYROGRAM:BACKUP_LENGKAP": None
+    }
+}
+
+# Aturan urutan: shortcode kiri harus selesai sebelum shortcode kanan dijalankan
+SHORTCODE_ORDER_RULES = [
+    ('CANVAS:CREATE', 'CANVAS:EXPORT'),
+    ('CANVAS:CREATE', 'CANVAS:SHOW'),
+    ('CANVAS:CREATE', 'CANVAS:EDIT'),
+    ('CANVAS:CREATE', 'CANVAS:HISTORY'),
+    ('CANVAS:CREATE', 'CANVAS:DELETE'),
+    ('CANVAS:EDIT', 'CANVAS:EXPORT'),
+    ('CANVAS:EDIT', 'CANVAS:SHOW'),
+    ('CANVAS:EDIT', 'CANVAS:DELETE'),
+    ('CANVAS:EXPORT', 'CANVAS:DELETE'),
+    ('MULTISTEP:CREATE_WORKFLOW', 'MULTISTEP:ADD_STEP'),
+    ('MULTISTEP:CREATE_WORKFLOW', 'MULTISTEP:EXECUTE'),
+    ('MULTISTEP:ADD_STEP', 'MULTISTEP:EXECUTE'),
+]
+
+# Kategori dengan state bersama: shortcode di kategori ini dijalankan berurutan
+SERIAL_CATEGORIES = {'CANVAS', 'TODO', 'MULTISTEP', 'CHANNEL', 'USERBOT'}
+
+def parse_shortcodes(text):
+    """Return list (match, name, params) untuk semua shortcode di teks"""
+    return [
+        (match, match.group(1).strip(), (match.group(2) or "").strip())
+        for match in SHORTCODE_PATTERN.finditer(text or "")
+    ]
+
+# Message yang sudah memicu user save, agar trigger hanya jalan sekali per message
+_triggered_messages = OrderedDict()
 
 # Import trigger function
 async def _trigger_user_save(client, message):
     """Universal trigger untuk save user data di semua shortcode"""
     try:
         if message and message.from_user:
+            chat = getattr(message, 'chat', None)
+            message_key = (getattr(chat, 'id', None), getattr(message, 'id', None))
+            if message_key[1] is not None:
+                if message_key in _triggered_messages:
+                    return
+                # Tandai sebelum await agar shortcode paralel tidak ikut trigger
+                _triggered_messages[message_key] = True
+                if len(_triggered_messages) > USER_SAVE_TRIGGER_MEMORY:
+                    _triggered_messages.popitem(last=False)
+            
             # Detect context from message type
             from pyrogram import enums
             context = "private" if message.chat.type == enums.ChatType.PRIVATE else "group"
@@ -29,7 +105,11 @@ class ShortcodeRegistry:
             cls._instance = super().__new__(cls)
             cls._instance.shortcodes = {}
             cls._instance.descriptions = {}
+            cls._instance._index = {}
             cls._instance._initialized = False
+            # Naik setiap kali handler/description berubah (invalidasi prompt yang sudah dikompilasi)
+            cls._instance.version = 0
+            cls._instance._docs_cache = {}
         return cls._instance
 
     def _load_shortcodes(self):
@@ -96,16 +176,52 @@ class ShortcodeRegistry:
             ]
             
             for pattern in dummy_patterns:
-                if pattern not in self.shortcodes:
+                if pattern not in self.shortcodes and SHORTCODE_ALIASES.get(pattern) not in self.shortcodes:
                     self.shortcodes[pattern] = self._dummy_handler
                     if pattern not in self.descriptions:
                         self.descriptions[pattern] = f'Handler for {pattern.lower().replace(":", " ")}'
             
+            self._build_index()
             self._initialized = True
+            self.version += 1
             
         except Exception as e:
             print(f"Error loading shortcodes: {e}")
 
+    def _build_index(self):
+        """Index dispatch {CATEGORY: {ACTION: handler}} termasuk alias"""
+        index = {}
+        for pattern, handler in self.shortcodes.items():
+            category, _, action = pattern.partition(':')
+            index.setdefault(category, {})[action] = handler
+        
+        for alias, target in SHORTCODE_ALIASES.items():
+            if target in self.shortcodes and alias not in self.shortcodes:
+                category, _, action = alias.partition(':')
+                index.setdefault(category, {})[action] = self.shortcodes[target]
+        
+        self._index = index
+
+    def register(self, pattern, handler, description=None):
+        """Daftarkan handler baru tanpa membangun ulang index"""
+        pattern = pattern.upper()
+        self.shortcodes[pattern] = handler
+        if description:
+            self.descriptions[pattern] = description
+        category, _, action = pattern.partition(':')
+        self._index.setdefault(category, {})[action] = handler
+        self.version += 1
+
+    def resolve(self, shortcode_pattern):
+        """Cari handler untuk CATEGORY:ACTION, return (handler, pattern kanonik)"""
+        if not self._initialized:
+            self._load_shortcodes()
+        
+        name = self._normalize_name(shortcode_pattern)
+        category, _, action = name.partition(':')
+        handler = self._index.get(category, {}).get(action)
+        return handler, SHORTCODE_ALIASES.get(name, name)
+
     async def _dummy_handler(self, client, message, params):
         """Dummy handler untuk shortcode yang belum diimplementasi"""
         return "⚠️ Shortcode handler belum diimplementasi"
@@ -113,33 +229,20 @@ class ShortcodeRegistry:
     async def execute_shortcode(self, shortcode_pattern, client, message, params=""):
         """Execute a shortcode with universal user trigger"""
         try:
-            # 🚀 UNIVERSAL TRIGGER: Save user data untuk SEMUA shortcode executions
+            # 🚀 UNIVERSAL TRIGGER: Save user data, sekali per incoming message
             await _trigger_user_save(client, message)
             
-            # Load shortcodes if not already loaded
-            if not self._initialized:
-                self._load_shortcodes()
-            
-            # Find matching shortcode handler
-            handler = None
-            matched_pattern = None
-            
-            # Exact match first
-            if shortcode_pattern in self.shortcodes:
-                handler = self.shortcodes[shortcode_pattern]
-                matched_pattern = shortcode_pattern
-            else:
-                # Try pattern matching
-                for pattern, func in self.shortcodes.items():
-                    if shortcode_pattern.startswith(pattern.split(':')[0]):
-                        handler = func
-                        matched_pattern = pattern
-                        break
+            # Lookup O(1) lewat index category/action
+            handler, matched_pattern = self.resolve(shortcode_pattern)
             
             if handler:
                 try:
                     # Execute the shortcode handler
-                    result = await handler(client, message, params)
+                    with performance_monitor.timer(f"shortcode.{matched_pattern}") as outcome:
+                        result = await handler(client, message, params)
+                        # Handler melaporkan kegagalan lewat pesan "❌ ..."
+                        if isinstance(result, str) and result.startswith("❌"):
+                            outcome["success"] = False
                     return result if result is not None else "✅ Shortcode executed successfully"
                 except Exception as e:
                     error_msg = f"❌ Error executing {matched_pattern}: {str(e)}"
@@ -151,11 +254,127 @@ class ShortcodeRegistry:
                         print(f"Shortcode execution error: {e}")
                     return error_msg
             else:
+                performance_monitor.record("shortcode.unknown", 0.0, False, shortcode=shortcode_pattern)
+                category = matched_pattern.split(':')[0]
+                available = sorted(a for a in self._index.get(category, {}) if f'{category}:{a}' not in SHORTCODE_ALIASES)
+                if available:
+                    return f"❌ Unknown shortcode: {shortcode_pattern} (tersedia: {', '.join(f'{category}:{a}' for a in available[:10])})"
                 return f"❌ Unknown shortcode: {shortcode_pattern}"
                 
         except Exception as e:
             return f"❌ Critical shortcode error: {str(e)}"
 
+    @staticmethod
+    def _normalize_name(shortcode):
+        """CATEGORY:ACTION tanpa params, alias diganti nama kanonik"""
+        name = ':'.join(shortcode.strip().split(':')[:2]).upper()
+        return SHORTCODE_ALIASES.get(name, name)
+
+    def build_execution_plan(self, shortcode_names: List[str]):
+        """
+        Bangun DAG eksekusi dari daftar shortcode (urutan teks).
+        Return (order, deps): order = urutan topologis (aturan urutan ditaati,
+        urutan teks sebagai tie-break), deps[i] = index yang harus selesai dulu.
+        """
+        names = [self._normalize_name(name) for name in shortcode_names]
+        rules = set(SHORTCODE_ORDER_RULES)
+        count = len(names)
+
+        deps = {i: set() for i in range(count)}
+        successors = {i: set() for i in range(count)}
+        for i, before in enumerate(names):
+            for j, after in enumerate(names):
+                if i != j and (before, after) in rules:
+                    deps[j].add(i)
+                    successors[i].add(j)
+
+        # Topological sort dengan prioritas posisi di teks
+        indegree = {i: len(deps[i]) for i in range(count)}
+        ready = [i for i in range(count) if indegree[i] == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            i = heapq.heappop(ready)
+            order.append(i)
+            for j in successors[i]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    heapq.heappush(ready, j)
+        order += [i for i in range(count) if i not in order]
+
+        # Rantai berurutan untuk kategori yang berbagi state
+        last_in_category = {}
+        for i in order:
+            category = names[i].split(':')[0]
+            if category in SERIAL_CATEGORIES:
+                if category in last_in_category:
+                    deps[i].add(last_in_category[category])
+                last_in_category[category] = i
+
+        return order, deps
+
+    def validate_shortcode_order(self, shortcode_names: List[str]) -> Dict:
+        """Cek apakah urutan shortcode di teks melanggar aturan urutan"""
+        names = [self._normalize_name(name) for name in shortcode_names]
+        rules = set(SHORTCODE_ORDER_RULES)
+        issues = []
+
+        for i, first in enumerate(names):
+            for second in names[i + 1:]:
+                if (second, first) in rules:
+                    issues.append(f"{first} muncul sebelum {second}; {first} akan dijalankan setelah {second}")
+
+        order, _ = self.build_execution_plan(shortcode_names)
+        return {
+            'valid': not issues,
+            'issues': issues,
+            'execution_order': [names[i] for i in order]
+        }
+
+    def _get_timeout(self, shortcode):
+        """Timeout (detik) untuk shortcode, None berarti berjalan sampai selesai"""
+        timeouts = SHORTCODE_EXECUTION_CONFIG["timeouts"]
+        name = self._normalize_name(shortcode)
+        if name in timeouts:
+            return timeouts[name]
+        return timeouts.get(name.split(':')[0], SHORTCODE_EXECUTION_CONFIG["default_timeout"])
+
+    async def execute_shortcodes(self, calls: List[Tuple[str, str]], client, message, max_concurrency=None):
+        """
+        Jalankan banyak shortcode sekaligus. Shortcode independen berjalan
+        paralel (dibatasi semaphore), pasangan yang bergantung tetap berurutan.
+        Return list hasil dengan urutan sama seperti calls; exception
+        (termasuk asyncio.TimeoutError) dikembalikan sebagai nilai.
+        """
+        if not calls:
+            return []
+
+        # User save cukup sekali per message, bukan per shortcode
+        await _trigger_user_save(client, message)
+        
+        order, deps = self.build_execution_plan([name for name, _ in calls])
+        finished = [asyncio.Event() for _ in calls]
+        results = [None] * len(calls)
+        semaphore = asyncio.Semaphore(max_concurrency or SHORTCODE_EXECUTION_CONFIG["max_concurrency"])
+
+        async def run(index):
+            name, params = calls[index]
+            try:
+                for dep in deps[index]:
+                    await finished[dep].wait()
+                async with semaphore:
+                    results[index] = await asyncio.wait_for(
+                        self.execute_shortcode(name, client, message, params),
+                        timeout=self._get_timeout(name)
+                    )
+            except Exception as e:
+                results[index] = e
+            finally:
+                finished[index].set()
+
+        await asyncio.gather(*(run(i) for i in order))
+        return results
+
     def get_shortcode_list(self):
         """Get list of available shortcodes"""
         if not self._initialized:
@@ -168,17 +387,24 @@ class ShortcodeRegistry:
             self._load_shortcodes()
         return self.descriptions.copy()
     
-    def get_shortcode_docs(self) -> str:
-        """Generate documentation for all registered shortcodes"""
+    def get_shortcode_docs(self, exclude_categories=()) -> str:
+        """Generate documentation for all registered shortcodes (di-cache per versi registry)"""
         if not self._initialized:
             self._load_shortcodes()
         
+        cache_key = (self.version, frozenset(exclude_categories))
+        cached = self._docs_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         docs = ["Available Shortcodes:"]
         
         # Group shortcodes by category
         categories = {}
         for shortcode, desc in self.descriptions.items():
             category = shortcode.split(':')[0]
+            if category in exclude_categories:
+                continue
             if category not in categories:
                 categories[category] = []
             categories[category].append((shortcode, desc))
@@ -198,7 +424,10 @@ class ShortcodeRegistry:
         docs.append("- CHANNEL management commands require owner privileges")
         docs.append("- PYROGRAM: prefix untuk semua fungsi Pyrogram method")
         
-        return "\n".join(docs)
+        result = "\n".join(docs)
+        self._docs_cache = {key: value for key, value in self._docs_cache.items() if key[0] == self.version}
+        self._docs_cache[cache_key] = result
+        return result
 
 # Create global registry instance
 registry = ShortcodeRegistry()
\ No newline at end of file
@@ -194,9 +194,13 @@ class ChannelManagementShortcode:
             response += f"📝 **Total Posts:** {stats.get('total_posts', 0)}\n\n"
             
             response += f"📅 **Recent Activity:**\n"
+            response += f"• Last 24h: {stats.get('posts_last_24h', 0)} posts\n"
             response += f"• Today: {stats.get('posts_today', 0)} posts\n"
             response += f"• This Week: {stats.get('posts_this_week', 0)} posts\n"
-            response += f"• This Month: {stats.get('posts_this_month', 0)} posts\n\n"
+            response += f"• This Month: {stats.get('posts_this_month', 0)} posts\n"
+            if stats.get('failed_posts'):
+                response += f"• Failed: {stats['failed_posts']} posts\n"
+            response += "\n"
             
             content_dist = stats.get('content_distribution', {})
             if content_dist:
@@ -382,9 +386,14 @@ class ChannelManagementShortcode:
             
             debug_info += f"\n**4. Scheduler Status:**\n"
             debug_info += f"• Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            debug_info += f"• Next Daily Tips: 08:00 (if not posted today)\n"
-            debug_info += f"• Next Fun Facts: 14:00 (if not posted today)\n"
-            debug_info += f"• Next Q&A: 20:00 (if not posted today)\n"
+            schedule = channel_manager.get_schedule()
+            if schedule:
+                for content_type, slot_info in schedule.items():
+                    next_slot = slot_info["next_slot"]
+                    state = "📝 siap" if slot_info["prepared"] else ("⏳ dibuat" if slot_info["generating"] else "—")
+                    debug_info += f"• Next {content_type}: {next_slot:%Y-%m-%d %H:%M} ({state})\n" if next_slot else f"• Next {content_type}: -\n"
+            else:
+                debug_info += f"• Scheduler belum berjalan\n"
             
             # Check if today's content was posted
             debug_info += f"\n**5. Today's Content Status:**\n"
@@ -1,6 +1,6 @@
 # syncara/shortcode/file_search.py
 from syncara.console import console
-import os
+from syncara.modules.file_index import WorkspaceFileIndex
 import asyncio
 import re
 from pathlib import Path
@@ -16,7 +16,7 @@ class FileSearchShortcode:
         }
         
         self.descriptions = {
-            'SEARCH:FILE': 'Search files in workspace. Usage: [SEARCH:FILE:filename or pattern]',
+            'SEARCH:FILE': 'Search files in workspace. Usage: [SEARCH:FILE:filename, *.py, re:pattern or content:text]',
             'FILE:SEARCH': 'Search files in workspace. Usage: [FILE:SEARCH:*.py]',
             'FIND:FILE': 'Find files in workspace. Usage: [FIND:FILE:config]',
             'SEARCH:CHAT': 'Search chat history. Usage: [SEARCH:CHAT:keyword]',
@@ -39,6 +39,13 @@ class FileSearchShortcode:
             '.py', '.txt', '.md', '.json', '.yaml', '.yml', '.ini', 
             '.cfg', '.conf', '.log', '.csv', '.xml', '.html', '.js', '.ts'
         }
+        
+        # Index path persistent, di-refresh di background thread
+        self.file_index = WorkspaceFileIndex(
+            self.workspace_path,
+            self.excluded_dirs,
+            self.searchable_extensions
+        )
 
     async def search_files(self, client, message, params):
         """Search for files in workspace"""
@@ -140,51 +147,15 @@ class FileSearchShortcode:
             return False
 
     async def _search_files_in_workspace(self, query):
-        """Search for files matching the query"""
+        """Search for files matching the query (glob, substring, re:regex, content:text)"""
         import time
         start_time = time.time()
         
-        found_files = []
-        
         try:
-            # Convert query to regex pattern
-            if '*' in query or '?' in query:
-                # Wildcard pattern
-                pattern = query.replace('*', '.*').replace('?', '.')
-                regex = re.compile(pattern, re.IGNORECASE)
-                use_regex = True
-            else:
-                # Simple substring search
-                use_regex = False
+            found_files = await self.file_index.search_async(query)
             
-            # Walk through workspace
-            for root, dirs, files in os.walk(self.workspace_path):
-                # Skip excluded directories
-                dirs[:] = [d for d in dirs if d not in self.excluded_dirs]
-                
-                for file in files:
-                    file_path = Path(root) / file
-                    relative_path = file_path.relative_to(self.workspace_path)
-                    
-                    # Check if file matches search criteria
-                    match = False
-                    if use_regex:
-                        match = regex.search(str(relative_path))
-                    else:
-                        match = query.lower() in str(relative_path).lower()
-                    
-                    if match:
-                        try:
-                            size = file_path.stat().st_size
-                            size_str = self._format_file_size(size)
-                            
-                            found_files.append({
-                                'path': str(relative_path),
-                                'size': size_str,
-                                'size_bytes': size
-                            })
-                        except Exception:
-                            pass  # Skip files that can't be accessed
+            for file_info in found_files:
+                file_info['size'] = self._format_file_size(file_info['size_bytes'])
             
             # Sort by size (smaller first)
             found_files.sort(key=lambda x: x['size_bytes'])
@@ -196,6 +167,9 @@ class FileSearchShortcode:
                 'duration': duration
             }
             
+        except re.error as e:
+            console.error(f"Invalid search pattern '{query}': {e}")
+            return {'files': [], 'duration': time.time() - start_time}
         except Exception as e:
             console.error(f"Error searching files: {e}")
             return {'files': [], 'duration': time.time() - start_time}
@@ -4,6 +4,7 @@ Shortcode untuk method-method advanced Pyrogram.
 """
 
 from syncara.console import console
+from syncara.modules.broadcast_engine import broadcast_engine
 import asyncio
 import json
 from datetime import datetime
@@ -631,6 +632,19 @@ class PyrogramAdvancedShortcode:
             }
             return response_id
     
+    def _format_broadcast_status(self, job_id):
+        """Ringkasan throughput dan kegagalan dari broadcast engine"""
+        status = broadcast_engine.get_job_status(job_id)
+        if not status:
+            return ""
+        text = f"⚡ Throughput: {status['throughput']:.1f} target/detik ({status['elapsed']:.1f}s)"
+        if status['skipped']:
+            text += f"\n⏭️ Dilewati (sudah terkirim sebelumnya): {status['skipped']}"
+        if status['failures']:
+            failures = "\n".join(f"• {target}: {error[:80]}" for target, error in list(status['failures'].items())[:5])
+            text += f"\n⚠️ **Gagal:**\n{failures}"
+        return text
+    
     async def bulk_kirim(self, client, message, params):
         """Kirim pesan ke multiple chat"""
         try:
@@ -642,13 +656,15 @@ class PyrogramAdvancedShortcode:
             text = parts[1]
             delay = float(parts[2]) if len(parts) > 2 and parts[2].replace('.', '').isdigit() else 1.0
             
-            results = await client.kirim_bulk_pesan(targets=targets, text=text, delay=delay)
+            # job_id deterministik: pesan yang diproses ulang melanjutkan job yang sama
+            job_id = f"bulk_kirim_{message.chat.id}_{message.id}"
+            results = await client.kirim_bulk_pesan(targets=targets, text=text, delay=delay, job_id=job_id)
             success_count = len(results)
             total_count = len(targets)
             
             response_id = f"bulk_kirim_{message.id}"
             self.pending_responses[response_id] = {
-                'text': f"✅ **Bulk Send Selesai**\n📨 Berhasil: {success_count}/{total_count}\n⏱️ Delay: {delay}s",
+                'text': f"✅ **Bulk Send Selesai**\n📨 Berhasil: {success_count}/{total_count}\n{self._format_broadcast_status(job_id)}",
                 'chat_id': message.chat.id,
                 'reply_to_message_id': message.id
             }
@@ -677,18 +693,20 @@ class PyrogramAdvancedShortcode:
             message_id = int(parts[1])
             delay = float(parts[2]) if len(parts) > 2 and parts[2].replace('.', '').isdigit() else 1.0
             
+            job_id = f"bulk_forward_{message.chat.id}_{message.id}"
             results = await client.forward_bulk_pesan(
                 targets=targets,
                 from_chat_id=message.chat.id,
                 message_ids=message_id,
-                delay=delay
+                delay=delay,
+                job_id=job_id
             )
             success_count = len(results)
             total_count = len(targets)
             
             response_id = f"bulk_forward_{message.id}"
             self.pending_responses[response_id] = {
-                'text': f"✅ **Bulk Forward Selesai**\n📤 Berhasil: {success_count}/{total_count}\n⏱️ Delay: {delay}s",
+                'text': f"✅ **Bulk Forward Selesai**\n📤 Berhasil: {success_count}/{total_count}\n{self._format_broadcast_status(job_id)}",
                 'chat_id': message.chat.id,
                 'reply_to_message_id': message.id
             }
@@ -739,23 +757,21 @@ class PyrogramAdvancedShortcode:
                 }
                 return response_id
             
-            # Send to all groups
-            success_count = 0
-            failed_count = 0
-            
-            for group_id in all_groups:
-                try:
-                    await client.send_message(chat_id=group_id, text=text)
-                    success_count += 1
-                    if delay > 0:
-                        await asyncio.sleep(delay)
-                except Exception as e:
-                    failed_count += 1
-                    console.warning(f"Failed to send to group {group_id}: {e}")
+            # Send to all groups (hanya client ini yang pasti menjadi member)
+            job_id = f"broadcast_all_{message.chat.id}_{message.id}"
+            results = await client.kirim_bulk_pesan(
+                targets=all_groups,
+                text=text,
+                delay=delay,
+                use_assistants=False,
+                job_id=job_id
+            )
+            success_count = len(results)
+            failed_count = len(all_groups) - success_count
             
             response_id = f"broadcast_all_{message.id}"
             self.pending_responses[response_id] = {
-                'text': f"📢 **Pengumuman Terkirim**\n✅ Berhasil: {success_count} grup\n❌ Gagal: {failed_count} grup\n⏱️ Delay: {delay}s\n\n📝 **Pesan:**\n{text}",
+                'text': f"📢 **Pengumuman Terkirim**\n✅ Berhasil: {success_count} grup\n❌ Gagal: {failed_count} grup\n{self._format_broadcast_status(job_id)}\n\n📝 **Pesan:**\n{text}",
                 'chat_id': message.chat.id,
                 'reply_to_message_id': message.id
             }
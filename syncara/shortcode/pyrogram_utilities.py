@@ -4,6 +4,7 @@ Shortcode untuk utilities methods Pyrogram.
 """
 
 from syncara.console import console
+from syncara.modules.chat_backup import get_backup_size
 import asyncio
 import json
 import os
@@ -431,12 +432,12 @@ class PyrogramUtilitiesShortcode:
                 include_media=include_media
             )
             
-            file_size = os.path.getsize(backup_file) if os.path.exists(backup_file) else 0
+            file_size = get_backup_size(backup_file) if os.path.exists(backup_file) else 0
             
             await client.edit_pesan(
                 chat_id=message.chat.id,
                 message_id=progress_msg.id,
-                text=f"✅ **Backup Selesai**\n📁 File: `{os.path.basename(backup_file)}`\n📊 Ukuran: {client.format_ukuran_file(file_size)}\n📱 Include Media: {'Ya' if include_media else 'Tidak'}"
+                text=f"✅ **Backup Selesai**\n📁 Backup: `{os.path.basename(backup_file)}`\n📊 Ukuran: {client.format_ukuran_file(file_size)}\n📱 Include Media: {'Ya' if include_media else 'Tidak'}"
             )
             
             console.info(f"[PYROGRAM:BACKUP_LENGKAP] Backup completed: {backup_file}")
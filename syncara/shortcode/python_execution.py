@@ -1,9 +1,6 @@
 # syncara/shortcode/python_execution.py
 from syncara.console import console
-import sys
-import io
-import contextlib
-import traceback
+from syncara.modules.python_sandbox import python_sandbox
 import asyncio
 import re
 
@@ -149,70 +146,9 @@ class PythonExecutionShortcode:
         return {'safe': True, 'reason': 'Code is safe', 'violations': []}
     
     async def _execute_code_safely(self, code):
-        """Execute code in a safe environment"""
+        """Execute code in a sandboxed worker process (rlimit CPU/memori + wall-clock kill)"""
         try:
-            # Create safe namespace
-            safe_namespace = {
-                '__builtins__': {
-                    'print': print,
-                    'len': len,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'bool': bool,
-                    'list': list,
-                    'dict': dict,
-                    'tuple': tuple,
-                    'set': set,
-                    'range': range,
-                    'enumerate': enumerate,
-                    'zip': zip,
-                    'map': map,
-                    'filter': filter,
-                    'sum': sum,
-                    'min': min,
-                    'max': max,
-                    'abs': abs,
-                    'round': round,
-                    'pow': pow,
-                    'divmod': divmod,
-                }
-            }
-            
-            # Add safe math operations
-            import math
-            safe_namespace['math'] = math
-            
-            # Capture output
-            old_stdout = sys.stdout
-            captured_output = io.StringIO()
-            
-            return_value = None
-            
-            try:
-                sys.stdout = captured_output
-                
-                # Try to evaluate as expression first (for calculations)
-                try:
-                    return_value = eval(code, safe_namespace)
-                    if return_value is not None:
-                        print(return_value)
-                except SyntaxError:
-                    # If not an expression, execute as statement
-                    exec(code, safe_namespace)
-                
-                output = captured_output.getvalue()
-                
-                return {
-                    'success': True,
-                    'output': output.strip() if output.strip() else None,
-                    'return_value': return_value,
-                    'error': None
-                }
-                
-            finally:
-                sys.stdout = old_stdout
-                
+            return await python_sandbox.execute(code)
         except Exception as e:
             return {
                 'success': False,
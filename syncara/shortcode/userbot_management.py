@@ -1,10 +1,11 @@
 # syncara/shortcode/userbot_management.py
 from syncara.console import console
+from syncara.modules.pyrogram_helpers import pyrogram_helpers
 from pyrogram.types import ChatPermissions
 import asyncio
 
 async def is_admin_or_owner(client, message):
-    member = await client.get_chat_member(message.chat.id, message.from_user.id)
+    member = await pyrogram_helpers.get_chat_member_cached(client, message.chat.id, message.from_user.id)
     return member.status in ("administrator", "creator")
 
 class UserbotManagementShortcode:
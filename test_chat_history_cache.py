@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script untuk ChatHistoryCache (ring buffer history chat per assistant)
+"""
+
+import sys
+import os
+
+# Add the syncara directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from syncara.modules.chat_history_cache import ChatHistoryCache
+
+KEY = ("AERIS", -100123)
+
+def _message(message_id: int, content: str = None) -> dict:
+    return {"message_id": message_id, "content": content or f"pesan {message_id}"}
+
+def _ids(messages) -> list:
+    return [m["message_id"] for m in messages]
+
+def test_cold_chat_is_miss():
+    cache = ChatHistoryCache()
+    assert cache.get(KEY, 10) is None
+    # Chat cold tidak direkam sampai di-backfill
+    assert not cache.append(KEY, _message(1))
+    assert cache.get(KEY, 10) is None
+    assert cache.get_stats()["misses"] == 2
+
+def test_backfill_then_hit():
+    cache = ChatHistoryCache()
+    cache.backfill(KEY, [_message(i) for i in range(1, 6)], chat_info={"title": "Grup"})
+    assert _ids(cache.get(KEY, 10)) == [1, 2, 3, 4, 5]
+    assert _ids(cache.get(KEY, 2)) == [4, 5]
+    assert cache.get_chat_info(KEY) == {"title": "Grup"}
+    stats = cache.get_stats()
+    assert stats["hits"] == 2 and stats["backfills"] == 1
+
+def test_limit_above_capacity_is_miss():
+    cache = ChatHistoryCache(max_messages=5)
+    cache.backfill(KEY, [_message(i) for i in range(1, 4)])
+    assert cache.get(KEY, 6) is None
+
+def test_backfill_keeps_newest_messages():
+    cache = ChatHistoryCache(max_messages=3)
+    cache.backfill(KEY, [_message(i) for i in range(1, 11)])
+    assert _ids(cache.get(KEY, 3)) == [8, 9, 10]
+
+def test_append_extends_ring_buffer():
+    cache = ChatHistoryCache(max_messages=3)
+    cache.backfill(KEY, [_message(1), _message(2)])
+    assert cache.append(KEY, _message(3))
+    assert cache.append(KEY, _message(4))
+    assert _ids(cache.get(KEY, 3)) == [2, 3, 4]
+
+def test_append_ignores_duplicates_and_old_messages():
+    cache = ChatHistoryCache()
+    cache.backfill(KEY, [_message(5), _message(6)])
+    assert not cache.append(KEY, _message(6))
+    assert not cache.append(KEY, _message(3))
+    assert _ids(cache.get(KEY, 10)) == [5, 6]
+
+def test_sequential_gap_invalidates_chat():
+    cache = ChatHistoryCache(gap_tolerance=5)
+    cache.backfill(KEY, [_message(10)])
+    assert cache.append(KEY, _message(14), sequential_ids=True)
+    assert not cache.append(KEY, _message(40), sequential_ids=True)
+    assert cache.get(KEY, 5) is None
+    assert cache.get_stats()["gaps"] == 1
+
+def test_non_sequential_ids_allow_jumps():
+    """Private chat / grup biasa: id tidak berurutan per chat, lompatan bukan gap"""
+    cache = ChatHistoryCache(gap_tolerance=5)
+    cache.backfill(KEY, [_message(10)])
+    assert cache.append(KEY, _message(400))
+    assert _ids(cache.get(KEY, 5)) == [10, 400]
+
+def test_update_content_tracks_size():
+    cache = ChatHistoryCache()
+    cache.backfill(KEY, [_message(1, "a")])
+    before = cache.total_bytes
+    assert cache.update_content(KEY, 1, "jawaban lengkap hasil streaming")
+    assert cache.get(KEY, 1)[0]["content"] == "jawaban lengkap hasil streaming"
+    assert cache.total_bytes == before + len("jawaban lengkap hasil streaming") - 1
+    assert not cache.update_content(KEY, 99, "tidak ada")
+    assert not cache.update_content(("AERIS", 1), 1, "chat lain")
+
+def test_keys_are_scoped_per_assistant():
+    cache = ChatHistoryCache()
+    cache.backfill(("AERIS", 1), [_message(1)])
+    assert cache.get(("KAIROS", 1), 5) is None
+
+def test_lru_eviction_by_chat_count():
+    cache = ChatHistoryCache(max_chats=2)
+    cache.backfill(("A", 1), [_message(1)])
+    cache.backfill(("A", 2), [_message(1)])
+    cache.get(("A", 1), 1)  # chat 1 jadi paling baru dipakai
+    cache.backfill(("A", 3), [_message(1)])
+    assert cache.get(("A", 2), 1) is None
+    assert cache.get(("A", 1), 1) is not None
+    assert cache.get_stats()["evictions"] == 1
+
+def test_eviction_by_total_bytes():
+    cache = ChatHistoryCache(max_bytes=2000)
+    big = "x" * 900
+    cache.backfill(("A", 1), [_message(1, big)])
+    cache.backfill(("A", 2), [_message(1, big)])
+    assert cache.get(("A", 1), 1) is None
+    assert cache.total_bytes <= 2000
+
+def test_total_bytes_consistent_after_invalidate_and_clear():
+    cache = ChatHistoryCache(max_messages=2)
+    cache.backfill(("A", 1), [_message(i) for i in range(1, 4)])
+    cache.backfill(("A", 2), [_message(1)])
+    cache.append(("A", 1), _message(4))
+    cache.invalidate(("A", 1))
+    remaining = cache.total_bytes
+    assert remaining > 0
+    cache.invalidate(("A", 2))
+    assert cache.total_bytes == 0
+    cache.backfill(("A", 3), [_message(1)])
+    cache.clear()
+    assert cache.total_bytes == 0 and cache.get_stats()["chats"] == 0
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing ChatHistoryCache...")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e}")
+    print(f"\n📊 {len(tests) - failed}/{len(tests)} tests passed")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script untuk WorkspaceFileIndex (index path file untuk SEARCH:FILE)
+"""
+
+import sys
+import os
+import tempfile
+
+# Add the syncara directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from syncara.modules.file_index import WorkspaceFileIndex
+
+EXTENSIONS = {'.py', '.md', '.json'}
+
+def _write(root, path, content="isi"):
+    full_path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, 'w') as f:
+        f.write(content)
+
+def _workspace(root):
+    _write(root, "main.py", "print('halo')")
+    _write(root, "docs/README.md", "# Syncara")
+    _write(root, "config/settings.json", "{}")
+    _write(root, "__pycache__/main.cpython-311.pyc", "")
+
+def _index(root, **kwargs):
+    kwargs.setdefault("snapshot_path", os.path.join(root, "cache", "file_index.json"))
+    return WorkspaceFileIndex(root, {"__pycache__"}, EXTENSIONS, **kwargs)
+
+def test_refresh_without_changes_writes_nothing():
+    """Snapshot di dalam workspace tidak boleh dianggap perubahan setiap refresh"""
+    with tempfile.TemporaryDirectory() as root:
+        _workspace(root)
+        index = _index(root)
+        index.refresh()
+        assert index.stats["changed_files"] == 3
+        snapshot = index.snapshot_path
+        assert os.path.exists(snapshot)
+        written_at = os.stat(snapshot).st_mtime_ns
+
+        for _ in range(3):
+            index.refresh()
+            assert index.stats["changed_files"] == 0
+        assert os.stat(snapshot).st_mtime_ns == written_at
+
+def test_snapshot_not_in_search_results():
+    with tempfile.TemporaryDirectory() as root:
+        _workspace(root)
+        index = _index(root)
+        index.refresh()
+        index.refresh()
+        paths = [result['path'] for result in index.search("*.json")]
+        assert paths == [os.path.join("config", "settings.json")]
+
+def test_refresh_detects_new_changed_and_removed_files():
+    with tempfile.TemporaryDirectory() as root:
+        _workspace(root)
+        index = _index(root, snapshot_path="")
+        index.refresh()
+        _write(root, "new.py")
+        os.remove(os.path.join(root, "docs", "README.md"))
+        index.refresh()
+        assert index.stats["changed_files"] == 2
+        assert [result['path'] for result in index.search("*.md")] == []
+        assert [result['path'] for result in index.search("new")] == ["new.py"]
+
+def test_excluded_dirs_are_skipped():
+    with tempfile.TemporaryDirectory() as root:
+        _workspace(root)
+        index = _index(root, snapshot_path="")
+        index.refresh()
+        assert index.search("pycache") == []
+
+def test_snapshot_is_loaded():
+    with tempfile.TemporaryDirectory() as root:
+        _workspace(root)
+        _index(root).refresh()
+        index = _index(root)
+        assert index._load_snapshot()
+        assert len(index.search("")) == 3
+
+def test_query_modes():
+    with tempfile.TemporaryDirectory() as root:
+        _workspace(root)
+        index = _index(root, snapshot_path="")
+        index.refresh()
+        assert [r['path'] for r in index.search("re:main\\.py$")] == ["main.py"]
+        assert [r['path'] for r in index.search("content:syncara")] == [os.path.join("docs", "README.md")]
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing WorkspaceFileIndex...")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e!r}")
+    print(f"\n📊 {len(tests) - failed}/{len(tests)} tests passed")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script untuk histogram latency (_Histogram.percentile) di metrics
+"""
+
+import sys
+import os
+
+# Add the syncara directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from syncara.modules.metrics import (
+    BUCKET_BOUNDS, METRICS_CONFIG, PerformanceMonitor, _Histogram, _bucket_index
+)
+
+# Error relatif percentile dibatasi oleh lebar bucket (bucket_growth)
+TOLERANCE = METRICS_CONFIG["bucket_growth"] - 1
+
+def _histogram(durations, success=True) -> _Histogram:
+    histogram = _Histogram()
+    for duration in durations:
+        histogram.add(_bucket_index(duration), duration, success)
+    return histogram
+
+def _exact_percentile(durations, q):
+    ordered = sorted(durations)
+    return ordered[max(int(q * len(ordered) + 0.5) - 1, 0)]
+
+def _assert_close(actual, expected):
+    assert abs(actual - expected) <= expected * TOLERANCE, f"{actual} vs {expected}"
+
+def test_bucket_index_matches_bounds():
+    """Durasi selalu masuk bucket pertama yang batas atasnya >= durasi"""
+    for duration in (0.00005, 0.0001, 0.00013, 0.01, 0.5, 1.0, 42.0, 299.0):
+        index = _bucket_index(duration)
+        assert duration <= BUCKET_BOUNDS[index] * (1 + 1e-9)
+        if index:
+            assert duration > BUCKET_BOUNDS[index - 1] * (1 - 1e-9)
+    assert _bucket_index(1000.0) == len(BUCKET_BOUNDS)
+
+def test_empty_histogram_is_zero():
+    histogram = _Histogram()
+    assert histogram.percentile(0.5) == 0.0
+    assert histogram.summary()["p99"] == 0.0
+
+def test_single_value_never_exceeds_max():
+    histogram = _histogram([0.25])
+    for q in (0.01, 0.5, 0.99, 1.0):
+        value = histogram.percentile(q)
+        assert value <= 0.25
+        _assert_close(value, 0.25)
+
+def test_uniform_distribution_within_bucket_error():
+    durations = [index / 1000 for index in range(1, 1001)]
+    histogram = _histogram(durations)
+    for q in (0.5, 0.95, 0.99):
+        _assert_close(histogram.percentile(q), _exact_percentile(durations, q))
+
+def test_skewed_distribution_tail():
+    """Sebagian besar request cepat, tail lambat tetap terlihat di p99"""
+    durations = [0.01] * 980 + [2.0] * 20
+    histogram = _histogram(durations)
+    _assert_close(histogram.percentile(0.50), 0.01)
+    _assert_close(histogram.percentile(0.95), 0.01)
+    _assert_close(histogram.percentile(0.99), 2.0)
+
+def test_percentile_is_monotonic():
+    durations = [(index % 97 + 1) / 50 for index in range(500)]
+    histogram = _histogram(durations)
+    values = [histogram.percentile(q / 100) for q in range(1, 101)]
+    assert values == sorted(values)
+    assert values[-1] <= histogram.max
+
+def test_overflow_bucket_returns_max():
+    histogram = _histogram([0.1, 500.0, 900.0])
+    assert histogram.percentile(0.99) == 900.0
+
+def test_merge_equals_combined():
+    first = [0.001 * index for index in range(1, 300)]
+    second = [0.5 + 0.01 * index for index in range(200)]
+    merged = _histogram(first)
+    merged.merge(_histogram(second))
+    combined = _histogram(first + second)
+    assert merged.buckets == combined.buckets
+    assert merged.count == combined.count
+    for q in (0.5, 0.95, 0.99):
+        assert merged.percentile(q) == combined.percentile(q)
+
+def test_summary_counts_errors():
+    histogram = _histogram([0.1, 0.2])
+    histogram.add(_bucket_index(0.3), 0.3, False)
+    summary = histogram.summary()
+    assert summary["count"] == 3
+    assert summary["errors"] == 1
+    assert abs(summary["avg"] - 0.2) < 1e-9
+    assert summary["max"] == 0.3
+
+def test_monitor_stats_include_percentiles():
+    monitor = PerformanceMonitor()
+    for index in range(1, 101):
+        monitor.record("op", index / 100, index % 10 != 0)
+    stats = monitor.get_stats("op")
+    assert stats["total_calls"] == 100
+    assert abs(stats["success_rate"] - 0.9) < 1e-9
+    _assert_close(stats["total"]["p50"], 0.5)
+    assert stats["window"]["count"] == 100
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing metrics histogram...")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e}")
+    print(f"\n📊 {len(tests) - failed}/{len(tests)} tests passed")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test script untuk RateLimiter (GCRA) dan HierarchicalRateLimiter
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the syncara directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from syncara.modules import pyrogram_helpers
+from syncara.modules.pyrogram_helpers import RateLimiter, HierarchicalRateLimiter, RateLimitExceeded
+
+class FakeClock:
+    """Ganti modul time di pyrogram_helpers agar waktu bisa dimajukan manual"""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+        self._original = None
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+    def __enter__(self):
+        self._original = pyrogram_helpers.time
+        pyrogram_helpers.time = self
+        return self
+
+    def __exit__(self, *exc):
+        pyrogram_helpers.time = self._original
+
+def test_burst_then_reject():
+    """Burst sampai max_requests diizinkan, request berikutnya ditolak"""
+    with FakeClock():
+        limiter = RateLimiter(max_requests=5, window_seconds=10)
+        assert all(limiter.is_allowed("user") for _ in range(5))
+        assert not limiter.is_allowed("user")
+
+def test_retry_after_is_emission_interval():
+    """Setelah burst habis, slot berikutnya tersedia satu emission interval kemudian"""
+    with FakeClock() as clock:
+        limiter = RateLimiter(max_requests=5, window_seconds=10)
+        for _ in range(5):
+            assert limiter.check("user") == 0
+        assert abs(limiter.check("user") - 2.0) < 1e-9
+
+        clock.advance(1.9)
+        assert limiter.check("user") > 0
+        clock.advance(0.1)
+        assert limiter.check("user") == 0
+
+def test_rejected_request_does_not_consume_quota():
+    with FakeClock() as clock:
+        limiter = RateLimiter(max_requests=2, window_seconds=10)
+        limiter.check("user")
+        limiter.check("user")
+        for _ in range(10):
+            assert limiter.check("user") > 0
+        clock.advance(5)
+        assert limiter.check("user") == 0
+
+def test_keys_are_independent():
+    with FakeClock():
+        limiter = RateLimiter(max_requests=1, window_seconds=60)
+        assert limiter.is_allowed("a")
+        assert not limiter.is_allowed("a")
+        assert limiter.is_allowed("b")
+
+def test_cost_consumes_multiple_slots():
+    with FakeClock():
+        limiter = RateLimiter(max_requests=4, window_seconds=4)
+        assert limiter.check("user", cost=3) == 0
+        assert limiter.check("user", cost=2) > 0
+        assert limiter.check("user", cost=1) == 0
+
+def test_idle_keys_expire():
+    """Key yang idle lebih dari satu window dibuang dari memori"""
+    with FakeClock() as clock:
+        limiter = RateLimiter(max_requests=3, window_seconds=10)
+        for index in range(100):
+            limiter.check(f"user{index}")
+        assert len(limiter) == 100
+
+        clock.advance(11)
+        limiter.check("fresh")
+        assert len(limiter) == 1
+        assert limiter.get_stats()["active_keys"] == 1
+
+def test_reset_restores_quota():
+    with FakeClock():
+        limiter = RateLimiter(max_requests=1, window_seconds=60)
+        limiter.check("user")
+        assert not limiter.is_allowed("user")
+        limiter.reset("user")
+        assert limiter.is_allowed("user")
+
+def test_acquire_raises_when_timeout_too_short():
+    with FakeClock():
+        limiter = RateLimiter(max_requests=1, window_seconds=60)
+        limiter.check("user")
+        try:
+            asyncio.run(limiter.acquire("user", timeout=1))
+        except RateLimitExceeded as e:
+            assert abs(e.retry_after - 60) < 1e-9
+        else:
+            raise AssertionError("acquire seharusnya raise RateLimitExceeded")
+
+def test_hierarchical_most_restrictive_level_wins():
+    with FakeClock():
+        limiter = HierarchicalRateLimiter({"user": (2, 10), "chat": (5, 10), "global": (100, 10)})
+        assert limiter.check(user=1, chat=1) == (0.0, None)
+        assert limiter.check(user=1, chat=1) == (0.0, None)
+        retry_after, level = limiter.check(user=1, chat=1)
+        assert retry_after > 0
+        assert level == "user"
+
+def test_hierarchical_rejection_consumes_nothing():
+    """Request yang ditolak satu level tidak mengurangi kuota level lain"""
+    with FakeClock():
+        limiter = HierarchicalRateLimiter({"user": (1, 10), "chat": (2, 10)})
+        assert limiter.check(user=1, chat=1)[0] == 0
+        # user 1 ditolak: kuota chat tidak boleh ikut terpakai
+        assert limiter.check(user=1, chat=1)[1] == "user"
+        assert limiter.check(user=2, chat=1)[0] == 0
+        retry_after, level = limiter.check(user=3, chat=1)
+        assert level == "chat" and retry_after > 0
+
+def test_hierarchical_missing_keys_skip_level():
+    with FakeClock():
+        limiter = HierarchicalRateLimiter({"user": (1, 10), "global": (3, 10)})
+        assert limiter.check()[0] == 0
+        assert limiter.check()[0] == 0
+        assert limiter.check()[0] == 0
+        assert limiter.check()[1] == "global"
+
+def test_hierarchical_acquire_stats():
+    with FakeClock():
+        limiter = HierarchicalRateLimiter({"user": (1, 60)})
+        assert asyncio.run(limiter.acquire(user=1)) == 0
+        try:
+            asyncio.run(limiter.acquire(user=1, timeout=5))
+        except RateLimitExceeded as e:
+            assert e.level == "user"
+        else:
+            raise AssertionError("acquire seharusnya raise RateLimitExceeded")
+        stats = limiter.get_stats()
+        assert stats["allowed"] == 1
+        assert stats["rejected"] == 1
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing RateLimiter...")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e}")
+    print(f"\n📊 {len(tests) - failed}/{len(tests)} tests passed")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
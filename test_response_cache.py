@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script untuk ResponseCache (exact & approximate lookup)
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the syncara directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from syncara.services.response_cache import RESPONSE_CACHE_CONFIG, ResponseCache, is_cacheable_response
+
+# Test hanya memakai cache memory
+RESPONSE_CACHE_CONFIG["persist"] = False
+
+PARAMS = {"temperature": 0.7, "top_p": 1}
+SCOPE = "AERIS:private"
+
+def _keys(prompt: str, scope: str = SCOPE, model: str = "model", params: dict = None):
+    return ResponseCache.make_keys(prompt, scope, model, params or PARAMS)
+
+def _store(cache: ResponseCache, prompt: str, response: str, **kwargs):
+    asyncio.run(cache.store(*_keys(prompt, **kwargs), response, 1.5))
+
+def _lookup(cache: ResponseCache, prompt: str, **kwargs):
+    return asyncio.run(cache.lookup(*_keys(prompt, **kwargs)))
+
+def test_exact_hit_ignores_case_and_whitespace():
+    cache = ResponseCache()
+    _store(cache, "Apa itu Python?", "Bahasa pemrograman")
+    assert _lookup(cache, "  apa itu   python? ") == "Bahasa pemrograman"
+    assert cache.stats["hits"] == 1
+    assert cache.stats["saved_seconds"] == 1.5
+
+def test_miss_for_other_scope_model_or_params():
+    cache = ResponseCache()
+    _store(cache, "apa itu python?", "Bahasa pemrograman")
+    assert _lookup(cache, "apa itu python?", scope="KAIROS:private") is None
+    assert _lookup(cache, "apa itu python?", model="model-lain") is None
+    assert _lookup(cache, "apa itu python?", params={"temperature": 1.0, "top_p": 1}) is None
+
+def test_approximate_hit_for_similar_prompt():
+    cache = ResponseCache()
+    _store(cache, "bagaimana cara install python di windows 11 dengan mudah sekali", "Unduh installer")
+    # Satu dari 10 token diganti: Jaccard 9/11 < 0.9, jadi miss
+    assert _lookup(cache, "bagaimana cara install python di windows 10 dengan mudah sekali") is None
+    # Tambahan satu token: Jaccard 10/11 >= 0.9
+    assert _lookup(cache, "bagaimana cara install python di windows 11 dengan mudah sekali ya") == "Unduh installer"
+    assert cache.stats["approximate_hits"] == 1
+
+def test_approximate_needs_minimum_tokens():
+    cache = ResponseCache()
+    _store(cache, "halo apa kabar", "Baik")
+    assert _lookup(cache, "halo apa kabar?") is None
+
+def test_approximate_can_be_disabled():
+    cache = ResponseCache()
+    _store(cache, "bagaimana cara install python di windows 11 dengan mudah sekali", "Unduh installer")
+    RESPONSE_CACHE_CONFIG["approximate"] = False
+    try:
+        assert _lookup(cache, "bagaimana cara install python di windows 11 dengan mudah sekali ya") is None
+    finally:
+        RESPONSE_CACHE_CONFIG["approximate"] = True
+
+def test_approximate_stays_within_scope():
+    cache = ResponseCache()
+    _store(cache, "bagaimana cara install python di windows 11 dengan mudah sekali", "Unduh installer")
+    assert _lookup(cache, "bagaimana cara install python di windows 11 dengan mudah sekali ya",
+                   scope="NOVA:private") is None
+
+def test_personalized_scope_isolates_users():
+    """Scope chat + user (prompt dengan history/user context) tidak dibagi ke user lain"""
+    cache = ResponseCache()
+    _store(cache, "rekomendasi buku untuk saya", "Untuk Budi: ...", scope="AERIS:group:-100:1")
+    assert _lookup(cache, "rekomendasi buku untuk saya", scope="AERIS:group:-100:2") is None
+    assert _lookup(cache, "rekomendasi buku untuk saya", scope="AERIS:group:-200:1") is None
+    assert _lookup(cache, "rekomendasi buku untuk saya", scope="AERIS:group") is None
+    assert _lookup(cache, "rekomendasi buku untuk saya", scope="AERIS:group:-100:1") == "Untuk Budi: ..."
+
+def test_uncacheable_responses_are_not_stored():
+    cache = ResponseCache()
+    for prompt, response in (("a b c d", "Error: timeout"), ("e f g h", "   "),
+                             ("kirim pesan ke grup sekarang", "Siap [USERBOT:SEND_MSG:123:halo]")):
+        _store(cache, prompt, response)
+        assert _lookup(cache, prompt) is None
+    assert cache.stats["stores"] == 0
+    assert not is_cacheable_response("Oke [CHAT:HISTORY]")
+    assert is_cacheable_response("Pakai [tanda kurung] biasa saja")
+
+def test_expired_entry_is_miss():
+    cache = ResponseCache(ttl=60)
+    keys = _keys("apa itu python?")
+    asyncio.run(cache.store(*keys, "Bahasa pemrograman", 1.0))
+    cache._entries[keys[0]].expires_at = 0
+    assert _lookup(cache, "apa itu python?") is None
+    assert cache.stats["expired"] == 1
+    assert cache.get_stats()["entries"] == 0
+
+def test_lru_eviction_cleans_index():
+    cache = ResponseCache(max_entries=2)
+    _store(cache, "pertanyaan satu tentang python dasar", "1")
+    _store(cache, "pertanyaan dua tentang python dasar", "2")
+    _store(cache, "pertanyaan tiga tentang python dasar", "3")
+    assert cache.stats["evictions"] == 1
+    assert _lookup(cache, "pertanyaan satu tentang python dasar") is None
+    indexed = set().union(*cache._index[_keys("x")[1]].values())
+    assert indexed == set(cache._entries)
+
+def test_get_or_generate_shares_inflight_requests():
+    cache = ResponseCache()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "Jawaban"
+
+    async def run():
+        keys = _keys("pertanyaan yang sama persis")
+        return await asyncio.gather(*(cache.get_or_generate(*keys, generate) for _ in range(3)))
+
+    assert asyncio.run(run()) == ["Jawaban"] * 3
+    assert len(calls) == 1
+    assert cache.stats["shared_inflight"] == 2
+    assert _lookup(cache, "pertanyaan yang sama persis") == "Jawaban"
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing ResponseCache...")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e}")
+    print(f"\n📊 {len(tests) - failed}/{len(tests)} tests passed")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
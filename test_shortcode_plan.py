@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script untuk rencana eksekusi shortcode (build_execution_plan,
+validate_shortcode_order) dan timeout per shortcode
+"""
+
+import sys
+import os
+
+# Add the syncara directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__)))
+
+from syncara.shortcode import SHORTCODE_EXECUTION_CONFIG, ShortcodeRegistry
+
+registry = ShortcodeRegistry()
+
+def _position(order, index):
+    return order.index(index)
+
+def test_independent_shortcodes_keep_text_order():
+    order, deps = registry.build_execution_plan(['IMAGE:GEN:kucing', 'SEARCH:WEB:berita', 'PYTHON:EXEC:1+1'])
+    assert order == [0, 1, 2]
+    assert all(not dependencies for dependencies in deps.values())
+
+def test_rule_moves_dependency_first():
+    """CANVAS:EXPORT ditulis sebelum CANVAS:CREATE tetap dijalankan setelahnya"""
+    order, deps = registry.build_execution_plan(['CANVAS:EXPORT:a.md', 'CANVAS:CREATE:a.md:isi'])
+    assert order == [1, 0]
+    assert 1 in deps[0]
+
+def test_chain_of_rules():
+    names = ['MULTISTEP:EXECUTE:wf', 'MULTISTEP:ADD_STEP:wf', 'MULTISTEP:CREATE_WORKFLOW:wf']
+    order, deps = registry.build_execution_plan(names)
+    assert order == [2, 1, 0]
+    assert {1, 2} <= deps[0]
+    assert 2 in deps[1]
+
+def test_aliases_are_normalized():
+    """CANVAS:UPDATE adalah alias CANVAS:EDIT, jadi aturan CREATE -> EDIT berlaku"""
+    order, deps = registry.build_execution_plan(['canvas:update:a.md:baru', 'CANVAS:CREATE:a.md:isi'])
+    assert order == [1, 0]
+    assert 1 in deps[0]
+
+def test_serial_category_is_chained():
+    """Kategori dengan state bersama (TODO) berjalan berurutan walau tanpa aturan"""
+    order, deps = registry.build_execution_plan(['TODO:ADD:a', 'IMAGE:GEN:x', 'TODO:ADD:b', 'TODO:LIST'])
+    assert order == [0, 1, 2, 3]
+    assert deps[2] == {0}
+    assert deps[3] == {2}
+    assert deps[1] == set()
+
+def test_parallel_category_has_no_chain():
+    _, deps = registry.build_execution_plan(['IMAGE:GEN:a', 'IMAGE:GEN:b'])
+    assert deps == {0: set(), 1: set()}
+
+def test_dependencies_always_precede_in_order():
+    names = ['CANVAS:DELETE:a', 'CANVAS:SHOW:a', 'TODO:LIST', 'CANVAS:EDIT:a:x',
+             'CANVAS:CREATE:a:y', 'CANVAS:EXPORT:a', 'TODO:ADD:z']
+    order, deps = registry.build_execution_plan(names)
+    assert sorted(order) == list(range(len(names)))
+    for index, dependencies in deps.items():
+        for dependency in dependencies:
+            assert _position(order, dependency) < _position(order, index)
+
+def test_empty_plan():
+    assert registry.build_execution_plan([]) == ([], {})
+
+def test_validate_valid_order():
+    result = registry.validate_shortcode_order(['CANVAS:CREATE:a.md:isi', 'CANVAS:EXPORT:a.md'])
+    assert result['valid']
+    assert result['issues'] == []
+    assert result['execution_order'] == ['CANVAS:CREATE', 'CANVAS:EXPORT']
+
+def test_validate_reports_reversed_order():
+    result = registry.validate_shortcode_order(['CANVAS:DELETE:a.md', 'CANVAS:CREATE:a.md:isi'])
+    assert not result['valid']
+    assert len(result['issues']) == 1
+    assert 'CANVAS:DELETE' in result['issues'][0]
+    assert result['execution_order'] == ['CANVAS:CREATE', 'CANVAS:DELETE']
+
+def test_timeout_overrides():
+    timeouts = SHORTCODE_EXECUTION_CONFIG["timeouts"]
+    assert registry._get_timeout('PYROGRAM:BULK_KIRIM:-100:halo') is None
+    assert registry._get_timeout('PYROGRAM:BACKUP_LENGKAP') is None
+    assert registry._get_timeout('PYROGRAM:GET_CHAT:-100') == timeouts["PYROGRAM"]
+    assert registry._get_timeout('IMAGE:GENERATE:kucing') == timeouts["IMAGE"]
+    assert registry._get_timeout('SEARCH:WEB:x') == SHORTCODE_EXECUTION_CONFIG["default_timeout"]
+
+def main():
+    """Run all tests"""
+    print("🧪 Testing shortcode execution plan...")
+    tests = [value for name, value in sorted(globals().items()) if name.startswith("test_")]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"   ✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"   ❌ {test.__name__}: {e}")
+    print(f"\n📊 {len(tests) - failed}/{len(tests)} tests passed")
+    return failed == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)